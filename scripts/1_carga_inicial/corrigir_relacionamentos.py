@@ -10,10 +10,14 @@ from pathlib import Path
 ROOT_DIR = Path(__file__).parent.parent.parent
 sys.path.insert(0, str(ROOT_DIR))
 
+import argparse
 import time
 from src.config import get_delay_padrao, DELAY_RATE_LIMIT_429, RETRY_BASE_WAIT, MAX_RETRIES
 from src.crawler.fipe_crawler import buscar_marcas_carros, buscar_modelos, buscar_anos_modelo
 from src.cache.fipe_local_cache import FipeLocalCache
+from src.crawler.estimador import estimar_relacionamentos, imprimir_estimativa
+from src.crawler.limitador import descrever_teto
+from src.registros import AnoCombustivel
 
 
 def buscar_marcas_com_retry(tipo_veiculo, stats=None, max_retries=MAX_RETRIES):
@@ -154,7 +158,7 @@ def processar_por_ano(cache, codigo_marca, nome_marca, anos_api, stats, tipo_vei
     print(f"  📅 Buscando modelos por ano/combustível...")
     
     modelos_encontrados = {}  # {codigo: {'Value': X, 'Label': Y}}
-    relacionamentos = []  # [(codigo_modelo, codigo_ano_combustivel, label)]
+    relacionamentos = []  # [(codigo_modelo, AnoCombustivel)]
     
     for combinacao in anos_api:
         try:
@@ -169,6 +173,8 @@ def processar_por_ano(cache, codigo_marca, nome_marca, anos_api, stats, tipo_vei
                 print(f"    ⚠️ Formato inválido: {codigo_ano_completo}")
                 continue
             
+            ano_registro = AnoCombustivel.da_api(combinacao)
+            
             # Busca modelos desta combinação específica
             modelos = buscar_modelos_por_ano_com_retry(
                 codigo_marca=codigo_marca,
@@ -201,7 +207,7 @@ def processar_por_ano(cache, codigo_marca, nome_marca, anos_api, stats, tipo_vei
                         modelos_encontrados[codigo_modelo] = modelo
                     
                     # Adiciona relacionamento
-                    relacionamentos.append((codigo_modelo, codigo_ano_completo, label_completo))
+                    relacionamentos.append((codigo_modelo, ano_registro))
             
             # Delay entre requisições (2.0s fixo)
             time.sleep(2.0)
@@ -217,16 +223,10 @@ def processar_por_ano(cache, codigo_marca, nome_marca, anos_api, stats, tipo_vei
         cache.save_modelos(modelos_lista, codigo_marca, tipo_veiculo)
         stats['modelos_processados'] += len(modelos_lista)
     
-    # Salva relacionamentos anos/combustível
+    # Salva relacionamentos anos/combustível (um único lote por marca)
     if relacionamentos:
         print(f"  💾 Salvando {len(relacionamentos)} relacionamentos...")
-        for codigo_modelo, codigo_ano_completo, label_completo in relacionamentos:
-            anos_data = [{
-                'Value': codigo_ano_completo,
-                'Label': label_completo
-            }]
-            cache.save_anos_modelo(anos_data, codigo_marca, int(codigo_modelo), tipo_veiculo)
-        
+        cache.save_relacionamentos(codigo_marca, tipo_veiculo, relacionamentos)
         stats['relacionamentos_criados'] += len(relacionamentos)
     
     return len(relacionamentos)
@@ -246,6 +246,7 @@ def repopular_tipo(tipo_veiculo: int, nome_tipo: str, codigo_marca_inicio: str =
     print("=" * 80)
     print(f"FIPE CRAWLER - Repopular Relacionamentos de {nome_tipo}")
     print("=" * 80)
+    print(descrever_teto())
     print()
     
     # Estatísticas
@@ -422,5 +423,29 @@ def main():
     print()
 
 
+def estimar(tipos_veiculo, offline=False):
+    """
+    Modo --plan: estima requisições e tempo da repopulação sem executá-la.
+    A repopulação ignora o cache, então todo modelo/ano da API entra no plano.
+    """
+    cache = FipeLocalCache()
+    # Pausas fixas do script: 2s após modelos e 2s por marca; 2s por requisição "modelos por ano"
+    estimativas = estimar_relacionamentos(
+        cache, tipos_veiculo, usar_cache=False, offline=offline, pausa_marca=4.0, pausa_ano=2.0
+    )
+    requisicoes_extras = 0 if offline else len(tipos_veiculo)
+    imprimir_estimativa("corrigir_relacionamentos.py", estimativas, 1, requisicoes_extras)
+
+
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Repopula relacionamentos modelo-ano da API FIPE")
+    parser.add_argument('--plan', action='store_true', help="Apenas estima requisições e tempo, sem executar")
+    parser.add_argument('--offline', action='store_true', help="Com --plan: usa só o cache local, sem consultar a API")
+    parser.add_argument('--tipos', default='1,2,3', help="Tipos de veículo para --plan (ex: 2,3)")
+    args = parser.parse_args()
+    
+    if args.plan:
+        tipos = [int(t) for t in args.tipos.split(',') if t.strip() in ('1', '2', '3')] or [1, 2, 3]
+        estimar(tipos, args.offline)
+    else:
+        main()
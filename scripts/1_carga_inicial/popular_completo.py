@@ -23,19 +23,26 @@ from pathlib import Path
 ROOT_DIR = Path(__file__).parent.parent.parent
 sys.path.insert(0, str(ROOT_DIR))
 
+import argparse
 import time
-from concurrent.futures import ThreadPoolExecutor, as_completed
-from threading import Semaphore, Lock, current_thread
-from src.config import RETRY_BASE_WAIT, MAX_RETRIES
+from threading import Lock, current_thread
+from src.config import RETRY_BASE_WAIT, MAX_RETRIES, PIPELINE_WORKERS, PIPELINE_TAMANHO_FILA
 from src.crawler.fipe_crawler import buscar_marcas_carros, buscar_modelos, buscar_anos_modelo, buscar_tabela_referencia, buscar_modelos_por_ano
 from src.cache.fipe_local_cache import FipeLocalCache
+from src.cache.diario_coleta import DiarioColeta
+from src.crawler.planejador import planejar_marca
+from src.crawler.escalonador import UnidadeTrabalho, estimar_custo_marca, dividir_plano
+from src.crawler.pipeline import Pipeline, Estagio
+from src.crawler.estimador import estimar_relacionamentos, imprimir_estimativa
+from src.crawler.limitador import descrever_teto
+from src.registros import AnoCombustivel
 
 
 class PopularBancoOtimizado:
     """
     Classe para popular o banco de forma otimizada:
     1. Gravação local em SQLite (rápido)
-    2. Processamento paralelo (5 marcas simultâneas)
+    2. Pipeline paralelo por estágios (ver _criar_pipeline), maior marca primeiro
     3. Suporte a carros, motos e caminhões
     """
     
@@ -48,12 +55,18 @@ class PopularBancoOtimizado:
     
     def __init__(self, max_workers=5, tipos_veiculo=None):
         self.max_workers = max_workers
-        self.semaphore = Semaphore(max_workers)  # Controla concorrência
         self.lock = Lock()  # Thread-safe para stats
-                # Tipos de veículo a processar (padrão: todos)
+        self.marcas_iniciadas = 0
+        self.total_marcas = 0
+        # Custo estimado das marcas: {(tipo, marca): modelos no cache}
+        self.contagem_modelos = {}
+        self.custo_desconhecido = 0
+        # Tipos de veículo a processar (padrão: todos)
         self.tipos_veiculo = tipos_veiculo if tipos_veiculo else [1, 2, 3]
         # Cache local
         self.cache_local = FipeLocalCache()
+        # Diário de requisições concluídas (retomada exata após interrupção)
+        self.diario = DiarioColeta.do_cache(self.cache_local.db_path)
         
         # Estatísticas
         self.stats = {
@@ -62,157 +75,145 @@ class PopularBancoOtimizado:
             'modelos': 0,
             'anos': 0,
             'erros': 0,
+            'reaproveitadas': 0,
             'tempo_api': 0.0,
             'tempo_db_local': 0.0,
             'tempo_delays': 0.0
         }
     
-    def processar_marca(self, marca, i, total, tipo_veiculo):
+    def _estagio_marcas(self, tipos_veiculo, emitir):
         """
-        Processa uma marca em paralelo usando estratégia híbrida inteligente.
-        - Se poucos modelos (<50): busca anos por modelo (menos requisições)
-        - Se muitos modelos (>=50): busca modelos por ano (evita centenas de requisições)
-        
-        Args:
-            marca: Dicionário com dados da marca
-            i: Índice atual
-            total: Total de marcas
-            tipo_veiculo: Tipo de veículo (1=Carros, 2=Motos, 3=Caminhões)
+        Estágio 1 (API): lista as marcas de cada tipo.
+        Envia as marcas para gravação e as unidades (tipo, marca) para o estágio de
+        modelos, mais caras primeiro (custo pelos modelos no cache, ver escalonador).
         """
-        with self.semaphore:  # Limita concorrência a max_workers
-            codigo_marca = marca['Value']
-            nome_marca = marca['Label']
-            tipo_info = self.TIPOS_VEICULO.get(tipo_veiculo, {'nome': 'Desconhecido', 'emoji': '❓'})
+        unidades = []
+        for tipo_veiculo in tipos_veiculo:
+            tipo_info = self.TIPOS_VEICULO[tipo_veiculo]
             
-            # Identifica worker (thread)
-            worker_id = current_thread().name.replace('ThreadPoolExecutor-', 'W')
+            inicio_api = time.time()
+            marcas_api = buscar_marcas_carros(tipo_veiculo)
+            with self.lock:
+                self.stats['tempo_api'] += time.time() - inicio_api
             
-            print(f"[{worker_id}] [{i}/{total}] {tipo_info['emoji']} Processando: {nome_marca} ({codigo_marca}) - {tipo_info['nome']}")
+            if not marcas_api:
+                print(f"⚠️  Nenhuma marca de {tipo_info['nome'].lower()} encontrada")
+                continue
             
-            try:
-                # 1. Busca modelos da marca (para decidir estratégia)
-                inicio_api = time.time()
-                resultado = self._buscar_modelos_com_retry(codigo_marca, nome_marca, worker_id, tipo_veiculo)
-                tempo_api = time.time() - inicio_api
-                
-                with self.lock:
-                    self.stats['tempo_api'] += tempo_api
-                
-                # Delay já implementado em buscar_modelos() no fipe_crawler.py
-                
-                if not resultado or 'Modelos' not in resultado:
-                    print(f"[{worker_id}]     ⚠️ Nenhum modelo encontrado para {nome_marca} ({codigo_marca})")
-                    return
-                
-                modelos_api = resultado['Modelos']
-                anos_api = resultado.get('Anos', [])  # Anos disponíveis da marca
-                total_modelos = len(modelos_api)
-                
-                # DEBUG: Mostra informação sobre o retorno da API
-                print(f"[{worker_id}]     🔍 API retornou: {total_modelos} modelos, {len(anos_api)} anos")
-                
-                # 2. Verifica se há modelos sem anos (marca incompleta)
-                modelos_cache = self.cache_local.get_modelos_marca_dict(codigo_marca)
-                modelos_sem_anos = self.cache_local.get_modelos_sem_anos_marca(codigo_marca)
-                
-                if modelos_sem_anos:
-                    print(f"[{worker_id}]     ⚠️  {len(modelos_sem_anos)} modelos sem anos - REPROCESSANDO")
-                    reprocessar = True
-                elif modelos_cache and len(modelos_cache) >= total_modelos:
-                    print(f"[{worker_id}]     ✅ Marca completa ({total_modelos} modelos) - pulando")
-                    return
-                else:
-                    print(f"[{worker_id}]     🆕 Marca nova/incompleta - processando")
-                    reprocessar = False
-                
-                # 3. DECISÃO INTELIGENTE: qual estratégia usar?
-                # Compara diretamente: modelos vs combinações de anos da API
-                # Escolhe o que tiver MENOS requisições
-                
-                total_combinacoes_anos = len(anos_api)
-                
-                if total_modelos <= total_combinacoes_anos:
-                    # Menos modelos que combinações de anos: busca POR MODELO
-                    print(f"[{worker_id}]     📊 {total_modelos} modelos vs {total_combinacoes_anos} combinações → Estratégia: ANOS POR MODELO")
-                    self._processar_por_modelo(codigo_marca, nome_marca, modelos_api, modelos_cache, modelos_sem_anos, worker_id, tipo_veiculo)
-                else:
-                    # Menos combinações de anos que modelos: busca POR ANO
-                    print(f"[{worker_id}]     📊 {total_modelos} modelos vs {total_combinacoes_anos} combinações → Estratégia: MODELOS POR ANO")
-                    self._processar_por_ano(codigo_marca, nome_marca, anos_api, worker_id, tipo_veiculo)
-                
-                # Delay entre marcas (2.0s fixo)
-                inicio_delay = time.time()
-                time.sleep(2.0)
-                tempo_delay = time.time() - inicio_delay
-                
-                with self.lock:
-                    self.stats['tempo_delays'] += tempo_delay
+            emitir(('save_marcas', (marcas_api, tipo_veiculo), 'marcas', len(marcas_api)), destino='gravacao')
+            print(f"{tipo_info['emoji']} {len(marcas_api)} marcas de {tipo_info['nome'].lower()} encontradas")
             
-            except Exception as e:
-                print(f"[{worker_id}]     ❌ Erro ao processar {nome_marca} ({codigo_marca}): {e}")
-                with self.lock:
-                    self.stats['erros'] += 1
-                print()
+            for marca in marcas_api:
+                num_modelos = self.contagem_modelos.get((tipo_veiculo, str(marca['Value'])), 0)
+                unidades.append(UnidadeTrabalho(
+                    estimar_custo_marca(num_modelos, self.custo_desconhecido), tipo_veiculo, marca
+                ))
+        
+        self.total_marcas = len(unidades)
+        print(f"📦 Total a verificar: {self.total_marcas} marcas (maiores primeiro)\n")
+        for unidade in sorted(unidades, key=lambda u: u.custo, reverse=True):
+            emitir(unidade, prioridade=unidade.custo)
     
-    def _processar_por_modelo(self, codigo_marca, nome_marca, modelos_api, modelos_cache, modelos_sem_anos, worker_id, tipo_veiculo):
+    def _estagio_modelos(self, unidade, emitir):
+        """Estágio 2 (API): ConsultarModelos de uma marca (modelos + anos da marca)"""
+        codigo_marca = unidade.marca['Value']
+        nome_marca = unidade.marca['Label']
+        tipo_info = self.TIPOS_VEICULO.get(unidade.tipo_veiculo, {'nome': 'Desconhecido', 'emoji': '❓'})
+        worker_id = current_thread().name
+        
+        with self.lock:
+            self.marcas_iniciadas += 1
+            i = self.marcas_iniciadas
+        
+        print(f"[{worker_id}] [{i}/{self.total_marcas}] {tipo_info['emoji']} Listando: {nome_marca} ({codigo_marca}) - {tipo_info['nome']}")
+        
+        resultado = self._consultar_api(
+            unidade.tipo_veiculo, codigo_marca, 'modelos',
+            lambda: self._buscar_modelos_com_retry(codigo_marca, nome_marca, worker_id, unidade.tipo_veiculo)
+        )
+        
+        if not resultado or 'Modelos' not in resultado:
+            print(f"[{worker_id}]     ⚠️ Nenhum modelo encontrado para {nome_marca} ({codigo_marca})")
+            return
+        
+        emitir((unidade, resultado['Modelos'], resultado.get('Anos', [])), prioridade=unidade.custo)
+    
+    def _estagio_plano(self, item, emitir):
         """
-        Estratégia 1: Busca anos para cada modelo.
-        Mais eficiente quando há poucos modelos (<50).
+        Estágio 3 (SQLite, leitura): planeja o menor conjunto de requisições da marca
+        a partir do cache e divide o plano em lotes de até LOTE_SUBUNIDADE requisições,
+        que os workers de anos consomem em paralelo (marca grande não prende um worker).
         """
-        # Identifica modelos novos ou que precisam reprocessar
-        codigos_cache = set(modelos_cache.keys())
-        codigos_sem_anos = set(str(cod) for cod in modelos_sem_anos)  # Modelos que precisam reprocessar
+        unidade, modelos_api, anos_api = item
+        codigo_marca = unidade.marca['Value']
+        nome_marca = unidade.marca['Label']
+        
+        inicio_db = time.time()
+        anos_por_modelo = self.cache_local.get_anos_por_modelo(codigo_marca, unidade.tipo_veiculo)
+        with self.lock:
+            self.stats['tempo_db_local'] += time.time() - inicio_db
         
-        # Prioriza modelos sem anos, depois novos modelos
-        modelos_processar = [m for m in modelos_api if str(m['Value']) not in codigos_cache or str(m['Value']) in codigos_sem_anos]
+        plano = planejar_marca(modelos_api, anos_api, anos_por_modelo)
         
-        if not modelos_processar:
-            modelos_processar = modelos_api  # Reprocessa todos se houver problemas
+        if plano.total_requisicoes == 0:
+            print(f"    ✅ {nome_marca} ({codigo_marca}) completa ({len(modelos_api)} modelos) - pulando")
+            return
+        
+        lotes = dividir_plano(plano, unidade.tipo_veiculo, unidade.marca)
+        print(f"    📊 {nome_marca} ({codigo_marca}): {plano.descricao()} em {len(lotes)} lote(s)")
+        for lote in lotes:
+            emitir(lote, prioridade=lote.custo)
+    
+    def _estagio_anos(self, lote, emitir):
+        """Estágio 4 (API): executa um lote do plano e envia o resultado para gravação"""
+        codigo_marca = lote.marca['Value']
+        nome_marca = lote.marca['Label']
+        worker_id = current_thread().name
+        
+        if lote.modelos:
+            self._buscar_anos_dos_modelos(codigo_marca, lote.modelos, worker_id, lote.tipo_veiculo, emitir)
+        if lote.anos:
+            self._buscar_modelos_dos_anos(codigo_marca, nome_marca, lote.anos, worker_id, lote.tipo_veiculo, emitir)
+    
+    def _estagio_gravacao(self, operacao, emitir):
+        """
+        Estágio 5 (SQLite, escrita): único escritor do cache.
+        
+        Args:
+            operacao: (método do FipeLocalCache, argumentos, chave em stats, quantidade)
+        """
+        metodo, args, chave_stats, quantidade = operacao
         
-        # Salva modelos
         inicio_db = time.time()
-        self.cache_local.save_modelos(modelos_processar, codigo_marca, tipo_veiculo)
+        getattr(self.cache_local, metodo)(*args)
         tempo_db = time.time() - inicio_db
         
         with self.lock:
-            self.stats['modelos'] += len(modelos_processar)
+            self.stats[chave_stats] += quantidade
             self.stats['tempo_db_local'] += tempo_db
-        
-        if modelos_sem_anos:
-            print(f"[{worker_id}]     🔄 {len(modelos_processar)} modelos reprocessados (estavam sem anos)")
-        else:
-            print(f"[{worker_id}]     💾 {len(modelos_processar)} modelos salvos")
-        print(f"[{worker_id}]     📅 Buscando anos de cada modelo...")
+    
+    def _buscar_anos_dos_modelos(self, codigo_marca, modelos_processar, worker_id, tipo_veiculo, emitir):
+        """
+        Estratégia 1: Busca anos para cada modelo do lote.
+        Usada para modelos novos/incompletos quando há menos modelos que anos a verificar.
+        """
+        emitir(('save_modelos', (modelos_processar, codigo_marca, tipo_veiculo), 'modelos', len(modelos_processar)), destino='gravacao')
         
         anos_total = 0
         
-        for j, modelo in enumerate(modelos_processar, 1):
+        for modelo in modelos_processar:
             codigo_modelo = modelo['Value']
             nome_modelo = modelo['Label']
             
-            # Progresso a cada 20 modelos
-            if j % 20 == 0:
-                print(f"[{worker_id}]         Progresso: {j}/{len(modelos_processar)} modelos...")
-            
             try:
-                # Busca anos da API com retry
-                inicio_anos = time.time()
-                anos = self._buscar_anos_com_retry(codigo_marca, codigo_modelo, worker_id, nome_modelo, tipo_veiculo)
-                tempo_anos = time.time() - inicio_anos
-                
-                with self.lock:
-                    self.stats['tempo_api'] += tempo_anos
+                # Busca anos da API com retry (ou do diário, se já consultado)
+                anos = self._consultar_api(
+                    tipo_veiculo, codigo_marca, f"modelo:{codigo_modelo}",
+                    lambda: self._buscar_anos_com_retry(codigo_marca, codigo_modelo, worker_id, nome_modelo, tipo_veiculo)
+                )
                 
                 if anos:
-                    # Salva localmente
-                    inicio_db = time.time()
-                    self.cache_local.save_anos_modelo(anos, codigo_marca, codigo_modelo, tipo_veiculo)
-                    tempo_db = time.time() - inicio_db
-                    
-                    with self.lock:
-                        self.stats['anos'] += len(anos)
-                        self.stats['tempo_db_local'] += tempo_db
-                    
+                    emitir(('save_anos_modelo', (anos, codigo_marca, codigo_modelo, tipo_veiculo), 'anos', len(anos)), destino='gravacao')
                     anos_total += len(anos)
                 
                 # Delay já implementado em buscar_anos_modelo() no fipe_crawler.py
@@ -223,110 +224,57 @@ class PopularBancoOtimizado:
                     self.stats['erros'] += 1
                 continue
         
-        print(f"[{worker_id}]     ✅ {len(modelos_processar)} modelos, {anos_total} anos salvos")
-        print()
+        print(f"[{worker_id}]     ✅ Marca {codigo_marca}: {len(modelos_processar)} modelos, {anos_total} anos")
     
-    def _processar_por_ano(self, codigo_marca, nome_marca, anos_api, worker_id, tipo_veiculo):
+    def _buscar_modelos_dos_anos(self, codigo_marca, nome_marca, anos_api, worker_id, tipo_veiculo, emitir):
         """
-        Estratégia 2: Busca modelos para cada ano/combustível.
-        Mais eficiente quando há muitos modelos (>=50).
+        Estratégia 2: Busca modelos para cada ano/combustível do lote.
+        Uma requisição cobre o ano em todos os modelos da marca.
+        Cada item de anos_api já é uma combinação ano+combustível que existe na API.
         """
-        from src.crawler.fipe_crawler import buscar_modelos_por_ano
-        
-        print(f"[{worker_id}]     📅 Buscando modelos por ano/combustível...")
+        modelos_encontrados = {}  # {codigo: {'Value': X, 'Label': Y}}
+        relacionamentos = []  # [(codigo_modelo, AnoCombustivel)]
         
-        # OTIMIZAÇÃO: Usa as combinações ano+combustível EXATAS da API
-        # Cada item em anos_api já é uma combinação válida que existe
-        if anos_api and len(anos_api) > 0:
-            # API retorna combinações prontas: [{'Value': '2024-1', 'Label': '2024 Gasolina'}]
-            combinacoes_validas = anos_api
-            print(f"[{worker_id}]     ✅ {len(combinacoes_validas)} combinações ano+combustível da API")
-        else:
-            # Fallback: se API não retornar anos, gera combinações padrão
-            print(f"[{worker_id}]     ⚠️  API não retornou anos, gerando combinações padrão")
-            anos_padrao = ["32000"]  # Zero Km
-            ano_atual = 2025
-            for ano in range(ano_atual, ano_atual - 30, -1):
-                anos_padrao.append(str(ano))
-            
-            combustiveis_padrao = {
-                1: "Gasolina",
-                2: "Álcool/Etanol", 
-                3: "Diesel",
-                4: "Elétrico",
-                5: "Flex",
-                6: "Híbrido",
-                7: "Gás Natural"
-            }
+        for combinacao in anos_api:
+            # Extrai ano e combustível da combinação (Value: "2024-1")
+            codigo_ano_completo = combinacao['Value']
+            label_completo = combinacao['Label']
             
-            # Gera produto cartesiano apenas no fallback
-            combinacoes_validas = []
-            for ano in anos_padrao:
-                for cod_comb, nome_comb in combustiveis_padrao.items():
-                    ano_label = "Zero Km" if ano == "32000" else ano
-                    combinacoes_validas.append({
-                        'Value': f"{ano}-{cod_comb}",
-                        'Label': f"{ano_label} {nome_comb}"
-                    })
+            try:
+                ano_modelo, codigo_combustivel = codigo_ano_completo.split('-')
+                codigo_combustivel = int(codigo_combustivel)
+            except (ValueError, AttributeError):
+                print(f"[{worker_id}]         ⚠️ Formato inválido: {codigo_ano_completo}")
+                continue
             
-            print(f"[{worker_id}]     📅 {len(combinacoes_validas)} combinações padrão geradas")
-        
-        modelos_encontrados = {}  # {codigo: {'Value': X, 'Label': Y}}
-        relacionamentos = []  # [(codigo_modelo, codigo_ano_combustivel)]
-        total_requisicoes = 0
-        
-        for combinacao in combinacoes_validas:
             try:
-                # Extrai ano e combustível da combinação (Value: "2024-1")
-                codigo_ano_completo = combinacao['Value']
-                label_completo = combinacao['Label']
+                ano_registro = AnoCombustivel.da_api(combinacao)
                 
-                try:
-                    ano_modelo, codigo_combustivel = codigo_ano_completo.split('-')
-                    codigo_combustivel = int(codigo_combustivel)
-                except (ValueError, AttributeError):
-                    print(f"[{worker_id}]         ⚠️ Formato inválido: {codigo_ano_completo}")
-                    continue
-                
-                # Busca modelos desta combinação específica
-                inicio_api = time.time()
-                modelos = self._buscar_modelos_por_ano_com_retry(
-                    codigo_marca=codigo_marca,
-                    ano_modelo=ano_modelo,
-                    codigo_combustivel=codigo_combustivel,
-                    nome_marca=nome_marca,
-                    tipo_veiculo=tipo_veiculo,
-                    label_completo=label_completo,
-                    worker_id=worker_id
+                # Busca modelos desta combinação específica (ou do diário, se já consultada)
+                modelos = self._consultar_api(
+                    tipo_veiculo, codigo_marca, f"ano:{codigo_ano_completo}",
+                    lambda: self._buscar_modelos_por_ano_com_retry(
+                        codigo_marca=codigo_marca,
+                        ano_modelo=ano_modelo,
+                        codigo_combustivel=codigo_combustivel,
+                        nome_marca=nome_marca,
+                        tipo_veiculo=tipo_veiculo,
+                        label_completo=label_completo,
+                        worker_id=worker_id
+                    )
                 )
-                tempo_api = time.time() - inicio_api
-                total_requisicoes += 1
-                    
-                with self.lock:
-                    self.stats['tempo_api'] += tempo_api
                 
-                if modelos:
-                    # Valida estrutura dos dados
-                    if isinstance(modelos, str):
-                        print(f"[{worker_id}]         ⚠️ API retornou string em {label_completo}")
+                if not modelos or isinstance(modelos, str):
+                    continue
+                
+                for modelo in modelos:
+                    # Valida estrutura do modelo
+                    if not isinstance(modelo, dict) or 'Value' not in modelo or 'Label' not in modelo:
                         continue
                     
-                    for modelo in modelos:
-                        # Valida que modelo é dict
-                        if not isinstance(modelo, dict):
-                            continue
-                        
-                        if 'Value' not in modelo or 'Label' not in modelo:
-                            continue
-                        
-                        codigo_modelo = str(modelo['Value'])
-                        
-                        # Adiciona modelo (se ainda não existe)
-                        if codigo_modelo not in modelos_encontrados:
-                            modelos_encontrados[codigo_modelo] = modelo
-                        
-                        # Adiciona relacionamento usando o código ano+combustível completo
-                        relacionamentos.append((codigo_modelo, codigo_ano_completo, label_completo))
+                    codigo_modelo = str(modelo['Value'])
+                    modelos_encontrados.setdefault(codigo_modelo, modelo)
+                    relacionamentos.append((codigo_modelo, ano_registro))
                 
                 # Delay já implementado em buscar_modelos_por_ano() no fipe_crawler.py
             
@@ -336,47 +284,32 @@ class PopularBancoOtimizado:
                 with self.lock:
                     self.stats['erros'] += 1
         
-        # Salva modelos no cache
+        # Modelos antes dos relacionamentos (mesma prioridade = ordem de chegada no escritor)
         if modelos_encontrados:
-            print(f"[{worker_id}]     💾 Salvando {len(modelos_encontrados)} modelos...")
-            inicio_db = time.time()
-            
             modelos_lista = list(modelos_encontrados.values())
-            self.cache_local.save_modelos(modelos_lista, codigo_marca, tipo_veiculo)
-            
-            tempo_db = time.time() - inicio_db
-            
-            with self.lock:
-                self.stats['modelos'] += len(modelos_lista)
-                self.stats['tempo_db_local'] += tempo_db
-        
-        # Salva relacionamentos anos/combustível
+            emitir(('save_modelos', (modelos_lista, codigo_marca, tipo_veiculo), 'modelos', len(modelos_lista)), destino='gravacao')
         if relacionamentos:
-            print(f"[{worker_id}]     💾 Salvando {len(relacionamentos)} relacionamentos...")
-            inicio_db = time.time()
-            
-            # Prepara dados para save_anos_modelo
-            for codigo_modelo, codigo_ano_completo, label_completo in relacionamentos:
-                anos_data = [{
-                    'Value': codigo_ano_completo,
-                    'Label': label_completo
-                }]
-                self.cache_local.save_anos_modelo(anos_data, codigo_marca, int(codigo_modelo), tipo_veiculo)
-            
-            tempo_db = time.time() - inicio_db
-            
-            with self.lock:
-                self.stats['anos'] += len(relacionamentos)
-                self.stats['tempo_db_local'] += tempo_db
+            emitir(('save_relacionamentos', (codigo_marca, tipo_veiculo, relacionamentos), 'anos', len(relacionamentos)), destino='gravacao')
         
-        # Calcula economia de requisições
-        requisicoes_por_modelo = len(modelos_encontrados)  # Se fosse buscar anos de cada modelo
-        economia = requisicoes_por_modelo - total_requisicoes
-        economia_perc = (economia / requisicoes_por_modelo * 100) if requisicoes_por_modelo > 0 else 0
+        print(f"[{worker_id}]     ✅ {nome_marca} ({codigo_marca}): {len(anos_api)} anos consultados, "
+              f"{len(modelos_encontrados)} modelos, {len(relacionamentos)} relacionamentos")
+    
+    def _consultar_api(self, tipo_veiculo, codigo_marca, requisicao, buscar):
+        """
+        Executa uma requisição passando pelo diário de coleta: se ela já foi concluída
+        numa execução interrompida, devolve o resultado registrado sem chamar a API;
+        senão chama buscar() e registra o resultado antes de seguir para a gravação.
+        """
+        inicio_api = time.time()
+        resultado, reaproveitado = self.diario.consultar(tipo_veiculo, codigo_marca, requisicao, buscar)
+        tempo_api = time.time() - inicio_api
         
-        print(f"[{worker_id}]     ✅ {len(modelos_encontrados)} modelos, {len(relacionamentos)} relacionamentos")
-        print(f"[{worker_id}]     📊 {total_requisicoes} requisições (economizou {economia} req, {economia_perc:.1f}%)")
-        print()
+        with self.lock:
+            if reaproveitado:
+                self.stats['reaproveitadas'] += 1
+            else:
+                self.stats['tempo_api'] += tempo_api
+        return resultado
     
     def _buscar_modelos_com_retry(self, codigo_marca, nome_marca, worker_id, tipo_veiculo=1, max_retries=MAX_RETRIES):
         """Busca modelos com retry em caso de rate limiting"""
@@ -448,6 +381,25 @@ class PopularBancoOtimizado:
                     raise
         return None
     
+    def _criar_pipeline(self):
+        """
+        Monta o pipeline de coleta. Estágios de API e de SQLite são separados:
+        workers de API nunca esperam gravações e o escritor nunca espera a API.
+        Workers por estágio vêm de PIPELINE_WORKERS; 'anos' usa o que sobra de
+        max_workers depois do estágio de modelos.
+        """
+        workers = dict(PIPELINE_WORKERS)
+        if workers.get('anos') is None:
+            workers['anos'] = max(self.max_workers - workers['modelos'], 1)
+        
+        return Pipeline([
+            Estagio('marcas', self._estagio_marcas, workers['marcas'], PIPELINE_TAMANHO_FILA),
+            Estagio('modelos', self._estagio_modelos, workers['modelos'], PIPELINE_TAMANHO_FILA),
+            Estagio('plano', self._estagio_plano, workers['plano'], PIPELINE_TAMANHO_FILA),
+            Estagio('anos', self._estagio_anos, workers['anos'], PIPELINE_TAMANHO_FILA),
+            Estagio('gravacao', self._estagio_gravacao, workers['gravacao'], PIPELINE_TAMANHO_FILA * 10)
+        ])
+    
     def popular(self):
         """Execução principal do processo otimizado"""
         print("=" * 70)
@@ -455,6 +407,7 @@ class PopularBancoOtimizado:
         print("=" * 70)
         print()
         print(f"⚙️  Configuração: {self.max_workers} workers paralelos")
+        print(descrever_teto())
         print(f"💾 Cache persistente: fipe_local.db")
         print()
         
@@ -471,7 +424,7 @@ class PopularBancoOtimizado:
             print()
             
             # 1. Buscar e salvar tabelas de referência (sempre atualizar)
-            print("📊 ETAPA 1/3: Atualizando tabelas de referência...")
+            print("📊 ETAPA 1/2: Atualizando tabelas de referência...")
             print("-" * 70)
             tabelas = buscar_tabela_referencia()
             
@@ -483,59 +436,39 @@ class PopularBancoOtimizado:
                 print(f"✅ {self.stats['tabelas_referencia']} tabelas carregadas")
                 print(f"   Mais recente: {tabelas[0]['Mes']} (código {tabelas[0]['Codigo']})\n")
             
-            # 2. Processar cada tipo de veículo
-            for tipo_veiculo in self.tipos_veiculo:
-                tipo_info = self.TIPOS_VEICULO[tipo_veiculo]
-                
-                print(f"\n{tipo_info['emoji']} ETAPA 2/{len(self.tipos_veiculo)+1}: Processando {tipo_info['nome'].upper()}")
-                print("=" * 70)
-                
-                # 2.1. Buscar marcas da API
-                print(f"📊 Buscando marcas de {tipo_info['nome'].lower()}...")
-                print("-" * 70)
-                inicio_api = time.time()
-                marcas_api = buscar_marcas_carros(tipo_veiculo)
-                self.stats['tempo_api'] += time.time() - inicio_api
-                
-                if not marcas_api:
-                    print(f"⚠️  Nenhuma marca de {tipo_info['nome'].lower()} encontrada\n")
-                    continue
-                
-                # Salva novas marcas no cache local
-                inicio_db = time.time()
-                self.cache_local.save_marcas(marcas_api, tipo_veiculo)
-                self.stats['tempo_db_local'] += time.time() - inicio_db
-                
-                self.stats['marcas'] += len(marcas_api)
-                print(f"✅ {len(marcas_api)} marcas de {tipo_info['nome'].lower()} encontradas")
-                print(f"ℹ️  Todas as marcas serão verificadas para completude\n")
-                
-                # 2.2. Processar TODAS as marcas deste tipo
-                print(f"📊 Verificando e atualizando modelos de {tipo_info['nome'].upper()} (PARALELO)...")
-                print("-" * 70)
-                print(f"🚀 Processando {min(self.max_workers, len(marcas_api))} marcas simultaneamente...")
-                print(f"📦 Total a verificar: {len(marcas_api)} marcas")
-                print(f"ℹ️  Processará apenas modelos novos de cada marca\n")
-                
-                inicio_paralelo = time.time()
-                
-                with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
-                    futures = [
-                        executor.submit(self.processar_marca, marca, i, len(marcas_api), tipo_veiculo)
-                        for i, marca in enumerate(marcas_api, 1)
-                    ]
-                    
-                    # Aguarda todas as threads terminarem
-                    for future in as_completed(futures):
-                        try:
-                            future.result()
-                        except Exception as e:
-                            print(f"❌ Erro em thread: {e}")
-                            self.stats['erros'] += 1
-                
-                tempo_paralelo = time.time() - inicio_paralelo
-                print(f"\n✅ {tipo_info['nome']} concluído em {tempo_paralelo/60:.1f} minutos")
-                print()
+            # 2. Pipeline: marcas → modelos → plano → anos → gravação
+            #    (custo das marcas estimado pelos modelos já no cache; marca desconhecida entra cedo)
+            self.contagem_modelos = self.cache_local.get_contagem_modelos()
+            self.custo_desconhecido = max(self.contagem_modelos.values(), default=0)
+            
+            pipeline = self._criar_pipeline()
+            
+            if len(self.diario):
+                print(f"♻️  Diário de coleta: {len(self.diario)} requisições de uma execução interrompida serão reaproveitadas\n")
+            
+            print(f"📊 ETAPA 2/2: Pipeline de coleta ({len(self.tipos_veiculo)} tipo(s) de veículo)")
+            print("-" * 70)
+            for estagio in pipeline.estagios:
+                print(f"   • {estagio.nome}: {estagio.workers} worker(s), fila de até {estagio.fila.maxsize}")
+            print(f"ℹ️  Processará apenas modelos novos de cada marca\n")
+            
+            pipeline.executar([self.tipos_veiculo])
+            
+            print(f"\n✅ Todas as marcas concluídas em {pipeline.tempo_total/60:.1f} minutos")
+            print()
+            
+            # O Pipeline só conta os erros dos estágios: com gravação falha, o diário fica
+            # para a próxima execução reaproveitar as respostas em vez de repetir as requisições
+            gravacao = next(e for e in pipeline.estagios if e.nome == 'gravacao')
+            erros_gravacao = gravacao.metricas()['erros']
+            if erros_gravacao:
+                print(f"⚠️  {erros_gravacao} gravações falharam: diário de coleta mantido "
+                      f"({len(self.diario)} requisições)")
+            else:
+                # Tudo gravado no cache: o diário não é mais necessário
+                self.diario.limpar()
+            pipeline.imprimir_metricas()
+            print()
             
             # Resumo final
             self._imprimir_resumo()
@@ -566,6 +499,7 @@ class PopularBancoOtimizado:
         print(f"   • Modelos: {self.stats['modelos']}")
         print(f"   • Anos/Combustível: {self.stats['anos']}")
         print(f"   • Erros: {self.stats['erros']}")
+        print(f"   • Requisições reaproveitadas do diário: {self.stats['reaproveitadas']}")
         print()
         
         # Tempos
@@ -610,7 +544,7 @@ class PopularBancoOtimizado:
         print(f"   • Anos/Combustível: {stats_local['anos_combustivel']}")
         print(f"   • Relacionamentos: {stats_local['modelos_anos']}")
         print()
-        print("💡 Execute novamente para continuar ou consulte fipe_local.db")
+        print("💡 Execute novamente para continuar: o diário de coleta (fipe_local_diario.db) evita refazer as requisições já concluídas")
         print()
 
 
@@ -669,5 +603,28 @@ def main():
         print("\n❌ Operação cancelada pelo usuário.")
 
 
+def estimar(tipos_veiculo, workers=5, offline=False):
+    """
+    Modo --plan: estima requisições e tempo sem coletar.
+    Consulta só as listagens de marcas e modelos (ou nada, com --offline).
+    """
+    cache = FipeLocalCache()
+    estimativas = estimar_relacionamentos(cache, tipos_veiculo, usar_cache=True, offline=offline, pausa_marca=0.0)
+    # Tabela de referência + listagem de marcas de cada tipo
+    requisicoes_extras = 0 if offline else 1 + len(tipos_veiculo)
+    imprimir_estimativa("popular_completo.py", estimativas, workers, requisicoes_extras, divide_marcas=True)
+
+
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Popula o cache local com marcas, modelos e anos da API FIPE")
+    parser.add_argument('--plan', action='store_true', help="Apenas estima requisições e tempo, sem coletar")
+    parser.add_argument('--offline', action='store_true', help="Com --plan: usa só o cache local, sem consultar a API")
+    parser.add_argument('--tipos', default='1,2,3', help="Tipos de veículo para --plan (ex: 1,2)")
+    parser.add_argument('--workers', type=int, default=5, help="Workers paralelos considerados no --plan")
+    args = parser.parse_args()
+    
+    if args.plan:
+        tipos = [int(t) for t in args.tipos.split(',') if t.strip() in ('1', '2', '3')] or [1, 2, 3]
+        estimar(tipos, args.workers, args.offline)
+    else:
+        main()
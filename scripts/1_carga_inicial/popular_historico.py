@@ -0,0 +1,152 @@
+"""
+Carga histórica de valores FIPE (vários meses de referência).
+
+Preenche os valores de todos os veículos do cache local para um intervalo de
+tabelas de referência (codigoTabelaReferencia), pulando o que já está no banco.
+Pode ser interrompido e retomado: cada execução consulta só o que falta.
+Ao final grava e mostra a completude de cada mês (tabela completude_meses).
+
+Exemplos:
+    python scripts/1_carga_inicial/popular_historico.py --ultimos 24
+    python scripts/1_carga_inicial/popular_historico.py --de 250 --ate 300 --workers 8 --taxa 3
+    python scripts/1_carga_inicial/popular_historico.py --de 250 --ate 300 --plan
+    python scripts/1_carga_inicial/popular_historico.py --relatorio
+"""
+import sys
+from pathlib import Path
+
+# Adiciona o diretório raiz ao path
+ROOT_DIR = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(ROOT_DIR))
+
+import argparse
+import time
+from src.config import NUM_WORKERS, TAXA_MAXIMA_API, yyyymm_para_mes_display
+from src.normalizacao import mes_para_inteiro
+from src.cache.fipe_local_cache import FipeLocalCache
+from src.crawler.carga_historica import MesReferencia, CargaHistorica, planejar_carga, imprimir_completude
+from src.crawler.limitador import limitador_global, descrever_teto
+from src.crawler.estimador import custo_requisicao
+from src.crawler.planejador import formatar_tempo
+
+
+def selecionar_meses(cache, de=None, ate=None, ultimos=None, offline=False):
+    """
+    Tabelas de referência do intervalo (mais recente primeiro).
+    Online, atualiza tabelas_referencia com a lista completa da API.
+    """
+    if offline:
+        tabelas = sorted(cache.get_all_tabelas_referencia(), key=lambda t: t['Codigo'], reverse=True)
+    else:
+        from src.crawler.fipe_crawler import buscar_tabela_referencia
+        tabelas = buscar_tabela_referencia()
+        for tabela in tabelas:
+            cache.save_tabela_referencia(tabela['Codigo'], tabela['Mes'])
+    
+    meses = [
+        MesReferencia(int(t['Codigo']), mes_para_inteiro(t['Mes']))
+        for t in tabelas if mes_para_inteiro(t['Mes'])
+    ]
+    if de is not None or ate is not None:
+        meses = [m for m in meses if (de is None or m.codigo >= de) and (ate is None or m.codigo <= ate)]
+    elif ultimos:
+        meses = meses[:ultimos]
+    return meses
+
+
+def imprimir_plano(plano, meses, workers, taxa):
+    """Modo --plan: requisições pendentes por mês (limite superior) e ETA"""
+    por_mes = {m.mes: 0 for m in meses}
+    for pendencia in plano:
+        for referencia in pendencia.meses:
+            por_mes[referencia.mes] += 1
+    total = sum(por_mes.values())
+    
+    print("=" * 70)
+    print(f"📋 PLANO (sem executar): carga histórica de {len(meses)} meses")
+    print("=" * 70)
+    for mes, pendentes in sorted(por_mes.items(), reverse=True):
+        print(f"   • {yyyymm_para_mes_display(str(mes))}: {pendentes} veículos pendentes")
+    
+    # Teto: o menor entre o limite global e o que os workers conseguem com o delay por requisição
+    vazao = min(taxa, workers / custo_requisicao())
+    print("=" * 70)
+    print(f"📊 TOTAL: até {total} requisições em {len(plano)} veículos "
+          f"(meses anteriores ao lançamento de cada veículo são inferidos sem consulta)")
+    print(f"⏱️  ETA máximo: ~{formatar_tempo(total / vazao)} a {vazao:.2f} req/s")
+    print("=" * 70)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Carga histórica de valores FIPE por intervalo de tabelas de referência")
+    parser.add_argument('--de', type=int, help="Primeiro codigoTabelaReferencia do intervalo")
+    parser.add_argument('--ate', type=int, help="Último codigoTabelaReferencia do intervalo")
+    parser.add_argument('--ultimos', type=int, default=12, help="Sem --de/--ate: os N meses mais recentes (padrão 12)")
+    parser.add_argument('--tipos', default='1,2,3', help="Tipos de veículo (ex: 1,2)")
+    parser.add_argument('--workers', type=int, default=NUM_WORKERS, help="Workers paralelos")
+    parser.add_argument('--taxa', type=float, default=TAXA_MAXIMA_API, help="Teto global de requisições por segundo")
+    parser.add_argument('--plan', action='store_true', help="Apenas estima requisições e tempo, sem coletar")
+    parser.add_argument('--relatorio', action='store_true', help="Só mostra a completude por mês já registrada")
+    parser.add_argument('--offline', action='store_true', help="Usa as tabelas de referência do cache, sem consultar a API")
+    args = parser.parse_args()
+    
+    cache = FipeLocalCache()
+    
+    if args.relatorio:
+        linhas = cache.get_completude_meses()
+        if not linhas:
+            print("ℹ️  Nenhuma completude registrada (rode a carga histórica antes)")
+            return 0
+        imprimir_completude(linhas)
+        return 0
+    
+    meses = selecionar_meses(cache, args.de, args.ate, args.ultimos, args.offline)
+    if not meses:
+        print("❌ Nenhuma tabela de referência no intervalo")
+        return 1
+    
+    tipos = [int(t) for t in args.tipos.split(',') if t.strip() in ('1', '2', '3')] or [1, 2, 3]
+    print(f"📅 Intervalo: {yyyymm_para_mes_display(str(meses[-1].mes))} (código {meses[-1].codigo}) "
+          f"a {yyyymm_para_mes_display(str(meses[0].mes))} (código {meses[0].codigo}), {len(meses)} meses")
+    
+    inicio = time.time()
+    plano = planejar_carga(cache, meses, tipos)
+    print(f"🧭 Plano: {len(plano)} veículos com meses pendentes ({time.time() - inicio:.1f}s)")
+    print()
+    
+    if args.plan:
+        imprimir_plano(plano, meses, args.workers, args.taxa)
+        return 0
+    
+    if plano:
+        limitador = limitador_global()
+        limitador.definir_taxa(args.taxa)
+        print(f"🚀 {args.workers} workers")
+        print(descrever_teto())
+        carga = CargaHistorica(cache, workers=args.workers)
+        try:
+            stats = carga.executar(plano)
+        except KeyboardInterrupt:
+            print("\n⚠️ Processo interrompido pelo usuário (o que foi gravado é mantido)")
+            stats = carga.stats
+        
+        print()
+        print(f"📊 {stats['veiculos']} veículos, {stats['requisicoes']} requisições: "
+              f"{stats['valores']} valores, {stats['sem_valor']} sem valor, "
+              f"{stats['inferidos']} inferidos, {stats['erros']} erros")
+        espera = limitador.metricas()['tempo_espera']
+        print(f"⏱️  {formatar_tempo(time.time() - inicio)} (espera no limitador: {formatar_tempo(espera)})")
+    else:
+        print("🎉 Nenhum veículo-mês pendente no intervalo")
+    
+    print()
+    print("📈 COMPLETUDE POR MÊS:")
+    imprimir_completude(cache.atualizar_completude_meses([(m.mes, m.codigo) for m in meses]))
+    
+    stats_series = cache.atualizar_series()
+    print(f"📈 Séries de preço: {stats_series['veiculos']} veículos atualizados ({len(stats_series['meses'])} meses)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
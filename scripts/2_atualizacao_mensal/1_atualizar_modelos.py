@@ -1,6 +1,7 @@
 """
 Script para atualização incremental de modelos.
-Busca novos modelos Zero Km por marca para descobrir lançamentos.
+Descobre lançamentos (modelos novos e versões Zero Km novas) de carros, motos
+e caminhões, com as marcas de todos os tipos em paralelo (src/crawler/descoberta.py).
 Muito mais rápido que popular_banco.py pois só busca novidades.
 """
 import sys
@@ -10,255 +11,114 @@ from pathlib import Path
 ROOT_DIR = Path(__file__).parent.parent.parent
 sys.path.insert(0, str(ROOT_DIR))
 
+import argparse
 import time
-from src.config import get_delay_padrao, DELAY_RATE_LIMIT_429
-from src.crawler.fipe_crawler import buscar_marcas_carros, buscar_modelos_por_ano, buscar_anos_modelo
+from src.config import NUM_WORKERS
 from src.cache.fipe_local_cache import FipeLocalCache
+from src.crawler.descoberta import DescobertaModelos, TIPOS_NOME
+from src.crawler.limitador import limitador_global, descrever_teto
+from src.crawler.planejador import formatar_tempo
 
 
-def atualizar_modelos():
+def atualizar_modelos(tipos=(1, 2, 3), workers=NUM_WORKERS, cache=None):
     """
-    Atualiza modelos de todas as marcas buscando por Zero Km.
+    Atualiza modelos de todas as marcas dos tipos informados.
     Descobre novos lançamentos sem precisar reprocessar tudo.
     Salva no SQLite local (fipe_local.db).
+    
+    Args:
+        tipos: Tipos de veículo (1=carros, 2=motos, 3=caminhões)
+        workers: Marcas consultadas em paralelo (sob o limite global de requisições)
+        cache: FipeLocalCache a usar (None = abre uma conexão própria); a rotina
+               mensal passa a mesma para todas as etapas paralelas
+    
+    Returns:
+        dict: Estatísticas somadas dos tipos; 'modelos' traz as chaves (tipo, marca, modelo)
+              dos modelos novos ou com versão Zero Km nova
+    
+    Raises:
+        RuntimeError: Lista de marcas indisponível para algum tipo (os demais são gravados)
     """
-    cache = FipeLocalCache()
+    cache = cache or FipeLocalCache()
     
     print("=" * 70)
     print("FIPE CRAWLER - Atualização Incremental de Modelos")
     print("=" * 70)
     print()
-    print("ℹ️  Este script busca apenas modelos Zero Km para descobrir lançamentos.")
-    print("ℹ️  É muito mais rápido que popular_banco.py e deve ser executado mensalmente.")
+    print(f"ℹ️  Tipos: {', '.join(TIPOS_NOME.get(t, str(t)) for t in tipos)} | {workers} workers em paralelo")
+    print("ℹ️  Por marca: 1 consulta de modelos + 1 por combustível com Zero Km + 1 por modelo novo.")
+    print(descrever_teto())
     print()
     
-    # Estatísticas
-    stats = {
-        'marcas_processadas': 0,
-        'marcas_novas': 0,
-        'novos_modelos': 0,
-        'novos_anos': 0,
-        'erros': 0,
-        'tempo_api': 0.0,
-        'tempo_db': 0.0,
-        'tempo_delays': 0.0
-    }
-    
+    inicio = time.time()
+    descoberta = DescobertaModelos(cache, workers)
     try:
-        # Busca todas as marcas da API FIPE
-        print("📊 Buscando marcas da API FIPE...")
-        print("-" * 70)
-        marcas_api = buscar_marcas_carros()
-        total_marcas = len(marcas_api)
-        print(f"✅ {total_marcas} marcas na API\n")
-        
-        # Busca marcas já cadastradas no cache local
-        print("📦 Verificando marcas no cache local...")
-        print("-" * 70)
-        marcas_cache = cache.get_all_marcas()
-        codigos_cache = {marca['codigo'] for marca in marcas_cache}
-        print(f"✅ {len(marcas_cache)} marcas no cache\n")
-        
-        # Identifica marcas novas (na API mas não no cache)
-        marcas_novas = []
-        for marca in marcas_api:
-            if marca['Value'] not in codigos_cache:
-                marcas_novas.append(marca)
-        
-        if marcas_novas:
-            print(f"🆕 {len(marcas_novas)} MARCAS NOVAS encontradas!")
-            print("-" * 70)
-            for marca in marcas_novas:
-                print(f"   • {marca['Label']} (código {marca['Value']})")
-            print()
-            
-            # Salva marcas novas no cache
-            print("💾 Salvando marcas novas no cache...")
-            cache.save_marcas(marcas_novas)
-            stats['marcas_novas'] = len(marcas_novas)
-            print(f"✅ Marcas salvas!\n")
-        else:
-            print("ℹ️  Nenhuma marca nova. Cache está atualizado!\n")
-        
-        # Atualiza modelos de cada marca
-        print("🔄 Buscando novos modelos Zero Km...")
-        print("-" * 70)
-        
-        marcas = marcas_api  # Processa todas as marcas da API
-        
-        for i, marca in enumerate(marcas, 1):
-            codigo_marca = marca['Value']
-            nome_marca = marca['Label']
-            marca_nova = codigo_marca not in codigos_cache
-            
-            marcador = "🆕" if marca_nova else "   "
-            print(f"{marcador}[{i}/{total_marcas}] {nome_marca} (código {codigo_marca})")
-            
-            try:
-                # Busca modelos existentes no cache
-                modelos_cache = cache.get_modelos_marca_dict(codigo_marca)
-                
-                # Para marcas novas, busca TODOS os modelos; para marcas existentes, apenas Zero Km
-                inicio_api = time.time()
-                novos = []
-                
-                if marca_nova:
-                    # MARCA NOVA: Busca completa usando endpoint ConsultarModelos
-                    print(f"    🆕 Marca nova! Buscando TODOS os modelos...")
-                    from src.crawler.fipe_crawler import buscar_modelos
-                    resultado = buscar_modelos(codigo_marca, tipo_veiculo=1, nome_marca=nome_marca)
-                    
-                    if resultado and 'Modelos' in resultado:
-                        modelos_api = resultado['Modelos']
-                        for modelo in modelos_api:
-                            codigo_modelo = str(modelo.get('Value', ''))
-                            if codigo_modelo and codigo_modelo not in modelos_cache:
-                                novos.append(modelo)
-                                modelos_cache[codigo_modelo] = modelo['Label']
-                        
-                        if novos:
-                            print(f"    ✅ {len(novos)} modelos encontrados (marca nova)")
-                    else:
-                        print(f"    ⚠️  Não foi possível buscar modelos da marca nova")
-                else:
-                    # MARCA EXISTENTE: Busca apenas modelos Zero Km
-                    combustiveis = [1, 2, 3, 4, 5, 6, 7]  # Todos os tipos
-                    
-                    for combustivel in combustiveis:
-                        modelos_api = buscar_modelos_por_ano(
-                            codigo_marca, 
-                            ano_modelo="32000",
-                            codigo_combustivel=combustivel,
-                            nome_marca=nome_marca
-                        )
-                        
-                        if modelos_api:
-                            for modelo in modelos_api:
-                                codigo_modelo = str(modelo.get('Value', ''))
-                                if codigo_modelo and codigo_modelo not in modelos_cache:
-                                    novos.append(modelo)
-                                    modelos_cache[codigo_modelo] = modelo['Label']
-                        
-                        # Delay já implementado em buscar_modelos_por_ano() no fipe_crawler.py
-                
-                stats['tempo_api'] += time.time() - inicio_api
-                
-                # Salva novos modelos
-                if novos:
-                    cache.save_modelos(novos, codigo_marca)
-                    print(f"    ✅ {len(novos)} novos modelos encontrados!")
-                    stats['novos_modelos'] += len(novos)
-                
-                stats['marcas_processadas'] += 1
-                
-                # Para cada novo modelo, busca os anos disponíveis
-                if novos:
-                    print(f"    📅 Buscando anos dos novos modelos...")
-                    for modelo in novos:
-                        codigo_modelo = modelo['Value']
-                        
-                        try:
-                            inicio_anos = time.time()
-                            anos = buscar_anos_modelo(codigo_marca, codigo_modelo, tipo_veiculo=1)
-                            stats['tempo_api'] += time.time() - inicio_anos
-                            
-                            if anos:
-                                cache.save_anos_modelo(anos, codigo_marca, codigo_modelo, tipo_veiculo=1)
-                                stats['novos_anos'] += len(anos)
-                            
-                            # Delay já implementado em buscar_anos_modelo() no fipe_crawler.py
-                        
-                        except Exception as e:
-                            print(f"        ⚠️ Erro ao buscar anos: {e}")
-                            stats['erros'] += 1
-                
-                # Delay já implementado em buscar_marcas_carros() no fipe_crawler.py
-                
-            except Exception as e:
-                print(f"    ❌ Erro ao processar marca {nome_marca}: {e}")
-                stats['erros'] += 1
-                continue
-        
-        # Resumo final
-        print("\n" + "=" * 70)
-        print("✅ ATUALIZAÇÃO CONCLUÍDA!")
-        print("=" * 70)
-        print()
-        print(f"📊 ESTATÍSTICAS:")
-        print(f"   • Marcas processadas: {stats['marcas_processadas']}/{total_marcas}")
-        if stats['marcas_novas'] > 0:
-            print(f"   • 🆕 Marcas novas encontradas: {stats['marcas_novas']}")
-        print(f"   • Novos modelos encontrados: {stats['novos_modelos']}")
-        print(f"   • Anos/Combustível carregados: {stats['novos_anos']}")
-        print(f"   • Erros: {stats['erros']}")
-        print()
-        print(f"⏱️  TEMPO:")
-        print(f"   • API FIPE + Supabase: {stats['tempo_api']:.1f}s")
-        print(f"   • Delays (rate limiting): {stats['tempo_delays']:.1f}s")
-        print(f"   • Total: {stats['tempo_api'] + stats['tempo_delays']:.1f}s")
-        print()
-        
-        # Análise do gargalo
-        total_tempo = stats['tempo_api'] + stats['tempo_delays']
-        if total_tempo > 0:
-            perc_api = (stats['tempo_api'] / total_tempo) * 100
-            perc_delays = (stats['tempo_delays'] / total_tempo) * 100
-            print(f"📈 ANÁLISE:")
-            print(f"   • API/DB: {perc_api:.1f}% do tempo")
-            print(f"   • Delays: {perc_delays:.1f}% do tempo")
-            print()
-            
-            if perc_delays > 70:
-                print("💡 Gargalo: Delays de segurança (rate limiting)")
-                print("   → Delays são necessários para evitar bloqueio da API")
-            elif perc_api > 70:
-                print("💡 Gargalo: Requisições de rede (API FIPE + Supabase)")
-                print("   → Tempo gasto em comunicação com servidores")
-        print()
-        
-        if stats['marcas_novas'] > 0 or stats['novos_modelos'] > 0:
-            print("🎉 Novidades encontradas e salvas no SQLite local!")
-            if stats['marcas_novas'] > 0:
-                print(f"   • {stats['marcas_novas']} marca(s) nova(s) adicionada(s)")
-            if stats['novos_modelos'] > 0:
-                print(f"   • {stats['novos_modelos']} modelo(s) novo(s) adicionado(s)")
-            print()
-            print("💡 Execute upload_para_supabase.py para enviar ao Supabase.")
-            print("💡 Depois execute atualizar_valores.py para buscar os preços.")
-        else:
-            print("ℹ️  Nenhuma novidade encontrada. Banco local está atualizado!")
-        print()
-    
+        por_tipo = descoberta.executar(tipos)
     except KeyboardInterrupt:
-        print("\n\n⚠️ Processo interrompido pelo usuário")
-        print(f"📊 Estatísticas parciais:")
-        print(f"   • Marcas processadas: {stats['marcas_processadas']}")
-        if stats['marcas_novas'] > 0:
-            print(f"   • Marcas novas: {stats['marcas_novas']}")
-        print(f"   • Novos modelos: {stats['novos_modelos']}")
-        print(f"   • Anos carregados: {stats['novos_anos']}")
-        print()
+        print("\n\n⚠️ Processo interrompido pelo usuário (o que foi gravado é mantido)")
+        por_tipo = descoberta.stats
+    tempo = time.time() - inicio
     
-    except Exception as e:
-        print(f"\n\n❌ Erro fatal: {e}")
-        print(f"📊 Estatísticas parciais:")
-        print(f"   • Marcas processadas: {stats['marcas_processadas']}")
-        if stats['marcas_novas'] > 0:
-            print(f"   • Marcas novas: {stats['marcas_novas']}")
-        print(f"   • Novos modelos: {stats['novos_modelos']}")
-        print()
+    stats = {'modelos': set()}
+    for s in por_tipo.values():
+        for chave, valor in s.items():
+            if chave == 'modelos':
+                stats['modelos'] |= valor
+            else:
+                stats[chave] = stats.get(chave, 0) + valor
+    stats['tempo'] = round(tempo, 1)
+    
+    # Resumo final
+    print("\n" + "=" * 70)
+    print("✅ ATUALIZAÇÃO CONCLUÍDA!")
+    print("=" * 70)
+    print()
+    print(f"📊 ESTATÍSTICAS:")
+    print(f"   {'Tipo':12s} {'Marcas':>7s} {'Novas':>6s} {'Modelos':>8s} {'Zero Km':>8s} {'Anos':>6s} {'Req.':>6s} {'Erros':>6s}")
+    for tipo, s in por_tipo.items():
+        print(f"   {TIPOS_NOME.get(tipo, str(tipo)):12s} {s['marcas_processadas']:>7d} {s['marcas_novas']:>6d} "
+              f"{s['novos_modelos']:>8d} {s['novos_zero_km']:>8d} {s['novos_anos']:>6d} "
+              f"{s['requisicoes']:>6d} {s['erros']:>6d}")
+    print()
+    print(f"⏱️  TEMPO: {formatar_tempo(tempo)} "
+          f"(espera no limitador: {formatar_tempo(limitador_global().metricas()['tempo_espera'])})")
+    print()
+    
+    if stats.get('novos_modelos') or stats.get('novos_zero_km') or stats.get('marcas_novas'):
+        print("🎉 Novidades encontradas e salvas no SQLite local!")
+        print("💡 Depois execute 2_atualizar_valores.py para buscar os preços.")
+    else:
+        print("ℹ️  Nenhuma novidade encontrada. Banco local está atualizado!")
+    print()
+    
+    if descoberta.tipos_sem_marcas:
+        tipos_falha = ', '.join(TIPOS_NOME.get(t, str(t)) for t in descoberta.tipos_sem_marcas)
+        raise RuntimeError(f"Marcas indisponíveis na API para: {tipos_falha}")
+    return stats
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Busca modelos novos e versões Zero Km novas de todas as marcas")
+    parser.add_argument('--tipos', default='1,2,3', help="Tipos de veículo (ex: 1,2)")
+    parser.add_argument('--workers', type=int, default=NUM_WORKERS, help="Marcas consultadas em paralelo")
+    parser.add_argument('--sim', action='store_true', help="Não pede confirmação (execução automática)")
+    args = parser.parse_args()
+    
+    tipos = [int(t) for t in args.tipos.split(',') if t.strip() in ('1', '2', '3')] or [1, 2, 3]
+    
     print()
-    print("⚠️  Este processo busca novos modelos Zero Km de todas as marcas.")
-    print("⚠️  Tempo estimado: 10-15 minutos.")
+    print("⚠️  Este processo busca lançamentos de todas as marcas (carros, motos e caminhões).")
+    print("⚠️  Tempo estimado: 5-10 minutos.")
     print()
     
-    resposta = input("Deseja continuar? (s/n): ")
+    resposta = 's' if args.sim else input("Deseja continuar? (s/n): ")
     
     if resposta.lower() in ['s', 'sim', 'y', 'yes']:
         print()
-        atualizar_modelos()
+        try:
+            atualizar_modelos(tipos, args.workers)
+        except Exception as e:
+            print(f"❌ Erro fatal: {e}")
+            sys.exit(1)
     else:
         print("\n❌ Operação cancelada.")
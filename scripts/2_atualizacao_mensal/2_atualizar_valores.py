@@ -2,6 +2,14 @@
 Script para atualização completa de valores FIPE.
 Busca os valores atualizados de TODOS os veículos já cadastrados no banco.
 Deve ser executado mensalmente quando a tabela FIPE é atualizada.
+
+Os veículos são processados por faixas de prioridade (PRIORIDADES_VALORES,
+src/crawler/prioridades.py): ao fim de cada faixa o marcador de completude é
+gravado em completude_faixas e quem chamou pode publicá-la (ao_concluir_faixa).
+
+Veículos sem valor na API vão para a quarentena (tabela descontinuados) e saem
+da passada principal: são reconsultados no fim, com espaçamento exponencial
+(1, 2, 4, 8... meses conforme as faltas, até MAX_INTERVALO_DESCONTINUADOS).
 """
 import sys
 from pathlib import Path
@@ -10,51 +18,81 @@ from pathlib import Path
 ROOT_DIR = Path(__file__).parent.parent.parent
 sys.path.insert(0, str(ROOT_DIR))
 
+import argparse
 import time
-import csv
 from datetime import datetime
-from src.config import DELAY_RATE_LIMIT_429, mes_pt_para_yyyymm, yyyymm_para_mes_display
+from src.config import DELAY_RATE_LIMIT_429, yyyymm_para_mes_display
+from src.normalizacao import mes_para_yyyymm
 from src.crawler.fipe_crawler import buscar_valor_veiculo, obter_codigo_referencia_atual, buscar_tabela_referencia
 from src.cache.fipe_local_cache import FipeLocalCache
+from src.crawler.estimador import estimar_valores, imprimir_estimativa
+from src.crawler.limitador import descrever_teto
+from src.crawler.prioridades import carregar_faixas, separar_por_faixa
+from src.registros import ValorFipe
+
+
+# Quarentena gravada em lotes (uma transação por lote)
+LOTE_QUARENTENA = 100
+
+
+def contar_por_ano(veiculos):
+    """{ano_modelo: quantidade} dos veículos (código de ano no formato '2024-1')"""
+    veiculos_por_ano = {}
+    for veiculo in veiculos:
+        codigo_ano_combustivel = veiculo[3]
+        if '-' in codigo_ano_combustivel:
+            ano_modelo = codigo_ano_combustivel.split('-')[0]
+            veiculos_por_ano[ano_modelo] = veiculos_por_ano.get(ano_modelo, 0) + 1
+    return veiculos_por_ano
 
 
-def atualizar_valores():
+def atualizar_valores(codigo_ref=None, mes_referencia_api=None, modelos=None, ao_concluir_faixa=None, cache=None):
     """
     Atualiza os valores FIPE de todos os veículos cadastrados no SQLite local.
     Busca apenas veículos que já têm marca+modelo+ano cadastrados.
     Depois execute upload_para_supabase.py para enviar ao Supabase.
-    """
-    cache = FipeLocalCache()
     
-    # Arquivo CSV para registrar descontinuados
-    csv_descontinuados = ROOT_DIR / 'logs' / f'descontinuados_{datetime.now().strftime("%Y%m%d_%H%M%S")}.csv'
-    csv_descontinuados.parent.mkdir(exist_ok=True)
+    Args:
+        codigo_ref: Código da tabela de referência (None = consulta a API)
+        mes_referencia_api: Texto do mês da tabela (ex: "janeiro/2026 "), junto com codigo_ref
+        modelos: Conjunto de chaves (tipo, marca, modelo) para restringir a atualização
+                 (ex: só os modelos descobertos agora); None = todos os veículos
+        ao_concluir_faixa: Função chamada ao fim de cada faixa de prioridade com o
+                           marcador de completude (dict) e as chaves (tipo, marca,
+                           modelo, ano) da faixa; só em atualizações completas (modelos=None)
+        cache: FipeLocalCache a usar (None = abre uma conexão própria); a rotina
+               mensal passa a mesma para todas as etapas paralelas
+    
+    Returns:
+        dict: Estatísticas ('faixas' = marcadores de completude das faixas concluídas)
     
-    # Abre arquivo CSV para escrita
-    csv_file = open(csv_descontinuados, 'w', newline='', encoding='utf-8')
-    csv_writer = csv.writer(csv_file)
-    csv_writer.writerow(['codigo_marca', 'codigo_modelo', 'tipo_veiculo', 'ano_modelo', 'codigo_combustivel', 
-                         'nome_marca', 'nome_modelo', 'data_verificacao'])
+    Raises:
+        Exception: Erro fatal, depois de salvar o progresso parcial
+    """
+    cache = cache or FipeLocalCache()
     
     print("=" * 70)
     print("FIPE CRAWLER - Atualização Completa de Valores")
     print("=" * 70)
     print()
-    print(f"📝 Descontinuados serão registrados em: {csv_descontinuados.name}")
-    print()
     
-    # Verifica tabela de referência atual
-    codigo_ref = obter_codigo_referencia_atual()
-    tabelas = buscar_tabela_referencia()
-    mes_referencia_api = tabelas[0]['Mes'] if tabelas else "desconhecido"
+    # Verifica tabela de referência atual (se não recebida de quem chamou)
+    if codigo_ref is None:
+        codigo_ref = obter_codigo_referencia_atual()
+        tabelas = buscar_tabela_referencia()
+        mes_referencia_api = tabelas[0]['Mes'] if tabelas else "desconhecido"
     
     # Converte para formato YYYYMM (202601)
-    mes_referencia = mes_pt_para_yyyymm(mes_referencia_api)
+    mes_referencia = mes_para_yyyymm(mes_referencia_api)
+    
+    # Formato inteiro usado na tabela valores (202601)
+    mes_int = int(mes_referencia) if mes_referencia else None
     
     # Formato legível para exibição
     mes_display = yyyymm_para_mes_display(mes_referencia)
     
     print(f"📅 Tabela de referência: {mes_display} (código {codigo_ref})")
+    print(descrever_teto())
     print()
     print("ℹ️  Este script atualiza os valores FIPE de TODOS os veículos cadastrados.")
     print("ℹ️  A FIPE publica novos valores mensalmente para veículos novos e antigos.")
@@ -68,10 +106,46 @@ def atualizar_valores():
         'faltam_atualizar': 0,    # Faltam atualizar no mês atual
         'processados': 0,         # Realmente tentados
         'valores_salvos': 0,      # Salvos com sucesso
-        'descontinuados': 0,      # Não existem mais na API FIPE
-        'erros': 0                # Erros durante o processo
+        'descontinuados': 0,      # Sem valor na API (registrados na quarentena)
+        'em_quarentena': 0,       # Descontinuados pulados (reconsulta ainda não devida)
+        'reverificados': 0,       # Descontinuados reconsultados neste mês
+        'recuperados': 0,         # Descontinuados que voltaram a ter valor
+        'erros': 0,               # Erros durante o processo
+        'faixas': [],             # Marcadores de completude das faixas concluídas
     }
     
+    # Quarentena: misses e recuperações gravados em lote
+    faltas_pendentes = []
+    recuperados_pendentes = []
+    
+    def gravar_quarentena(forcar=False):
+        if faltas_pendentes and (forcar or len(faltas_pendentes) >= LOTE_QUARENTENA):
+            cache.registrar_descontinuados(faltas_pendentes, mes_int)
+            faltas_pendentes.clear()
+        if recuperados_pendentes and (forcar or len(recuperados_pendentes) >= LOTE_QUARENTENA):
+            stats['recuperados'] += cache.remover_descontinuados(recuperados_pendentes)
+            recuperados_pendentes.clear()
+    
+    def concluir_faixa(ordem, faixa, resumo, base):
+        """Grava o marcador de completude da faixa e avisa quem chamou"""
+        gravar_quarentena(forcar=True)
+        cache.conn.commit()
+        erros = stats['erros'] - base['erros']
+        com_valor = resumo['com_valor'] + stats['valores_salvos'] - base['valores_salvos']
+        sem_valor = resumo['em_quarentena'] + stats['descontinuados'] - base['descontinuados']
+        completa = cache.save_completude_faixa(
+            mes_int, faixa.nome, ordem, resumo['esperados'], com_valor, sem_valor, erros
+        )
+        marcador = {
+            'faixa': faixa.nome, 'esperados': resumo['esperados'], 'com_valor': com_valor,
+            'sem_valor': sem_valor, 'erros': erros, 'completa': completa
+        }
+        stats['faixas'].append(marcador)
+        print(f"\n🏁 Faixa {faixa.nome} {'completa' if completa else 'INCOMPLETA'}: "
+              f"{com_valor}/{resumo['esperados']} com valor, {sem_valor} sem valor, {erros} erros")
+        if ao_concluir_faixa and resumo['chaves']:
+            ao_concluir_faixa(marcador, resumo['chaves'])
+    
     try:
         # Busca todos os modelos_anos cadastrados (combinações de marca+modelo+ano)
         print("📊 Buscando veículos cadastrados no banco local...")
@@ -86,7 +160,7 @@ def atualizar_valores():
         if total_veiculos == 0:
             print("⚠️ Nenhum veículo cadastrado!")
             print("💡 Execute popular_completo.py primeiro para popular o banco.")
-            return
+            return stats
         
         print(f"✅ {total_veiculos} veículos cadastrados (combinações de marca+modelo+ano)\n")
         stats['total_veiculos'] = total_veiculos
@@ -97,16 +171,12 @@ def atualizar_valores():
         print("-" * 70)
         
         cursor.execute('''
-            SELECT COUNT(DISTINCT ma.codigo_marca || '-' || ma.codigo_modelo || '-' || ma.codigo_ano_combustivel)
-            FROM modelos_anos ma
-            INNER JOIN valores_fipe vf 
-                ON vf.codigo_marca = ma.codigo_marca
-                AND vf.codigo_modelo = ma.codigo_modelo
-                AND vf.tipo_veiculo = ma.tipo_veiculo
-                AND vf.mes_referencia = ?
-            WHERE ma.codigo_ano_combustivel = 
-                CAST(vf.ano_modelo AS TEXT) || '-' || CAST(vf.codigo_combustivel AS TEXT)
-        ''', (mes_referencia,))
+            SELECT COUNT(*)
+            FROM modelos_anos_veiculos ma
+            INNER JOIN valores vf
+                ON vf.veiculo_id = ma.veiculo_id
+                AND vf.mes = ?
+        ''', (mes_int,))
         ja_atualizados = cursor.fetchone()[0]
         
         faltam_atualizar = total_veiculos - ja_atualizados
@@ -122,41 +192,76 @@ def atualizar_valores():
             print("🎉 Todos os veículos já possuem valores atualizados para este mês!")
             print(f"   Mês de referência: {mes_display}")
             print("   Nada a fazer.")
-            return
+            return stats
         
-        # Busca APENAS os veículos que NÃO TÊM valor para o mês atual
+        # Processa APENAS os veículos que NÃO TÊM valor para o mês atual
         # Isso permite que o script seja retomado se interrompido
+        # (os que já têm valor entram só na completude das faixas)
         print(f"🔄 Buscando valores de {faltam_atualizar} veículos...")
         print("-" * 70)
         
         cursor.execute('''
-            SELECT ma.codigo_marca, ma.codigo_modelo, ma.tipo_veiculo, ma.codigo_ano_combustivel
-            FROM modelos_anos ma
-            LEFT JOIN valores_fipe vf 
-                ON vf.codigo_marca = ma.codigo_marca
-                AND vf.codigo_modelo = ma.codigo_modelo
-                AND vf.tipo_veiculo = ma.tipo_veiculo
-                AND vf.mes_referencia = ?
-                AND ma.codigo_ano_combustivel = 
-                    CAST(vf.ano_modelo AS TEXT) || '-' || CAST(vf.codigo_combustivel AS TEXT)
-            WHERE vf.codigo_marca IS NULL
+            SELECT ma.codigo_marca, ma.codigo_modelo, ma.tipo_veiculo, ma.codigo_ano_combustivel,
+                   vf.veiculo_id IS NOT NULL AS tem_valor
+            FROM modelos_anos_veiculos ma
+            LEFT JOIN valores vf
+                ON vf.veiculo_id = ma.veiculo_id
+                AND vf.mes = ?
             ORDER BY 
                 CAST(SUBSTR(ma.codigo_ano_combustivel, 1, INSTR(ma.codigo_ano_combustivel, '-') - 1) AS INTEGER) DESC,
                 ma.codigo_marca, 
                 ma.codigo_modelo
-        ''', (mes_referencia,))
-        veiculos = cursor.fetchall()
+        ''', (mes_int,))
+        catalogo = cursor.fetchall()
+        veiculos = [v for v in catalogo if not v[4]]
+        
+        if modelos is not None:
+            veiculos = [v for v in veiculos if (v[2], str(v[0]), str(v[1])) in modelos]
+            stats['faltam_atualizar'] = len(veiculos)
+            print(f"🎯 Restrito a {len(modelos)} modelos informados")
+        
+        # Quarentena: fora da passada principal; os devidos são reconsultados no fim
+        quarentena = cache.get_quarentena_descontinuados(mes_int)
+        principais, devidos = [], []
+        for veiculo in veiculos:
+            devido = quarentena.get((veiculo[2], str(veiculo[0]), str(veiculo[1]), veiculo[3]))
+            if devido is None:
+                principais.append(veiculo)
+            elif devido:
+                devidos.append(veiculo)
+            else:
+                stats['em_quarentena'] += 1
+        if modelos is None:
+            # Em quarentena mas já com valor no mês (ou fora do catálogo): sai da quarentena
+            sem_valor = {(v[2], str(v[0]), str(v[1]), v[3]) for v in veiculos}
+            recuperados_pendentes.extend(chave for chave in quarentena if chave not in sem_valor)
+        veiculos = principais + devidos
+        if quarentena:
+            print(f"🧪 Quarentena: {len(devidos)} descontinuados a reconsultar no fim, "
+                  f"{stats['em_quarentena']} adiados (backoff)")
+        
+        # Faixas de prioridade: cada faixa é processada inteira antes da próxima
+        faixas = carregar_faixas()
+        blocos = separar_por_faixa(principais, faixas, mes_int)
+        resumos = {}
+        if modelos is None:
+            for faixa, itens in separar_por_faixa(catalogo, faixas, mes_int):
+                chaves = [(v[2], str(v[0]), str(v[1]), v[3]) for v in itens]
+                resumos[faixa.nome] = {
+                    'esperados': len(itens),
+                    'com_valor': sum(1 for v in itens if v[4]),
+                    'em_quarentena': sum(1 for v, chave in zip(itens, chaves) if not v[4] and chave in quarentena),
+                    'chaves': chaves
+                }
+        print("🎯 Faixas de prioridade:")
+        for faixa, itens in blocos:
+            print(f"  • {faixa.nome}: {len(itens)} veículos")
         
         print(f"🚗 {len(veiculos)} veículos para processar\n")
         
         # Pré-processa veículos para contar por ano
         print("📊 Analisando distribuição por ano...")
-        veiculos_por_ano = {}
-        for veiculo in veiculos:
-            codigo_ano_combustivel = veiculo[3]
-            if '-' in codigo_ano_combustivel:
-                ano_modelo = codigo_ano_combustivel.split('-')[0]
-                veiculos_por_ano[ano_modelo] = veiculos_por_ano.get(ano_modelo, 0) + 1
+        veiculos_por_ano = contar_por_ano(veiculos)
         
         # Mostra distribuição
         print(f"{'='*70}")
@@ -166,11 +271,25 @@ def atualizar_valores():
         print(f"{'='*70}\n")
         
         # Controle de ano atual para logs informativos
-        ano_atual_processamento = None
         contador_ano_atual = 0
         total_ano_atual = 0
+        i = 0
         
-        for i, veiculo in enumerate(veiculos, 1):
+        # Faixas em ordem e, por último, a reconsulta da quarentena (faixa None)
+        for ordem, (faixa, lista) in enumerate(blocos + [(None, devidos)], 1):
+            if lista:
+                print(f"\n{'#'*70}")
+                if faixa is None:
+                    print(f"🔁 Reconsultando {len(lista)} veículos da quarentena")
+                else:
+                    print(f"🎯 Faixa {ordem}/{len(blocos)}: {faixa.nome} ({len(lista)} veículos)")
+                print(f"{'#'*70}")
+            ano_atual_processamento = None
+            veiculos_por_ano_bloco = contar_por_ano(lista)
+            base = dict(stats)
+            
+            for veiculo in lista:
+                i += 1
                 codigo_marca = veiculo[0]
                 codigo_modelo = veiculo[1]
                 tipo_veiculo = veiculo[2]
@@ -200,7 +319,7 @@ def atualizar_valores():
                         
                         ano_atual_processamento = ano_modelo
                         contador_ano_atual = 0
-                        total_ano_atual = veiculos_por_ano.get(ano_modelo, 0)
+                        total_ano_atual = veiculos_por_ano_bloco.get(ano_modelo, 0)
                         
                         # Nome amigável do ano
                         ano_display = "Zero Km" if ano_modelo == "32000" else ano_modelo
@@ -217,6 +336,9 @@ def atualizar_valores():
                 
                 # Incrementa contador de processados
                 stats['processados'] += 1
+                chave = (tipo_veiculo, str(codigo_marca), str(codigo_modelo), codigo_ano_combustivel)
+                if chave in quarentena:
+                    stats['reverificados'] += 1
                 
                 # Mostra progresso a cada 10 veículos (relativo ao ano)
                 if contador_ano_atual % 10 == 0 or contador_ano_atual == 1:
@@ -225,7 +347,7 @@ def atualizar_valores():
                     
                     # Debug: mostra último mes_referencia salvo
                     if i == 1:
-                        cursor.execute('SELECT mes_referencia FROM valores_fipe ORDER BY data_consulta DESC LIMIT 1')
+                        cursor.execute('SELECT mes FROM valores ORDER BY data_consulta DESC LIMIT 1')
                         ultimo_mes = cursor.fetchone()
                         if ultimo_mes:
                             print(f"    🔍 Último mês salvo no banco: {ultimo_mes[0]}")
@@ -242,36 +364,18 @@ def atualizar_valores():
                     )
                     
                     if valor and valor.get('Valor'):
-                        # Valida que o valor principal está presente
-                        valor_texto = valor.get('Valor')
-                        
-                        # Prepara dados para salvar
-                        valor_data = {
-                            'codigo_marca': int(codigo_marca),
-                            'codigo_modelo': int(codigo_modelo),
-                            'tipo_veiculo': int(tipo_veiculo),
-                            'ano_modelo': int(ano_modelo),
-                            'codigo_combustivel': int(codigo_combustivel),
-                            'valor': valor_texto,
-                            'marca': valor.get('Marca'),
-                            'modelo': valor.get('Modelo'),
-                            'combustivel': valor.get('Combustivel'),
-                            'codigo_fipe': valor.get('CodigoFipe'),
-                            'mes_referencia': mes_pt_para_yyyymm(valor.get('MesReferencia')),  # Converte para YYYYMM
-                            'codigo_referencia': codigo_ref,
-                            'data_consulta': datetime.now().isoformat()
-                        }
-                        
-                        # Extrai valor numérico
-                        valor_limpo = valor_texto.replace('R$', '').replace('.', '').replace(',', '.').strip()
-                        try:
-                            valor_data['valor_numerico'] = float(valor_limpo)
-                        except:
-                            valor_data['valor_numerico'] = 0.0
+                        # Prepara registro para salvar
+                        valor_data = ValorFipe.da_api(
+                            valor, codigo_marca, codigo_modelo, tipo_veiculo,
+                            ano_modelo, codigo_combustivel, codigo_ref,
+                            data_consulta=datetime.now().isoformat()
+                        )
                         
                         # Salva no SQLite local (sem commit imediato)
                         cache.save_valor_fipe(valor_data, commit=False)
                         stats['valores_salvos'] += 1
+                        if chave in quarentena:
+                            recuperados_pendentes.append(chave)
                         
                         # Commit a cada 10 registros para salvar progresso
                         if stats['valores_salvos'] % 10 == 0:
@@ -280,19 +384,15 @@ def atualizar_valores():
                         # API retornou mas sem valor (veículo descontinuado ou sem preço)
                         # Isso é normal - a FIPE remove modelos antigos/descontinuados
                         stats['descontinuados'] += 1
-                        
-                        # Registra no CSV
-                        csv_writer.writerow([
-                            codigo_marca, codigo_modelo, tipo_veiculo, ano_modelo, codigo_combustivel,
-                            nome_marca, nome_modelo, datetime.now().isoformat()
-                        ])
-                        csv_file.flush()  # Garante gravação imediata
+                        faltas_pendentes.append(chave)
                         
                         # Log apenas a cada 50 descontinuados (evita poluição)
                         if stats['descontinuados'] % 50 == 1:
                             ano_display = "Zero Km" if ano_modelo == "32000" else ano_modelo
                             print(f"    ⏭️ {nome_marca} {nome_modelo} {ano_display} - Descontinuado/Não disponível na API")
                     
+                    gravar_quarentena()
+                    
                     # Delay já implementado em buscar_valor_veiculo() no fipe_crawler.py
                 
                 except Exception as e:
@@ -312,29 +412,15 @@ def atualizar_valores():
                                 codigo_ref  # Passa codigo_ref também no retry
                             )
                             if valor:
-                                valor_data = {
-                                    'codigo_marca': int(codigo_marca),
-                                    'codigo_modelo': int(codigo_modelo),
-                                    'tipo_veiculo': int(tipo_veiculo),  # IMPORTANTE: faltava!
-                                    'ano_modelo': int(ano_modelo),
-                                    'codigo_combustivel': int(codigo_combustivel),
-                                    'valor': valor.get('Valor'),
-                                    'marca': valor.get('Marca'),
-                                    'modelo': valor.get('Modelo'),
-                                    'combustivel': valor.get('Combustivel'),
-                                    'codigo_fipe': valor.get('CodigoFipe'),
-                                    'mes_referencia': mes_pt_para_yyyymm(valor.get('MesReferencia')),  # Converte para YYYYMM
-                                    'codigo_referencia': codigo_ref,
-                                    'data_consulta': datetime.now().isoformat()
-                                }
-                                valor_texto = valor.get('Valor', 'R$ 0,00')
-                                valor_limpo = valor_texto.replace('R$', '').replace('.', '').replace(',', '.').strip()
-                                try:
-                                    valor_data['valor_numerico'] = float(valor_limpo)
-                                except:
-                                    valor_data['valor_numerico'] = 0.0
+                                valor_data = ValorFipe.da_api(
+                                    valor, codigo_marca, codigo_modelo, tipo_veiculo,
+                                    ano_modelo, codigo_combustivel, codigo_ref,
+                                    data_consulta=datetime.now().isoformat()
+                                )
                                 cache.save_valor_fipe(valor_data, commit=False)
                                 stats['valores_salvos'] += 1
+                                if chave in quarentena:
+                                    recuperados_pendentes.append(chave)
                                 
                                 # Commit a cada 10 registros
                                 if stats['valores_salvos'] % 10 == 0:
@@ -351,11 +437,14 @@ def atualizar_valores():
                     # Incrementa processados mesmo em caso de erro
                     stats['processados'] += 1
                     continue
-        
-        # Log do último ano processado
-        if ano_atual_processamento:
-            ano_display = "Zero Km" if ano_atual_processamento == "32000" else ano_atual_processamento
-            print(f"\n    ✅ Ano {ano_display}: {contador_ano_atual}/{total_ano_atual} veículos processados")
+            
+            # Log do último ano processado no bloco
+            if ano_atual_processamento:
+                ano_display = "Zero Km" if ano_atual_processamento == "32000" else ano_atual_processamento
+                print(f"\n    ✅ Ano {ano_display}: {contador_ano_atual}/{total_ano_atual} veículos processados")
+            
+            if faixa is not None and modelos is None:
+                concluir_faixa(ordem, faixa, resumos[faixa.nome], base)
         
         # COMMIT FINAL - CRUCIAL para persistir dados!
         print("\n💾 Salvando todos os dados no banco...")
@@ -373,9 +462,18 @@ def atualizar_valores():
         print(f"   • Processados agora: {stats['processados']}")
         print(f"   • Valores salvos: {stats['valores_salvos']}")
         print(f"   • Descontinuados (não disponíveis na API): {stats['descontinuados']}")
+        print(f"   • Quarentena: {stats['reverificados']} reconsultados, {stats['em_quarentena']} adiados")
         print(f"   • Erros: {stats['erros']}")
         print()
         
+        if stats['faixas']:
+            print(f"🎯 COMPLETUDE POR FAIXA:")
+            for marcador in stats['faixas']:
+                print(f"   • {marcador['faixa']}: {marcador['com_valor']}/{marcador['esperados']} com valor, "
+                      f"{marcador['sem_valor']} sem valor, {marcador['erros']} erros"
+                      f"{'' if marcador['completa'] else ' (incompleta)'}")
+            print()
+        
         # Mostra resumo por ano
         if veiculos_por_ano:
             print(f"📅 VEÍCULOS PROCESSADOS POR ANO:")
@@ -390,8 +488,7 @@ def atualizar_valores():
         print()
         
         if stats['descontinuados'] > 0:
-            print(f"📝 {stats['descontinuados']} veículos descontinuados registrados em:")
-            print(f"   {csv_descontinuados}")
+            print(f"📝 {stats['descontinuados']} veículos descontinuados registrados na quarentena (tabela descontinuados)")
             print(f"💡 Execute verificar_descontinuados.py para validar e remover do banco.")
             print()
     
@@ -408,9 +505,6 @@ def atualizar_valores():
         print("💾 Salvando alterações finais...")
         cache.conn.commit()
         print("✅ Dados salvos no SQLite!")
-        
-        # Fecha CSV
-        csv_file.close()
     
     except Exception as e:
         print(f"\n\n❌ Erro fatal: {e}")
@@ -431,22 +525,65 @@ def atualizar_valores():
         print(f"   • Valores salvos: {stats['valores_salvos']}")
         print(f"   • Descontinuados: {stats['descontinuados']}")
         print()
-        
-        # Fecha CSV
-        csv_file.close()
+        raise
+    
+    finally:
+        # Grava o que restou da quarentena (também em interrupção ou erro)
+        gravar_quarentena(forcar=True)
+    
+    return stats
+
+
+def estimar(offline=False):
+    """
+    Modo --plan: estima quantos valores faltam no mês atual e o tempo da atualização.
+    Consulta só a tabela de referência (ou nada, com --offline).
+    """
+    cache = FipeLocalCache()
+    
+    if offline:
+        row = cache.conn.execute('SELECT mes FROM tabelas_referencia ORDER BY codigo DESC LIMIT 1').fetchone()
+        mes_api = row[0] if row else None
+    else:
+        tabelas = buscar_tabela_referencia()
+        mes_api = tabelas[0]['Mes'] if tabelas else None
+    
+    mes_referencia = mes_para_yyyymm(mes_api)
+    if not mes_referencia:
+        print("❌ Mês de referência desconhecido (rode sem --offline ou popule tabelas_referencia)")
+        return
+    
+    estimativas = estimar_valores(cache, mes_referencia)
+    imprimir_estimativa(
+        f"2_atualizar_valores.py ({yyyymm_para_mes_display(mes_referencia)})",
+        estimativas, 1, 0 if offline else 2
+    )
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Atualiza os valores FIPE do mês para todos os veículos do cache")
+    parser.add_argument('--plan', action='store_true', help="Apenas estima requisições e tempo, sem atualizar")
+    parser.add_argument('--offline', action='store_true', help="Com --plan: usa só o cache local, sem consultar a API")
+    parser.add_argument('--sim', action='store_true', help="Não pede confirmação (execução automática)")
+    args = parser.parse_args()
+    
+    if args.plan:
+        estimar(args.offline)
+        sys.exit(0)
+    
     print()
     print("⚠️  ATENÇÃO: Este processo pode levar VÁRIAS HORAS!")
     print("⚠️  Certifique-se de ter uma conexão estável com a internet.")
     print("⚠️  O processo pode ser interrompido (Ctrl+C) e retomado depois.")
     print()
     
-    resposta = input("Deseja continuar? (s/n): ")
+    resposta = 's' if args.sim else input("Deseja continuar? (s/n): ")
     
     if resposta.lower() in ['s', 'sim', 'y', 'yes']:
         print()
-        atualizar_valores()
+        try:
+            atualizar_valores()
+        except Exception:
+            sys.exit(1)
     else:
         print("\n❌ Operação cancelada.")
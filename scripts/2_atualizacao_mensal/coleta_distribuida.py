@@ -0,0 +1,377 @@
+"""
+Coleta distribuída: vários processos (ou máquinas) dividem a atualização mensal.
+
+Uma fila compartilhada em SQLite (src/cache/fila_trabalho.py) guarda as tarefas:
+valores pendentes do mês e, opcionalmente, listagens de modelos por marca. Cada
+worker reivindica lotes disjuntos com lease/heartbeat, grava num shard SQLite
+próprio (mesmo schema do fipe_local.db) e, no fim, o passo de mesclagem incorpora
+os shards ao fipe_local.db. Worker que morre perde só o lease: as tarefas voltam
+para a fila quando o prazo vence.
+
+Comandos:
+    coordenar   Cria o lote do mês e enfileira as tarefas a partir do cache local
+    worker      Consome a fila até acabar o trabalho (rode quantos quiser)
+    mesclar     Incorpora os shards ao fipe_local.db
+    status      Mostra o andamento do lote
+    local       Tudo numa máquina: coordenar + N processos worker + mesclar
+
+Exemplos:
+    python scripts/2_atualizacao_mensal/coleta_distribuida.py local --processos 4
+    # Várias máquinas: só a fila fica no disco de rede (--compartilhada em todos os comandos);
+    # os shards ficam no disco local de cada host e são copiados para o coordenador no fim
+    python scripts/2_atualizacao_mensal/coleta_distribuida.py coordenar --fila /mnt/fipe/fila.db --compartilhada
+    python scripts/2_atualizacao_mensal/coleta_distribuida.py worker --fila /mnt/fipe/fila.db --compartilhada   # em cada host
+    python scripts/2_atualizacao_mensal/coleta_distribuida.py mesclar --shards shards_host1/*.db shards_host2/*.db
+"""
+import sys
+from pathlib import Path
+
+# Adiciona o diretório raiz ao path
+ROOT_DIR = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(ROOT_DIR))
+
+import argparse
+import os
+import re
+import socket
+import subprocess
+import time
+from datetime import datetime
+from threading import Lock
+from src.normalizacao import mes_para_yyyymm
+from src.config import yyyymm_para_mes_display
+from src.cache.fipe_local_cache import FipeLocalCache
+from src.cache.fila_trabalho import FilaTrabalho, LEASE_PADRAO
+from src.registros import ValorFipe
+
+
+FILA_PADRAO = 'fipe_fila.db'
+SHARDS_PADRAO = 'shards'
+
+
+def nome_shard(dono):
+    """Nome do shard de um worker (identificação sem caracteres especiais)"""
+    return re.sub(r'[^A-Za-z0-9_.-]', '_', dono)
+
+
+def listar_shards(pasta_shards):
+    """Shards da pasta ("fipe_local_shard_*.db")"""
+    return sorted(Path(pasta_shards).glob(FipeLocalCache.caminho_shard('*').name))
+
+
+def coordenar(fila, incluir_marcas=False, tipos_veiculo=(1, 2, 3)):
+    """
+    Cria o lote do mês atual e enfileira os valores pendentes do cache local.
+    
+    Returns:
+        str: Nome do lote
+    """
+    from src.crawler.fipe_crawler import buscar_tabela_referencia
+    
+    tabelas = buscar_tabela_referencia()
+    if not tabelas:
+        print("❌ Não foi possível obter a tabela de referência atual")
+        return None
+    
+    codigo_ref = tabelas[0]['Codigo']
+    mes_int = int(mes_para_yyyymm(tabelas[0]['Mes']))
+    lote = f"valores:{mes_int}"
+    
+    print("=" * 70)
+    print(f"📋 COORDENADOR - lote {lote} ({yyyymm_para_mes_display(str(mes_int))}, código {codigo_ref})")
+    print("=" * 70)
+    
+    fila.criar_lote(lote, {'codigo_ref': codigo_ref, 'mes': mes_int})
+    cache = FipeLocalCache()
+    
+    # Mesma seleção do 2_atualizar_valores.py: veículos sem valor no mês
+    marcadores = ','.join('?' * len(tipos_veiculo))
+    cursor = cache.conn.execute(f'''
+        SELECT ma.codigo_marca, ma.codigo_modelo, ma.tipo_veiculo, ma.codigo_ano_combustivel
+        FROM modelos_anos_veiculos ma
+        LEFT JOIN valores vf
+            ON vf.veiculo_id = ma.veiculo_id
+            AND vf.mes = ?
+        WHERE vf.veiculo_id IS NULL AND ma.tipo_veiculo IN ({marcadores})
+        ORDER BY ma.codigo_ano_combustivel DESC, ma.codigo_marca, ma.codigo_modelo
+    ''', (mes_int, *tipos_veiculo))
+    pendentes = [list(row) for row in cursor.fetchall()]
+    novas = fila.enfileirar(lote, 'valor', pendentes)
+    print(f"💰 {len(pendentes)} valores pendentes ({novas} tarefas novas na fila)")
+    
+    if incluir_marcas:
+        cursor = cache.conn.execute(
+            f'SELECT tipo_veiculo, codigo, nome FROM marcas WHERE tipo_veiculo IN ({marcadores})',
+            tuple(tipos_veiculo)
+        )
+        marcas = [list(row) for row in cursor.fetchall()]
+        novas = fila.enfileirar(lote, 'marca', marcas)
+        print(f"🏷️  {len(marcas)} listagens de modelos por marca ({novas} tarefas novas)")
+    
+    cache.close()
+    print()
+    return lote
+
+
+class WorkerDistribuido:
+    """
+    Worker: reivindica lotes de tarefas, consulta a API e grava no shard próprio.
+    A ordem é sempre gravar no shard e só depois concluir na fila; se o processo
+    cai no meio, o lease vence e a tarefa é refeita (gravações são idempotentes).
+    """
+    
+    def __init__(self, fila, lote, dono, pasta_shards, quantidade=20, lease=LEASE_PADRAO):
+        self.fila = fila
+        self.lote = lote
+        self.dono = dono
+        self.quantidade = quantidade
+        self.lease = lease
+        
+        parametros = fila.parametros_lote(lote)
+        if parametros is None:
+            raise ValueError(f"Lote '{lote}' não existe na fila (rode 'coordenar' antes)")
+        self.codigo_ref = parametros['codigo_ref']
+        
+        self.shard = FipeLocalCache.abrir_shard(nome_shard(dono), pasta_shards)
+        
+        self.em_posse = []
+        self.lock = Lock()
+        self.stats = {'valores': 0, 'sem_valor': 0, 'modelos': 0, 'falhas': 0}
+    
+    def executar(self):
+        """Consome a fila até não restar tarefa pendente nem lease de outro worker em aberto"""
+        from src.crawler.fipe_crawler import buscar_valor_veiculo, buscar_modelos
+        self._buscar_valor = buscar_valor_veiculo
+        self._buscar_modelos = buscar_modelos
+        
+        print(f"👷 Worker {self.dono} no lote {self.lote} (shard: {self.shard.db_path})")
+        parar_heartbeat = self.fila.heartbeat(self.dono, self._ids_em_posse, self.lease)
+        
+        try:
+            while True:
+                tarefas = self.fila.reivindicar(self.lote, self.dono, self.quantidade, self.lease)
+                if not tarefas:
+                    resumo = self.fila.resumo(self.lote)
+                    if not resumo.get('em_andamento'):
+                        break
+                    # Tarefas com outros workers: espera concluírem ou o lease vencer
+                    time.sleep(min(self.lease / 4, 30))
+                    continue
+                
+                with self.lock:
+                    self.em_posse = [t.id for t in tarefas]
+                self._processar_lote(tarefas)
+                with self.lock:
+                    self.em_posse = []
+        finally:
+            parar_heartbeat.set()
+            self.shard.close()
+        
+        print(f"✅ Worker {self.dono}: {self.stats['valores']} valores, {self.stats['sem_valor']} sem valor, "
+              f"{self.stats['modelos']} modelos, {self.stats['falhas']} falhas")
+        return self.stats
+    
+    def _ids_em_posse(self):
+        with self.lock:
+            return list(self.em_posse)
+    
+    def _processar_lote(self, tarefas):
+        valores = []
+        concluidas = {'ok': [], 'sem_valor': []}
+        
+        for tarefa in tarefas:
+            try:
+                if tarefa.tipo == 'valor':
+                    valor = self._processar_valor(tarefa.carga)
+                    if valor is None:
+                        concluidas['sem_valor'].append(tarefa.id)
+                    else:
+                        valores.append(valor)
+                        concluidas['ok'].append(tarefa.id)
+                elif tarefa.tipo == 'marca':
+                    self._processar_marca(tarefa.carga)
+                    concluidas['ok'].append(tarefa.id)
+                else:
+                    raise ValueError(f"Tipo de tarefa desconhecido: {tarefa.tipo}")
+            except Exception as e:
+                print(f"   ⚠️ [{self.dono}] Tarefa {tarefa.id} ({tarefa.tipo} {tarefa.carga}): {e}")
+                self.fila.falhar(tarefa.id, self.dono, e)
+                self.stats['falhas'] += 1
+        
+        # Primeiro o shard, depois a fila
+        if valores:
+            self.shard.save_valores_fipe(valores)
+        for resultado, ids in concluidas.items():
+            self.fila.concluir(ids, self.dono, resultado)
+        
+        self.stats['valores'] += len(valores)
+        self.stats['sem_valor'] += len(concluidas['sem_valor'])
+        print(f"   📦 [{self.dono}] {len(tarefas)} tarefas: {len(valores)} valores, "
+              f"{len(concluidas['sem_valor'])} sem valor")
+    
+    def _processar_valor(self, carga):
+        """Consulta o valor de um veículo; None se a API não tem valor (descontinuado)"""
+        codigo_marca, codigo_modelo, tipo_veiculo, codigo_ano_combustivel = carga
+        ano_modelo, codigo_combustivel = codigo_ano_combustivel.split('-')
+        
+        dados = self._buscar_valor(
+            codigo_marca, codigo_modelo, ano_modelo, codigo_combustivel, tipo_veiculo, self.codigo_ref
+        )
+        if dados is None:
+            # buscar_valor_veiculo devolve None em rate limit persistente: tenta de novo depois
+            raise RuntimeError("sem resposta da API (rate limit?)")
+        if not dados.get('Valor'):
+            return None
+        return ValorFipe.da_api(
+            dados, codigo_marca, codigo_modelo, tipo_veiculo,
+            ano_modelo, codigo_combustivel, self.codigo_ref,
+            data_consulta=datetime.now().isoformat()
+        )
+    
+    def _processar_marca(self, carga):
+        """Lista os modelos de uma marca e grava no shard"""
+        tipo_veiculo, codigo_marca, nome_marca = carga
+        resultado = self._buscar_modelos(codigo_marca, tipo_veiculo, nome_marca)
+        if not resultado or 'Modelos' not in resultado:
+            raise RuntimeError("listagem de modelos vazia")
+        self.shard.save_modelos(resultado['Modelos'], codigo_marca, tipo_veiculo)
+        self.stats['modelos'] += len(resultado['Modelos'])
+
+
+def mesclar(shards, remover=True):
+    """
+    Incorpora os shards ao fipe_local.db com INSERT ... SELECT entre bancos anexados
+    (FipeLocalCache.mesclar_shards): uma transação por tabela, sem passar pelo Python.
+    
+    Returns:
+        int: Shards mesclados
+    """
+    existentes = []
+    for caminho in map(Path, shards):
+        if caminho.exists():
+            existentes.append(caminho)
+        else:
+            print(f"⚠️  Shard não encontrado: {caminho}")
+    if not existentes:
+        return 0
+    
+    cache = FipeLocalCache()
+    print(f"🔀 Mesclando {len(existentes)} shard(s) em {cache.db_path}...")
+    inicio = time.time()
+    totais = cache.mesclar_shards(existentes)
+    cache.close()
+    print(f"   • valores: {totais['valores']} | veículos: {totais['veiculos']} | "
+          f"modelos: {totais['modelos']} | anos: {totais['modelos_anos']} ({time.time() - inicio:.1f}s)")
+    
+    if remover:
+        for caminho in existentes:
+            for arquivo in (caminho, Path(f"{caminho}-wal"), Path(f"{caminho}-shm"), Path(f"{caminho}-journal")):
+                if arquivo.exists():
+                    arquivo.unlink()
+    
+    return len(existentes)
+
+
+def imprimir_status(fila, lote):
+    resumo = fila.resumo(lote)
+    resultados = resumo.pop('resultados')
+    total = sum(resumo.values())
+    print(f"📊 Lote {lote}: {total} tarefas")
+    for estado in ('pendente', 'em_andamento', 'concluida', 'falhou'):
+        print(f"   • {estado}: {resumo.get(estado, 0)}")
+    if resultados:
+        print(f"   • resultados: " + ", ".join(f"{r}={n}" for r, n in resultados.items()))
+
+
+def executar_local(args):
+    """Coordena, dispara N processos worker nesta máquina e mescla os shards"""
+    fila = FilaTrabalho(args.fila, compartilhada=args.compartilhada)
+    lote = coordenar(fila, args.marcas, _tipos(args.tipos))
+    if not lote:
+        return 1
+    
+    print(f"🚀 Iniciando {args.processos} processos worker...")
+    processos = [
+        subprocess.Popen([
+            sys.executable, __file__, 'worker',
+            '--fila', args.fila, '--lote', lote, '--shards', args.shards,
+            '--id', f"{socket.gethostname()}-local{i}", '--quantidade', str(args.quantidade)
+        ] + (['--compartilhada'] if args.compartilhada else []))
+        for i in range(1, args.processos + 1)
+    ]
+    codigos = [p.wait() for p in processos]
+    if any(codigos):
+        print(f"⚠️  Workers terminaram com códigos {codigos}")
+    
+    print()
+    imprimir_status(fila, lote)
+    print()
+    mesclar(listar_shards(args.shards))
+    return 0
+
+
+def _tipos(texto):
+    return [int(t) for t in texto.split(',') if t.strip() in ('1', '2', '3')] or [1, 2, 3]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Coleta distribuída da atualização mensal (fila com lease + shards)")
+    sub = parser.add_subparsers(dest='comando', required=True)
+    comum = argparse.ArgumentParser(add_help=False)
+    comum.add_argument('--fila', default=FILA_PADRAO, help="Arquivo SQLite da fila compartilhada")
+    comum.add_argument('--compartilhada', action='store_true',
+                       help="Fila num disco de rede usado por várias máquinas (journal DELETE em vez de WAL)")
+    
+    p_coord = sub.add_parser('coordenar', parents=[comum], help="Cria o lote do mês e enfileira as tarefas")
+    p_coord.add_argument('--marcas', action='store_true', help="Enfileira também a listagem de modelos de cada marca")
+    p_coord.add_argument('--tipos', default='1,2,3', help="Tipos de veículo (ex: 1,2)")
+    
+    p_worker = sub.add_parser('worker', parents=[comum], help="Consome a fila e grava num shard próprio")
+    p_worker.add_argument('--lote', help="Lote a consumir (padrão: o mais recente)")
+    p_worker.add_argument('--id', default=f"{socket.gethostname()}-{os.getpid()}", help="Identificação do worker")
+    p_worker.add_argument('--shards', default=SHARDS_PADRAO, help="Pasta dos shards")
+    p_worker.add_argument('--quantidade', type=int, default=20, help="Tarefas por reivindicação")
+    p_worker.add_argument('--lease', type=float, default=LEASE_PADRAO, help="Prazo da reivindicação em segundos")
+    
+    p_mesclar = sub.add_parser('mesclar', parents=[comum], help="Incorpora shards ao fipe_local.db")
+    p_mesclar.add_argument('--shards', nargs='*', help="Arquivos de shard (padrão: shards/fipe_local_shard_*.db)")
+    p_mesclar.add_argument('--manter', action='store_true', help="Não apaga os shards depois de mesclar")
+    
+    p_status = sub.add_parser('status', parents=[comum], help="Andamento do lote")
+    p_status.add_argument('--lote', help="Lote (padrão: o mais recente)")
+    
+    p_local = sub.add_parser('local', parents=[comum], help="coordenar + N processos worker + mesclar nesta máquina")
+    p_local.add_argument('--processos', type=int, default=3, help="Processos worker")
+    p_local.add_argument('--marcas', action='store_true', help="Enfileira também a listagem de modelos de cada marca")
+    p_local.add_argument('--tipos', default='1,2,3', help="Tipos de veículo (ex: 1,2)")
+    p_local.add_argument('--shards', default=SHARDS_PADRAO, help="Pasta dos shards")
+    p_local.add_argument('--quantidade', type=int, default=20, help="Tarefas por reivindicação")
+    
+    args = parser.parse_args()
+    
+    if args.comando == 'coordenar':
+        sys.exit(0 if coordenar(FilaTrabalho(args.fila, compartilhada=args.compartilhada), args.marcas, _tipos(args.tipos)) else 1)
+    
+    elif args.comando == 'worker':
+        fila = FilaTrabalho(args.fila, compartilhada=args.compartilhada)
+        lote = args.lote or fila.ultimo_lote()
+        if not lote:
+            print("❌ Nenhum lote na fila (rode 'coordenar' antes)")
+            sys.exit(1)
+        WorkerDistribuido(fila, lote, args.id, args.shards, args.quantidade, args.lease).executar()
+    
+    elif args.comando == 'mesclar':
+        shards = args.shards or listar_shards(SHARDS_PADRAO)
+        total = mesclar(shards, remover=not args.manter)
+        print(f"✅ {total} shard(s) mesclado(s) em fipe_local.db")
+    
+    elif args.comando == 'status':
+        fila = FilaTrabalho(args.fila, compartilhada=args.compartilhada)
+        lote = args.lote or fila.ultimo_lote()
+        if lote:
+            imprimir_status(fila, lote)
+        else:
+            print("ℹ️  Nenhum lote na fila")
+    
+    elif args.comando == 'local':
+        sys.exit(executar_local(args))
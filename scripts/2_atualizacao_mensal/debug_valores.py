@@ -9,6 +9,7 @@ sys.path.insert(0, str(ROOT_DIR))
 
 from src.cache.fipe_local_cache import FipeLocalCache
 from src.crawler.fipe_crawler import buscar_tabela_referencia
+from src.normalizacao import mes_para_yyyymm
 
 cache = FipeLocalCache()
 conn = cache.conn
@@ -62,17 +63,13 @@ for v in valores_recentes:
 print(f"\n🔍 Testando query do script (veículos SEM valor para {mes_referencia}):")
 cursor.execute('''
     SELECT ma.codigo_marca, ma.codigo_modelo, ma.tipo_veiculo, ma.codigo_ano_combustivel
-    FROM modelos_anos ma
-    LEFT JOIN valores_fipe vf 
-        ON vf.codigo_marca = ma.codigo_marca
-        AND vf.codigo_modelo = ma.codigo_modelo
-        AND vf.tipo_veiculo = ma.tipo_veiculo
-        AND vf.mes_referencia = ?
-        AND ma.codigo_ano_combustivel = 
-            CAST(vf.ano_modelo AS TEXT) || '-' || CAST(vf.codigo_combustivel AS TEXT)
-    WHERE vf.codigo_marca IS NULL
+    FROM modelos_anos_veiculos ma
+    LEFT JOIN valores vf 
+        ON vf.veiculo_id = ma.veiculo_id
+        AND vf.mes = ?
+    WHERE vf.veiculo_id IS NULL
     LIMIT 10
-''', (mes_referencia,))
+''', (mes_para_yyyymm(mes_referencia),))
 veiculos_sem_valor = cursor.fetchall()
 print(f"   Encontrados: {len(veiculos_sem_valor)} veículos (mostrando primeiros 10)")
 for v in veiculos_sem_valor[:5]:
@@ -1,10 +1,38 @@
 """
 Script principal para atualização mensal completa.
-Executa em sequência:
-  1. Atualização de modelos (novos modelos Zero Km)
-  2. Atualização de valores (preços do novo mês)
+Executa as etapas no próprio processo, como um grafo de dependências
+(ramos independentes rodam em paralelo):
 
-Execute este script no início de cada mês quando a tabela FIPE é atualizada.
+    referencia ─┬─ modelos_carros ─────┐
+                ├─ modelos_motos ──────┤
+                ├─ modelos_caminhoes ──┼─ valores_novos ─┬─ descontinuados ─┬─ sincronizacao
+                └─ valores_existentes ─┘                 ├─ validacao ──────┘
+                                                         ├─ registro_mes
+                                                         └─ series
+
+  • referencia: uma única consulta à tabela de referência, usada por todas as etapas
+  • modelos_*: modelos novos e versões Zero Km novas de cada tipo de veículo
+  • valores_existentes: preços do mês dos veículos já cadastrados (junto com a descoberta),
+    por faixa de prioridade; cada faixa completa já é validada e enviada ao Supabase
+  • valores_novos: preços dos modelos descobertos nesta execução
+  • descontinuados: confirma na API os veículos que entraram ou continuaram na
+    quarentena neste mês e remove os inexistentes
+  • validacao: retém em quarentena os valores suspeitos do mês (zerados, saltos fora da
+    curva, codigo_fipe/nome alterado); a sincronização só envia o resto
+  • registro_mes: grava o mês em tabelas_referencia (só se os valores não tiveram erro)
+  • series: incorpora o mês às séries de preço por veículo (FipeLocalCache.historico)
+  • sincronizacao: envia o SQLite local ao Supabase (sem os valores em quarentena)
+
+Etapas com erro são repetidas (--tentativas); se esgotarem, só as etapas que
+dependem delas deixam de rodar. Ao final grava um resumo JSON da execução.
+
+Execute este script no início de cada mês quando a tabela FIPE é atualizada
+(ou deixe monitorar_referencia.py --executar disparar com --sim, sem perguntas).
+
+Exemplos:
+    python scripts/2_atualizacao_mensal/executar_mes.py
+    python scripts/2_atualizacao_mensal/executar_mes.py --sim --resumo logs/mes.json
+    python scripts/2_atualizacao_mensal/executar_mes.py --sim --se-novo --tipos 1 --sem-sincronizar
 """
 import sys
 from pathlib import Path
@@ -13,153 +41,298 @@ from pathlib import Path
 ROOT_DIR = Path(__file__).parent.parent.parent
 sys.path.insert(0, str(ROOT_DIR))
 
-import subprocess
-import time
+import argparse
+import importlib.util
+import json
 from datetime import datetime
+from src.analise import validar_mes
+from src.config import yyyymm_para_mes_display
+from src.cache.fipe_local_cache import FipeLocalCache
+from src.crawler.fipe_crawler import buscar_tabela_referencia
+from src.crawler.limitador import descrever_teto
+from src.crawler.monitor_referencia import descrever_tabela
+from src.crawler.orquestrador import Etapa, Orquestrador, FluxoEncerrado, ESPERA_RETRY_ETAPA
 
 
-def executar_script(script_path, descricao):
-    """
-    Executa um script Python e retorna código de saída.
+TIPOS_ETAPA = {1: 'modelos_carros', 2: 'modelos_motos', 3: 'modelos_caminhoes'}
+
+
+def carregar_script(caminho):
+    """Importa um script como módulo (os nomes dos scripts começam com dígito)"""
+    spec = importlib.util.spec_from_file_location(caminho.stem, caminho)
+    modulo = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(modulo)
+    return modulo
+
+
+def etapa_referencia(contexto):
+    """Consulta a tabela de referência uma vez; com --se-novo, encerra se o mês já é conhecido"""
+    tabelas = buscar_tabela_referencia()
+    if not tabelas:
+        raise RuntimeError("Tabela de referência indisponível na API")
     
-    Args:
-        script_path: Caminho do script a executar
-        descricao: Descrição da etapa
-        
-    Returns:
-        bool: True se sucesso, False se erro
-    """
+    tabela = tabelas[0]
+    conhecida = contexto['cache'].get_codigo_referencia_mais_recente() or 0
+    resultado = descrever_tabela(tabela)
+    resultado['mes_novo'] = int(tabela['Codigo']) > conhecida
+    contexto['tabela'] = tabela
+    
+    print(f"📅 Tabela de referência: {yyyymm_para_mes_display(resultado['mes'])} "
+          f"(código {resultado['codigo_referencia']}){' 🆕' if resultado['mes_novo'] else ''}")
+    if contexto['se_novo'] and not resultado['mes_novo']:
+        raise FluxoEncerrado("nenhum mês novo publicado", resultado)
+    return resultado
+
+
+def etapa_modelos(tipo_veiculo):
+    """Descoberta de modelos novos de um tipo de veículo"""
+    def executar(contexto):
+        stats = contexto['scripts']['modelos'].atualizar_modelos((tipo_veiculo,), cache=contexto['cache'])
+        contexto['modelos_novos'][tipo_veiculo] = stats['modelos']
+        return {k: v for k, v in stats.items() if k != 'modelos'}
+    return executar
+
+
+def uploader_supabase(cache=None):
+    """SupabaseUploader do script de sincronização (importado só aqui: depende do cliente Supabase)"""
+    modulo = carregar_script(ROOT_DIR / 'scripts' / '3_sincronizacao' / 'sincronizar_supabase.py')
+    return modulo.SupabaseUploader(db_path='fipe_local.db', batch_size=1000, cache=cache)
+
+
+def publicador_faixas(contexto, publicacoes):
+    """Envia ao Supabase os valores do mês de cada faixa de prioridade completa, sem esperar o resto"""
+    mes = descrever_tabela(contexto['tabela'])['mes']
+    
+    def publicar(marcador, chaves):
+        if not marcador['completa']:
+            print(f"⏭️  Faixa {marcador['faixa']} incompleta: fica para a sincronização final")
+            return
+        try:
+            # Mesma conexão do crawler (gravações serializadas pelo write_lock do cache);
+            # só os veículos da faixa são validados, o mês inteiro fica para a etapa validacao
+            cache = contexto['cache']
+            veiculo_ids = cache.get_veiculo_ids(
+                (marca, modelo, tipo, *map(int, codigo_ano.split('-', 1)))
+                for tipo, marca, modelo, codigo_ano in chaves
+            )
+            validacao = validar_mes(cache, int(mes), veiculo_ids=veiculo_ids)
+            print(f"🛡️  Faixa {marcador['faixa']}: {validacao['retidos']} valores em quarentena")
+            uploader = uploader_supabase(cache)
+            try:
+                enviados = uploader.upload_valores_mes(mes, veiculo_ids)
+            finally:
+                uploader.close()
+            publicacoes.append({'faixa': marcador['faixa'], 'enviados': enviados, 'retidos': validacao['retidos']})
+        except Exception as e:
+            # A sincronização final envia de novo: falha aqui não interrompe os valores
+            print(f"⚠️  Publicação da faixa {marcador['faixa']} falhou: {e}")
+            publicacoes.append({'faixa': marcador['faixa'], 'erro': f"{type(e).__name__}: {e}"})
+    return publicar
+
+
+def etapa_valores_existentes(contexto):
+    """Valores do mês de todos os veículos já cadastrados, publicados por faixa"""
+    tabela = contexto['tabela']
+    publicacoes = []
+    publicar = publicador_faixas(contexto, publicacoes) if contexto['publicar_faixas'] else None
+    stats = contexto['scripts']['valores'].atualizar_valores(
+        tabela['Codigo'], tabela['Mes'], ao_concluir_faixa=publicar, cache=contexto['cache']
+    )
+    contexto['resultados_valores'].append(stats)
+    return {**stats, 'publicacoes': publicacoes}
+
+
+def etapa_valores_novos(contexto):
+    """Valores do mês dos modelos descobertos nas etapas modelos_*"""
+    modelos = set().union(*contexto['modelos_novos'].values())
+    if not modelos:
+        print("ℹ️  Nenhum modelo novo: nada a atualizar")
+        return {'modelos_novos': 0}
+    
+    tabela = contexto['tabela']
+    stats = contexto['scripts']['valores'].atualizar_valores(
+        tabela['Codigo'], tabela['Mes'], modelos, cache=contexto['cache']
+    )
+    contexto['resultados_valores'].append(stats)
+    return {**stats, 'modelos_novos': len(modelos)}
+
+
+def etapa_descontinuados(contexto):
+    """Verifica a quarentena do mês (veículos sem valor nas etapas de valores)"""
+    if not any(s['descontinuados'] for s in contexto['resultados_valores']):
+        print("ℹ️  Nenhum veículo sem valor neste mês: nada a verificar")
+        return {'verificados': 0}
+    mes = descrever_tabela(contexto['tabela'])['mes']
+    return contexto['scripts']['descontinuados'].verificar_descontinuados(int(mes), cache=contexto['cache'])
+
+
+def etapa_registro_mes(contexto):
+    """Grava o mês em tabelas_referencia quando todos os valores foram consultados sem erro"""
+    erros = sum(s['erros'] for s in contexto['resultados_valores'])
+    if erros:
+        raise RuntimeError(f"{erros} veículos com erro na atualização de valores: mês fica pendente")
+    tabela = contexto['tabela']
+    contexto['cache'].save_tabela_referencia(tabela['Codigo'], tabela['Mes'])
+    return {'codigo_referencia': int(tabela['Codigo'])}
+
+
+def etapa_validacao(contexto):
+    """Retém em quarentena os valores suspeitos do mês antes da sincronização"""
+    mes = descrever_tabela(contexto['tabela'])['mes']
+    stats = validar_mes(contexto['cache'], int(mes))
+    print(f"🛡️  Validação de {mes}: {stats['verificados']} valores em {stats['tempo']:.2f}s, "
+          f"{stats['retidos']} em quarentena ({stats['valor_invalido']} inválidos, "
+          f"{stats['salto']} saltos, {stats['deriva']} derivas)")
+    return {chave: valor for chave, valor in stats.items() if chave != 'linhas'}
+
+
+def etapa_sincronizacao(contexto):
+    """Envia o SQLite local ao Supabase"""
+    # Mesma conexão das outras etapas: uma segunda FipeLocalCache no arquivo disputaria o lock
+    uploader = uploader_supabase(contexto['cache'])
+    try:
+        return uploader.upload_completo()
+    finally:
+        uploader.close()
+
+
+def etapa_series(contexto):
+    """Incorpora os meses gravados às séries de preço delta-codificadas"""
+    stats = contexto['cache'].atualizar_series()
+    print(f"📈 Séries de preço: {stats['veiculos']} veículos atualizados ({len(stats['meses'])} meses)")
+    return stats
+
+
+def montar_etapas(tipos, tentativas, descontinuados=True, sincronizar=True):
+    """Grafo da rotina mensal"""
+    modelos = [TIPOS_ETAPA[tipo] for tipo in tipos]
+    return [
+        Etapa('referencia', etapa_referencia, tentativas=tentativas),
+        *[
+            Etapa(TIPOS_ETAPA[tipo], etapa_modelos(tipo), depende=('referencia',), tentativas=tentativas)
+            for tipo in tipos
+        ],
+        Etapa('valores_existentes', etapa_valores_existentes, depende=('referencia',), tentativas=tentativas),
+        Etapa('valores_novos', etapa_valores_novos, depende=(*modelos, 'valores_existentes'), tentativas=tentativas),
+        Etapa('descontinuados', etapa_descontinuados, depende=('valores_novos',),
+              tentativas=tentativas, ativa=descontinuados),
+        Etapa('registro_mes', etapa_registro_mes, depende=('valores_novos',)),
+        Etapa('validacao', etapa_validacao, depende=('valores_novos',)),
+        Etapa('sincronizacao', etapa_sincronizacao, depende=('valores_novos', 'descontinuados', 'validacao'),
+              tentativas=tentativas, ativa=sincronizar),
+        Etapa('series', etapa_series, depende=('valores_novos',))
+    ]
+
+
+def imprimir_relatorio(resumo):
+    """Relatório final por etapa"""
+    icones = {'ok': '✅', 'falhou': '❌', 'ignorada': '⏭️ ', 'encerrada': '🛑', 'desativada': '➖', 'interrompida': '⚠️ '}
+    
+    print()
     print("=" * 80)
-    print(f"📋 {descricao}")
+    print("📊 RELATÓRIO FINAL - ATUALIZAÇÃO MENSAL")
     print("=" * 80)
-    print(f"🚀 Executando: {script_path}")
+    print()
+    for nome, registro in resumo['etapas'].items():
+        detalhe = f" ({registro['tentativas']} tentativas)" if registro['tentativas'] > 1 else ""
+        print(f"   {icones.get(registro['status'], '•')} {nome:20s} {registro['status']:12s} "
+              f"{registro['duracao']:8.1f}s{detalhe}")
+        if registro['erro'] and registro['status'] != 'ok':
+            print(f"      {registro['erro']}")
+    print()
+    print(f"⏱️  Tempo total: {resumo['duracao']:.1f}s ({resumo['duracao']/60:.1f} minutos)")
     print()
     
-    inicio = time.time()
-    
-    try:
-        # Executa script e mostra output em tempo real
-        result = subprocess.run(
-            [sys.executable, script_path],
-            cwd=ROOT_DIR,
-            check=True,
-            text=True
-        )
-        
-        tempo = time.time() - inicio
-        print()
-        print(f"✅ Concluído em {tempo:.1f}s ({tempo/60:.1f} minutos)")
-        print()
-        return True
-        
-    except subprocess.CalledProcessError as e:
-        tempo = time.time() - inicio
-        print()
-        print(f"❌ Erro após {tempo:.1f}s")
-        print(f"   Código de saída: {e.returncode}")
-        print()
-        return False
-    except KeyboardInterrupt:
-        print()
-        print("⚠️  Interrompido pelo usuário")
-        print()
-        return False
+    if resumo['status'] == 'ok':
+        print("🎉 ATUALIZAÇÃO MENSAL CONCLUÍDA COM SUCESSO!")
+    elif resumo['status'] == 'encerrado':
+        print("ℹ️  Execução encerrada sem novidades.")
+    else:
+        print("⚠️  Atualização incompleta. Revise os erros acima (as etapas retomam de onde pararam).")
+    print()
+    print("=" * 80)
 
 
 def main():
-    """Executa rotina mensal completa"""
+    """
+    Executa rotina mensal completa.
+    
+    Returns:
+        int: 0 se todas as etapas concluíram (ou não havia mês novo com --se-novo), 1 caso contrário
+    """
+    parser = argparse.ArgumentParser(description="Rotina mensal: modelos, valores, descontinuados e sincronização")
+    parser.add_argument('--sim', action='store_true', help="Execução automática, sem perguntas")
+    parser.add_argument('--se-novo', action='store_true', help="Encerra sem erro se a FIPE não publicou mês novo")
+    parser.add_argument('--tipos', default='1,2,3', help="Tipos de veículo da descoberta de modelos (ex: 1,2)")
+    parser.add_argument('--tentativas', type=int, default=2, help="Tentativas por etapa (padrão 2)")
+    parser.add_argument('--espera-retry', type=float, default=ESPERA_RETRY_ETAPA,
+                        help=f"Segundos antes de repetir uma etapa, dobrando a cada tentativa (padrão {ESPERA_RETRY_ETAPA})")
+    parser.add_argument('--sem-descontinuados', action='store_true', help="Não verifica os descontinuados")
+    parser.add_argument('--sem-sincronizar', action='store_true', help="Não envia ao Supabase (nem as faixas concluídas)")
+    parser.add_argument('--resumo', help="Arquivo JSON do resumo (padrão: logs/execucao_mes_<data>.json)")
+    args = parser.parse_args()
+    
+    tipos = [int(t) for t in args.tipos.split(',') if t.strip() in ('1', '2', '3')] or [1, 2, 3]
+    etapas = montar_etapas(tipos, args.tentativas, not args.sem_descontinuados, not args.sem_sincronizar)
+    
     print()
     print("=" * 80)
     print("🗓️  ATUALIZAÇÃO MENSAL FIPE - ROTINA COMPLETA")
     print("=" * 80)
     print()
     print(f"📅 Data/Hora: {datetime.now().strftime('%d/%m/%Y %H:%M:%S')}")
+    print(descrever_teto())
     print()
-    print("ℹ️  Esta rotina executa:")
-    print("   1️⃣  Atualização de modelos (novos lançamentos Zero Km)")
-    print("   2️⃣  Atualização de valores (preços do novo mês)")
-    print()
-    print("⏱️  Tempo estimado:")
-    print("   • Etapa 1: ~10-15 minutos")
-    print("   • Etapa 2: Várias horas (depende da quantidade de veículos)")
+    print("ℹ️  Etapas (ramos independentes em paralelo):")
+    for etapa in etapas:
+        depende = f" ← {', '.join(etapa.depende)}" if etapa.depende else ""
+        desativada = "" if etapa.ativa else " (desativada)"
+        print(f"   • {etapa.nome}{depende}{desativada}")
     print()
+    print("⏱️  Tempo estimado: várias horas (depende da quantidade de veículos)")
     print("💾 Dados salvos no SQLite local (fipe_local.db)")
-    print("💡 Execute sincronizar_supabase.py depois para enviar ao Supabase")
     print()
     
-    resposta = input("Deseja continuar? (s/n): ")
+    resposta = 's' if args.sim else input("Deseja continuar? (s/n): ")
     
     if resposta.lower() not in ['s', 'sim', 'y', 'yes']:
         print("\n❌ Operação cancelada.")
-        return
+        return 1
     
     print()
     
-    # Diretório dos scripts mensais
     scripts_dir = Path(__file__).parent
+    # Uma única conexão para todas as etapas: com conexões separadas, escritas
+    # simultâneas de etapas paralelas podem se bloquear até o timeout ("database is locked")
+    contexto = {
+        'cache': FipeLocalCache(),
+        'se_novo': args.se_novo,
+        'publicar_faixas': not args.sem_sincronizar,
+        'scripts': {
+            'modelos': carregar_script(scripts_dir / '1_atualizar_modelos.py'),
+            'valores': carregar_script(scripts_dir / '2_atualizar_valores.py'),
+            'descontinuados': carregar_script(scripts_dir / 'verificar_descontinuados.py')
+        },
+        'modelos_novos': {},
+        'resultados_valores': []
+    }
     
-    # Lista de scripts na ordem de execução
-    etapas = [
-        (scripts_dir / "1_atualizar_modelos.py", "ETAPA 1/2 - Atualização de Modelos"),
-        (scripts_dir / "2_atualizar_valores.py", "ETAPA 2/2 - Atualização de Valores")
-    ]
+    orquestrador = Orquestrador(etapas, max_paralelo=len(tipos) + 1, espera_retry=args.espera_retry)
+    resumo = orquestrador.executar(contexto)
+    resumo['referencia'] = resumo['etapas']['referencia']['resultado']
+    resumo['argumentos'] = vars(args)
     
-    # Estatísticas
-    inicio_total = time.time()
-    sucesso = []
-    falhas = []
-    
-    # Executa cada etapa
-    for script_path, descricao in etapas:
-        if executar_script(script_path, descricao):
-            sucesso.append(descricao)
-        else:
-            falhas.append(descricao)
-            print("❌ Etapa falhou. Deseja continuar para próxima etapa? (s/n): ", end="")
-            continuar = input()
-            if continuar.lower() not in ['s', 'sim', 'y', 'yes']:
-                print("\n⚠️  Processo interrompido")
-                break
-    
-    # Relatório final
-    tempo_total = time.time() - inicio_total
+    imprimir_relatorio(resumo)
     
-    print()
-    print("=" * 80)
-    print("📊 RELATÓRIO FINAL - ATUALIZAÇÃO MENSAL")
-    print("=" * 80)
-    print()
-    print(f"⏱️  Tempo total: {tempo_total:.1f}s ({tempo_total/60:.1f} minutos)")
-    print()
-    
-    if sucesso:
-        print(f"✅ Etapas concluídas ({len(sucesso)}):")
-        for etapa in sucesso:
-            print(f"   • {etapa}")
-        print()
-    
-    if falhas:
-        print(f"❌ Etapas com erro ({len(falhas)}):")
-        for etapa in falhas:
-            print(f"   • {etapa}")
-        print()
+    caminho_resumo = Path(args.resumo) if args.resumo else (
+        ROOT_DIR / 'logs' / f'execucao_mes_{datetime.now().strftime("%Y%m%d_%H%M%S")}.json'
+    )
+    caminho_resumo.parent.mkdir(parents=True, exist_ok=True)
+    caminho_resumo.write_text(json.dumps(resumo, indent=2, ensure_ascii=False, default=str), encoding='utf-8')
+    print(f"📝 Resumo da execução: {caminho_resumo}")
     
-    if len(sucesso) == len(etapas):
-        print("🎉 ATUALIZAÇÃO MENSAL CONCLUÍDA COM SUCESSO!")
-        print()
-        print("📋 PRÓXIMOS PASSOS:")
-        print("   1. Verifique os dados no SQLite local:")
-        print("      sqlite3 fipe_local.db \"SELECT COUNT(*) FROM valores_fipe;\"")
-        print()
-        print("   2. Sincronize com Supabase:")
-        print("      python scripts/3_sincronizacao/sincronizar_supabase.py")
-        print()
-    else:
-        print("⚠️  Atualização incompleta. Revise os erros acima.")
-        print()
-    
-    print("=" * 80)
+    return 0 if resumo['status'] in ('ok', 'encerrado') else 1
 
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
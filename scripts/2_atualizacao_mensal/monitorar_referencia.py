@@ -0,0 +1,135 @@
+"""
+Monitor de mês novo na tabela FIPE.
+
+Consulta ConsultarTabelaDeReferencia (no máximo uma vez a cada --intervalo
+minutos, mesmo chamado repetidamente pelo cron) e compara com o cache local.
+Quando a FIPE publica um mês novo:
+- sai com código 10 (ou dispara a rotina mensal com --executar);
+- opcionalmente grava um evento JSON (--evento).
+
+O mês novo só é gravado em tabelas_referencia quando tratado: sem --executar,
+ao ser detectado; com --executar, só se o comando terminar com sucesso (se a
+rotina falhar, a próxima verificação detecta o mês de novo).
+
+Exemplos:
+    # cron a cada 5 minutos, consulta a API no máximo a cada 30
+    */5 * * * * python scripts/2_atualizacao_mensal/monitorar_referencia.py --executar
+    # Fica em execução até o mês novo sair e então roda a rotina mensal
+    python scripts/2_atualizacao_mensal/monitorar_referencia.py --continuo --intervalo 15 --executar
+    # Comando próprio (recebe FIPE_CODIGO_REFERENCIA e FIPE_MES no ambiente)
+    python scripts/2_atualizacao_mensal/monitorar_referencia.py --comando "./publicar.sh"
+"""
+import sys
+from pathlib import Path
+
+# Adiciona o diretório raiz ao path
+ROOT_DIR = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(ROOT_DIR))
+
+import argparse
+import json
+import os
+import shlex
+import subprocess
+import time
+from datetime import datetime
+from src.config import INTERVALO_MONITOR_REFERENCIA, yyyymm_para_mes_display
+from src.cache.fipe_local_cache import FipeLocalCache
+from src.crawler.monitor_referencia import (
+    MonitorReferencia, descrever_tabela, SAIDA_SEM_NOVIDADE, SAIDA_ERRO, SAIDA_NOVO_MES
+)
+from src.crawler.planejador import formatar_tempo
+
+
+def comando_rotina_mensal():
+    """Rotina mensal completa sem confirmações (executar_mes.py --sim)"""
+    return [sys.executable, str(Path(__file__).parent / 'executar_mes.py'), '--sim']
+
+
+def tratar_novo_mes(monitor, verificacao, comando=None, arquivo_evento=None):
+    """
+    Publica o evento e executa o comando (se houver).
+    
+    Returns:
+        int: Código de saída do monitor
+    """
+    evento = descrever_tabela(verificacao.mais_recente)
+    evento['novas'] = len(verificacao.novas)
+    evento['detectado_em'] = datetime.now().isoformat()
+    
+    print(f"🆕 Mês novo na FIPE: {yyyymm_para_mes_display(evento['mes'])} (código {evento['codigo_referencia']})")
+    if arquivo_evento:
+        with open(arquivo_evento, 'a', encoding='utf-8') as f:
+            f.write(json.dumps({'evento': 'novo_mes', **evento}, ensure_ascii=False) + '\n')
+        print(f"📝 Evento gravado em {arquivo_evento}")
+    
+    if not comando:
+        monitor.registrar(verificacao.novas)
+        return SAIDA_NOVO_MES
+    
+    print(f"🚀 Executando: {' '.join(comando)}")
+    ambiente = dict(os.environ, FIPE_CODIGO_REFERENCIA=str(evento['codigo_referencia']), FIPE_MES=evento['mes'] or '')
+    inicio = time.time()
+    codigo = subprocess.run(comando, cwd=ROOT_DIR, env=ambiente).returncode
+    if codigo != 0:
+        print(f"❌ Comando terminou com código {codigo} após {formatar_tempo(time.time() - inicio)}; "
+              f"o mês continua pendente para a próxima verificação")
+        return SAIDA_ERRO
+    
+    monitor.registrar(verificacao.novas)
+    print(f"✅ Comando concluído em {formatar_tempo(time.time() - inicio)}")
+    return SAIDA_NOVO_MES
+
+
+def monitorar(args):
+    cache = FipeLocalCache()
+    monitor = MonitorReferencia(cache, args.intervalo)
+    if args.executar:
+        comando = comando_rotina_mensal()
+    else:
+        comando = shlex.split(args.comando) if args.comando else None
+    
+    forcar = args.forcar
+    while True:
+        verificacao = monitor.verificar(forcar=forcar)
+        forcar = False
+        
+        if verificacao.status == 'novo':
+            return tratar_novo_mes(monitor, verificacao, comando, args.evento)
+        
+        if verificacao.status == 'erro':
+            print("❌ Não foi possível consultar a tabela de referência")
+            if not args.continuo:
+                return SAIDA_ERRO
+            espera = monitor.intervalo
+        elif verificacao.status == 'adiado':
+            print(f"⏳ Última consulta há menos de {args.intervalo} min; próxima em {formatar_tempo(verificacao.espera)}")
+            if not args.continuo:
+                return SAIDA_SEM_NOVIDADE
+            espera = verificacao.espera
+        else:
+            print(f"✅ Sem mês novo (mais recente no cache: código {cache.get_codigo_referencia_mais_recente()})")
+            if not args.continuo:
+                return SAIDA_SEM_NOVIDADE
+            espera = monitor.intervalo
+        
+        time.sleep(espera)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Detecta mês novo na tabela de referência FIPE")
+    parser.add_argument('--intervalo', type=float, default=INTERVALO_MONITOR_REFERENCIA,
+                        help=f"Minutos mínimos entre consultas à API (padrão {INTERVALO_MONITOR_REFERENCIA})")
+    parser.add_argument('--continuo', action='store_true', help="Continua consultando até aparecer um mês novo")
+    parser.add_argument('--forcar', action='store_true', help="Consulta agora, ignorando o intervalo mínimo")
+    acao = parser.add_mutually_exclusive_group()
+    acao.add_argument('--executar', action='store_true', help="Com mês novo, roda executar_mes.py --sim")
+    acao.add_argument('--comando', help="Com mês novo, roda este comando (FIPE_CODIGO_REFERENCIA e FIPE_MES no ambiente)")
+    parser.add_argument('--evento', help="Arquivo onde acrescentar o evento de mês novo (uma linha JSON)")
+    args = parser.parse_args()
+    
+    try:
+        sys.exit(monitorar(args))
+    except KeyboardInterrupt:
+        print("\n⚠️  Monitor interrompido")
+        sys.exit(SAIDA_SEM_NOVIDADE)
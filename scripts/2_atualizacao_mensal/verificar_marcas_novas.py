@@ -36,7 +36,7 @@ def verificar_marcas_novas():
         print("📦 Buscando marcas do cache local...")
         marcas_cache = cache.get_all_marcas()
         total_cache = len(marcas_cache)
-        codigos_cache = {marca['codigo'] for marca in marcas_cache}
+        codigos_cache = {marca.codigo for marca in marcas_cache}
         print(f"✅ {total_cache} marcas encontradas no cache\n")
         
         # Identifica marcas novas
@@ -0,0 +1,112 @@
+"""
+Sincronização contínua do SQLite local para o Supabase, em paralelo com a coleta.
+
+Ativa o log de alterações do cache (triggers) e envia ao Supabase, em micro-lotes,
+tudo o que 2_atualizar_valores.py, popular_completo.py ou executar_mes.py gravarem
+enquanto este script estiver rodando: o Supabase fica segundos atrás do crawler,
+em vez de esperar o sincronizar_supabase.py no fim.
+
+Uso (em outro terminal, antes ou durante a coleta):
+    python scripts/3_sincronizacao/sincronizar_continuo.py
+    python scripts/3_sincronizacao/sincronizar_continuo.py --lote 1000 --atraso-maximo 10
+    python scripts/3_sincronizacao/sincronizar_continuo.py --ate-esvaziar
+    python scripts/3_sincronizacao/sincronizar_continuo.py --desativar
+
+Ctrl+C envia o que estiver pendente e desativa o log (--manter-log deixa os triggers
+ativos: o que for gravado até a próxima execução fica no log e é enviado por ela).
+O que foi gravado antes da primeira ativação e as remoções continuam no sincronizar_supabase.py.
+Os valores de cada micro-lote são validados antes do envio (mesmas regras do
+validar_valores.py); os retidos ficam na quarentena e voltam ao log quando liberados.
+"""
+import sys
+from pathlib import Path
+
+# Configurar encoding UTF-8 para o stdout (Windows)
+if sys.platform == 'win32':
+    import io
+    sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
+    sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding='utf-8')
+
+# Adiciona o diretório raiz ao path
+ROOT_DIR = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(ROOT_DIR))
+
+import argparse
+import threading
+import time
+from src.cache.fipe_local_cache import FipeLocalCache
+from src.config import LOTE_SINCRONIZACAO_CONTINUA, ATRASO_MAXIMO_SINCRONIZACAO, LIMITE_PENDENTES_SINCRONIZACAO
+from src.database.sincronizacao_continua import SincronizadorContinuo
+
+
+def main():
+    """Função principal"""
+    parser = argparse.ArgumentParser(description="Envia ao Supabase, em micro-lotes, o que a coleta grava no SQLite")
+    parser.add_argument('--lote', type=int, default=LOTE_SINCRONIZACAO_CONTINUA,
+                        help=f"Alterações por micro-lote (padrão: {LOTE_SINCRONIZACAO_CONTINUA})")
+    parser.add_argument('--atraso-maximo', type=float, default=ATRASO_MAXIMO_SINCRONIZACAO,
+                        help=f"Segundos até enviar um lote incompleto (padrão: {ATRASO_MAXIMO_SINCRONIZACAO})")
+    parser.add_argument('--ate-esvaziar', action='store_true', help="Envia o que estiver no log e encerra")
+    parser.add_argument('--manter-log', action='store_true', help="Não desativa o log de alterações ao encerrar")
+    parser.add_argument('--desativar', action='store_true', help="Só desativa o log de alterações e descarta o pendente")
+    args = parser.parse_args()
+    
+    cache = FipeLocalCache()
+    
+    if args.desativar:
+        pendentes, _ = cache.get_alteracoes_pendentes()
+        cache.desativar_log_alteracoes(limpar=True)
+        print(f"🛑 Log de alterações desativado ({pendentes} alterações descartadas)")
+        print("💡 Execute sincronizar_supabase.py para sincronizar o que ficou de fora")
+        return
+    
+    print("=" * 60)
+    print("🔄 SINCRONIZAÇÃO CONTÍNUA SQLite → Supabase")
+    print("=" * 60)
+    print(f"📦 Micro-lote: {args.lote} alterações | Atraso máximo: {args.atraso_maximo}s")
+    print(f"⏸️  Backpressure: coleta espera acima de {LIMITE_PENDENTES_SINCRONIZACAO} pendentes")
+    
+    if not args.ate_esvaziar and not cache.log_alteracoes_ativo():
+        cache.ativar_log_alteracoes()
+        print("✅ Log de alterações ativado (o que já estava no banco fica para o sincronizar_supabase.py)")
+    pendentes, _ = cache.get_alteracoes_pendentes()
+    print(f"📊 {pendentes} alterações pendentes")
+    if not args.ate_esvaziar:
+        print("👀 Aguardando gravações da coleta... (Ctrl+C para encerrar)")
+    print()
+    
+    sincronizador = SincronizadorContinuo(cache, lote=args.lote, atraso_maximo=args.atraso_maximo)
+    parar = threading.Event()
+    inicio = time.time()
+    
+    try:
+        try:
+            sincronizador.executar(parar, ate_esvaziar=args.ate_esvaziar)
+        except KeyboardInterrupt:
+            print("\n⚠️  Encerrando: enviando alterações pendentes...")
+            parar.set()
+            sincronizador.executar(parar)
+    finally:
+        if not args.manter_log and not args.ate_esvaziar:
+            cache.desativar_log_alteracoes()
+            print("🛑 Log de alterações desativado")
+        pendentes, _ = cache.get_alteracoes_pendentes()
+        cache.close()
+    
+    stats = sincronizador.stats
+    tempo = time.time() - inicio
+    print()
+    print("=" * 60)
+    print("📊 RESUMO DA SINCRONIZAÇÃO CONTÍNUA")
+    print("=" * 60)
+    print(f"   • Lotes enviados: {stats['lotes']}")
+    print(f"   • Alterações: {stats['alteracoes']} ({stats['registros']} registros)")
+    print(f"   • Maior atraso: {stats['maior_atraso']:.1f}s")
+    print(f"   • Retidos na validação: {stats['retidos']}")
+    print(f"   • Falhas de envio: {stats['falhas']}")
+    print(f"   • Pendentes no log: {pendentes}")
+    print(f"   • Tempo: {tempo:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
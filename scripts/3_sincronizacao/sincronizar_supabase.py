@@ -16,10 +16,11 @@ if sys.platform == 'win32':
 ROOT_DIR = Path(__file__).parent.parent.parent
 sys.path.insert(0, str(ROOT_DIR))
 
-import sqlite3
 import time
 from datetime import datetime
+from src.cache.fipe_local_cache import FipeLocalCache, anos_arquivados
 from src.database.supabase_client import get_supabase_client
+from src.registros import COLUNAS_VALORES_FIPE
 
 
 class SupabaseUploader:
@@ -28,12 +29,19 @@ class SupabaseUploader:
     Faz upload em lotes para melhor performance.
     """
     
-    def __init__(self, db_path='fipe_local.db', batch_size=1000):
-        self.db_path = db_path
+    def __init__(self, db_path='fipe_local.db', batch_size=1000, cache=None):
+        self.db_path = cache.db_path if cache is not None else db_path
         self.batch_size = batch_size
-        self.conn = sqlite3.connect(db_path)
-        self.conn.row_factory = sqlite3.Row
+        # Conexão do cache local: anexa os arquivos anuais (arquivar_ano), então as views
+        # de valores cobrem o histórico inteiro e a limpeza de órfãos não apaga anos arquivados.
+        # Um cache já aberto (executar_mes.py) é reaproveitado e não é fechado em close()
+        self.fechar_cache = cache is None
+        self.cache = FipeLocalCache(db_path) if cache is None else cache
+        self.conn = self.cache.conn
         self.supabase = get_supabase_client()
+        # Valores retidos pela validação (quarentena_valores) ficam fora do envio e,
+        # se já estavam no Supabase, saem na limpeza de órfãos
+        self.tabela_valores = 'valores_publicaveis'
         
     def _contar_registros_sqlite(self, tabela):
         """Conta registros em uma tabela SQLite"""
@@ -308,7 +316,7 @@ class SupabaseUploader:
         print("-" * 60)
         
         cursor = self.conn.cursor()
-        cursor.execute('SELECT COUNT(*) FROM valores_fipe')
+        cursor.execute(f'SELECT COUNT(*) FROM {self.tabela_valores}')
         total = cursor.fetchone()[0]
         
         if total == 0:
@@ -323,11 +331,8 @@ class SupabaseUploader:
         
         while offset < total:
             cursor.execute(f'''
-                SELECT codigo_marca, codigo_modelo, tipo_veiculo, ano_modelo, 
-                       codigo_combustivel, valor, valor_numerico, codigo_fipe, 
-                       mes_referencia, codigo_referencia, marca, modelo, 
-                       combustivel, data_consulta
-                FROM valores_fipe
+                SELECT {', '.join(COLUNAS_VALORES_FIPE)}
+                FROM {self.tabela_valores}
                 LIMIT {self.batch_size} OFFSET {offset}
             ''')
             rows = cursor.fetchall()
@@ -335,25 +340,8 @@ class SupabaseUploader:
             if not rows:
                 break
             
-            data = [
-                {
-                    'codigo_marca': row['codigo_marca'],
-                    'codigo_modelo': row['codigo_modelo'],
-                    'tipo_veiculo': row['tipo_veiculo'],
-                    'ano_modelo': row['ano_modelo'],
-                    'codigo_combustivel': row['codigo_combustivel'],
-                    'valor': row['valor'],
-                    'valor_numerico': row['valor_numerico'],
-                    'codigo_fipe': row['codigo_fipe'],
-                    'mes_referencia': row['mes_referencia'],
-                    'codigo_referencia': row['codigo_referencia'],
-                    'marca': row['marca'],
-                    'modelo': row['modelo'],
-                    'combustivel': row['combustivel'],
-                    'data_consulta': row['data_consulta']
-                }
-                for row in rows
-            ]
+            # Linhas na ordem de COLUNAS_VALORES_FIPE → dicts JSON sem montar chave por chave
+            data = [dict(zip(COLUNAS_VALORES_FIPE, row)) for row in rows]
             
             try:
                 # Upsert com PK composta
@@ -369,6 +357,35 @@ class SupabaseUploader:
         print(f"   ✅ {enviados} registros enviados")
         return enviados
     
+    def upload_valores_mes(self, mes, veiculo_ids=None):
+        """
+        Upload só dos valores de um mês, opcionalmente restrito a alguns veículos
+        (publicação de uma faixa de prioridade assim que concluída).
+        
+        Args:
+            mes: Mês de referência YYYYMM
+            veiculo_ids: ids em "veiculos" (FipeLocalCache.get_veiculo_ids); None = todos
+        
+        Returns:
+            int: Registros enviados
+        """
+        data = [
+            {coluna: row[coluna] for coluna in COLUNAS_VALORES_FIPE}
+            for row in self.cache.get_valores_publicaveis_mes(mes, veiculo_ids)
+        ]
+        
+        enviados = 0
+        for inicio in range(0, len(data), self.batch_size):
+            lote = data[inicio:inicio + self.batch_size]
+            try:
+                self.supabase.table('valores_fipe').upsert(lote, on_conflict='codigo_marca,codigo_modelo,tipo_veiculo,ano_modelo,codigo_combustivel,mes_referencia').execute()
+                enviados += len(lote)
+            except Exception as e:
+                print(f"   ❌ Erro no lote {inicio}-{inicio+len(lote)}: {e}")
+        
+        print(f"   📤 {enviados}/{len(data)} valores de {mes} enviados")
+        return enviados
+    
     def mostrar_estatisticas(self):
         """Mostra estatísticas comparativas SQLite vs Supabase"""
         print("\n" + "=" * 60)
@@ -385,7 +402,7 @@ class SupabaseUploader:
         ]
         
         for tabela in tabelas:
-            sqlite_count = self._contar_registros_sqlite(tabela)
+            sqlite_count = self._contar_registros_sqlite(self.tabela_valores if tabela == 'valores_fipe' else tabela)
             supabase_count = self._contar_registros_supabase(tabela)
             
             status = "✅" if sqlite_count == supabase_count else "⚠️"
@@ -399,10 +416,10 @@ class SupabaseUploader:
         try:
             # Busca todas as PKs do SQLite
             cursor = self.conn.cursor()
-            cursor.execute('''
+            cursor.execute(f'''
                 SELECT codigo_marca, codigo_modelo, tipo_veiculo, ano_modelo, 
                        codigo_combustivel, mes_referencia
-                FROM valores_fipe
+                FROM {self.tabela_valores}
             ''')
             sqlite_keys = {
                 (row['codigo_marca'], row['codigo_modelo'], row['tipo_veiculo'], 
@@ -438,8 +455,13 @@ class SupabaseUploader:
             }
             print(f"   📊 {len(supabase_keys)} registros no Supabase")
             
-            # Registros que existem no Supabase mas não no SQLite
-            para_deletar = supabase_keys - sqlite_keys
+            # Registros que existem no Supabase mas não no SQLite; anos com arquivo em
+            # disco que não coube nos anexos (MAX_ARQUIVOS_ANEXADOS) não são tocados
+            nao_anexados = {str(ano) for ano in set(anos_arquivados(self.db_path)) - set(self.cache.anos_arquivados)}
+            para_deletar = {
+                chave for chave in supabase_keys - sqlite_keys
+                if str(chave[5])[:4] not in nao_anexados
+            }
             
             if not para_deletar:
                 print("   ✅ Nenhum registro órfão encontrado")
@@ -622,7 +644,12 @@ class SupabaseUploader:
             return 0
     
     def upload_completo(self):
-        """Executa sincronização completa: upload + limpeza"""
+        """
+        Executa sincronização completa: upload + limpeza
+        
+        Returns:
+            dict: {'enviados': {tabela: registros}, 'deletados': {tabela: registros}}
+        """
         print("=" * 60)
         print("🔄 SINCRONIZAÇÃO SQLite ↔ Supabase")
         print("=" * 60)
@@ -676,10 +703,12 @@ class SupabaseUploader:
         print(f"Tempo total: {tempo_total:.1f}s ({tempo_total/60:.1f} minutos)")
         print()
         print("✅ Sincronização concluída!")
+        return {'enviados': stats, 'deletados': deletados}
     
     def close(self):
         """Fecha conexão SQLite"""
-        self.conn.close()
+        if self.fechar_cache:
+            self.cache.close()
 
 
 def main():
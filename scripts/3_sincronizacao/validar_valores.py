@@ -0,0 +1,94 @@
+"""
+Valida os valores de um mês antes da sincronização (NumPy) e gerencia a quarentena.
+
+Valores vazios/zerados, saltos mês a mês fora da curva (z-score robusto) e veículos
+com codigo_fipe/nome alterado ficam em quarentena_valores: o sincronizar_supabase.py
+e o sincronizador contínuo não os enviam (e a limpeza de órfãos os tira do Supabase)
+até serem liberados aqui. O executar_mes.py roda a validação na etapa "validacao".
+
+Uso:
+    python scripts/3_sincronizacao/validar_valores.py                       # mês mais recente
+    python scripts/3_sincronizacao/validar_valores.py --mes 202601 --listar
+    python scripts/3_sincronizacao/validar_valores.py --mes 202601 --liberar 1234,5678
+    python scripts/3_sincronizacao/validar_valores.py --mes 202601 --liberar todos
+"""
+import sys
+from pathlib import Path
+
+# Configurar encoding UTF-8 para o stdout (Windows)
+if sys.platform == 'win32':
+    import io
+    sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
+    sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding='utf-8')
+
+# Adiciona o diretório raiz ao path
+ROOT_DIR = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(ROOT_DIR))
+
+import argparse
+from src.analise import validar_mes
+from src.cache.fipe_local_cache import FipeLocalCache
+from src.config import LIMITE_Z_ROBUSTO, VARIACAO_MINIMA_QUARENTENA, yyyymm_para_mes_display
+
+
+def imprimir_quarentena(cache, mes, limite=50):
+    """Valores retidos do mês, ordenados por motivo"""
+    linhas = cache.get_quarentena_valores(mes)
+    print()
+    print(f"🔒 {len({linha['veiculo_id'] for linha in linhas})} veículos em quarentena em "
+          f"{yyyymm_para_mes_display(str(mes))}")
+    for linha in linhas[:limite]:
+        print(f"   [{linha['motivo']:14s}] #{linha['veiculo_id']} {linha['codigo_fipe']} {linha['marca']} "
+              f"{linha['modelo']} {linha['ano_modelo']}: {linha['detalhe']}")
+    if len(linhas) > limite:
+        print(f"   ... e mais {len(linhas) - limite}")
+
+
+def main():
+    """Função principal"""
+    parser = argparse.ArgumentParser(description="Valida os valores do mês e gerencia a quarentena")
+    parser.add_argument('--banco', default='fipe_local.db', help="Banco SQLite local (padrão: fipe_local.db)")
+    parser.add_argument('--mes', type=int, help="Mês YYYYMM (padrão: mais recente)")
+    parser.add_argument('--anterior', type=int, help="Mês de comparação dos saltos (padrão: mês anterior com valores)")
+    parser.add_argument('--limite-z', type=float, default=LIMITE_Z_ROBUSTO,
+                        help=f"z-score robusto mínimo de um salto (padrão: {LIMITE_Z_ROBUSTO})")
+    parser.add_argument('--variacao-minima', type=float, default=VARIACAO_MINIMA_QUARENTENA,
+                        help=f"Variação %% mínima de um salto (padrão: {VARIACAO_MINIMA_QUARENTENA})")
+    parser.add_argument('--listar', action='store_true', help="Lista os valores retidos do mês")
+    parser.add_argument('--liberar', help="veiculo_ids separados por vírgula, ou 'todos' (não revalida)")
+    args = parser.parse_args()
+    
+    cache = FipeLocalCache(args.banco)
+    try:
+        print("=" * 60)
+        print("🛡️  VALIDAÇÃO DOS VALORES")
+        print("=" * 60)
+        
+        if args.liberar:
+            mes = args.mes or cache.conn.execute('SELECT MAX(mes) FROM main.valores').fetchone()[0]
+            ids = None if args.liberar == 'todos' else [int(i) for i in args.liberar.split(',') if i.strip()]
+            liberados = cache.liberar_quarentena_valores(mes, ids)
+            print(f"🔓 {liberados} veículos liberados em {yyyymm_para_mes_display(str(mes))}")
+            print("   Envie com: python scripts/3_sincronizacao/sincronizar_supabase.py")
+            if args.listar:
+                imprimir_quarentena(cache, mes)
+            return 0
+        
+        stats = validar_mes(cache, args.mes, args.anterior, args.limite_z, args.variacao_minima)
+        print(f"📅 {yyyymm_para_mes_display(str(stats['mes']))}"
+              f" (saltos contra {stats['mes_anterior'] or 'nenhum mês anterior'})")
+        print(f"✅ {stats['verificados']} valores verificados em {stats['tempo']:.2f}s")
+        print(f"   • Valores vazios ou zerados: {stats['valor_invalido']}")
+        print(f"   • Saltos fora da curva:      {stats['salto']}")
+        print(f"   • codigo_fipe/nome alterado: {stats['deriva']}")
+        print(f"🔒 {stats['retidos']} em quarentena | 📤 {stats['liberados']} liberados para sincronização")
+        
+        if args.listar:
+            imprimir_quarentena(cache, stats['mes'])
+    finally:
+        cache.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,92 @@
+"""
+Exporta os preços de um mês do cache local para o snapshot binário (mmap).
+
+O arquivo gerado é imutável e substituído atomicamente: workers abrem com
+SnapshotPrecos (src/consulta/snapshot.py) e compartilham as mesmas páginas em
+memória, com busca binária de microssegundos, sem abrir o SQLite.
+
+Uso:
+    python scripts/4_consulta/exportar_snapshot.py
+    python scripts/4_consulta/exportar_snapshot.py --mes 202601 --saida /dados/fipe_202601.snapshot
+    python scripts/4_consulta/exportar_snapshot.py --verificar
+
+Execute depois da atualização mensal (executar_mes.py) para publicar o mês novo.
+"""
+import sys
+from pathlib import Path
+
+# Configurar encoding UTF-8 para o stdout (Windows)
+if sys.platform == 'win32':
+    import io
+    sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
+    sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding='utf-8')
+
+# Adiciona o diretório raiz ao path
+ROOT_DIR = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(ROOT_DIR))
+
+import argparse
+import random
+import time
+from src.config import ARQUIVO_SNAPSHOT_PRECOS, yyyymm_para_mes_display
+from src.consulta.snapshot import SnapshotPrecos, exportar_snapshot
+
+
+def verificar(caminho, amostras=100000):
+    """Abre o snapshot e mede buscas de chaves existentes (amostra aleatória)"""
+    with SnapshotPrecos(caminho) as snapshot:
+        if not len(snapshot):
+            print("   ⚠️ Snapshot vazio")
+            return
+        chaves = [snapshot.chave(random.randrange(len(snapshot))) for _ in range(min(amostras, 1000))]
+        
+        inicio = time.perf_counter()
+        for i in range(amostras):
+            if snapshot.buscar_centavos(*chaves[i % len(chaves)]) is None:
+                raise RuntimeError(f"Chave não encontrada no snapshot: {chaves[i % len(chaves)]}")
+        tempo = time.perf_counter() - inicio
+        
+        exemplo = snapshot.buscar(*chaves[0])
+        print(f"   🔍 {amostras} buscas: {tempo / amostras * 1e6:.1f} µs por busca")
+        print(f"   📄 Exemplo: {exemplo['codigo_fipe']} {exemplo['marca']} {exemplo['modelo']} "
+              f"{exemplo['ano_modelo']} → {exemplo['valor']}")
+
+
+def main():
+    """Função principal"""
+    parser = argparse.ArgumentParser(description="Exporta os preços de um mês para o snapshot binário (mmap)")
+    parser.add_argument('--banco', default='fipe_local.db', help="Banco SQLite local (padrão: fipe_local.db)")
+    parser.add_argument('--mes', type=int, help="Mês YYYYMM (padrão: mais recente no cache)")
+    parser.add_argument('--saida', default=ARQUIVO_SNAPSHOT_PRECOS, help=f"Arquivo de saída (padrão: {ARQUIVO_SNAPSHOT_PRECOS})")
+    parser.add_argument('--verificar', action='store_true', help="Reabre o snapshot e mede o tempo de busca")
+    args = parser.parse_args()
+    
+    if not Path(args.banco).exists():
+        print(f"❌ Banco local não encontrado: {args.banco}")
+        sys.exit(1)
+    
+    print("=" * 60)
+    print("📦 SNAPSHOT BINÁRIO DE PREÇOS")
+    print("=" * 60)
+    
+    inicio = time.time()
+    try:
+        stats = exportar_snapshot(args.banco, args.saida, args.mes)
+    except ValueError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+    
+    print(f"📅 Mês: {yyyymm_para_mes_display(str(stats['mes']))}")
+    print(f"✅ {stats['registros']} preços, {stats['strings']} nomes, {stats['bytes'] / 1024 / 1024:.1f} MB "
+          f"em {time.time() - inicio:.1f}s")
+    if stats['ignorados']:
+        print(f"⚠️ {stats['ignorados']} valores ignorados (código FIPE fora do formato NNNNNN-N)")
+    print(f"💾 {args.saida}")
+    
+    if args.verificar:
+        print()
+        verificar(args.saida)
+
+
+if __name__ == "__main__":
+    main()
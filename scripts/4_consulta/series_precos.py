@@ -0,0 +1,91 @@
+"""
+Atualiza e consulta as séries de preço por veículo (blocos delta-codificados).
+
+Cada veículo tem a série inteira (todos os meses, inclusive os anos arquivados)
+num único bloco comprimido em series_valores: o histórico de 36 meses é uma
+leitura de linha, não 36. Gravações em valores marcam o mês e este script (ou a
+etapa "series" do executar_mes.py) incorpora só os meses marcados.
+
+Uso:
+    python scripts/4_consulta/series_precos.py
+    python scripts/4_consulta/series_precos.py --reconstruir
+    python scripts/4_consulta/series_precos.py --veiculo 1234 --de 202301 --ate 202512
+    python scripts/4_consulta/series_precos.py --medir
+"""
+import sys
+from pathlib import Path
+
+# Configurar encoding UTF-8 para o stdout (Windows)
+if sys.platform == 'win32':
+    import io
+    sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
+    sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding='utf-8')
+
+# Adiciona o diretório raiz ao path
+ROOT_DIR = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(ROOT_DIR))
+
+import argparse
+import time
+from src.cache.fipe_local_cache import FipeLocalCache
+from src.config import yyyymm_para_mes_display
+from src.normalizacao import centavos_para_texto
+
+
+def imprimir_tamanho(cache):
+    """Séries, pontos e bytes por ponto"""
+    series, pontos, tamanho = cache.conn.execute(
+        'SELECT COUNT(*), COALESCE(SUM(pontos), 0), COALESCE(SUM(length(dados)), 0) FROM series_valores'
+    ).fetchone()
+    print(f"📊 {series} séries, {pontos} pontos, {tamanho / 1024 / 1024:.1f} MB"
+          f" ({tamanho / max(pontos, 1):.1f} bytes por ponto)")
+
+
+def main():
+    """Função principal"""
+    parser = argparse.ArgumentParser(description="Atualiza e consulta as séries de preço por veículo")
+    parser.add_argument('--banco', default='fipe_local.db', help="Banco SQLite local (padrão: fipe_local.db)")
+    parser.add_argument('--reconstruir', action='store_true', help="Regrava todas as séries a partir dos valores")
+    parser.add_argument('--veiculo', type=int, help="Mostra a série de um veiculo_id")
+    parser.add_argument('--de', type=int, help="Primeiro mês YYYYMM da série mostrada")
+    parser.add_argument('--ate', type=int, help="Último mês YYYYMM da série mostrada")
+    parser.add_argument('--medir', action='store_true', help="Mede a leitura da frota inteira (matriz veículo × mês)")
+    args = parser.parse_args()
+    
+    cache = FipeLocalCache(args.banco)
+    try:
+        print("=" * 60)
+        print("📈 SÉRIES DE PREÇO POR VEÍCULO")
+        print("=" * 60)
+        
+        pendentes = cache.get_meses_series_pendentes()
+        if pendentes and not args.reconstruir:
+            print(f"🗓️  Meses alterados: {', '.join(str(mes) for mes in pendentes)}")
+        inicio = time.time()
+        stats = cache.atualizar_series(reconstruir=args.reconstruir)
+        if stats['meses']:
+            print(f"✅ {stats['veiculos']} séries gravadas, {stats['removidas']} removidas "
+                  f"({len(stats['meses'])} meses) em {time.time() - inicio:.1f}s")
+        else:
+            print("✅ Séries em dia com os valores")
+        imprimir_tamanho(cache)
+        
+        if args.veiculo is not None:
+            meses, centavos = cache.historico(args.veiculo, args.de, args.ate)
+            print()
+            print(f"🚗 Veículo {args.veiculo}: {len(meses)} meses")
+            for mes, valor in zip(meses, centavos):
+                print(f"   {yyyymm_para_mes_display(str(mes)):>15s}  {centavos_para_texto(valor)}")
+        
+        if args.medir:
+            inicio = time.time()
+            ids, meses, valores = cache.matriz_historico(args.de, args.ate)
+            tempo = time.time() - inicio
+            print()
+            print(f"⏱️  Frota inteira: {len(ids)} veículos × {len(meses)} meses em {tempo:.2f}s")
+    finally:
+        cache.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Servidor local de consulta de preços sobre o fipe_local.db (somente leitura).
+
+Aplicações consultam preços por HTTP direto do cache local, sem Supabase nem API
+FIPE: pool de conexões somente leitura, consultas pelos índices do banco e LRU em
+memória das chaves mais consultadas (src/consulta/).
+
+Uso:
+    python scripts/4_consulta/servidor_consulta.py
+    python scripts/4_consulta/servidor_consulta.py --porta 9000 --conexoes 16
+
+Exemplos:
+    curl "http://127.0.0.1:8765/valor?codigo_fipe=001004-9"
+    curl "http://127.0.0.1:8765/valor?tipo_veiculo=1&codigo_marca=59&codigo_modelo=5940&ano_modelo=2024&codigo_combustivel=1&mes=202601"
+    curl -X POST http://127.0.0.1:8765/lote -d '{"itens": [{"codigo_fipe": "001004-9"}]}'
+    curl http://127.0.0.1:8765/metricas
+"""
+import sys
+from pathlib import Path
+
+# Configurar encoding UTF-8 para o stdout (Windows)
+if sys.platform == 'win32':
+    import io
+    sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
+    sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding='utf-8')
+
+# Adiciona o diretório raiz ao path
+ROOT_DIR = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(ROOT_DIR))
+
+import argparse
+from src.config import HOST_CONSULTA, PORTA_CONSULTA, CONEXOES_CONSULTA, TAMANHO_CACHE_CONSULTA
+from src.consulta import ConsultaPrecos, criar_servidor
+
+
+def main():
+    """Função principal"""
+    parser = argparse.ArgumentParser(description="Servidor HTTP de consulta de preços sobre o cache local")
+    parser.add_argument('--banco', default='fipe_local.db', help="Banco SQLite local (padrão: fipe_local.db)")
+    parser.add_argument('--host', default=HOST_CONSULTA, help=f"Interface (padrão: {HOST_CONSULTA})")
+    parser.add_argument('--porta', type=int, default=PORTA_CONSULTA, help=f"Porta (padrão: {PORTA_CONSULTA})")
+    parser.add_argument('--conexoes', type=int, default=CONEXOES_CONSULTA,
+                        help=f"Conexões somente leitura no pool (padrão: {CONEXOES_CONSULTA})")
+    parser.add_argument('--cache', type=int, default=TAMANHO_CACHE_CONSULTA,
+                        help=f"Chaves no LRU em memória, 0 desativa (padrão: {TAMANHO_CACHE_CONSULTA})")
+    args = parser.parse_args()
+    
+    try:
+        consulta = ConsultaPrecos(args.banco, conexoes=args.conexoes, tamanho_cache=args.cache)
+    except FileNotFoundError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+    
+    servidor = criar_servidor(consulta, args.host, args.porta)
+    host, porta = servidor.server_address[:2]
+    
+    print("=" * 60)
+    print("🔎 SERVIDOR DE CONSULTA DE PREÇOS")
+    print("=" * 60)
+    print(f"📂 Banco local: {args.banco} (somente leitura)")
+    print(f"🔌 {args.conexoes} conexões | 🧠 LRU de {args.cache} chaves")
+    print(f"🌐 http://{host}:{porta}  (/valor, /historico, /lote, /metricas)")
+    print("   Ctrl+C para encerrar")
+    
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        print("\n🛑 Encerrando...")
+    finally:
+        servidor.server_close()
+        consulta.close()
+
+
+if __name__ == "__main__":
+    main()
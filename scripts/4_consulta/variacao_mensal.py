@@ -0,0 +1,111 @@
+"""
+Relatório de variação mensal de preços (NumPy).
+
+Carrega os meses pedidos do cache local numa matriz veículo × mês e calcula,
+para cada par de meses consecutivos, variações percentuais, agregados por tipo,
+marca, ano modelo e combustível, distribuição e maiores altas/quedas. Os
+resultados ficam nas tabelas variacao_mensal e variacao_destaques.
+
+Uso:
+    python scripts/4_consulta/variacao_mensal.py                    # dois meses mais recentes
+    python scripts/4_consulta/variacao_mensal.py --ultimos 13       # 12 pares (último ano)
+    python scripts/4_consulta/variacao_mensal.py --meses 202501,202601 --destaques 50
+"""
+import sys
+from pathlib import Path
+
+# Configurar encoding UTF-8 para o stdout (Windows)
+if sys.platform == 'win32':
+    import io
+    sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
+    sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding='utf-8')
+
+# Adiciona o diretório raiz ao path
+ROOT_DIR = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(ROOT_DIR))
+
+import argparse
+import time
+from src.analise import analisar_meses
+from src.cache.fipe_local_cache import FipeLocalCache
+from src.config import yyyymm_para_mes_display
+from src.normalizacao import centavos_para_texto
+
+
+TIPOS_VEICULO = {1: 'Carros', 2: 'Motos', 3: 'Caminhões'}
+
+
+def imprimir_relatorio(cache, mes_anterior, mes, marcas=10):
+    """Resumo gravado de um par de meses: total, tipos, maiores marcas e destaques"""
+    linhas = cache.get_variacao_mensal(mes, mes_anterior)
+    if not linhas:
+        print(f"⚠️  Sem relatório gravado para {mes_anterior} → {mes}")
+        return
+    
+    total = next(linha for linha in linhas if linha['grupo'] == 'total')
+    print()
+    print(f"📅 {yyyymm_para_mes_display(str(mes_anterior))} → {yyyymm_para_mes_display(str(mes))}")
+    print(f"   • {total['veiculos']} veículos: {total['subiram']} subiram, {total['cairam']} caíram")
+    print(f"   • Média {total['variacao_media']:+.2f}% | mediana {total['variacao_mediana']:+.2f}% | "
+          f"ponderada {total['variacao_ponderada']:+.2f}% | desvio {total['desvio_padrao']:.2f}")
+    print(f"   • Distribuição: p5 {total['p05']:+.2f}% | p25 {total['p25']:+.2f}% | "
+          f"p75 {total['p75']:+.2f}% | p95 {total['p95']:+.2f}%")
+    
+    print("   Por tipo:")
+    for linha in (linha for linha in linhas if linha['grupo'] == 'tipo_veiculo'):
+        nome = TIPOS_VEICULO.get(int(linha['chave']), linha['chave'])
+        print(f"      {str(nome):12s} {linha['veiculos']:7d} veículos  mediana {linha['variacao_mediana']:+.2f}%")
+    
+    print("   Maiores marcas (por veículos):")
+    for linha in [linha for linha in linhas if linha['grupo'] == 'marca'][:marcas]:
+        print(f"      {str(linha['nome'] or linha['chave'])[:25]:25s} {linha['veiculos']:6d} veículos  "
+              f"mediana {linha['variacao_mediana']:+.2f}%  ponderada {linha['variacao_ponderada']:+.2f}%")
+    
+    destaques = cache.get_destaques_variacao(mes, mes_anterior)
+    for direcao, titulo in (('alta', '📈 Maiores altas'), ('queda', '📉 Maiores quedas')):
+        print(f"   {titulo}:")
+        for linha in [linha for linha in destaques if linha['direcao'] == direcao][:5]:
+            print(f"      {linha['variacao']:+7.2f}%  {linha['codigo_fipe']} {linha['marca']} {linha['modelo']} "
+                  f"{linha['ano_modelo']}: {centavos_para_texto(linha['valor_anterior'])} → "
+                  f"{centavos_para_texto(linha['valor_atual'])}")
+
+
+def main():
+    """Função principal"""
+    parser = argparse.ArgumentParser(description="Relatório de variação mensal de preços (NumPy)")
+    parser.add_argument('--banco', default='fipe_local.db', help="Banco SQLite local (padrão: fipe_local.db)")
+    parser.add_argument('--meses', help="Meses YYYYMM separados por vírgula (ex: 202512,202601)")
+    parser.add_argument('--ultimos', type=int, default=2, help="Quantidade de meses mais recentes (padrão: 2)")
+    parser.add_argument('--destaques', type=int, default=20, help="Maiores altas e quedas guardadas por par (padrão: 20)")
+    args = parser.parse_args()
+    
+    cache = FipeLocalCache(args.banco)
+    try:
+        if args.meses:
+            meses = [int(mes) for mes in args.meses.split(',') if mes.strip()]
+        else:
+            meses = [row[0] for row in cache.conn.execute(
+                'SELECT DISTINCT mes FROM valores_historico ORDER BY mes DESC LIMIT ?', (max(args.ultimos, 2),)
+            )]
+        if len(set(meses)) < 2:
+            print("❌ São necessários pelo menos 2 meses com valores")
+            return 1
+        
+        print("=" * 60)
+        print("📊 VARIAÇÃO MENSAL DE PREÇOS")
+        print("=" * 60)
+        
+        inicio = time.time()
+        resultados = analisar_meses(cache, meses, destaques=args.destaques)
+        print(f"✅ {len(resultados)} pares de meses analisados em {time.time() - inicio:.2f}s "
+              f"(gravados em variacao_mensal/variacao_destaques)")
+        
+        for resultado in resultados:
+            imprimir_relatorio(cache, resultado['mes_anterior'], resultado['mes'])
+    finally:
+        cache.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,79 @@
+"""
+Script de manutenção: arquiva anos antigos de valores em arquivos anuais.
+
+Cada ano arquivado vai para "fipe_local_valores_<ano>.db" (ao lado do banco
+principal). O FipeLocalCache anexa esses arquivos somente leitura e a view
+valores_fipe continua mostrando o histórico completo, enquanto índices, VACUUM
+e gravações do mês corrente só pagam pelo que ficou no banco principal.
+
+Arquivos podem ser copiados/enviados sozinhos ou apagados para descartar o ano.
+
+Uso:
+    python scripts/migracoes/arquivar_valores.py
+"""
+import sys
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(ROOT_DIR))
+
+from src.cache.fipe_local_cache import FipeLocalCache
+
+
+def arquivar_valores(db_path='fipe_local.db'):
+    """Lista os anos do banco principal e arquiva os escolhidos"""
+    print("=" * 70)
+    print("ARQUIVAMENTO: valores antigos → arquivos anuais")
+    print("=" * 70)
+    print()
+    
+    cache = FipeLocalCache(db_path)
+    
+    try:
+        anos = cache.conn.execute('''
+            SELECT mes / 100 AS ano, COUNT(*) AS total
+            FROM main.valores
+            GROUP BY ano
+            ORDER BY ano
+        ''').fetchall()
+        
+        if cache.anos_arquivados:
+            print(f"📦 Já arquivados: {', '.join(str(a) for a in sorted(cache.anos_arquivados))}")
+        
+        if len(anos) < 2:
+            print("✅ Nada a arquivar (o banco principal tem no máximo um ano).")
+            return
+        
+        print("📊 Valores no banco principal por ano:")
+        for ano, total in anos:
+            print(f"   {ano}: {total:,} valores")
+        print()
+        
+        # O ano do mês mais recente fica sempre no banco principal
+        ultimo_arquivavel = anos[-1][0] - 1
+        resposta = input(f"Arquivar anos até (Enter = {ultimo_arquivavel}): ").strip()
+        ate_ano = int(resposta) if resposta else ultimo_arquivavel
+        ate_ano = min(ate_ano, ultimo_arquivavel)
+        
+        print()
+        total_movidos = 0
+        for ano, _ in anos:
+            if ano <= ate_ano:
+                total_movidos += cache.arquivar_ano(ano)
+        
+        if total_movidos:
+            print("\n🧹 Executando VACUUM no banco principal...")
+            cache.conn.execute('VACUUM main')
+        
+        print()
+        print("=" * 70)
+        print(f"✅ {total_movidos:,} valores arquivados")
+        print(f"📦 Arquivos anexados: {', '.join(str(a) for a in sorted(cache.anos_arquivados))}")
+        print("=" * 70)
+    
+    finally:
+        cache.close()
+
+
+if __name__ == "__main__":
+    arquivar_valores()
@@ -53,6 +53,13 @@ def migrar_mes_referencia():
     conn = cache.conn
     cursor = conn.cursor()
     
+    # Bancos no formato compacto (valores + view valores_fipe) já guardam o mês como inteiro YYYYMM
+    cursor.execute("SELECT type FROM sqlite_master WHERE name = 'valores_fipe'")
+    if cursor.fetchone()[0] == 'view':
+        print("✅ Banco já está no formato compacto (mês como inteiro YYYYMM). Nada a fazer.")
+        print("💡 Veja scripts/migracoes/migrar_valores_compactos.py")
+        return
+    
     try:
         # 1. Análise pré-migração
         print("📊 ANÁLISE PRÉ-MIGRAÇÃO")
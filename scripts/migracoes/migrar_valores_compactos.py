@@ -0,0 +1,120 @@
+"""
+Script de migração: converte valores_fipe para o formato compacto no SQLite local.
+
+Antes:
+- valores_fipe com valor (VARCHAR), valor_numerico (REAL), mes_referencia (VARCHAR)
+  e marca/modelo/combustivel repetidos em toda linha
+
+Depois:
+- veiculos: um id inteiro por veículo (tipo, marca, modelo, ano, combustível),
+  com os textos (código FIPE, marca, modelo, combustível) uma vez só
+- valores: (veiculo_id, mes) com centavos inteiros e mês inteiro YYYYMM
+- valores_fipe: VIEW de compatibilidade com as colunas antigas
+
+A migração é feita em lotes (transações curtas), então o banco continua
+utilizável por outros scripts durante a conversão. O FipeLocalCache também
+executa essa migração automaticamente ao abrir um banco antigo; este script
+existe para fazê-la de forma controlada, com backup e VACUUM.
+
+IMPORTANTE:
+- Faça backup do banco antes de executar! (criado automaticamente)
+"""
+import sys
+import os
+import shutil
+import sqlite3
+from pathlib import Path
+from datetime import datetime
+
+ROOT_DIR = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(ROOT_DIR))
+
+from src.cache.fipe_local_cache import FipeLocalCache
+
+
+def fazer_backup(db_path='fipe_local.db'):
+    """Cria backup do banco antes da migração"""
+    backup_path = f"{db_path}.backup_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+    shutil.copy2(db_path, backup_path)
+    return backup_path
+
+
+def tamanho_mb(db_path):
+    """Tamanho do arquivo em MB"""
+    return os.path.getsize(db_path) / (1024 * 1024)
+
+
+def migrar_valores_compactos(db_path='fipe_local.db', vacuum=True):
+    """
+    Converte valores_fipe para o formato compacto e mostra o ganho de espaço.
+    
+    Args:
+        db_path: Caminho do banco SQLite
+        vacuum: Se True, executa VACUUM ao final para devolver o espaço ao disco
+    """
+    print("=" * 70)
+    print("MIGRAÇÃO: valores_fipe → formato compacto (centavos + YYYYMM)")
+    print("=" * 70)
+    print()
+    
+    if not Path(db_path).exists():
+        print(f"❌ Banco não encontrado: {db_path}")
+        return
+    
+    # Verifica se ainda está no formato antigo (sem abrir pelo FipeLocalCache)
+    conn = sqlite3.connect(db_path)
+    row = conn.execute("SELECT type FROM sqlite_master WHERE name = 'valores_fipe'").fetchone()
+    conn.close()
+    
+    if not row or row[0] != 'table':
+        print("✅ Banco já está no formato compacto. Nada a fazer.")
+        return
+    
+    tamanho_antes = tamanho_mb(db_path)
+    
+    print("📦 Criando backup do banco...")
+    backup_path = fazer_backup(db_path)
+    print(f"✅ Backup criado: {backup_path}")
+    print()
+    
+    # Abrir o cache executa a migração em lotes
+    cache = FipeLocalCache(db_path)
+    
+    try:
+        total = cache.conn.execute('SELECT COUNT(*) FROM valores').fetchone()[0]
+        veiculos = cache.conn.execute('SELECT COUNT(*) FROM veiculos').fetchone()[0]
+        meses = cache.conn.execute('SELECT COUNT(DISTINCT mes) FROM valores').fetchone()[0]
+        
+        if vacuum:
+            print("\n🧹 Executando VACUUM...")
+            cache.conn.execute('VACUUM')
+        
+        tamanho_depois = tamanho_mb(db_path)
+        
+        print()
+        print("=" * 70)
+        print("✅ MIGRAÇÃO CONCLUÍDA!")
+        print("=" * 70)
+        print(f"📊 Valores: {total} | Veículos: {veiculos} | Meses: {meses}")
+        print(f"💾 Tamanho: {tamanho_antes:.1f} MB → {tamanho_depois:.1f} MB")
+        print(f"📦 Backup: {backup_path}")
+        print()
+        print("💡 Leitores antigos continuam funcionando via VIEW valores_fipe.")
+        print()
+    finally:
+        cache.close()
+
+
+if __name__ == "__main__":
+    print()
+    print("⚠️  ATENÇÃO: Esta migração irá reestruturar a tabela valores_fipe!")
+    print("⚠️  Um backup automático será criado antes da migração.")
+    print()
+    
+    resposta = input("Deseja continuar? (s/n): ")
+    
+    if resposta.lower() in ['s', 'sim', 'y', 'yes']:
+        print()
+        migrar_valores_compactos()
+    else:
+        print("\n❌ Migração cancelada.")
@@ -0,0 +1,10 @@
+"""
+Módulo de análises de preços sobre o cache local (NumPy)
+"""
+from .variacao import analisar_meses, carregar_precos, calcular_variacao, agregar, maiores_variacoes
+from .qualidade import validar_mes, validar_lote_alteracoes, z_robusto
+
+__all__ = [
+    'analisar_meses', 'carregar_precos', 'calcular_variacao', 'agregar', 'maiores_variacoes',
+    'validar_mes', 'validar_lote_alteracoes', 'z_robusto'
+]
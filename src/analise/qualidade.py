@@ -0,0 +1,222 @@
+"""
+Validação dos valores de um mês antes da sincronização, vetorizada com NumPy.
+
+O mês inteiro é carregado em vetores alinhados por veiculo_id, junto com o preço
+do mês anterior, e cada regra é uma máscara booleana sobre esses vetores:
+
+- valor_invalido: valor vazio, zero ou negativo (falha de leitura na API);
+- salto: variação mês a mês fora da curva do tipo de veículo, pelo z-score robusto
+  do log da razão entre os preços (mediana e MAD por grupo, sem laço por veículo),
+  acima de LIMITE_Z_ROBUSTO e de VARIACAO_MINIMA_QUARENTENA;
+- deriva: codigo_fipe ou nomes do veículo mudaram desde a última publicação
+  (tabela veiculos_alterados, preenchida por trigger em veiculos).
+
+Os valores marcados ficam em quarentena_valores e saem da view valores_publicaveis
+(lida pela sincronização) até serem liberados; o resto do mês segue normalmente.
+A sincronização contínua valida os veículos de cada micro-lote antes de enviá-lo
+(validar_lote_alteracoes), comparando-os com a mediana/MAD do mês inteiro já gravado.
+"""
+import time
+
+import numpy as np
+
+from ..cache.fipe_local_cache import SEM_VALOR
+from ..config import LIMITE_Z_ROBUSTO, VARIACAO_MINIMA_QUARENTENA
+from ..normalizacao import centavos_para_texto
+from .variacao import _tuplas
+
+
+# MAD mínimo do log da razão (~0,2%): meses sem mudança nenhuma não transformam
+# qualquer ajuste em z-score infinito
+MAD_MINIMO = 0.002
+
+# Converte o MAD em desvio padrão equivalente (distribuição normal)
+FATOR_MAD = 0.6745
+
+# Campos comparados na deriva (veiculos_alterados → veiculos)
+CAMPOS_DERIVA = ('codigo_fipe', 'marca', 'modelo', 'combustivel')
+
+
+def carregar_mes(cache, mes, mes_anterior):
+    """
+    Valores do mês (inclusive vazios) e do mês anterior, alinhados por veículo.
+    
+    Returns:
+        tuple: (veiculo_ids, tipo_veiculo, centavos, anterior) em arrays int64;
+               centavos = SEM_VALOR para valor vazio, anterior = SEM_VALOR sem preço no mês anterior
+    """
+    atual = np.fromiter(
+        _tuplas(cache, f'''
+            SELECT v.veiculo_id, d.tipo_veiculo, COALESCE(v.valor_centavos, {SEM_VALOR})
+            FROM valores_historico v
+            JOIN main.veiculos d ON d.id = v.veiculo_id
+            WHERE v.mes = ?
+        ''', (int(mes),)),
+        dtype=[('veiculo_id', np.int64), ('tipo_veiculo', np.int64), ('centavos', np.int64)]
+    )
+    atual = atual[np.argsort(atual['veiculo_id'], kind='stable')]
+    
+    anterior = np.full(len(atual), SEM_VALOR, dtype=np.int64)
+    if mes_anterior is not None:
+        precos = np.fromiter(
+            _tuplas(cache, '''
+                SELECT veiculo_id, valor_centavos FROM valores_historico
+                WHERE mes = ? AND valor_centavos > 0
+            ''', (int(mes_anterior),)),
+            dtype=[('veiculo_id', np.int64), ('centavos', np.int64)]
+        )
+        precos = precos[np.argsort(precos['veiculo_id'], kind='stable')]
+        posicao = np.minimum(np.searchsorted(precos['veiculo_id'], atual['veiculo_id']), max(len(precos) - 1, 0))
+        if len(precos):
+            encontrado = precos['veiculo_id'][posicao] == atual['veiculo_id']
+            anterior[encontrado] = precos['centavos'][posicao[encontrado]]
+    
+    return atual['veiculo_id'], atual['tipo_veiculo'], atual['centavos'], anterior
+
+
+def _mediana_por_grupo(valores, grupo, quantidade):
+    """Mediana de cada grupo (grupo = índices 0..n-1, quantidade = tamanho de cada um)"""
+    ordenados = valores[np.lexsort((valores, grupo))]
+    inicio = np.concatenate(([0], np.cumsum(quantidade)[:-1]))
+    return (ordenados[inicio + (quantidade - 1) // 2] + ordenados[inicio + quantidade // 2]) / 2
+
+
+def z_robusto(razao_log, chaves):
+    """
+    z-score robusto de cada elemento dentro do seu grupo: 0,6745 × (x − mediana) / MAD.
+    
+    Args:
+        razao_log: log(atual / anterior) de cada veículo (float64)
+        chaves: Grupo de cada veículo (int64, mesmo tamanho)
+    
+    Returns:
+        np.ndarray: z-score robusto (float64)
+    """
+    if not len(razao_log):
+        return np.zeros(0)
+    _, grupo, quantidade = np.unique(chaves, return_inverse=True, return_counts=True)
+    grupo = grupo.ravel()
+    desvio = razao_log - _mediana_por_grupo(razao_log, grupo, quantidade)[grupo]
+    mad = np.maximum(_mediana_por_grupo(np.abs(desvio), grupo, quantidade), MAD_MINIMO)
+    return FATOR_MAD * desvio / mad[grupo]
+
+
+def _detalhe_deriva(alterado):
+    """'campo: anterior → atual' de cada campo que mudou"""
+    return '; '.join(
+        f"{campo}: {alterado[campo]} → {alterado[f'{campo}_atual']}"
+        for campo in CAMPOS_DERIVA
+        if alterado[campo] is not None and alterado[campo] != alterado[f'{campo}_atual']
+    )
+
+
+def validar_mes(cache, mes=None, mes_anterior=None, limite_z=LIMITE_Z_ROBUSTO,
+                variacao_minima=VARIACAO_MINIMA_QUARENTENA, gravar=True, veiculo_ids=None):
+    """
+    Valida os valores do mês e retém os suspeitos em quarentena_valores.
+    
+    Com veiculo_ids (faixa de prioridade ou micro-lote da sincronização contínua), só
+    esses veículos são marcados e só a quarentena deles é substituída; a mediana e o
+    MAD dos saltos continuam vindo do mês inteiro, já que poucos veículos não têm
+    estatística própria (um só teria sempre z = 0).
+    
+    Args:
+        cache: FipeLocalCache
+        mes: Mês YYYYMM (None = mais recente em valores)
+        mes_anterior: Mês de comparação dos saltos (None = último mês anterior com valores)
+        limite_z: |z-score robusto| acima do qual a variação é suspeita
+        variacao_minima: |variação %| mínima para reter um salto
+        gravar: Se False, só calcula
+        veiculo_ids: Só estes veículos (None = mês inteiro)
+    
+    Returns:
+        dict: {'mes', 'mes_anterior', 'verificados', 'valor_invalido', 'salto', 'deriva',
+               'retidos', 'liberados', 'tempo', 'linhas'}
+    """
+    inicio = time.time()
+    if mes is None:
+        mes = cache.conn.execute('SELECT MAX(mes) FROM main.valores').fetchone()[0]
+        if mes is None:
+            raise ValueError("Nenhum valor no cache local para validar")
+    mes = int(mes)
+    if mes_anterior is None:
+        mes_anterior = cache.conn.execute(
+            'SELECT MAX(mes) FROM valores_historico WHERE mes < ?', (mes,)
+        ).fetchone()[0]
+    
+    escopo = veiculo_ids
+    veiculo_ids, tipo_veiculo, centavos, anterior = carregar_mes(cache, mes, mes_anterior)
+    if escopo is None:
+        no_escopo = np.ones(len(veiculo_ids), dtype=bool)
+    else:
+        no_escopo = np.isin(veiculo_ids, np.fromiter((int(i) for i in escopo), dtype=np.int64))
+    
+    invalido = (centavos <= 0) & no_escopo
+    
+    # Saltos: z-score entre todos os veículos com preço válido nos dois meses, marcados só no escopo
+    comparaveis = np.flatnonzero((centavos > 0) & (anterior > 0))
+    razao = centavos[comparaveis] / anterior[comparaveis]
+    percentual = (razao - 1.0) * 100.0
+    z = z_robusto(np.log(razao), tipo_veiculo[comparaveis])
+    suspeitos = (np.abs(z) > limite_z) & (np.abs(percentual) > variacao_minima) & no_escopo[comparaveis]
+    saltos = comparaveis[suspeitos]
+    
+    alterados = {row['veiculo_id']: row for row in cache.get_veiculos_alterados()}
+    deriva = np.flatnonzero(
+        no_escopo & np.isin(veiculo_ids, np.fromiter(alterados, dtype=np.int64, count=len(alterados)))
+    )
+    
+    # Só as linhas marcadas (poucas) viram tuplas Python
+    linhas = []
+    for indice in np.flatnonzero(invalido).tolist():
+        valor = int(centavos[indice])
+        detalhe = "valor vazio" if valor == SEM_VALOR else f"valor {centavos_para_texto(valor)}"
+        linhas.append((int(veiculo_ids[indice]), 'valor_invalido',
+                       None if valor == SEM_VALOR else valor, None, None, None, detalhe))
+    for indice, variacao, z_salto in zip(saltos.tolist(), percentual[suspeitos].tolist(), z[suspeitos].tolist()):
+        valor, valor_anterior = int(centavos[indice]), int(anterior[indice])
+        linhas.append((
+            int(veiculo_ids[indice]), 'salto', valor, valor_anterior, variacao, z_salto,
+            f"{centavos_para_texto(valor_anterior)} → {centavos_para_texto(valor)} ({variacao:+.1f}%, z {z_salto:+.1f})"
+        ))
+    for indice in deriva.tolist():
+        valor = int(centavos[indice])
+        linhas.append((int(veiculo_ids[indice]), 'deriva', None if valor == SEM_VALOR else valor,
+                       None, None, None, _detalhe_deriva(alterados[int(veiculo_ids[indice])])))
+    
+    if gravar:
+        retidos = cache.save_quarentena_valores(mes, linhas, veiculo_ids=escopo)
+    else:
+        retidos = len({linha[0] for linha in linhas})
+    
+    return {
+        'mes': mes,
+        'mes_anterior': mes_anterior,
+        'verificados': int(no_escopo.sum()),
+        'valor_invalido': int(invalido.sum()),
+        'salto': len(saltos),
+        'deriva': len(deriva),
+        'retidos': retidos,
+        'liberados': int(no_escopo.sum()) - retidos,
+        'tempo': time.time() - inicio,
+        'linhas': linhas
+    }
+
+
+def validar_lote_alteracoes(cache, limite):
+    """
+    Valida os valores do próximo lote do log de alterações (sincronização contínua),
+    mês a mês, só nos veículos alterados; o lote é lido depois com o mesmo ultimo_id.
+    
+    Args:
+        cache: FipeLocalCache com o log de alterações
+        limite: Máximo de alterações do lote
+    
+    Returns:
+        tuple: (ultimo_id ou None se o log está vazio, veículos retidos no lote)
+    """
+    ultimo_id, por_mes = cache.get_valores_lote_alteracoes(limite)
+    retidos = 0
+    for mes, veiculo_ids in sorted(por_mes.items()):
+        retidos += validar_mes(cache, mes, veiculo_ids=veiculo_ids)['retidos']
+    return ultimo_id, retidos
@@ -0,0 +1,284 @@
+"""
+Variação mensal de preços, vetorizada com NumPy.
+
+Os valores dos meses pedidos são carregados de uma vez em uma matriz
+veículo × mês de centavos inteiros (SEM_VALOR onde o veículo não tem preço),
+alinhada por veiculo_id, junto com as colunas do veículo (tipo, marca, ano,
+combustível). Cada par de meses consecutivos vira um vetor de variações
+percentuais sobre os veículos com preço nos dois meses, e tudo o mais é
+aritmética sobre esses vetores:
+
+- agregados por grupo (total, tipo de veículo, marca, ano modelo, combustível):
+  contagens, média, mediana, percentis, desvio e variação ponderada pelo preço,
+  com np.unique + np.bincount e uma única ordenação por (grupo, variação);
+- maiores altas e quedas (np.argpartition);
+- gravação nas tabelas variacao_mensal e variacao_destaques do cache local.
+"""
+from typing import NamedTuple
+
+import numpy as np
+
+from ..cache.fipe_local_cache import SEM_VALOR
+from ..normalizacao import meses_para_inteiros
+
+
+# Grupos dos agregados: nome → colunas de PrecosMeses que formam a chave
+GRUPOS = {
+    'total': (),
+    'tipo_veiculo': ('tipo_veiculo',),
+    'marca': ('tipo_veiculo', 'codigo_marca'),
+    'ano_modelo': ('ano_modelo',),
+    'combustivel': ('codigo_combustivel',),
+}
+
+# Percentis guardados por grupo (colunas p05, p25, p75, p95)
+PERCENTIS = (5, 25, 75, 95)
+
+
+class PrecosMeses(NamedTuple):
+    """Matriz de preços de vários meses, uma linha por veículo (veiculo_id crescente)"""
+    meses: list                 # Meses YYYYMM em ordem crescente (colunas de centavos)
+    veiculo_ids: np.ndarray     # int64 (n)
+    centavos: np.ndarray        # int64 (n, len(meses)), SEM_VALOR = sem preço no mês
+    tipo_veiculo: np.ndarray    # int64 (n)
+    codigo_marca: np.ndarray    # int64 (n)
+    ano_modelo: np.ndarray      # int64 (n)
+    codigo_combustivel: np.ndarray  # int64 (n)
+    nomes_marcas: dict          # {(tipo_veiculo, codigo_marca): nome}
+    nomes_combustiveis: dict    # {codigo_combustivel: nome}
+
+
+class Variacao(NamedTuple):
+    """Variação entre dois meses, só dos veículos com preço nos dois"""
+    mes_anterior: int
+    mes: int
+    linhas: np.ndarray          # Índices das linhas de PrecosMeses
+    anterior: np.ndarray        # Centavos no mês anterior (int64)
+    atual: np.ndarray           # Centavos no mês (int64)
+    percentual: np.ndarray      # (atual / anterior - 1) * 100 (float64)
+
+
+def carregar_precos(cache, meses):
+    """
+    Carrega os valores dos meses (inclusive anos arquivados) numa matriz alinhada por veículo.
+    
+    Args:
+        cache: FipeLocalCache
+        meses: Meses YYYYMM ou "janeiro/2026" (2 ou mais; ordem indiferente)
+    
+    Returns:
+        PrecosMeses
+    """
+    meses = np.unique(meses_para_inteiros(meses)).tolist()
+    if SEM_VALOR in meses:
+        raise ValueError("Mês de referência inválido")
+    marcadores = ', '.join('?' * len(meses))
+    linhas = np.fromiter(
+        _tuplas(cache, f'''
+            SELECT veiculo_id, mes, valor_centavos FROM valores_historico
+            WHERE mes IN ({marcadores}) AND valor_centavos IS NOT NULL
+        ''', meses),
+        dtype=[('veiculo_id', np.int64), ('mes', np.int64), ('centavos', np.int64)]
+    )
+    
+    veiculo_ids, linha = np.unique(linhas['veiculo_id'], return_inverse=True)
+    coluna = np.searchsorted(np.array(meses, dtype=np.int64), linhas['mes'])
+    centavos = np.full((len(veiculo_ids), len(meses)), SEM_VALOR, dtype=np.int64)
+    centavos[linha, coluna] = linhas['centavos']
+    
+    veiculos = np.fromiter(
+        _tuplas(cache, '''
+            SELECT id, tipo_veiculo, codigo_marca, ano_modelo, codigo_combustivel
+            FROM main.veiculos ORDER BY id
+        '''),
+        dtype=[('id', np.int64), ('tipo_veiculo', np.int64), ('codigo_marca', np.int64),
+               ('ano_modelo', np.int64), ('codigo_combustivel', np.int64)]
+    )
+    veiculos = veiculos[np.searchsorted(veiculos['id'], veiculo_ids)]
+    
+    nomes_marcas = {
+        (tipo, codigo): nome
+        for tipo, codigo, nome in cache.conn.execute(
+            'SELECT tipo_veiculo, codigo_marca, MAX(marca) FROM main.veiculos GROUP BY tipo_veiculo, codigo_marca'
+        )
+    }
+    nomes_combustiveis = dict(cache.conn.execute(
+        'SELECT codigo_combustivel, MAX(combustivel) FROM main.veiculos GROUP BY codigo_combustivel'
+    ).fetchall())
+    
+    return PrecosMeses(
+        meses, veiculo_ids, centavos,
+        veiculos['tipo_veiculo'], veiculos['codigo_marca'], veiculos['ano_modelo'], veiculos['codigo_combustivel'],
+        nomes_marcas, nomes_combustiveis
+    )
+
+
+def _tuplas(cache, sql, parametros=()):
+    """Cursor com linhas em tuplas (np.fromiter não aceita sqlite3.Row)"""
+    cursor = cache.conn.cursor()
+    cursor.row_factory = None
+    return cursor.execute(sql, parametros)
+
+
+def calcular_variacao(precos, mes_anterior, mes):
+    """Variação percentual de cada veículo com preço (> 0) nos dois meses"""
+    anterior = precos.centavos[:, precos.meses.index(mes_anterior)]
+    atual = precos.centavos[:, precos.meses.index(mes)]
+    linhas = np.flatnonzero((anterior > 0) & (atual != SEM_VALOR))
+    anterior, atual = anterior[linhas], atual[linhas]
+    percentual = (atual / anterior - 1.0) * 100.0
+    return Variacao(mes_anterior, mes, linhas, anterior, atual, percentual)
+
+
+def agregar(chaves, variacao):
+    """
+    Estatísticas da variação por grupo, sem laço por veículo.
+    
+    Args:
+        chaves: Chave do grupo de cada veículo da variação (int64, mesmo tamanho)
+        variacao: Variacao
+    
+    Returns:
+        dict: Arrays alinhados com 'chaves' (chaves distintas em ordem crescente):
+              veiculos, subiram, cairam, media, mediana, ponderada, desvio,
+              p05, p25, p75, p95, minima, maxima
+    """
+    percentual = variacao.percentual
+    distintas, grupo = np.unique(chaves, return_inverse=True)
+    quantidade = np.bincount(grupo, minlength=len(distintas))
+    soma = np.bincount(grupo, weights=percentual, minlength=len(distintas))
+    soma_quadrados = np.bincount(grupo, weights=percentual * percentual, minlength=len(distintas))
+    media = soma / quantidade
+    
+    # Uma ordenação por (grupo, variação): cada grupo vira um trecho contíguo e ordenado
+    ordenadas = percentual[np.lexsort((percentual, grupo))]
+    inicio = np.concatenate(([0], np.cumsum(quantidade)[:-1]))
+    
+    def posicao(fracao):
+        return ordenadas[inicio + np.floor((quantidade - 1) * fracao).astype(np.int64)]
+    
+    resultado = {
+        'chaves': distintas,
+        'veiculos': quantidade,
+        'subiram': np.bincount(grupo, weights=percentual > 0, minlength=len(distintas)).astype(np.int64),
+        'cairam': np.bincount(grupo, weights=percentual < 0, minlength=len(distintas)).astype(np.int64),
+        'media': media,
+        'mediana': (ordenadas[inicio + (quantidade - 1) // 2] + ordenadas[inicio + quantidade // 2]) / 2,
+        # Variação do preço somado do grupo (veículos caros pesam mais)
+        'ponderada': (
+            np.bincount(grupo, weights=variacao.atual, minlength=len(distintas))
+            / np.bincount(grupo, weights=variacao.anterior, minlength=len(distintas)) - 1.0
+        ) * 100.0,
+        'desvio': np.sqrt(np.maximum(soma_quadrados / quantidade - media * media, 0.0)),
+        'minima': ordenadas[inicio],
+        'maxima': ordenadas[inicio + quantidade - 1],
+    }
+    for percentil in PERCENTIS:
+        resultado[f'p{percentil:02d}'] = posicao(percentil / 100)
+    return resultado
+
+
+def chaves_grupo(precos, variacao, grupo):
+    """Chave inteira de cada veículo da variação no grupo (ver GRUPOS)"""
+    colunas = GRUPOS[grupo]
+    if not colunas:
+        return np.zeros(len(variacao.linhas), dtype=np.int64)
+    if len(colunas) == 1:
+        return getattr(precos, colunas[0])[variacao.linhas]
+    # Marca: códigos de marca se repetem entre tipos de veículo
+    return precos.tipo_veiculo[variacao.linhas] * 1_000_000 + precos.codigo_marca[variacao.linhas]
+
+
+def maiores_variacoes(variacao, quantidade=20):
+    """
+    Maiores altas e quedas (argpartition: só os extremos são ordenados).
+    
+    Returns:
+        dict: {'alta': índices em Variacao, 'queda': índices em Variacao}, do maior para o menor movimento
+    """
+    quantidade = min(quantidade, len(variacao.percentual))
+    if not quantidade:
+        return {'alta': np.array([], dtype=np.int64), 'queda': np.array([], dtype=np.int64)}
+    percentual = variacao.percentual
+    altas = np.argpartition(percentual, len(percentual) - quantidade)[-quantidade:]
+    quedas = np.argpartition(percentual, quantidade - 1)[:quantidade]
+    return {
+        'alta': altas[np.argsort(-percentual[altas], kind='stable')],
+        'queda': quedas[np.argsort(percentual[quedas], kind='stable')],
+    }
+
+
+def _nome_grupo(precos, grupo, chave):
+    if grupo == 'marca':
+        tipo, codigo = divmod(chave, 1_000_000)
+        return precos.nomes_marcas.get((tipo, codigo)), f"{tipo}:{codigo}"
+    if grupo == 'combustivel':
+        return precos.nomes_combustiveis.get(chave), str(chave)
+    if grupo == 'total':
+        return None, ''
+    return None, str(chave)
+
+
+def resumir_variacao(precos, variacao, destaques=20):
+    """
+    Agregados de todos os GRUPOS e maiores altas/quedas, no formato das tabelas de resumo.
+    
+    Returns:
+        tuple: (linhas de variacao_mensal, linhas de variacao_destaques)
+    """
+    linhas = []
+    if len(variacao.percentual):
+        for grupo in GRUPOS:
+            agregados = agregar(chaves_grupo(precos, variacao, grupo), variacao)
+            colunas = [agregados[nome].tolist() for nome in (
+                'veiculos', 'subiram', 'cairam', 'media', 'mediana', 'ponderada', 'desvio',
+                *(f'p{percentil:02d}' for percentil in PERCENTIS), 'minima', 'maxima'
+            )]
+            for posicao, chave in enumerate(agregados['chaves'].tolist()):
+                nome, chave_texto = _nome_grupo(precos, grupo, chave)
+                linhas.append((variacao.mes, variacao.mes_anterior, grupo, chave_texto, nome,
+                               *(coluna[posicao] for coluna in colunas)))
+    
+    linhas_destaques = []
+    for direcao, indices in maiores_variacoes(variacao, destaques).items():
+        for posicao, indice in enumerate(indices.tolist(), 1):
+            linhas_destaques.append((
+                variacao.mes, variacao.mes_anterior, direcao, posicao,
+                int(precos.veiculo_ids[variacao.linhas[indice]]),
+                int(variacao.anterior[indice]), int(variacao.atual[indice]), float(variacao.percentual[indice])
+            ))
+    return linhas, linhas_destaques
+
+
+def analisar_meses(cache, meses, destaques=20, gravar=True):
+    """
+    Variação de cada par de meses consecutivos da lista (ex: [202511, 202512, 202601]
+    → 202511→202512 e 202512→202601), gravada em variacao_mensal/variacao_destaques.
+    
+    Args:
+        cache: FipeLocalCache
+        meses: Meses YYYYMM (2 ou mais)
+        destaques: Maiores altas e quedas guardadas por par
+        gravar: Se False, só calcula
+    
+    Returns:
+        list: Um dict por par: {'mes_anterior', 'mes', 'veiculos', 'linhas', 'destaques'}
+    """
+    precos = carregar_precos(cache, meses)
+    if len(precos.meses) < 2:
+        raise ValueError("São necessários pelo menos 2 meses distintos")
+    
+    resultados = []
+    for mes_anterior, mes in zip(precos.meses, precos.meses[1:]):
+        variacao = calcular_variacao(precos, mes_anterior, mes)
+        linhas, linhas_destaques = resumir_variacao(precos, variacao, destaques)
+        if gravar:
+            cache.save_variacao_mensal(mes_anterior, mes, linhas, linhas_destaques)
+        resultados.append({
+            'mes_anterior': mes_anterior,
+            'mes': mes,
+            'veiculos': len(variacao.percentual),
+            'linhas': linhas,
+            'destaques': linhas_destaques
+        })
+    return resultados
@@ -2,8 +2,10 @@
 Módulo de cache (SQLite local e Supabase remoto)
 """
 from .fipe_local_cache import FipeLocalCache
+from .diario_coleta import DiarioColeta
+from .fila_trabalho import FilaTrabalho
 
 # FipeCache comentado pois não está sendo usado ativamente
 # from .fipe_cache import FipeCache
 
-__all__ = ['FipeLocalCache']
+__all__ = ['FipeLocalCache', 'DiarioColeta', 'FilaTrabalho']
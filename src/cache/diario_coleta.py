@@ -0,0 +1,114 @@
+"""
+Diário de coleta (write-ahead) em SQLite.
+
+Cada requisição concluída à API FIPE é registrada com o seu resultado logo após
+a resposta, antes de qualquer gravação no cache. Se a coleta é interrompida,
+a próxima execução reaproveita do diário tudo o que já foi consultado (inclusive
+resultados que ainda estavam na fila de gravação) e só refaz as requisições que
+estavam em andamento: no máximo uma por worker.
+
+O diário fica num arquivo próprio ("<banco>_diario.db", ao lado do cache), com
+conexão e lock próprios: workers de API registram sem disputar o escritor do cache.
+Ao fim de uma coleta completa tudo já está no cache e o diário é esvaziado.
+"""
+import sqlite3
+import json
+from pathlib import Path
+from threading import Lock
+
+
+class DiarioColeta:
+    """
+    Diário de requisições concluídas, chaveado por (tipo, marca, requisição).
+    
+    Requisições: 'modelos' (ConsultarModelos da marca), 'modelo:<codigo>'
+    (ConsultarAnoModelo) e 'ano:<ano-combustivel>' (ConsultarModelosAtravesDoAno).
+    """
+    
+    def __init__(self, db_path='fipe_local_diario.db'):
+        self.db_path = db_path
+        self.conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self.lock = Lock()
+        
+        with self.lock:
+            if db_path != ':memory:':
+                self.conn.execute('PRAGMA journal_mode=WAL')
+            self.conn.execute('''
+                CREATE TABLE IF NOT EXISTS requisicoes (
+                    tipo_veiculo INTEGER NOT NULL,
+                    codigo_marca VARCHAR(10) NOT NULL,
+                    requisicao VARCHAR(30) NOT NULL,
+                    resultado TEXT NOT NULL,
+                    data_consulta TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    PRIMARY KEY (tipo_veiculo, codigo_marca, requisicao)
+                ) WITHOUT ROWID
+            ''')
+            cursor = self.conn.execute('SELECT tipo_veiculo, codigo_marca, requisicao, resultado FROM requisicoes')
+            # Diário inteiro em memória: consulta sem tocar no disco
+            self.feitas = {
+                (row[0], str(row[1]), row[2]): json.loads(row[3])
+                for row in cursor.fetchall()
+            }
+    
+    @classmethod
+    def do_cache(cls, cache_db_path):
+        """Diário ao lado do banco do cache local ("fipe_local.db" → "fipe_local_diario.db")"""
+        if cache_db_path == ':memory:':
+            return cls(':memory:')
+        banco = Path(cache_db_path)
+        return cls(str(banco.with_name(f"{banco.stem}_diario.db")))
+    
+    def obter(self, tipo_veiculo, codigo_marca, requisicao):
+        """
+        Returns:
+            tuple: (True, resultado) se a requisição já consta no diário; (False, None) caso contrário
+        """
+        chave = (tipo_veiculo, str(codigo_marca), requisicao)
+        with self.lock:
+            if chave in self.feitas:
+                return True, self.feitas[chave]
+        return False, None
+    
+    def registrar(self, tipo_veiculo, codigo_marca, requisicao, resultado):
+        """
+        Registra uma requisição concluída (durável ao retornar).
+        Resultados vazios não são registrados: podem ser rate limit persistente
+        (as funções de retry devolvem lista vazia/None) e devem ser refeitos.
+        """
+        if not resultado:
+            return
+        chave = (tipo_veiculo, str(codigo_marca), requisicao)
+        with self.lock:
+            self.conn.execute(
+                'INSERT OR REPLACE INTO requisicoes (tipo_veiculo, codigo_marca, requisicao, resultado) VALUES (?, ?, ?, ?)',
+                (tipo_veiculo, str(codigo_marca), requisicao, json.dumps(resultado, ensure_ascii=False))
+            )
+            self.feitas[chave] = resultado
+    
+    def consultar(self, tipo_veiculo, codigo_marca, requisicao, buscar):
+        """
+        Resultado do diário se a requisição já foi feita; senão chama buscar() e registra.
+        
+        Returns:
+            tuple: (resultado, reaproveitado)
+        """
+        feita, resultado = self.obter(tipo_veiculo, codigo_marca, requisicao)
+        if feita:
+            return resultado, True
+        resultado = buscar()
+        self.registrar(tipo_veiculo, codigo_marca, requisicao, resultado)
+        return resultado, False
+    
+    def limpar(self):
+        """Esvazia o diário (coleta concluída: tudo já foi gravado no cache)"""
+        with self.lock:
+            self.conn.execute('DELETE FROM requisicoes')
+            self.feitas.clear()
+    
+    def __len__(self):
+        with self.lock:
+            return len(self.feitas)
+    
+    def close(self):
+        """Fecha conexão com o diário"""
+        self.conn.close()
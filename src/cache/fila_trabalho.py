@@ -0,0 +1,240 @@
+"""
+Fila de trabalho compartilhada em SQLite, com reivindicação por lease.
+
+Vários processos (ou máquinas com o arquivo num disco compartilhado) pegam lotes
+disjuntos de tarefas da mesma fila. Cada tarefa reivindicada fica "em andamento"
+com um prazo (lease); o worker renova o prazo periodicamente (heartbeat) enquanto
+trabalha. Se o worker morre, o prazo vence e a tarefa volta a ser reivindicável
+por outro worker, sem coordenação extra.
+
+Estados: pendente → em_andamento → concluida | falhou
+(falha com tentativas restantes volta para pendente)
+
+Numa máquina só, a fila usa WAL. Em disco de rede (várias máquinas) abra com
+compartilhada=True em todos os processos: o WAL depende de memória compartilhada
+entre processos do mesmo host e não funciona em NFS/SMB, então a fila usa o
+journal tradicional (DELETE) e os locks de arquivo do sistema de arquivos.
+Os prazos usam o relógio de cada host: mantenha os relógios sincronizados (NTP).
+
+Uso:
+    fila = FilaTrabalho('fipe_fila.db')
+    fila.enfileirar('valores:202601', 'valor', [carga1, carga2, ...])
+    tarefas = fila.reivindicar('valores:202601', 'host1-W1', quantidade=20)
+    ...
+    fila.concluir([t.id for t in tarefas], 'host1-W1')
+"""
+import sqlite3
+import json
+import time
+from threading import Lock, Thread, Event
+from typing import NamedTuple
+
+
+# Prazo padrão de uma reivindicação (renovado pelo heartbeat)
+LEASE_PADRAO = 120  # segundos
+
+# Tentativas antes de uma tarefa ser marcada como falhou
+MAX_TENTATIVAS = 3
+
+
+class Tarefa(NamedTuple):
+    """Tarefa reivindicada: id na fila, tipo e carga (JSON decodificado)"""
+    id: int
+    tipo: str
+    carga: object
+
+
+class FilaTrabalho:
+    """
+    Fila de tarefas com lease/heartbeat num arquivo SQLite.
+    Seguro para várias threads (lock) e vários processos (transações do SQLite).
+    
+    Args:
+        db_path: Arquivo da fila
+        timeout: Busy timeout em segundos
+        compartilhada: True se o arquivo está num disco de rede acessado por várias
+            máquinas (journal_mode=DELETE em vez de WAL)
+    """
+    
+    def __init__(self, db_path='fipe_fila.db', timeout=30, compartilhada=False):
+        self.db_path = db_path
+        self.compartilhada = compartilhada
+        # timeout = busy timeout: espera o lock de outro processo em vez de falhar
+        self.conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None, timeout=timeout)
+        self.lock = Lock()
+        self._setup_database()
+    
+    def _setup_database(self):
+        with self.lock:
+            if self.db_path != ':memory:':
+                self.conn.execute(f"PRAGMA journal_mode={'DELETE' if self.compartilhada else 'WAL'}")
+            self.conn.execute('''
+                CREATE TABLE IF NOT EXISTS lotes (
+                    lote VARCHAR(50) PRIMARY KEY,
+                    parametros TEXT,
+                    criado_em TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            ''')
+            self.conn.execute('''
+                CREATE TABLE IF NOT EXISTS tarefas (
+                    id INTEGER PRIMARY KEY,
+                    lote VARCHAR(50) NOT NULL,
+                    tipo VARCHAR(20) NOT NULL,
+                    carga TEXT NOT NULL,
+                    estado VARCHAR(15) NOT NULL DEFAULT 'pendente',
+                    dono VARCHAR(50),
+                    expira_em REAL,
+                    tentativas INTEGER NOT NULL DEFAULT 0,
+                    resultado VARCHAR(20),
+                    erro TEXT,
+                    UNIQUE (lote, tipo, carga)
+                )
+            ''')
+            self.conn.execute('CREATE INDEX IF NOT EXISTS idx_tarefas_estado ON tarefas(lote, estado, expira_em)')
+    
+    def criar_lote(self, lote, parametros=None):
+        """Registra um lote (rodada de coleta) com parâmetros comuns aos workers"""
+        with self.lock:
+            self.conn.execute(
+                'INSERT OR REPLACE INTO lotes (lote, parametros) VALUES (?, ?)',
+                (lote, json.dumps(parametros or {}))
+            )
+    
+    def parametros_lote(self, lote):
+        """Parâmetros do lote (dict) ou None se o lote não existe"""
+        with self.lock:
+            row = self.conn.execute('SELECT parametros FROM lotes WHERE lote = ?', (lote,)).fetchone()
+        return json.loads(row[0]) if row else None
+    
+    def ultimo_lote(self):
+        """Nome do lote criado mais recentemente (ou None)"""
+        with self.lock:
+            row = self.conn.execute('SELECT lote FROM lotes ORDER BY criado_em DESC, rowid DESC LIMIT 1').fetchone()
+        return row[0] if row else None
+    
+    def enfileirar(self, lote, tipo, cargas):
+        """
+        Adiciona tarefas ao lote (duplicatas da mesma carga são ignoradas).
+        
+        Returns:
+            int: Tarefas novas
+        """
+        linhas = [(lote, tipo, json.dumps(carga)) for carga in cargas]
+        with self.lock:
+            antes = self.conn.total_changes
+            self.conn.execute('BEGIN IMMEDIATE')
+            try:
+                self.conn.executemany(
+                    'INSERT OR IGNORE INTO tarefas (lote, tipo, carga) VALUES (?, ?, ?)', linhas
+                )
+                self.conn.execute('COMMIT')
+            except Exception:
+                self.conn.execute('ROLLBACK')
+                raise
+            return self.conn.total_changes - antes
+    
+    def reivindicar(self, lote, dono, quantidade=20, lease=LEASE_PADRAO, max_tentativas=MAX_TENTATIVAS):
+        """
+        Reivindica até `quantidade` tarefas pendentes (ou com lease vencido).
+        Um único UPDATE ... RETURNING: dois workers nunca recebem a mesma tarefa.
+        Lease vencido de tarefa que já esgotou as tentativas vira 'falhou'.
+        
+        Returns:
+            list: Tarefa reivindicadas (vazia se não há trabalho disponível)
+        """
+        agora = time.time()
+        with self.lock:
+            self.conn.execute('''
+                UPDATE tarefas SET estado = 'falhou', erro = 'lease vencido', expira_em = NULL
+                WHERE lote = ? AND estado = 'em_andamento' AND expira_em < ? AND tentativas >= ?
+            ''', (lote, agora, max_tentativas))
+            cursor = self.conn.execute('''
+                UPDATE tarefas
+                SET estado = 'em_andamento', dono = ?, expira_em = ?, tentativas = tentativas + 1
+                WHERE id IN (
+                    SELECT id FROM tarefas
+                    WHERE lote = ?
+                        AND (estado = 'pendente' OR (estado = 'em_andamento' AND expira_em < ?))
+                    ORDER BY id
+                    LIMIT ?
+                )
+                RETURNING id, tipo, carga
+            ''', (dono, agora + lease, lote, agora, quantidade))
+            linhas = cursor.fetchall()
+        return sorted((Tarefa(row[0], row[1], json.loads(row[2])) for row in linhas), key=lambda t: t.id)
+    
+    def renovar(self, ids, dono, lease=LEASE_PADRAO):
+        """Heartbeat: estende o prazo das tarefas ainda em posse do dono"""
+        if not ids:
+            return 0
+        with self.lock:
+            cursor = self.conn.executemany(
+                "UPDATE tarefas SET expira_em = ? WHERE id = ? AND dono = ? AND estado = 'em_andamento'",
+                [(time.time() + lease, i, dono) for i in ids]
+            )
+            return cursor.rowcount
+    
+    def concluir(self, ids, dono, resultado='ok'):
+        """Marca tarefas como concluídas (só as que ainda pertencem ao dono)"""
+        if not ids:
+            return 0
+        with self.lock:
+            cursor = self.conn.executemany(
+                "UPDATE tarefas SET estado = 'concluida', resultado = ?, expira_em = NULL "
+                "WHERE id = ? AND dono = ? AND estado = 'em_andamento'",
+                [(resultado, i, dono) for i in ids]
+            )
+            return cursor.rowcount
+    
+    def falhar(self, id_tarefa, dono, erro, max_tentativas=MAX_TENTATIVAS):
+        """Devolve a tarefa para a fila, ou marca como falhou após max_tentativas"""
+        with self.lock:
+            self.conn.execute('''
+                UPDATE tarefas
+                SET estado = CASE WHEN tentativas >= ? THEN 'falhou' ELSE 'pendente' END,
+                    erro = ?, expira_em = NULL
+                WHERE id = ? AND dono = ? AND estado = 'em_andamento'
+            ''', (max_tentativas, str(erro)[:500], id_tarefa, dono))
+    
+    def resumo(self, lote):
+        """
+        Returns:
+            dict: {estado: quantidade} do lote, mais 'resultados': {resultado: quantidade}
+        """
+        with self.lock:
+            estados = dict(self.conn.execute(
+                'SELECT estado, COUNT(*) FROM tarefas WHERE lote = ? GROUP BY estado', (lote,)
+            ).fetchall())
+            resultados = dict(self.conn.execute(
+                "SELECT resultado, COUNT(*) FROM tarefas WHERE lote = ? AND estado = 'concluida' GROUP BY resultado",
+                (lote,)
+            ).fetchall())
+        estados['resultados'] = resultados
+        return estados
+    
+    def heartbeat(self, dono, ids_em_posse, lease=LEASE_PADRAO):
+        """
+        Inicia uma thread que renova o lease de ids_em_posse() a cada lease/3 segundos.
+        
+        Args:
+            dono: Identificação do worker
+            ids_em_posse: Função sem argumentos que devolve os ids atuais do worker
+        
+        Returns:
+            Event: set() encerra a thread
+        """
+        parar = Event()
+        
+        def renovar_periodicamente():
+            while not parar.wait(lease / 3):
+                try:
+                    self.renovar(ids_em_posse(), dono, lease)
+                except sqlite3.OperationalError as e:
+                    print(f"⚠️  Heartbeat falhou ({e}); tentando de novo")
+        
+        Thread(target=renovar_periodicamente, name=f"heartbeat-{dono}", daemon=True).start()
+        return parar
+    
+    def close(self):
+        """Fecha conexão com a fila"""
+        self.conn.close()
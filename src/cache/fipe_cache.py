@@ -1,6 +1,7 @@
 from datetime import datetime
 from typing import List, Dict, Optional
 from supabase_client import get_supabase_client
+from ..normalizacao import valor_para_reais
 
 
 class FipeCache:
@@ -330,16 +331,9 @@ class FipeCache:
     # UTILITÁRIOS
     # ============================================
     
-    def _parse_valor(self, valor_str: str) -> float:
+    def _parse_valor(self, valor_str: str) -> Optional[float]:
         """
         Converte string de valor para float.
-        Ex: "R$ 69.252,00" -> 69252.00
+        Ex: "R$ 69.252,00" -> 69252.00 (None se inválido)
         """
-        try:
-            # Remove "R$", espaços, e pontos de milhar
-            valor = valor_str.replace('R$', '').replace(' ', '').replace('.', '')
-            # Substitui vírgula por ponto decimal
-            valor = valor.replace(',', '.')
-            return float(valor)
-        except:
-            return 0.0
+        return valor_para_reais(valor_str)
@@ -4,10 +4,191 @@ Grava dados localmente primeiro (rápido) e sincroniza com Supabase depois.
 """
 import sqlite3
 import json
+import time
+from array import array
+from bisect import bisect_left, bisect_right
 from datetime import datetime
 from pathlib import Path
 from threading import Lock
 
+from ..registros import Marca, Modelo, AnoCombustivel, ValorFipe
+from .series import codificar_serie, decodificar_serie, mes_para_indice, indice_para_mes
+from ..normalizacao import valores_para_centavos, meses_para_inteiros, SEM_VALOR
+from ..config import (
+    CODIGO_ZERO_KM, ANTECEDENCIA_ANO_MODELO, MAX_INTERVALO_DESCONTINUADOS,
+    LIMITE_PENDENTES_SINCRONIZACAO, SINCRONIZACAO_INATIVA_APOS
+)
+
+
+# Reconstrói o texto "R$ 69.252,00" a partir de valores.valor_centavos (view valores_fipe)
+_SQL_VALOR_TEXTO = (
+    "'R$ ' || replace(printf('%,d', v.valor_centavos / 100), ',', '.')"
+    " || ',' || printf('%02d', v.valor_centavos % 100)"
+)
+
+# Mantém o id do veículo e atualiza só os textos que mudaram (INSERT OR REPLACE geraria id novo)
+_SQL_UPSERT_VEICULO = '''
+    ON CONFLICT (tipo_veiculo, codigo_marca, codigo_modelo, ano_modelo, codigo_combustivel) DO UPDATE SET
+        codigo_fipe = excluded.codigo_fipe,
+        marca = excluded.marca,
+        modelo = excluded.modelo,
+        combustivel = excluded.combustivel
+    WHERE (codigo_fipe, marca, modelo, combustivel) IS NOT
+          (excluded.codigo_fipe, excluded.marca, excluded.modelo, excluded.combustivel)
+'''
+
+# Linha de valores (alias v) retida pela validação e ainda não liberada (src/analise/qualidade.py)
+_SQL_VALOR_RETIDO = '''
+    EXISTS (SELECT 1 FROM quarentena_valores q
+            WHERE q.veiculo_id = v.veiculo_id AND q.mes = v.mes AND q.liberado_em IS NULL)
+'''
+
+# codigo_ano_combustivel de modelos_anos ("2024-1") montado de uma linha de veiculos ({v} = alias)
+_SQL_CODIGO_ANO_VEICULO = "CAST({v}.ano_modelo AS TEXT) || '-' || CAST({v}.codigo_combustivel AS TEXT)"
+
+# Arquivos anuais de valores ("<banco>_valores_<ano>.db") anexados somente leitura.
+# O SQLite permite 10 bancos anexados por conexão; os slots restantes ficam livres
+# para ferramentas que anexam outros bancos (ex: merge).
+MAX_ARQUIVOS_ANEXADOS = 8
+
+# Shards ("<banco>_shard_<nome>.db") anexados de uma vez por mesclar_shards().
+# A conexão de mescla não anexa os arquivos anuais, então usa os 10 slots.
+MAX_SHARDS_POR_MESCLA = 10
+
+# Veículos por transação ao (re)construir as séries de preço (faixas de veiculo_id)
+VEICULOS_POR_LOTE_SERIES = 20000
+
+# Mescla de shards: uma instrução por tabela e shard ({s} = esquema do shard).
+# Cadastros: INSERT OR IGNORE (ou nome mais recente); veículos mantêm o id do banco
+# principal; valores já existentes só são substituídos por data_consulta mais nova.
+_SQL_MESCLA_SHARD = {
+    'tabelas_referencia': '''
+        INSERT OR IGNORE INTO main.tabelas_referencia (codigo, mes)
+        SELECT codigo, mes FROM {s}.tabelas_referencia
+    ''',
+    'marcas': '''
+        INSERT INTO main.marcas (codigo, tipo_veiculo, nome)
+        SELECT codigo, tipo_veiculo, nome FROM {s}.marcas WHERE true
+        ON CONFLICT (codigo, tipo_veiculo) DO UPDATE SET nome = excluded.nome
+        WHERE nome IS NOT excluded.nome
+    ''',
+    'modelos': '''
+        INSERT INTO main.modelos (codigo, codigo_marca, tipo_veiculo, nome)
+        SELECT codigo, codigo_marca, tipo_veiculo, nome FROM {s}.modelos WHERE true
+        ON CONFLICT (codigo, codigo_marca, tipo_veiculo) DO UPDATE SET nome = excluded.nome
+        WHERE nome IS NOT excluded.nome
+    ''',
+    'anos_combustivel': '''
+        INSERT OR IGNORE INTO main.anos_combustivel (codigo, nome, ano, codigo_combustivel, combustivel)
+        SELECT codigo, nome, ano, codigo_combustivel, combustivel FROM {s}.anos_combustivel
+    ''',
+    'modelos_anos': '''
+        INSERT OR IGNORE INTO main.modelos_anos (codigo_marca, codigo_modelo, tipo_veiculo, codigo_ano_combustivel)
+        SELECT codigo_marca, codigo_modelo, tipo_veiculo, codigo_ano_combustivel FROM {s}.modelos_anos
+    ''',
+    'veiculos': f'''
+        INSERT INTO main.veiculos (
+            codigo_marca, codigo_modelo, tipo_veiculo, ano_modelo, codigo_combustivel,
+            codigo_fipe, marca, modelo, combustivel
+        )
+        SELECT codigo_marca, codigo_modelo, tipo_veiculo, ano_modelo, codigo_combustivel,
+               codigo_fipe, marca, modelo, combustivel
+        FROM {{s}}.veiculos WHERE true
+        {_SQL_UPSERT_VEICULO}
+    ''',
+    'valores_ausentes': '''
+        INSERT OR IGNORE INTO main.valores_ausentes
+            (tipo_veiculo, codigo_marca, codigo_modelo, codigo_ano_combustivel, mes, inferido, data_consulta)
+        SELECT tipo_veiculo, codigo_marca, codigo_modelo, codigo_ano_combustivel, mes, inferido, data_consulta
+        FROM {s}.valores_ausentes
+    ''',
+    # O id do veículo difere entre shard e principal: traduz pela chave de 5 colunas
+    'valores': '''
+        INSERT INTO main.valores (veiculo_id, mes, valor_centavos, codigo_referencia, data_consulta)
+        SELECT d.id, v.mes, v.valor_centavos, v.codigo_referencia, v.data_consulta
+        FROM {s}.valores v
+        JOIN {s}.veiculos sv ON sv.id = v.veiculo_id
+        JOIN main.veiculos d
+            ON d.tipo_veiculo = sv.tipo_veiculo
+            AND d.codigo_marca = sv.codigo_marca
+            AND d.codigo_modelo = sv.codigo_modelo
+            AND d.ano_modelo = sv.ano_modelo
+            AND d.codigo_combustivel = sv.codigo_combustivel
+        WHERE true
+        ON CONFLICT (veiculo_id, mes) DO UPDATE SET
+            valor_centavos = excluded.valor_centavos,
+            codigo_referencia = excluded.codigo_referencia,
+            data_consulta = excluded.data_consulta
+        WHERE COALESCE(julianday(excluded.data_consulta), 0) > COALESCE(julianday(valores.data_consulta), 0)
+    ''',
+}
+
+# Log de alterações da sincronização contínua: tabela → colunas da chave gravadas
+# pelos triggers (ordem de dependência, a mesma do envio ao Supabase)
+_CHAVES_LOG_ALTERACOES = {
+    'marcas': ('codigo', 'tipo_veiculo'),
+    'anos_combustivel': ('codigo',),
+    'modelos': ('codigo', 'codigo_marca', 'tipo_veiculo'),
+    'modelos_anos': ('codigo_marca', 'codigo_modelo', 'tipo_veiculo', 'codigo_ano_combustivel'),
+    'valores': ('veiculo_id', 'mes'),
+}
+
+# Linhas atuais das chaves do log até um id ({chaves} = subconsulta das chaves da tabela)
+_SQL_LINHAS_ALTERADAS = {
+    'marcas': '''
+        SELECT codigo, tipo_veiculo, nome FROM marcas
+        WHERE (codigo, tipo_veiculo) IN ({chaves})
+    ''',
+    'anos_combustivel': '''
+        SELECT codigo, nome, ano, codigo_combustivel, combustivel FROM anos_combustivel
+        WHERE codigo IN ({chaves})
+    ''',
+    'modelos': '''
+        SELECT codigo, codigo_marca, tipo_veiculo, nome FROM modelos
+        WHERE (codigo, codigo_marca, tipo_veiculo) IN ({chaves})
+    ''',
+    'modelos_anos': '''
+        SELECT codigo_marca, codigo_modelo, tipo_veiculo, codigo_ano_combustivel FROM modelos_anos
+        WHERE (codigo_marca, codigo_modelo, tipo_veiculo, codigo_ano_combustivel) IN ({chaves})
+    ''',
+}
+
+
+def _sql_valores_fipe(valores, veiculos):
+    """SELECT da view valores_fipe (layout antigo) sobre as tabelas/views informadas"""
+    return f'''
+        SELECT d.codigo_marca, d.codigo_modelo, d.tipo_veiculo, d.ano_modelo, d.codigo_combustivel,
+               {_SQL_VALOR_TEXTO} AS valor,
+               v.valor_centavos / 100.0 AS valor_numerico,
+               d.codigo_fipe,
+               CAST(v.mes AS TEXT) AS mes_referencia,
+               v.codigo_referencia,
+               v.data_consulta,
+               d.marca, d.modelo, d.combustivel,
+               v.data_consulta AS created_at
+        FROM {valores} v
+        JOIN {veiculos} d ON d.id = v.veiculo_id
+    '''
+
+
+def caminho_arquivo_valores(db_path, ano):
+    """Caminho do arquivo de valores de um ano (ao lado do banco principal)"""
+    banco = Path(db_path)
+    return banco.with_name(f"{banco.stem}_valores_{ano}.db")
+
+
+def anos_arquivados(db_path):
+    """Anos com arquivo de valores em disco ao lado do banco, do mais recente ao mais antigo"""
+    if db_path == ':memory:':
+        return []
+    banco = Path(db_path)
+    anos = []
+    for arquivo in banco.parent.glob(f"{banco.stem}_valores_*.db"):
+        sufixo = arquivo.stem.rpartition('_')[2]
+        if sufixo.isdigit() and len(sufixo) == 4:
+            anos.append(int(sufixo))
+    return sorted(anos, reverse=True)
+
 
 class FipeLocalCache:
     """
@@ -16,11 +197,14 @@ class FipeLocalCache:
     Thread-safe com locks para operações de escrita.
     """
     
-    def __init__(self, db_path='fipe_local.db'):
+    def __init__(self, db_path='fipe_local.db', timeout=30):
         self.db_path = db_path
-        self.conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self.timeout = timeout
+        # timeout = busy timeout: espera o lock de outro processo em vez de falhar
+        self.conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None, uri=True, timeout=timeout)
         self.conn.row_factory = sqlite3.Row
         self.write_lock = Lock()  # Lock para operações de escrita
+        self._proxima_verificacao_pendentes = 0.0  # Backpressure da sincronização contínua
         self._setup_database()
     
     def _setup_database(self):
@@ -78,9 +262,10 @@ class FipeLocalCache:
             CREATE TABLE IF NOT EXISTS modelos_anos (
                 codigo_marca VARCHAR(10),
                 codigo_modelo INTEGER,
+                tipo_veiculo INTEGER DEFAULT 1,
                 codigo_ano_combustivel VARCHAR(20),
                 created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                PRIMARY KEY (codigo_marca, codigo_modelo, codigo_ano_combustivel),
+                PRIMARY KEY (codigo_marca, codigo_modelo, tipo_veiculo, codigo_ano_combustivel),
                 FOREIGN KEY (codigo_modelo) REFERENCES modelos(codigo),
                 FOREIGN KEY (codigo_marca) REFERENCES marcas(codigo),
                 FOREIGN KEY (codigo_ano_combustivel) REFERENCES anos_combustivel(codigo)
@@ -91,31 +276,624 @@ class FipeLocalCache:
         cursor.execute('CREATE INDEX IF NOT EXISTS idx_modelos_marca ON modelos(codigo_marca)')
         cursor.execute('CREATE INDEX IF NOT EXISTS idx_modelos_anos_modelo ON modelos_anos(codigo_marca, codigo_modelo)')
         
-        # Tabela de Valores FIPE
+        # Carga histórica: veículo-mês consultado sem valor (inferido = não consultado,
+        # deduzido por ser anterior ao primeiro mês em que o veículo aparece)
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS valores_ausentes (
+                tipo_veiculo INTEGER NOT NULL,
+                codigo_marca VARCHAR(10) NOT NULL,
+                codigo_modelo INTEGER NOT NULL,
+                codigo_ano_combustivel VARCHAR(20) NOT NULL,
+                mes INTEGER NOT NULL,
+                inferido INTEGER NOT NULL DEFAULT 0,
+                data_consulta TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                PRIMARY KEY (tipo_veiculo, codigo_marca, codigo_modelo, codigo_ano_combustivel, mes)
+            ) WITHOUT ROWID
+        ''')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_valores_ausentes_mes ON valores_ausentes(mes)')
+        
+        # Completude por mês de referência (relatório da carga histórica)
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS completude_meses (
+                mes INTEGER PRIMARY KEY,
+                codigo_referencia INTEGER,
+                esperados INTEGER NOT NULL,
+                com_valor INTEGER NOT NULL,
+                sem_valor INTEGER NOT NULL,
+                atualizado_em TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        
+        # Completude por faixa de prioridade da atualização mensal (src/crawler/prioridades.py):
+        # faixa completa = todo veículo da faixa com valor no mês ou em quarentena, sem erros
         cursor.execute('''
-            CREATE TABLE IF NOT EXISTS valores_fipe (
+            CREATE TABLE IF NOT EXISTS completude_faixas (
+                mes INTEGER NOT NULL,
+                faixa TEXT NOT NULL,
+                ordem INTEGER NOT NULL,
+                esperados INTEGER NOT NULL,
+                com_valor INTEGER NOT NULL,
+                sem_valor INTEGER NOT NULL,
+                erros INTEGER NOT NULL,
+                completa INTEGER NOT NULL,
+                concluida_em TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                PRIMARY KEY (mes, faixa)
+            )
+        ''')
+        
+        # Consultas do monitor de tabela de referência (limita a frequência entre execuções)
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS verificacoes_referencia (
+                id INTEGER PRIMARY KEY,
+                verificado_em REAL NOT NULL,
+                codigo_api INTEGER,
+                novas INTEGER NOT NULL DEFAULT 0
+            )
+        ''')
+        
+        # Quarentena da atualização mensal: veículos sem valor na API (meses YYYYMM).
+        # Reconsultados só depois de 2^(faltas-1) meses da última verificação
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS descontinuados (
+                tipo_veiculo INTEGER NOT NULL,
+                codigo_marca VARCHAR(10) NOT NULL,
+                codigo_modelo INTEGER NOT NULL,
+                codigo_ano_combustivel VARCHAR(20) NOT NULL,
+                primeira_falta INTEGER NOT NULL,
+                ultima_verificacao INTEGER NOT NULL,
+                faltas INTEGER NOT NULL DEFAULT 1,
+                atualizado_em TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                PRIMARY KEY (tipo_veiculo, codigo_marca, codigo_modelo, codigo_ano_combustivel)
+            ) WITHOUT ROWID
+        ''')
+        
+        # Log de alterações da sincronização contínua (src/database/sincronizacao_continua.py):
+        # preenchido por triggers só enquanto ativado (ativar_log_alteracoes), chave em JSON
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS alteracoes (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                tabela TEXT NOT NULL,
+                chave TEXT NOT NULL,
+                criado_em REAL NOT NULL DEFAULT ((julianday('now') - 2440587.5) * 86400.0)
+            )
+        ''')
+        
+        # Último progresso do sincronizador contínuo (epoch): sem progresso recente, sem backpressure
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS sincronizacao_continua (
+                id INTEGER PRIMARY KEY CHECK (id = 1),
+                progresso_em REAL NOT NULL
+            )
+        ''')
+        
+        # Série de preços de cada veículo em um bloco delta-codificado (src/cache/series.py),
+        # derivada de valores por atualizar_series(): histórico = uma linha por veículo
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS series_valores (
+                veiculo_id INTEGER PRIMARY KEY,
+                primeiro_mes INTEGER NOT NULL,
+                ultimo_mes INTEGER NOT NULL,
+                pontos INTEGER NOT NULL,
+                dados BLOB NOT NULL
+            )
+        ''')
+        
+        # Meses com valores alterados ainda não incorporados às séries (triggers em valores)
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS series_pendentes (
+                mes INTEGER PRIMARY KEY
+            ) WITHOUT ROWID
+        ''')
+        
+        # Relatório de variação mensal de preços (src/analise/variacao.py): agregados por
+        # grupo (total, tipo_veiculo, marca "tipo:codigo", ano_modelo, combustivel), em %
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS variacao_mensal (
+                mes INTEGER NOT NULL,
+                mes_anterior INTEGER NOT NULL,
+                grupo TEXT NOT NULL,
+                chave TEXT NOT NULL,
+                nome TEXT,
+                veiculos INTEGER NOT NULL,
+                subiram INTEGER NOT NULL,
+                cairam INTEGER NOT NULL,
+                variacao_media REAL,
+                variacao_mediana REAL,
+                variacao_ponderada REAL,
+                desvio_padrao REAL,
+                p05 REAL,
+                p25 REAL,
+                p75 REAL,
+                p95 REAL,
+                variacao_minima REAL,
+                variacao_maxima REAL,
+                gerado_em TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                PRIMARY KEY (mes, mes_anterior, grupo, chave)
+            ) WITHOUT ROWID
+        ''')
+        
+        # Maiores altas e quedas de cada par de meses do relatório de variação
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS variacao_destaques (
+                mes INTEGER NOT NULL,
+                mes_anterior INTEGER NOT NULL,
+                direcao TEXT NOT NULL,
+                posicao INTEGER NOT NULL,
+                veiculo_id INTEGER NOT NULL,
+                valor_anterior INTEGER NOT NULL,
+                valor_atual INTEGER NOT NULL,
+                variacao REAL NOT NULL,
+                PRIMARY KEY (mes, mes_anterior, direcao, posicao)
+            ) WITHOUT ROWID
+        ''')
+        
+        # Valores retidos pela validação antes da sincronização (src/analise/qualidade.py):
+        # não vão ao Supabase (view valores_publicaveis) até liberado_em; um motivo por linha
+        # ('valor_invalido', 'salto' ou 'deriva')
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS quarentena_valores (
+                veiculo_id INTEGER NOT NULL,
+                mes INTEGER NOT NULL,
+                motivo TEXT NOT NULL,
+                valor_centavos INTEGER,
+                valor_anterior INTEGER,
+                variacao REAL,
+                z_robusto REAL,
+                detalhe TEXT,
+                detectado_em TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                liberado_em TIMESTAMP,
+                PRIMARY KEY (veiculo_id, mes, motivo)
+            ) WITHOUT ROWID
+        ''')
+        
+        # Textos publicados dos veículos cujo codigo_fipe/nome mudou (trigger em veiculos);
+        # os valores desses veículos ficam retidos por deriva até a liberação
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS veiculos_alterados (
+                veiculo_id INTEGER PRIMARY KEY,
+                codigo_fipe VARCHAR(20),
+                marca VARCHAR(100),
+                modelo TEXT,
+                combustivel VARCHAR(100),
+                alterado_em TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        
+        # Valores FIPE em formato compacto: centavos inteiros e mês inteiro YYYYMM,
+        # referenciando o veículo por um id inteiro (dimensão "veiculos")
+        self._criar_tabelas_valores(cursor)
+        
+        # Toda gravação em valores marca o mês para atualizar_series() (só o banco principal:
+        # arquivos anuais são somente leitura)
+        # ON CONFLICT DO NOTHING, não INSERT OR IGNORE: dentro de um trigger o OR IGNORE é
+        # substituído pelo conflito da instrução externa (upsert DO UPDATE → UNIQUE falha)
+        for evento, linha in (('INSERT', 'NEW'), ('UPDATE', 'NEW'), ('DELETE', 'OLD')):
+            self._criar_trigger(cursor, f'series_valores_{evento.lower()}', f'''
+                AFTER {evento} ON valores
+                BEGIN
+                    INSERT INTO series_pendentes (mes) VALUES ({linha}.mes) ON CONFLICT (mes) DO NOTHING;
+                END
+            ''')
+        
+        # Bancos antigos: converte a tabela valores_fipe para o formato compacto
+        if self._tem_valores_fipe_legado():
+            self.migrar_valores_compactos()
+        
+        # Texto já preenchido que muda = deriva; ficam guardados os textos de antes da
+        # primeira mudança (DO NOTHING: o upsert de veículos anularia um OR IGNORE) até a liberação
+        self._criar_trigger(cursor, 'veiculos_deriva', '''
+            AFTER UPDATE OF codigo_fipe, marca, modelo, combustivel ON veiculos
+            WHEN (OLD.codigo_fipe IS NOT NULL AND OLD.codigo_fipe IS NOT NEW.codigo_fipe)
+              OR (OLD.marca IS NOT NULL AND OLD.marca IS NOT NEW.marca)
+              OR (OLD.modelo IS NOT NULL AND OLD.modelo IS NOT NEW.modelo)
+              OR (OLD.combustivel IS NOT NULL AND OLD.combustivel IS NOT NEW.combustivel)
+            BEGIN
+                INSERT INTO veiculos_alterados (veiculo_id, codigo_fipe, marca, modelo, combustivel)
+                VALUES (OLD.id, OLD.codigo_fipe, OLD.marca, OLD.modelo, OLD.combustivel)
+                ON CONFLICT (veiculo_id) DO NOTHING;
+            END
+        ''')
+        
+        # View de compatibilidade com o layout antigo de valores_fipe (leitores existentes)
+        cursor.execute(f'CREATE VIEW IF NOT EXISTS valores_fipe AS {_sql_valores_fipe("valores", "veiculos")}')
+        
+        # Catálogo de veículos (modelos_anos) com o veiculo_id correspondente em veiculos
+        # (NULL enquanto o veículo não tem valor gravado): base das seleções de pendentes.
+        # codigo_marca é texto em modelos_anos e inteiro em veiculos; a comparação com o
+        # CAST repete a igualdade para que a chave de modelos_anos sirva de índice quando
+        # o plano parte de valores (sem ela, modelos_anos é varrida a cada linha)
+        cursor.execute(f'''
+            CREATE VIEW IF NOT EXISTS modelos_anos_veiculos AS
+            SELECT ma.codigo_marca, ma.codigo_modelo, ma.tipo_veiculo, ma.codigo_ano_combustivel,
+                   ve.id AS veiculo_id
+            FROM modelos_anos ma
+            LEFT JOIN veiculos ve
+                ON ve.tipo_veiculo = ma.tipo_veiculo
+                AND ve.codigo_marca = ma.codigo_marca
+                AND ma.codigo_marca = CAST(ve.codigo_marca AS TEXT)
+                AND ve.codigo_modelo = ma.codigo_modelo
+                AND ma.codigo_ano_combustivel = {_SQL_CODIGO_ANO_VEICULO.format(v="ve")}
+        ''')
+        
+        # O que a sincronização envia ao Supabase: valores_fipe sem os valores retidos
+        cursor.execute(f'''
+            CREATE VIEW IF NOT EXISTS valores_publicaveis AS
+            {_sql_valores_fipe("valores", "veiculos")} WHERE NOT {_SQL_VALOR_RETIDO}
+        ''')
+        
+        # Anos antigos arquivados em arquivos próprios (somente leitura)
+        self._anexar_arquivos()
+    
+    def _criar_trigger(self, cursor, nome, definicao):
+        """Cria o trigger ou substitui uma versão antiga com outra definição (bancos existentes)"""
+        sql = f'CREATE TRIGGER {nome} {definicao.strip()}'
+        atual = cursor.execute(
+            "SELECT sql FROM sqlite_master WHERE type = 'trigger' AND name = ?", (nome,)
+        ).fetchone()
+        if atual is not None:
+            if atual[0] == sql:
+                return
+            cursor.execute(f'DROP TRIGGER {nome}')
+        cursor.execute(sql)
+    
+    def _criar_tabelas_valores(self, cursor, esquema='main'):
+        """Cria veiculos (id por tipo+marca+modelo+ano+combustível) e valores (veiculo_id, mes)"""
+        cursor.execute(f'''
+            CREATE TABLE IF NOT EXISTS {esquema}.veiculos (
+                id INTEGER PRIMARY KEY,
                 codigo_marca INTEGER NOT NULL,
                 codigo_modelo INTEGER NOT NULL,
+                tipo_veiculo INTEGER NOT NULL,
                 ano_modelo INTEGER NOT NULL,
                 codigo_combustivel INTEGER NOT NULL,
-                valor VARCHAR(50) NOT NULL,
-                valor_numerico REAL,
                 codigo_fipe VARCHAR(20),
-                mes_referencia VARCHAR(50),
-                codigo_referencia INTEGER,
-                data_consulta TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                 marca VARCHAR(100),
                 modelo TEXT,
                 combustivel VARCHAR(100),
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                PRIMARY KEY (codigo_marca, codigo_modelo, tipo_veiculo, ano_modelo, codigo_combustivel, mes_referencia),
-                FOREIGN KEY (codigo_modelo, codigo_marca, tipo_veiculo) REFERENCES modelos(codigo, codigo_marca, tipo_veiculo) ON DELETE CASCADE
+                UNIQUE (tipo_veiculo, codigo_marca, codigo_modelo, ano_modelo, codigo_combustivel)
+            )
+        ''')
+        
+        # Histórico de um veículo = varredura de um intervalo da chave primária
+        cursor.execute(f'''
+            CREATE TABLE IF NOT EXISTS {esquema}.valores (
+                veiculo_id INTEGER NOT NULL REFERENCES veiculos(id),
+                mes INTEGER NOT NULL,
+                valor_centavos INTEGER,
+                codigo_referencia INTEGER,
+                data_consulta TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                PRIMARY KEY (veiculo_id, mes)
+            ) WITHOUT ROWID
+        ''')
+        
+        cursor.execute(f'CREATE INDEX IF NOT EXISTS {esquema}.idx_valores_mes ON valores(mes)')
+        cursor.execute(f'CREATE INDEX IF NOT EXISTS {esquema}.idx_veiculos_codigo_fipe ON veiculos(codigo_fipe)')
+    
+    def _tem_valores_fipe_legado(self):
+        """True se valores_fipe ainda é uma tabela (layout antigo com textos por linha)"""
+        row = self.conn.execute(
+            "SELECT type FROM sqlite_master WHERE name = 'valores_fipe'"
+        ).fetchone()
+        return row is not None and row[0] == 'table'
+    
+    def migrar_valores_compactos(self, tamanho_lote=50000):
+        """
+        Migra a tabela antiga valores_fipe para valores + veiculos (online, em lotes).
+        
+        Cada lote é uma transação curta, então outros processos continuam lendo e
+        gravando entre os lotes. Linhas gravadas na tabela antiga durante a migração
+        (INSERT OR REPLACE gera rowid novo) são copiadas na transação final, que
+        também troca a tabela pela view de compatibilidade.
+        
+        Args:
+            tamanho_lote: Linhas copiadas por transação
+        
+        Returns:
+            int: Total de linhas copiadas
+        """
+        # Valores e meses de cada lote convertidos em coluna (src/normalizacao.py) e
+        # juntados ao INSERT ... SELECT pelo rowid; meses inválidos ficam de fora
+        self.conn.execute('''
+            CREATE TEMP TABLE IF NOT EXISTS valores_convertidos (
+                linha INTEGER PRIMARY KEY,
+                mes INTEGER NOT NULL,
+                valor_centavos INTEGER
             )
         ''')
         
-        cursor.execute('CREATE INDEX IF NOT EXISTS idx_valores_fipe_tipo_veiculo ON valores_fipe(tipo_veiculo)')
-        cursor.execute('CREATE INDEX IF NOT EXISTS idx_valores_fipe_mes ON valores_fipe(mes_referencia)')
-        cursor.execute('CREATE INDEX IF NOT EXISTS idx_valores_fipe_codigo_fipe ON valores_fipe(codigo_fipe)')
+        # Veículos primeiro (o id é necessário para os valores); textos mais recentes prevalecem
+        sql_veiculos = f'''
+            INSERT INTO veiculos (
+                codigo_marca, codigo_modelo, tipo_veiculo, ano_modelo, codigo_combustivel,
+                codigo_fipe, marca, modelo, combustivel
+            )
+            SELECT codigo_marca, codigo_modelo, COALESCE(tipo_veiculo, 1), ano_modelo, codigo_combustivel,
+                   codigo_fipe, marca, modelo, combustivel
+            FROM valores_fipe
+            WHERE rowid > ? AND rowid <= ?
+            ORDER BY data_consulta
+            {_SQL_UPSERT_VEICULO}
+        '''
+        sql_valores = '''
+            INSERT OR REPLACE INTO valores (veiculo_id, mes, valor_centavos, codigo_referencia, data_consulta)
+            SELECT d.id, c.mes, c.valor_centavos, f.codigo_referencia, f.data_consulta
+            FROM valores_fipe f
+            JOIN temp.valores_convertidos c ON c.linha = f.rowid
+            JOIN veiculos d
+                ON d.tipo_veiculo = COALESCE(f.tipo_veiculo, 1)
+                AND d.codigo_marca = f.codigo_marca
+                AND d.codigo_modelo = f.codigo_modelo
+                AND d.ano_modelo = f.ano_modelo
+                AND d.codigo_combustivel = f.codigo_combustivel
+            WHERE f.rowid > ? AND f.rowid <= ?
+        '''
+        
+        total = self.conn.execute('SELECT COUNT(*) FROM valores_fipe').fetchone()[0]
+        print(f"🔄 Migrando {total} valores FIPE para o formato compacto...")
+        
+        ultimo_rowid = 0
+        copiados = 0
+        with self.write_lock:
+            while True:
+                fim = self.conn.execute(
+                    'SELECT MAX(rowid) FROM (SELECT rowid FROM valores_fipe WHERE rowid > ? ORDER BY rowid LIMIT ?)',
+                    (ultimo_rowid, tamanho_lote)
+                ).fetchone()[0]
+                if fim is None:
+                    break
+                
+                self.conn.execute('BEGIN IMMEDIATE')
+                try:
+                    self.conn.execute(sql_veiculos, (ultimo_rowid, fim))
+                    self._converter_lote_valores_fipe(ultimo_rowid, fim)
+                    copiados += self.conn.execute(sql_valores, (ultimo_rowid, fim)).rowcount
+                    self.conn.execute('COMMIT')
+                except Exception:
+                    self.conn.execute('ROLLBACK')
+                    raise
+                
+                ultimo_rowid = fim
+                print(f"   📦 {copiados}/{total} linhas migradas")
+            
+            # Transação final: linhas que chegaram durante a migração + troca por view
+            self.conn.execute('BEGIN IMMEDIATE')
+            try:
+                self.conn.execute(sql_veiculos, (ultimo_rowid, 2 ** 63 - 1))
+                self._converter_lote_valores_fipe(ultimo_rowid, 2 ** 63 - 1)
+                copiados += self.conn.execute(sql_valores, (ultimo_rowid, 2 ** 63 - 1)).rowcount
+                self.conn.execute('DROP TABLE valores_fipe')
+                self.conn.execute('DROP TABLE temp.valores_convertidos')
+                self.conn.execute('COMMIT')
+            except Exception:
+                self.conn.execute('ROLLBACK')
+                raise
+        
+        if copiados < total:
+            print(f"   ⚠️ {total - copiados} linhas ignoradas (mês de referência inválido)")
+        print(f"✅ Migração concluída: {copiados} valores no formato compacto")
+        return copiados
+    
+    def _converter_lote_valores_fipe(self, inicio, fim):
+        """Preenche temp.valores_convertidos com as linhas (inicio, fim] de valores_fipe"""
+        linhas, valores, meses = [], [], []
+        for rowid, valor, mes_referencia in self.conn.execute(
+            'SELECT rowid, valor, mes_referencia FROM valores_fipe WHERE rowid > ? AND rowid <= ?', (inicio, fim)
+        ):
+            linhas.append(rowid)
+            valores.append(valor)
+            meses.append(mes_referencia)
+        
+        self.conn.execute('DELETE FROM temp.valores_convertidos')
+        self.conn.executemany(
+            'INSERT INTO temp.valores_convertidos (linha, mes, valor_centavos) VALUES (?, ?, ?)',
+            (
+                (linha, mes, None if centavos == SEM_VALOR else centavos)
+                for linha, mes, centavos in zip(
+                    linhas, meses_para_inteiros(meses).tolist(), valores_para_centavos(valores).tolist()
+                )
+                if mes != SEM_VALOR
+            )
+        )
+    
+    def _caminho_arquivo(self, ano):
+        """Caminho do arquivo de valores de um ano (ao lado do banco principal)"""
+        return caminho_arquivo_valores(self.db_path, ano)
+    
+    def _arquivos_disponiveis(self):
+        """Anos com arquivo de valores em disco, do mais recente ao mais antigo"""
+        return anos_arquivados(self.db_path)
+    
+    def _anexar_arquivos(self):
+        """
+        Anexa os arquivos anuais (somente leitura) e recria as views TEMP que os unem.
+        
+        - valores_historico: valores de todas as partições (principal + arquivos)
+        - valores_fipe e valores_publicaveis (TEMP): sobrepõem as views do banco principal
+          nesta conexão (a sincronização com o Supabase enxerga o histórico inteiro)
+        
+        Gravações continuam indo sempre para main.valores.
+        """
+        with self.write_lock:
+            cursor = self.conn.cursor()
+            cursor.execute('DROP VIEW IF EXISTS temp.valores_fipe')
+            cursor.execute('DROP VIEW IF EXISTS temp.valores_publicaveis')
+            cursor.execute('DROP VIEW IF EXISTS temp.valores_historico')
+            
+            for row in cursor.execute('PRAGMA database_list').fetchall():
+                if row[1].startswith('arq_'):
+                    cursor.execute(f'DETACH DATABASE {row[1]}')
+            
+            anos = self._arquivos_disponiveis()
+            if len(anos) > MAX_ARQUIVOS_ANEXADOS:
+                ignorados = anos[MAX_ARQUIVOS_ANEXADOS:]
+                print(f"⚠️ {len(ignorados)} arquivos de valores não anexados (limite {MAX_ARQUIVOS_ANEXADOS}): "
+                      f"{', '.join(str(a) for a in ignorados)}")
+                anos = anos[:MAX_ARQUIVOS_ANEXADOS]
+            
+            self.anos_arquivados = anos
+            partes = ['SELECT veiculo_id, mes, valor_centavos, codigo_referencia, data_consulta FROM main.valores']
+            for ano in anos:
+                uri = self._caminho_arquivo(ano).resolve().as_uri() + '?mode=ro'
+                cursor.execute(f'ATTACH DATABASE ? AS arq_{ano}', (uri,))
+                partes.append(
+                    f'SELECT veiculo_id, mes, valor_centavos, codigo_referencia, data_consulta FROM arq_{ano}.valores'
+                )
+            
+            cursor.execute(f"CREATE TEMP VIEW valores_historico AS {' UNION ALL '.join(partes)}")
+            if anos:
+                cursor.execute(
+                    f'CREATE TEMP VIEW valores_fipe AS {_sql_valores_fipe("valores_historico", "main.veiculos")}'
+                )
+                cursor.execute(f'''
+                    CREATE TEMP VIEW valores_publicaveis AS
+                    {_sql_valores_fipe("valores_historico", "main.veiculos")} WHERE NOT {_SQL_VALOR_RETIDO}
+                ''')
+    
+    def arquivar_ano(self, ano):
+        """
+        Move os valores de um ano para o arquivo "<banco>_valores_<ano>.db".
+        
+        O arquivo recebe os valores e uma cópia dos veículos referenciados, podendo
+        ser copiado ou enviado sozinho; para descartar o ano, basta apagá-lo.
+        Se o ano já foi arquivado, linhas gravadas depois no banco principal
+        (ex: reprocessamento) são incorporadas ao arquivo.
+        
+        O ano do mês mais recente nunca é arquivado: gravações do mês corrente
+        continuam no banco principal.
+        
+        Args:
+            ano: Ano a arquivar (ex: 2024)
+        
+        Returns:
+            int: Linhas movidas para o arquivo
+        """
+        if self.db_path == ':memory:':
+            raise ValueError("Banco em memória não suporta arquivos anuais")
+        
+        ultimo_mes = self.conn.execute('SELECT MAX(mes) FROM main.valores').fetchone()[0]
+        if ultimo_mes and ano >= ultimo_mes // 100:
+            raise ValueError(f"Ano {ano} contém o mês mais recente ({ultimo_mes}) e fica no banco principal")
+        
+        mes_inicio, mes_fim = ano * 100 + 1, ano * 100 + 12
+        esquema = f'arq_{ano}'
+        
+        with self.write_lock:
+            cursor = self.conn.cursor()
+            cursor.execute('DROP VIEW IF EXISTS temp.valores_fipe')
+            cursor.execute('DROP VIEW IF EXISTS temp.valores_publicaveis')
+            cursor.execute('DROP VIEW IF EXISTS temp.valores_historico')
+            if esquema in [row[1] for row in cursor.execute('PRAGMA database_list').fetchall()]:
+                cursor.execute(f'DETACH DATABASE {esquema}')
+            
+            # Anexa para escrita (cria o arquivo se não existir)
+            cursor.execute(f'ATTACH DATABASE ? AS {esquema}', (str(self._caminho_arquivo(ano)),))
+            try:
+                self._criar_tabelas_valores(cursor, esquema)
+                
+                cursor.execute('BEGIN IMMEDIATE')
+                try:
+                    movidos = cursor.execute(f'''
+                        INSERT OR REPLACE INTO {esquema}.valores
+                            (veiculo_id, mes, valor_centavos, codigo_referencia, data_consulta)
+                        SELECT veiculo_id, mes, valor_centavos, codigo_referencia, data_consulta
+                        FROM main.valores
+                        WHERE mes BETWEEN ? AND ?
+                    ''', (mes_inicio, mes_fim)).rowcount
+                    cursor.execute(f'''
+                        INSERT OR REPLACE INTO {esquema}.veiculos
+                        SELECT * FROM main.veiculos
+                        WHERE id IN (SELECT DISTINCT veiculo_id FROM {esquema}.valores)
+                    ''')
+                    cursor.execute('DELETE FROM main.valores WHERE mes BETWEEN ? AND ?', (mes_inicio, mes_fim))
+                    cursor.execute('COMMIT')
+                except Exception:
+                    cursor.execute('ROLLBACK')
+                    raise
+            finally:
+                cursor.execute(f'DETACH DATABASE {esquema}')
+        
+        self._anexar_arquivos()
+        print(f"📦 {movidos} valores de {ano} arquivados em {self._caminho_arquivo(ano).name}")
+        return movidos
+    
+    @staticmethod
+    def caminho_shard(nome, pasta=None, db_path='fipe_local.db'):
+        """
+        Caminho do shard de um worker: "<pasta>/<banco>_shard_<nome>.db".
+        Sem pasta, o shard fica ao lado do banco principal.
+        """
+        banco = Path(db_path)
+        return Path(pasta or banco.parent) / f"{banco.stem}_shard_{nome}.db"
+    
+    @classmethod
+    def abrir_shard(cls, nome, pasta=None, db_path='fipe_local.db'):
+        """
+        Abre (ou cria) o shard de um worker, com o mesmo schema do banco principal.
+        
+        Cada processo grava no seu próprio arquivo, sem disputar o lock do banco
+        principal; mesclar_shards() incorpora os shards depois.
+        """
+        caminho = cls.caminho_shard(nome, pasta, db_path)
+        caminho.parent.mkdir(parents=True, exist_ok=True)
+        return cls(str(caminho))
+    
+    def listar_shards(self, pasta=None):
+        """Shards deste banco em disco (pasta padrão: ao lado do banco principal)"""
+        if self.db_path == ':memory:' and pasta is None:
+            return []
+        banco = Path(self.db_path)
+        return sorted(Path(pasta or banco.parent).glob(f"{banco.stem}_shard_*.db"))
+    
+    def mesclar_shards(self, caminhos):
+        """
+        Incorpora shards ao banco principal com INSERT ... SELECT (sem passar pelo Python).
+        
+        Os shards são anexados somente leitura, em grupos de até MAX_SHARDS_POR_MESCLA;
+        cada tabela é mesclada numa única transação para todos os shards do grupo.
+        Conflitos em valores: prevalece o data_consulta mais recente.
+        
+        Args:
+            caminhos: Arquivos de shard (ex: listar_shards())
+        
+        Returns:
+            dict: {tabela: linhas inseridas ou atualizadas}
+        """
+        if self.db_path == ':memory:':
+            raise ValueError("Banco em memória não suporta mescla de shards")
+        
+        caminhos = [Path(c) for c in caminhos]
+        totais = dict.fromkeys(_SQL_MESCLA_SHARD, 0)
+        
+        # Conexão própria: a principal tem os arquivos anuais anexados (slots de ATTACH)
+        conn = sqlite3.connect(self.db_path, isolation_level=None, timeout=self.timeout)
+        try:
+            with self.write_lock:
+                for inicio in range(0, len(caminhos), MAX_SHARDS_POR_MESCLA):
+                    grupo = caminhos[inicio:inicio + MAX_SHARDS_POR_MESCLA]
+                    esquemas = [f'shard_{i}' for i in range(len(grupo))]
+                    for esquema, caminho in zip(esquemas, grupo):
+                        uri = caminho.resolve().as_uri() + '?mode=ro'
+                        conn.execute(f'ATTACH DATABASE ? AS {esquema}', (uri,))
+                    try:
+                        for tabela, sql in _SQL_MESCLA_SHARD.items():
+                            antes = conn.total_changes
+                            conn.execute('BEGIN IMMEDIATE')
+                            try:
+                                for esquema in esquemas:
+                                    conn.execute(sql.format(s=esquema))
+                                conn.execute('COMMIT')
+                            except Exception:
+                                conn.execute('ROLLBACK')
+                                raise
+                            totais[tabela] += conn.total_changes - antes
+                    finally:
+                        for esquema in esquemas:
+                            conn.execute(f'DETACH DATABASE {esquema}')
+                    print(f"   🔀 {inicio + len(grupo)}/{len(caminhos)} shards mesclados")
+        finally:
+            conn.close()
+        
+        return totais
     
     def limpar_cache(self):
         """Remove todos os dados do cache local"""
@@ -136,16 +914,32 @@ class FipeLocalCache:
                 VALUES (?, ?)
             ''', (codigo, mes))
     
+    def get_codigo_referencia_mais_recente(self):
+        """Maior codigo em tabelas_referencia (None se vazia)"""
+        return self.conn.execute('SELECT MAX(codigo) FROM tabelas_referencia').fetchone()[0]
+    
+    def registrar_verificacao_referencia(self, verificado_em, codigo_api, novas):
+        """Registra uma consulta do monitor de referência (epoch, código mais recente na API, tabelas novas)"""
+        with self.write_lock:
+            self.conn.execute(
+                'INSERT INTO verificacoes_referencia (verificado_em, codigo_api, novas) VALUES (?, ?, ?)',
+                (verificado_em, codigo_api, novas)
+            )
+    
+    def get_ultima_verificacao_referencia(self):
+        """Epoch da última consulta do monitor de referência (None se nunca consultou)"""
+        return self.conn.execute('SELECT MAX(verificado_em) FROM verificacoes_referencia').fetchone()[0]
+    
     def save_marcas(self, marcas, tipo_veiculo=1):
         """Salva múltiplas marcas em lote
         
         Args:
-            marcas: Lista de marcas da API
+            marcas: Lista de marcas da API ou de registros Marca
             tipo_veiculo: Tipo de veículo (1=Carros, 2=Motos, 3=Caminhões)
         """
+        dados = marcas if _sao_registros(marcas) else Marca.lista_da_api(marcas, tipo_veiculo)
         with self.write_lock:
             cursor = self.conn.cursor()
-            dados = [(m['Value'], tipo_veiculo, m['Label']) for m in marcas]
             cursor.executemany('''
                 INSERT OR REPLACE INTO marcas (codigo, tipo_veiculo, nome)
                 VALUES (?, ?, ?)
@@ -155,13 +949,13 @@ class FipeLocalCache:
         """Salva múltiplos modelos de uma marca em lote
         
         Args:
-            modelos: Lista de modelos da API
+            modelos: Lista de modelos da API ou de registros Modelo
             codigo_marca: Código da marca
             tipo_veiculo: Tipo de veículo (1=Carros, 2=Motos, 3=Caminhões)
         """
+        dados = modelos if _sao_registros(modelos) else Modelo.lista_da_api(modelos, codigo_marca, tipo_veiculo)
         with self.write_lock:
             cursor = self.conn.cursor()
-            dados = [(m['Value'], codigo_marca, tipo_veiculo, m['Label']) for m in modelos]
             cursor.executemany('''
                 INSERT OR REPLACE INTO modelos (codigo, codigo_marca, tipo_veiculo, nome)
                 VALUES (?, ?, ?, ?)
@@ -171,48 +965,42 @@ class FipeLocalCache:
         """Salva anos/combustível de um modelo
         
         Args:
-            anos: Lista de dicionários com Value e Label dos anos
+            anos: Lista de dicionários com Value e Label dos anos, ou de registros AnoCombustivel
             codigo_marca: Código da marca
             codigo_modelo: Código do modelo
             tipo_veiculo: Tipo de veículo (1=Carros, 2=Motos, 3=Caminhões). Padrão: 1
         """
-        # Mapeamento de códigos para nomes de combustível
-        combustiveis_map = {
-            1: "Gasolina",
-            2: "Álcool/Etanol",
-            3: "Diesel",
-            4: "Elétrico",
-            5: "Flex",
-            6: "Híbrido",
-            7: "Gás Natural"
-        }
+        registros = anos if _sao_registros(anos) else AnoCombustivel.lista_da_api(anos)
+        self.save_relacionamentos(
+            codigo_marca, tipo_veiculo,
+            [(codigo_modelo, ano) for ano in registros]
+        )
+    
+    def save_relacionamentos(self, codigo_marca, tipo_veiculo, relacionamentos):
+        """Salva em lote relacionamentos modelo-ano de uma marca
+        
+        Args:
+            codigo_marca: Código da marca
+            tipo_veiculo: Tipo de veículo (1=Carros, 2=Motos, 3=Caminhões)
+            relacionamentos: Lista de tuplas (codigo_modelo, AnoCombustivel)
+        """
+        if not relacionamentos:
+            return
         
+        # anos_combustivel únicos (o mesmo ano aparece em vários modelos)
+        anos_unicos = {ano.codigo: ano for _, ano in relacionamentos}
+        dados = [
+            (codigo_marca, int(codigo_modelo), tipo_veiculo, ano.codigo)
+            for codigo_modelo, ano in relacionamentos
+        ]
+        
+        self.aguardar_sincronizacao()
         with self.write_lock:
             cursor = self.conn.cursor()
-            
-            # Salva anos_combustivel únicos
-            for ano in anos:
-                codigo_ano = ano['Value']  # Ex: "2024-1" ou "32000"
-                nome_ano = ano['Label']    # Ex: "2024 Gasolina" ou "Zero Km"
-                
-                # Extrai ano e código do combustível
-                if '-' in codigo_ano:
-                    ano_valor, combustivel_valor = codigo_ano.split('-')
-                    combustivel_valor = int(combustivel_valor)
-                    combustivel_nome = combustiveis_map.get(combustivel_valor, None)
-                else:
-                    # Zero Km ou formato antigo
-                    ano_valor = codigo_ano
-                    combustivel_valor = None
-                    combustivel_nome = None
-                
-                cursor.execute('''
-                    INSERT OR IGNORE INTO anos_combustivel (codigo, nome, ano, codigo_combustivel, combustivel)
-                    VALUES (?, ?, ?, ?, ?)
-                ''', (codigo_ano, nome_ano, ano_valor, combustivel_valor, combustivel_nome))
-            
-            # Salva relacionamento modelo-ano com tipo_veiculo
-            dados = [(codigo_marca, codigo_modelo, tipo_veiculo, ano['Value']) for ano in anos]
+            cursor.executemany('''
+                INSERT OR IGNORE INTO anos_combustivel (codigo, nome, ano, codigo_combustivel, combustivel)
+                VALUES (?, ?, ?, ?, ?)
+            ''', anos_unicos.values())
             cursor.executemany('''
                 INSERT OR IGNORE INTO modelos_anos (codigo_marca, codigo_modelo, tipo_veiculo, codigo_ano_combustivel)
                 VALUES (?, ?, ?, ?)
@@ -222,34 +1010,41 @@ class FipeLocalCache:
         """Salva um valor FIPE no cache local
         
         Args:
-            valor_data: Dicionário com dados do valor
+            valor_data: Registro ValorFipe (ou dicionário no formato antigo)
+            commit: Se True, faz commit imediato (padrão). Se False, deixa para commit em lote.
+        """
+        if not isinstance(valor_data, ValorFipe):
+            valor_data = ValorFipe.do_dict(valor_data)
+        self.save_valores_fipe([valor_data], commit=commit)
+    
+    def save_valores_fipe(self, valores, commit=True):
+        """Salva vários valores FIPE em lote
+        
+        Args:
+            valores: Lista de registros ValorFipe
             commit: Se True, faz commit imediato (padrão). Se False, deixa para commit em lote.
         """
+        # ValorFipe = chave do veículo (5) + mes, valor_centavos, codigo_referencia, data_consulta + 4 textos
+        linhas_veiculos = [v[:5] + v[9:] for v in valores]
+        linhas_valores = [v[5:9] + v[:5] for v in valores]
+        
+        self.aguardar_sincronizacao()
         with self.write_lock:
             cursor = self.conn.cursor()
-            
-            cursor.execute('''
-                INSERT OR REPLACE INTO valores_fipe (
+            cursor.executemany(f'''
+                INSERT INTO veiculos (
                     codigo_marca, codigo_modelo, tipo_veiculo, ano_modelo, codigo_combustivel,
-                    valor, valor_numerico, codigo_fipe, mes_referencia, codigo_referencia,
-                    marca, modelo, combustivel, data_consulta
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (
-                valor_data['codigo_marca'],
-                valor_data['codigo_modelo'],
-                valor_data.get('tipo_veiculo', 1),  # Default para carros se não especificado
-                valor_data['ano_modelo'],
-                valor_data['codigo_combustivel'],
-                valor_data['valor'],
-                valor_data['valor_numerico'],
-                valor_data['codigo_fipe'],
-                valor_data['mes_referencia'],
-                valor_data['codigo_referencia'],
-                valor_data['marca'],
-                valor_data['modelo'],
-                valor_data['combustivel'],
-                valor_data.get('data_consulta', 'CURRENT_TIMESTAMP')
-            ))
+                    codigo_fipe, marca, modelo, combustivel
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                {_SQL_UPSERT_VEICULO}
+            ''', linhas_veiculos)
+            cursor.executemany('''
+                INSERT OR REPLACE INTO valores (veiculo_id, mes, valor_centavos, codigo_referencia, data_consulta)
+                SELECT id, ?, ?, ?, COALESCE(?, CURRENT_TIMESTAMP)
+                FROM veiculos
+                WHERE codigo_marca = ? AND codigo_modelo = ? AND tipo_veiculo = ?
+                    AND ano_modelo = ? AND codigo_combustivel = ?
+            ''', linhas_valores)
             
             if commit:
                 self.conn.commit()
@@ -273,23 +1068,26 @@ class FipeLocalCache:
         cursor.execute('SELECT codigo, mes FROM tabelas_referencia')
         return [{'Codigo': row[0], 'Mes': row[1]} for row in cursor.fetchall()]
     
-    def get_all_marcas(self):
-        """Retorna todas as marcas para upload"""
+    def get_all_marcas(self, tipo_veiculo=None):
+        """Retorna todas as marcas (registros Marca), ou só as de um tipo de veículo"""
         cursor = self.conn.cursor()
-        cursor.execute('SELECT codigo, nome FROM marcas')
-        return [{'codigo': row[0], 'nome': row[1]} for row in cursor.fetchall()]
+        if tipo_veiculo is None:
+            cursor.execute('SELECT codigo, tipo_veiculo, nome FROM marcas')
+        else:
+            cursor.execute('SELECT codigo, tipo_veiculo, nome FROM marcas WHERE tipo_veiculo = ?', (tipo_veiculo,))
+        return [Marca.da_linha(row) for row in cursor.fetchall()]
     
     def get_all_modelos(self):
-        """Retorna todos os modelos para upload"""
+        """Retorna todos os modelos (registros Modelo)"""
         cursor = self.conn.cursor()
-        cursor.execute('SELECT codigo, codigo_marca, nome FROM modelos')
-        return [{'codigo': row[0], 'codigo_marca': row[1], 'nome': row[2]} for row in cursor.fetchall()]
+        cursor.execute('SELECT codigo, codigo_marca, tipo_veiculo, nome FROM modelos')
+        return [Modelo.da_linha(row) for row in cursor.fetchall()]
     
     def get_all_anos_combustivel(self):
-        """Retorna todos os anos/combustível para upload"""
+        """Retorna todos os anos/combustível (registros AnoCombustivel)"""
         cursor = self.conn.cursor()
-        cursor.execute('SELECT codigo, nome FROM anos_combustivel')
-        return [{'codigo': row[0], 'nome': row[1]} for row in cursor.fetchall()]
+        cursor.execute('SELECT codigo, nome, ano, codigo_combustivel, combustivel FROM anos_combustivel')
+        return [AnoCombustivel.da_linha(row) for row in cursor.fetchall()]
     
     def get_all_modelos_anos(self):
         """Retorna todos os relacionamentos modelo-ano para upload"""
@@ -298,33 +1096,299 @@ class FipeLocalCache:
         return [{'codigo_marca': row[0], 'codigo_modelo': row[1], 'codigo_ano_combustivel': row[2]} for row in cursor.fetchall()]
     
     def get_all_valores_fipe(self):
-        """Retorna todos os valores FIPE para upload"""
+        """Retorna todos os valores FIPE para upload (registros ValorFipe)"""
         cursor = self.conn.cursor()
         cursor.execute('''
-            SELECT codigo_marca, codigo_modelo, ano_modelo, codigo_combustivel, codigo_ano_combustivel,
-                   valor, valor_numerico, codigo_fipe, mes_referencia, codigo_referencia,
-                   marca, modelo, combustivel, data_consulta
-            FROM valores_fipe
+            SELECT d.codigo_marca, d.codigo_modelo, d.tipo_veiculo, d.ano_modelo, d.codigo_combustivel,
+                   v.mes, v.valor_centavos, v.codigo_referencia, v.data_consulta,
+                   d.codigo_fipe, d.marca, d.modelo, d.combustivel
+            FROM valores_historico v
+            JOIN main.veiculos d ON d.id = v.veiculo_id
         ''')
-        return [
-            {
-                'codigo_marca': row[0],
-                'codigo_modelo': row[1],
-                'ano_modelo': row[2],
-                'codigo_combustivel': row[3],
-                'codigo_ano_combustivel': row[4],
-                'valor': row[5],
-                'valor_numerico': row[6],
-                'codigo_fipe': row[7],
-                'mes_referencia': row[8],
-                'codigo_referencia': row[9],
-                'marca': row[10],
-                'modelo': row[11],
-                'combustivel': row[12],
-                'data_consulta': row[13]
-            }
-            for row in cursor.fetchall()
-        ]
+        return [ValorFipe.da_linha(row) for row in cursor.fetchall()]
+    
+    def get_veiculo_id(self, codigo_marca, codigo_modelo, tipo_veiculo, ano_modelo, codigo_combustivel):
+        """Retorna o id do veículo em "veiculos" (ou None se ainda não tem valores)"""
+        row = self.conn.execute('''
+            SELECT id FROM veiculos
+            WHERE tipo_veiculo = ? AND codigo_marca = ? AND codigo_modelo = ?
+                AND ano_modelo = ? AND codigo_combustivel = ?
+        ''', (tipo_veiculo, codigo_marca, codigo_modelo, ano_modelo, codigo_combustivel)).fetchone()
+        return row[0] if row else None
+    
+    def get_veiculo_ids(self, veiculos):
+        """
+        ids em "veiculos" de várias chaves numa consulta só (veículos ainda sem valores ficam de fora).
+        
+        Args:
+            veiculos: Chaves (codigo_marca, codigo_modelo, tipo_veiculo, ano_modelo, codigo_combustivel)
+        
+        Returns:
+            list: veiculo_ids
+        """
+        return [row[0] for row in self.conn.execute('''
+            SELECT d.id
+            FROM json_each(?) c
+            JOIN main.veiculos d
+                ON d.codigo_marca = json_extract(c.value, '$[0]') AND d.codigo_modelo = json_extract(c.value, '$[1]')
+                AND d.tipo_veiculo = json_extract(c.value, '$[2]') AND d.ano_modelo = json_extract(c.value, '$[3]')
+                AND d.codigo_combustivel = json_extract(c.value, '$[4]')
+        ''', (json.dumps([[int(campo) for campo in chave] for chave in veiculos]),))]
+    
+    def get_valores_publicaveis_mes(self, mes, veiculo_ids=None):
+        """
+        Valores de um mês no layout de valores_fipe, sem os retidos em quarentena.
+        
+        Consulta direta em valores/veiculos pelo índice de mês: o mês corrente nunca está
+        nos arquivos anuais, então não passa pela view valores_historico (UNION dos anos).
+        
+        Args:
+            mes: Mês YYYYMM
+            veiculo_ids: Restringe a estes veículos (ex: get_veiculo_ids() de uma faixa); None = todos
+        
+        Returns:
+            list: sqlite3.Row com as colunas de valores_fipe
+        """
+        filtro, parametros = '', [int(mes)]
+        if veiculo_ids is not None:
+            filtro = 'AND v.veiculo_id IN (SELECT value FROM json_each(?))'
+            parametros.append(json.dumps(list(veiculo_ids)))
+        return self.conn.execute(f'''
+            {_sql_valores_fipe("main.valores", "main.veiculos")}
+            WHERE v.mes = ? {filtro}
+              AND NOT {_SQL_VALOR_RETIDO}
+        ''', parametros).fetchall()
+    
+    def get_historico_valores(self, veiculo_id):
+        """
+        Retorna o histórico de preços de um veículo, do mês mais antigo ao mais recente.
+        
+        Returns:
+            list: Tuplas (mes, valor_centavos), ex: [(202512, 6890000), (202601, 6925200)]
+        """
+        cursor = self.conn.execute(
+            'SELECT mes, valor_centavos FROM valores_historico WHERE veiculo_id = ? ORDER BY mes',
+            (veiculo_id,)
+        )
+        return [tuple(row) for row in cursor.fetchall()]
+    
+    def get_meses_series_pendentes(self):
+        """Meses com valores gravados/removidos desde a última atualizar_series() (marcados pelos triggers)"""
+        return [row[0] for row in self.conn.execute('SELECT mes FROM series_pendentes ORDER BY mes')]
+    
+    def atualizar_series(self, meses=None, reconstruir=False):
+        """
+        Incorpora às séries de preço (series_valores) os valores dos meses alterados.
+        
+        Incremental: só os veículos com valor nos meses afetados (ou com série que os
+        cobre) são decodificados, mesclados e regravados; com o mês novo no fim da
+        série, isso é um bloco por veículo do mês. Transação por faixa de
+        VEICULOS_POR_LOTE_SERIES veículos: a coleta não fica bloqueada.
+        Sem nenhuma série gravada ainda, constrói todas.
+        
+        Args:
+            meses: Meses YYYYMM a reprocessar (None = os marcados em series_pendentes)
+            reconstruir: Regrava todas as séries a partir de valores_historico
+        
+        Returns:
+            dict: {'meses': [...], 'veiculos': séries regravadas, 'removidas': séries vazias apagadas}
+        """
+        if not reconstruir and self.conn.execute('SELECT 1 FROM series_valores LIMIT 1').fetchone() is None:
+            reconstruir = True
+        
+        # Tira as marcas antes de ler os valores: o que for gravado durante a
+        # atualização marca o mês de novo e entra na próxima
+        with self.write_lock:
+            cursor = self.conn.cursor()
+            cursor.execute('BEGIN IMMEDIATE')
+            try:
+                pendentes = [row[0] for row in cursor.execute('SELECT mes FROM series_pendentes')]
+                if reconstruir or meses is None:
+                    cursor.execute('DELETE FROM series_pendentes')
+                else:
+                    meses = sorted({int(mes) for mes in meses})
+                    cursor.executemany('DELETE FROM series_pendentes WHERE mes = ?', [(mes,) for mes in meses])
+                cursor.execute('COMMIT')
+            except Exception:
+                cursor.execute('ROLLBACK')
+                raise
+        if reconstruir:
+            meses = [row[0] for row in self.conn.execute('SELECT DISTINCT mes FROM valores_historico ORDER BY mes')]
+        elif meses is None:
+            meses = sorted(pendentes)
+        
+        stats = {'meses': meses, 'veiculos': 0, 'removidas': 0}
+        try:
+            if meses or reconstruir:
+                self._incorporar_meses_series(meses, reconstruir, stats)
+        except BaseException:
+            # Interrompida: os meses voltam para a fila
+            with self.write_lock:
+                self.conn.executemany(
+                    'INSERT OR IGNORE INTO series_pendentes (mes) VALUES (?)', [(mes,) for mes in meses]
+                )
+            raise
+        return stats
+    
+    def _incorporar_meses_series(self, meses, reconstruir, stats):
+        """Regrava as séries afetadas pelos meses, em transações por faixa de veiculo_id"""
+        marcadores = ', '.join('?' * len(meses))
+        filtro_meses = '' if reconstruir else f'AND mes IN ({marcadores})'
+        parametros_meses = () if reconstruir else tuple(meses)
+        conjunto_meses = set(meses)
+        primeiro_id, ultimo_id = self.conn.execute('SELECT MIN(id), MAX(id) FROM main.veiculos').fetchone()
+        
+        for inicio in range(primeiro_id or 0, (ultimo_id or -1) + 1, VEICULOS_POR_LOTE_SERIES):
+            fim = inicio + VEICULOS_POR_LOTE_SERIES - 1
+            novos = {}
+            for veiculo_id, mes, centavos in self.conn.execute(f'''
+                SELECT veiculo_id, mes, valor_centavos FROM valores_historico
+                WHERE veiculo_id BETWEEN ? AND ? AND valor_centavos IS NOT NULL {filtro_meses}
+            ''', (inicio, fim, *parametros_meses)):
+                novos.setdefault(veiculo_id, {})[mes] = centavos
+            
+            existentes = {}
+            if not reconstruir:
+                existentes = {
+                    row[0]: (row[1], row[2])
+                    for row in self.conn.execute(f'''
+                        SELECT veiculo_id, dados, pontos FROM series_valores
+                        WHERE veiculo_id BETWEEN ? AND ?
+                            AND (ultimo_mes >= ? AND primeiro_mes <= ?
+                                 OR veiculo_id IN (
+                                     SELECT veiculo_id FROM valores_historico
+                                     WHERE veiculo_id BETWEEN ? AND ? {filtro_meses}
+                                 ))
+                    ''', (inicio, fim, meses[0], meses[-1], inicio, fim, *parametros_meses))
+                }
+            
+            gravar, remover = [], []
+            for veiculo_id in novos.keys() | existentes.keys():
+                pontos = {}
+                if veiculo_id in existentes:
+                    for mes, centavos in zip(*decodificar_serie(*existentes[veiculo_id])):
+                        if mes not in conjunto_meses:
+                            pontos[mes] = centavos
+                pontos.update(novos.get(veiculo_id, {}))
+                if pontos:
+                    ordenados = sorted(pontos.items())
+                    gravar.append((veiculo_id, ordenados[0][0], ordenados[-1][0], len(ordenados), codificar_serie(ordenados)))
+                else:
+                    remover.append((veiculo_id,))
+            
+            with self.write_lock:
+                cursor = self.conn.cursor()
+                cursor.execute('BEGIN IMMEDIATE')
+                try:
+                    if reconstruir:
+                        cursor.execute('DELETE FROM series_valores WHERE veiculo_id BETWEEN ? AND ?', (inicio, fim))
+                    cursor.executemany('''
+                        INSERT OR REPLACE INTO series_valores (veiculo_id, primeiro_mes, ultimo_mes, pontos, dados)
+                        VALUES (?, ?, ?, ?, ?)
+                    ''', gravar)
+                    cursor.executemany('DELETE FROM series_valores WHERE veiculo_id = ?', remover)
+                    cursor.execute('COMMIT')
+                except Exception:
+                    cursor.execute('ROLLBACK')
+                    raise
+            stats['veiculos'] += len(gravar)
+            stats['removidas'] += len(remover)
+        
+        if reconstruir:
+            with self.write_lock:
+                self.conn.execute('DELETE FROM series_valores WHERE veiculo_id NOT IN (SELECT id FROM main.veiculos)')
+    
+    def _veiculo_serie(self, veiculo):
+        """veiculo_id de um id ou da chave (codigo_marca, codigo_modelo, tipo_veiculo, ano_modelo, codigo_combustivel)"""
+        if isinstance(veiculo, int):
+            return veiculo
+        return self.get_veiculo_id(*veiculo)
+    
+    def historico(self, veiculo, de=None, ate=None):
+        """
+        Série de preços de um veículo (series_valores), opcionalmente limitada a um intervalo.
+        Reflete os valores até a última atualizar_series().
+        
+        Args:
+            veiculo: veiculo_id ou chave (codigo_marca, codigo_modelo, tipo_veiculo, ano_modelo, codigo_combustivel)
+            de: Primeiro mês YYYYMM (inclusive, None = desde o início)
+            ate: Último mês YYYYMM (inclusive, None = até o fim)
+        
+        Returns:
+            tuple: (array('i') de meses YYYYMM, array('q') de centavos), vazios se não há série
+        """
+        veiculo_id = self._veiculo_serie(veiculo)
+        row = None
+        if veiculo_id is not None:
+            row = self.conn.execute('SELECT dados, pontos FROM series_valores WHERE veiculo_id = ?', (veiculo_id,)).fetchone()
+        if row is None:
+            return array('i'), array('q')
+        return _recortar_serie(*decodificar_serie(row[0], row[1]), de, ate)
+    
+    def historicos(self, veiculos=None, de=None, ate=None):
+        """
+        Séries de vários veículos (ou de todos), no formato de historico().
+        
+        Args:
+            veiculos: veiculo_ids ou chaves (None = todos os veículos com série)
+            de, ate: Intervalo de meses YYYYMM (inclusive)
+        
+        Returns:
+            dict: {veiculo_id: (meses, centavos)}; veículos sem série ou sem pontos no intervalo ficam de fora
+        """
+        filtro = 'WHERE (? IS NULL OR ultimo_mes >= ?) AND (? IS NULL OR primeiro_mes <= ?)'
+        parametros = (de, de, ate, ate)
+        if veiculos is None:
+            linhas = self.conn.execute(f'SELECT veiculo_id, dados, pontos FROM series_valores {filtro}', parametros)
+        else:
+            ids = sorted({veiculo_id for veiculo_id in map(self._veiculo_serie, veiculos) if veiculo_id is not None})
+            linhas = []
+            for inicio in range(0, len(ids), 900):  # Abaixo do limite de parâmetros do SQLite
+                parte = ids[inicio:inicio + 900]
+                marcadores = ', '.join('?' * len(parte))
+                linhas += self.conn.execute(
+                    f'SELECT veiculo_id, dados, pontos FROM series_valores {filtro} AND veiculo_id IN ({marcadores})',
+                    (*parametros, *parte)
+                ).fetchall()
+        
+        resultado = {}
+        for veiculo_id, dados, pontos in linhas:
+            meses, centavos = _recortar_serie(*decodificar_serie(dados, pontos), de, ate)
+            if meses:
+                resultado[veiculo_id] = (meses, centavos)
+        return resultado
+    
+    def matriz_historico(self, de=None, ate=None, veiculos=None):
+        """
+        Séries lado a lado num único array (linha = veículo, coluna = mês), para
+        análises sobre a frota inteira (ex: numpy.frombuffer(valores).reshape(len(ids), len(meses))).
+        
+        Args:
+            de, ate: Intervalo de meses YYYYMM (None = primeiro/último mês incorporado)
+            veiculos: veiculo_ids ou chaves (None = todos os veículos com série)
+        
+        Returns:
+            tuple: (array('q') de veiculo_ids, lista de meses YYYYMM consecutivos,
+                    array('q') de centavos com SEM_VALOR nos meses sem preço)
+        """
+        if de is None or ate is None:
+            primeiro, ultimo = self.conn.execute('SELECT MIN(primeiro_mes), MAX(ultimo_mes) FROM series_valores').fetchone()
+            de = primeiro if de is None else de
+            ate = ultimo if ate is None else ate
+        if de is None or ate is None or de > ate:
+            return array('q'), [], array('q')
+        
+        inicio = mes_para_indice(de)
+        colunas = mes_para_indice(ate) - inicio + 1
+        meses = [indice_para_mes(indice) for indice in range(inicio, inicio + colunas)]
+        series = self.historicos(veiculos, de, ate)
+        ids = array('q', sorted(series))
+        valores = array('q', [SEM_VALOR]) * (len(ids) * colunas)
+        for linha, veiculo_id in enumerate(ids):
+            base = linha * colunas - inicio
+            for mes, centavos in zip(*series[veiculo_id]):
+                valores[base + mes_para_indice(mes)] = centavos
+        return ids, meses, valores
     
     def carregar_do_supabase(self, supabase):
         """
@@ -475,7 +1539,7 @@ class FipeLocalCache:
         
         return [{'Value': row[0], 'Label': row[1]} for row in cursor.fetchall()]
     
-    def get_modelos_marca_dict(self, codigo_marca):
+    def get_modelos_marca_dict(self, codigo_marca, tipo_veiculo=None):
         """
         Retorna modelos de uma marca como dicionário {codigo: nome}.
         Útil para verificação rápida de existência.
@@ -484,11 +1548,751 @@ class FipeLocalCache:
         cursor.execute('''
             SELECT codigo, nome
             FROM modelos
-            WHERE codigo_marca = ?
-        ''', (codigo_marca,))
+            WHERE codigo_marca = ? AND (? IS NULL OR tipo_veiculo = ?)
+        ''', (codigo_marca, tipo_veiculo, tipo_veiculo))
         
         return {str(row[0]): row[1] for row in cursor.fetchall()}
     
+    def get_contagem_modelos(self):
+        """
+        Retorna quantos modelos cada marca tem no cache (estimativa de custo de coleta).
+        
+        Returns:
+            dict: {(tipo_veiculo, codigo_marca): quantidade}
+        """
+        cursor = self.conn.cursor()
+        cursor.execute('''
+            SELECT tipo_veiculo, codigo_marca, COUNT(*)
+            FROM modelos
+            GROUP BY tipo_veiculo, codigo_marca
+        ''')
+        return {(row[0], str(row[1])): row[2] for row in cursor.fetchall()}
+    
+    def remover_modelos_anos(self, chaves):
+        """
+        Remove relacionamentos modelo-ano (veículos descontinuados) numa única transação.
+        
+        Args:
+            chaves: Lista de (tipo_veiculo, codigo_marca, codigo_modelo, codigo_ano_combustivel)
+        
+        Returns:
+            int: Relacionamentos removidos (chaves já ausentes não contam)
+        """
+        if not chaves:
+            return 0
+        with self.write_lock:
+            antes = self.conn.total_changes
+            self.conn.execute('BEGIN IMMEDIATE')
+            try:
+                self.conn.executemany('''
+                    DELETE FROM modelos_anos
+                    WHERE tipo_veiculo = ? AND codigo_marca = ? AND codigo_modelo = ? AND codigo_ano_combustivel = ?
+                ''', chaves)
+                removidos = self.conn.total_changes - antes
+                # Removidos do catálogo saem também da quarentena
+                self.conn.executemany('''
+                    DELETE FROM descontinuados
+                    WHERE tipo_veiculo = ? AND codigo_marca = ? AND codigo_modelo = ? AND codigo_ano_combustivel = ?
+                ''', chaves)
+                self.conn.execute('COMMIT')
+            except Exception:
+                self.conn.execute('ROLLBACK')
+                raise
+            return removidos
+    
+    def registrar_descontinuados(self, chaves, mes):
+        """
+        Registra veículos sem valor na API no mês (quarentena), numa única transação.
+        Veículo novo entra com 1 falta; já em quarentena soma uma falta, uma vez por mês.
+        
+        Args:
+            chaves: Lista de (tipo_veiculo, codigo_marca, codigo_modelo, codigo_ano_combustivel)
+            mes: Mês de referência consultado (YYYYMM)
+        
+        Returns:
+            int: Registros incluídos ou atualizados
+        """
+        if not chaves:
+            return 0
+        mes = int(mes)
+        with self.write_lock:
+            antes = self.conn.total_changes
+            self.conn.execute('BEGIN IMMEDIATE')
+            try:
+                self.conn.executemany('''
+                    INSERT INTO descontinuados
+                        (tipo_veiculo, codigo_marca, codigo_modelo, codigo_ano_combustivel,
+                         primeira_falta, ultima_verificacao, faltas)
+                    VALUES (?, ?, ?, ?, ?, ?, 1)
+                    ON CONFLICT (tipo_veiculo, codigo_marca, codigo_modelo, codigo_ano_combustivel) DO UPDATE SET
+                        faltas = faltas + 1,
+                        ultima_verificacao = excluded.ultima_verificacao,
+                        atualizado_em = CURRENT_TIMESTAMP
+                    WHERE excluded.ultima_verificacao > descontinuados.ultima_verificacao
+                ''', [(*chave, mes, mes) for chave in chaves])
+                self.conn.execute('COMMIT')
+            except Exception:
+                self.conn.execute('ROLLBACK')
+                raise
+            return self.conn.total_changes - antes
+    
+    def remover_descontinuados(self, chaves):
+        """
+        Tira veículos da quarentena (voltaram a ter valor na API).
+        
+        Args:
+            chaves: Lista de (tipo_veiculo, codigo_marca, codigo_modelo, codigo_ano_combustivel)
+        
+        Returns:
+            int: Registros removidos
+        """
+        if not chaves:
+            return 0
+        with self.write_lock:
+            antes = self.conn.total_changes
+            self.conn.execute('BEGIN IMMEDIATE')
+            try:
+                self.conn.executemany('''
+                    DELETE FROM descontinuados
+                    WHERE tipo_veiculo = ? AND codigo_marca = ? AND codigo_modelo = ? AND codigo_ano_combustivel = ?
+                ''', chaves)
+                self.conn.execute('COMMIT')
+            except Exception:
+                self.conn.execute('ROLLBACK')
+                raise
+            return self.conn.total_changes - antes
+    
+    def get_quarentena_descontinuados(self, mes):
+        """
+        Veículos em quarentena e se já cabe reconsultá-los no mês informado:
+        passaram pelo menos 2^(faltas-1) meses (até MAX_INTERVALO_DESCONTINUADOS)
+        desde a última verificação.
+        
+        Args:
+            mes: Mês de referência atual (YYYYMM)
+        
+        Returns:
+            dict: {(tipo_veiculo, codigo_marca (str), codigo_modelo (str), codigo_ano_combustivel): bool}
+        """
+        mes = int(mes)
+        cursor = self.conn.execute('''
+            SELECT tipo_veiculo, codigo_marca, codigo_modelo, codigo_ano_combustivel,
+                   (? / 100 * 12 + ? % 100) - (ultima_verificacao / 100 * 12 + ultima_verificacao % 100)
+                       >= MIN(1 << (faltas - 1), ?) AS devido
+            FROM descontinuados
+        ''', (mes, mes, MAX_INTERVALO_DESCONTINUADOS))
+        return {
+            (tipo, str(marca), str(modelo), codigo_ano): bool(devido)
+            for tipo, marca, modelo, codigo_ano, devido in cursor.fetchall()
+        }
+    
+    def get_descontinuados(self, ultima_verificacao=None):
+        """
+        Veículos em quarentena com nomes de marca e modelo (para verificação e relatórios).
+        
+        Args:
+            ultima_verificacao: Só os que faltaram neste mês (YYYYMM); None = todos
+        
+        Returns:
+            list: Linhas com tipo_veiculo, codigo_marca, codigo_modelo, codigo_ano_combustivel,
+                  nome_marca, nome_modelo, primeira_falta, ultima_verificacao, faltas
+        """
+        sql = '''
+            SELECT d.tipo_veiculo, d.codigo_marca, d.codigo_modelo, d.codigo_ano_combustivel,
+                   COALESCE(ma.nome, 'Marca ' || d.codigo_marca) AS nome_marca,
+                   COALESCE(mo.nome, 'Modelo ' || d.codigo_modelo) AS nome_modelo,
+                   d.primeira_falta, d.ultima_verificacao, d.faltas
+            FROM descontinuados d
+            LEFT JOIN marcas ma
+                ON ma.codigo = d.codigo_marca AND ma.tipo_veiculo = d.tipo_veiculo
+            LEFT JOIN modelos mo
+                ON mo.codigo = d.codigo_modelo AND mo.codigo_marca = d.codigo_marca AND mo.tipo_veiculo = d.tipo_veiculo
+        '''
+        ordem = ' ORDER BY d.tipo_veiculo, d.codigo_marca, d.codigo_modelo, d.codigo_ano_combustivel'
+        if ultima_verificacao is None:
+            return self.conn.execute(sql + ordem).fetchall()
+        return self.conn.execute(sql + ' WHERE d.ultima_verificacao = ?' + ordem, (int(ultima_verificacao),)).fetchall()
+    
+    def get_ultima_verificacao_descontinuados(self):
+        """Mês (YYYYMM) da verificação mais recente da quarentena, ou None"""
+        return self.conn.execute('SELECT MAX(ultima_verificacao) FROM descontinuados').fetchone()[0]
+    
+    def get_veiculos_catalogo(self, tipos_veiculo=(1, 2, 3)):
+        """
+        Veículos conhecidos (modelos_anos) dos tipos informados, em ordem de marca/modelo/ano.
+        
+        Returns:
+            list: Tuplas (tipo_veiculo, codigo_marca, codigo_modelo, codigo_ano_combustivel)
+        """
+        marcadores = ', '.join('?' * len(tipos_veiculo))
+        cursor = self.conn.execute(f'''
+            SELECT tipo_veiculo, codigo_marca, codigo_modelo, codigo_ano_combustivel
+            FROM modelos_anos
+            WHERE tipo_veiculo IN ({marcadores}) AND instr(codigo_ano_combustivel, '-') > 0
+            ORDER BY tipo_veiculo, codigo_marca, codigo_modelo, codigo_ano_combustivel
+        ''', tuple(tipos_veiculo))
+        return [(row[0], str(row[1]), int(row[2]), row[3]) for row in cursor.fetchall()]
+    
+    def get_meses_cobertos(self, mes_inicio, mes_fim):
+        """
+        Meses do intervalo já resolvidos por veículo: com valor (inclui arquivos anuais)
+        ou registrados em valores_ausentes.
+        
+        Returns:
+            tuple: (com_valor, sem_valor), cada um {(tipo, marca, modelo, codigo_ano): set de meses}
+        """
+        com_valor = {}
+        cursor = self.conn.execute(f'''
+            SELECT d.tipo_veiculo, d.codigo_marca, d.codigo_modelo,
+                   {_SQL_CODIGO_ANO_VEICULO.format(v="d")}, v.mes
+            FROM valores_historico v
+            JOIN main.veiculos d ON d.id = v.veiculo_id
+            WHERE v.mes BETWEEN ? AND ?
+        ''', (mes_inicio, mes_fim))
+        for tipo, marca, modelo, codigo_ano, mes in cursor:
+            com_valor.setdefault((tipo, str(marca), modelo, codigo_ano), set()).add(mes)
+        
+        sem_valor = {}
+        cursor = self.conn.execute('''
+            SELECT tipo_veiculo, codigo_marca, codigo_modelo, codigo_ano_combustivel, mes
+            FROM valores_ausentes
+            WHERE mes BETWEEN ? AND ?
+        ''', (mes_inicio, mes_fim))
+        for tipo, marca, modelo, codigo_ano, mes in cursor:
+            sem_valor.setdefault((tipo, str(marca), modelo, codigo_ano), set()).add(mes)
+        
+        return com_valor, sem_valor
+    
+    def save_valores_ausentes(self, ausentes):
+        """Registra veículo-mês sem valor na API
+        
+        Args:
+            ausentes: Lista de tuplas (tipo_veiculo, codigo_marca, codigo_modelo, codigo_ano_combustivel, mes, inferido)
+        """
+        if not ausentes:
+            return
+        with self.write_lock:
+            self.conn.executemany('''
+                INSERT OR REPLACE INTO valores_ausentes
+                    (tipo_veiculo, codigo_marca, codigo_modelo, codigo_ano_combustivel, mes, inferido)
+                VALUES (?, ?, ?, ?, ?, ?)
+            ''', ausentes)
+    
+    def atualizar_completude_meses(self, meses):
+        """
+        Recalcula a completude dos meses e grava em completude_meses.
+        
+        Esperados = veículos de modelos_anos cujo ano-modelo já podia estar na tabela
+        do mês (ano <= ano do mês + ANTECEDENCIA_ANO_MODELO, ou Zero Km).
+        
+        Args:
+            meses: Lista de tuplas (mes YYYYMM, codigo_referencia)
+        
+        Returns:
+            list: Linhas de completude_meses dos meses informados
+        """
+        with self.write_lock:
+            for mes, codigo_referencia in meses:
+                esperados = self.conn.execute('''
+                    SELECT COUNT(*) FROM modelos_anos
+                    WHERE instr(codigo_ano_combustivel, '-') > 0
+                        AND (CAST(substr(codigo_ano_combustivel, 1, instr(codigo_ano_combustivel, '-') - 1) AS INTEGER) = ?
+                             OR CAST(substr(codigo_ano_combustivel, 1, instr(codigo_ano_combustivel, '-') - 1) AS INTEGER) <= ?)
+                ''', (int(CODIGO_ZERO_KM), mes // 100 + ANTECEDENCIA_ANO_MODELO)).fetchone()[0]
+                com_valor = self.conn.execute(
+                    'SELECT COUNT(*) FROM valores_historico WHERE mes = ?', (mes,)
+                ).fetchone()[0]
+                sem_valor = self.conn.execute(
+                    'SELECT COUNT(*) FROM valores_ausentes WHERE mes = ?', (mes,)
+                ).fetchone()[0]
+                self.conn.execute('''
+                    INSERT OR REPLACE INTO completude_meses (mes, codigo_referencia, esperados, com_valor, sem_valor)
+                    VALUES (?, ?, ?, ?, ?)
+                ''', (mes, codigo_referencia, esperados, com_valor, sem_valor))
+        return self.get_completude_meses([mes for mes, _ in meses])
+    
+    def get_completude_meses(self, meses=None):
+        """
+        Relatório de completude por mês (mais recente primeiro).
+        
+        Returns:
+            list: Linhas com mes, codigo_referencia, esperados, com_valor, sem_valor, atualizado_em
+        """
+        sql = 'SELECT mes, codigo_referencia, esperados, com_valor, sem_valor, atualizado_em FROM completude_meses'
+        if meses is None:
+            return self.conn.execute(f'{sql} ORDER BY mes DESC').fetchall()
+        marcadores = ', '.join('?' * len(meses))
+        return self.conn.execute(f'{sql} WHERE mes IN ({marcadores}) ORDER BY mes DESC', tuple(meses)).fetchall()
+    
+    def save_completude_faixa(self, mes, faixa, ordem, esperados, com_valor, sem_valor, erros):
+        """
+        Grava o marcador de completude de uma faixa de prioridade no mês.
+        
+        Returns:
+            bool: True se a faixa ficou completa (nenhum erro e nenhum veículo pendente)
+        """
+        completa = erros == 0 and com_valor + sem_valor >= esperados
+        with self.write_lock:
+            self.conn.execute('''
+                INSERT OR REPLACE INTO completude_faixas
+                    (mes, faixa, ordem, esperados, com_valor, sem_valor, erros, completa)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            ''', (int(mes), faixa, ordem, esperados, com_valor, sem_valor, erros, int(completa)))
+        return completa
+    
+    def get_completude_faixas(self, mes):
+        """
+        Completude das faixas de prioridade do mês, na ordem de prioridade.
+        
+        Returns:
+            list: Linhas com faixa, ordem, esperados, com_valor, sem_valor, erros, completa, concluida_em
+        """
+        return self.conn.execute('''
+            SELECT faixa, ordem, esperados, com_valor, sem_valor, erros, completa, concluida_em
+            FROM completude_faixas
+            WHERE mes = ?
+            ORDER BY ordem
+        ''', (int(mes),)).fetchall()
+    
+    def save_variacao_mensal(self, mes_anterior, mes, linhas, destaques):
+        """
+        Substitui o relatório de variação de um par de meses (src/analise/variacao.py).
+        
+        Args:
+            linhas: Tuplas na ordem das colunas de variacao_mensal (sem gerado_em)
+            destaques: Tuplas na ordem das colunas de variacao_destaques
+        """
+        with self.write_lock:
+            cursor = self.conn.cursor()
+            cursor.execute('BEGIN IMMEDIATE')
+            try:
+                chave = (int(mes), int(mes_anterior))
+                cursor.execute('DELETE FROM variacao_mensal WHERE mes = ? AND mes_anterior = ?', chave)
+                cursor.execute('DELETE FROM variacao_destaques WHERE mes = ? AND mes_anterior = ?', chave)
+                cursor.executemany('''
+                    INSERT INTO variacao_mensal (
+                        mes, mes_anterior, grupo, chave, nome, veiculos, subiram, cairam,
+                        variacao_media, variacao_mediana, variacao_ponderada, desvio_padrao,
+                        p05, p25, p75, p95, variacao_minima, variacao_maxima
+                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ''', linhas)
+                cursor.executemany('''
+                    INSERT INTO variacao_destaques (
+                        mes, mes_anterior, direcao, posicao, veiculo_id, valor_anterior, valor_atual, variacao
+                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                ''', destaques)
+                cursor.execute('COMMIT')
+            except Exception:
+                cursor.execute('ROLLBACK')
+                raise
+    
+    def get_variacao_mensal(self, mes, mes_anterior=None, grupo=None):
+        """
+        Agregados de variação gravados para o mês.
+        
+        Args:
+            mes: Mês YYYYMM do relatório
+            mes_anterior: Mês de comparação (None = todos os gravados para o mês)
+            grupo: 'total', 'tipo_veiculo', 'marca', 'ano_modelo' ou 'combustivel' (None = todos)
+        
+        Returns:
+            list: Linhas de variacao_mensal, maiores grupos primeiro
+        """
+        return self.conn.execute('''
+            SELECT * FROM variacao_mensal
+            WHERE mes = ? AND (? IS NULL OR mes_anterior = ?) AND (? IS NULL OR grupo = ?)
+            ORDER BY mes_anterior, grupo, veiculos DESC
+        ''', (int(mes), mes_anterior, mes_anterior, grupo, grupo)).fetchall()
+    
+    def get_destaques_variacao(self, mes, mes_anterior=None):
+        """
+        Maiores altas e quedas gravadas para o mês, com a descrição do veículo.
+        
+        Args:
+            mes: Mês YYYYMM do relatório
+            mes_anterior: Mês de comparação (None = todos os gravados para o mês)
+        
+        Returns:
+            list: Linhas com direcao, posicao, variacao, valores e colunas de veiculos
+        """
+        return self.conn.execute('''
+            SELECT d.direcao, d.posicao, d.mes_anterior, d.variacao, d.valor_anterior, d.valor_atual,
+                   v.codigo_fipe, v.marca, v.modelo, v.ano_modelo, v.combustivel
+            FROM variacao_destaques d
+            JOIN main.veiculos v ON v.id = d.veiculo_id
+            WHERE d.mes = ? AND (? IS NULL OR d.mes_anterior = ?)
+            ORDER BY d.mes_anterior, d.direcao, d.posicao
+        ''', (int(mes), mes_anterior, mes_anterior)).fetchall()
+    
+    def save_quarentena_valores(self, mes, linhas, veiculo_ids=None):
+        """
+        Substitui a quarentena do mês pelo resultado da validação (src/analise/qualidade.py).
+        Liberações continuam valendo enquanto o valor liberado não mudar.
+        
+        Args:
+            mes: Mês YYYYMM validado
+            linhas: Tuplas (veiculo_id, motivo, valor_centavos, valor_anterior, variacao, z_robusto, detalhe)
+            veiculo_ids: Só substitui a quarentena destes veículos (None = mês inteiro)
+        
+        Returns:
+            int: Veículos retidos no mês (sem liberação), entre os validados
+        """
+        mes = int(mes)
+        escopo = '' if veiculo_ids is None else ' AND veiculo_id IN (SELECT value FROM json_each(?))'
+        parametros = (mes,) if veiculo_ids is None else (mes, json.dumps([int(i) for i in veiculo_ids]))
+        with self.write_lock:
+            cursor = self.conn.cursor()
+            cursor.execute('BEGIN IMMEDIATE')
+            try:
+                cursor.execute(f'''
+                    DELETE FROM quarentena_valores
+                    WHERE mes = ?{escopo} AND (
+                        liberado_em IS NULL
+                        OR valor_centavos IS NOT (
+                            SELECT v.valor_centavos FROM main.valores v
+                            WHERE v.veiculo_id = quarentena_valores.veiculo_id AND v.mes = quarentena_valores.mes
+                        )
+                    )
+                ''', parametros)
+                cursor.executemany('''
+                    INSERT OR IGNORE INTO quarentena_valores (
+                        veiculo_id, mes, motivo, valor_centavos, valor_anterior, variacao, z_robusto, detalhe
+                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                ''', [(veiculo_id, mes, *resto) for veiculo_id, *resto in linhas])
+                retidos = cursor.execute(
+                    f'''SELECT COUNT(DISTINCT veiculo_id) FROM quarentena_valores
+                        WHERE mes = ?{escopo} AND liberado_em IS NULL''',
+                    parametros
+                ).fetchone()[0]
+                cursor.execute('COMMIT')
+            except Exception:
+                cursor.execute('ROLLBACK')
+                raise
+        return retidos
+    
+    def get_quarentena_valores(self, mes=None, liberados=False):
+        """
+        Valores em quarentena, com a descrição atual do veículo.
+        
+        Args:
+            mes: Mês YYYYMM (None = todos)
+            liberados: Se True, inclui os já liberados
+        
+        Returns:
+            list: Linhas de quarentena_valores + codigo_fipe, marca, modelo, ano_modelo, combustivel
+        """
+        return self.conn.execute('''
+            SELECT q.*, d.codigo_fipe, d.marca, d.modelo, d.ano_modelo, d.combustivel
+            FROM quarentena_valores q
+            JOIN main.veiculos d ON d.id = q.veiculo_id
+            WHERE (? IS NULL OR q.mes = ?) AND (? OR q.liberado_em IS NULL)
+            ORDER BY q.mes, q.motivo, q.veiculo_id
+        ''', (mes, mes, bool(liberados))).fetchall()
+    
+    def liberar_quarentena_valores(self, mes, veiculo_ids=None):
+        """
+        Libera valores retidos (passam a ir ao Supabase na próxima sincronização e,
+        com o log ativo, voltam ao log da sincronização contínua).
+        Liberar uma deriva aceita os textos novos do veículo.
+        
+        Args:
+            mes: Mês YYYYMM
+            veiculo_ids: Veículos a liberar (None = todos os retidos do mês)
+        
+        Returns:
+            int: Veículos liberados
+        """
+        mes = int(mes)
+        with self.write_lock:
+            cursor = self.conn.cursor()
+            cursor.execute('BEGIN IMMEDIATE')
+            try:
+                filtro = '' if veiculo_ids is None else ' AND veiculo_id = ?'
+                parametros = [(mes,)] if veiculo_ids is None else [(mes, int(veiculo_id)) for veiculo_id in veiculo_ids]
+                # Já revisados: com o log ativo, voltam a ele para a sincronização contínua
+                registrar = self.log_alteracoes_ativo()
+                liberados = set()
+                for parametro in parametros:
+                    liberados.update(row[0] for row in cursor.execute(f'''
+                        SELECT DISTINCT veiculo_id FROM quarentena_valores
+                        WHERE mes = ? AND liberado_em IS NULL{filtro}
+                    ''', parametro))
+                    cursor.execute(f'''
+                        DELETE FROM veiculos_alterados WHERE veiculo_id IN (
+                            SELECT veiculo_id FROM quarentena_valores
+                            WHERE mes = ? AND motivo = 'deriva' AND liberado_em IS NULL{filtro}
+                        )
+                    ''', parametro)
+                    if registrar:
+                        cursor.execute(f'''
+                            INSERT INTO alteracoes (tabela, chave)
+                            SELECT 'valores', json_array(veiculo_id, mes)
+                            FROM quarentena_valores
+                            WHERE mes = ? AND liberado_em IS NULL{filtro}
+                            GROUP BY veiculo_id
+                        ''', parametro)
+                    cursor.execute(f'''
+                        UPDATE quarentena_valores SET liberado_em = CURRENT_TIMESTAMP
+                        WHERE mes = ? AND liberado_em IS NULL{filtro}
+                    ''', parametro)
+                cursor.execute('COMMIT')
+            except Exception:
+                cursor.execute('ROLLBACK')
+                raise
+        return len(liberados)
+    
+    def get_veiculos_alterados(self):
+        """
+        Veículos com deriva pendente: textos publicados (anteriores) e atuais.
+        
+        Returns:
+            list: Linhas (veiculo_id, codigo_fipe, marca, modelo, combustivel,
+                  codigo_fipe_atual, marca_atual, modelo_atual, combustivel_atual)
+        """
+        return self.conn.execute('''
+            SELECT a.veiculo_id, a.codigo_fipe, a.marca, a.modelo, a.combustivel,
+                   d.codigo_fipe AS codigo_fipe_atual, d.marca AS marca_atual,
+                   d.modelo AS modelo_atual, d.combustivel AS combustivel_atual
+            FROM veiculos_alterados a
+            JOIN main.veiculos d ON d.id = a.veiculo_id
+            ORDER BY a.veiculo_id
+        ''').fetchall()
+    
+    def get_anos_por_modelo(self, codigo_marca, tipo_veiculo=1):
+        """
+        Retorna os anos/combustível já conhecidos de cada modelo de uma marca.
+        Modelos cadastrados sem anos aparecem com set vazio.
+        
+        Returns:
+            dict: {codigo_modelo (str): set de códigos de ano ('2024-1', ...)}
+        """
+        cursor = self.conn.cursor()
+        cursor.execute('''
+            SELECT m.codigo, ma.codigo_ano_combustivel
+            FROM modelos m
+            LEFT JOIN modelos_anos ma
+                ON ma.codigo_marca = m.codigo_marca
+                AND ma.codigo_modelo = m.codigo
+                AND ma.tipo_veiculo = m.tipo_veiculo
+            WHERE m.codigo_marca = ? AND m.tipo_veiculo = ?
+        ''', (codigo_marca, tipo_veiculo))
+        
+        anos_por_modelo = {}
+        for codigo_modelo, codigo_ano in cursor.fetchall():
+            anos = anos_por_modelo.setdefault(str(codigo_modelo), set())
+            if codigo_ano:
+                anos.add(codigo_ano)
+        return anos_por_modelo
+    
+    def ativar_log_alteracoes(self):
+        """
+        Cria os triggers que registram em 'alteracoes' cada linha inserida ou atualizada
+        em marcas, anos_combustivel, modelos, modelos_anos e valores (sincronização contínua).
+        Idempotente; o que foi gravado antes de ativar fica para o sincronizar_supabase.py.
+        """
+        with self.write_lock:
+            self.conn.execute('BEGIN IMMEDIATE')
+            try:
+                for tabela, colunas in _CHAVES_LOG_ALTERACOES.items():
+                    chave = f"json_array({', '.join('NEW.' + c for c in colunas)})"
+                    for evento in ('INSERT', 'UPDATE'):
+                        self.conn.execute(f'''
+                            CREATE TRIGGER IF NOT EXISTS log_{tabela}_{evento.lower()}
+                            AFTER {evento} ON {tabela}
+                            BEGIN
+                                INSERT INTO alteracoes (tabela, chave) VALUES ('{tabela}', {chave});
+                            END
+                        ''')
+                self.conn.execute('COMMIT')
+            except Exception:
+                self.conn.execute('ROLLBACK')
+                raise
+    
+    def desativar_log_alteracoes(self, limpar=False):
+        """
+        Remove os triggers do log de alterações (gravações deixam de ser registradas).
+        
+        Args:
+            limpar: Também descarta as alterações ainda não enviadas
+        """
+        with self.write_lock:
+            self.conn.execute('BEGIN IMMEDIATE')
+            try:
+                for tabela in _CHAVES_LOG_ALTERACOES:
+                    for evento in ('insert', 'update'):
+                        self.conn.execute(f'DROP TRIGGER IF EXISTS log_{tabela}_{evento}')
+                self.conn.execute('DELETE FROM sincronizacao_continua')
+                if limpar:
+                    self.conn.execute('DELETE FROM alteracoes')
+                self.conn.execute('COMMIT')
+            except Exception:
+                self.conn.execute('ROLLBACK')
+                raise
+    
+    def log_alteracoes_ativo(self):
+        """True se os triggers do log de alterações existem"""
+        return self.conn.execute(
+            "SELECT COUNT(*) FROM sqlite_master WHERE type = 'trigger' AND name LIKE 'log\\_%' ESCAPE '\\'"
+        ).fetchone()[0] > 0
+    
+    def get_alteracoes_pendentes(self):
+        """
+        Tamanho do log de alterações. Os ids são contínuos (só saem as mais antigas),
+        então a contagem vem do intervalo de ids, sem varrer a tabela.
+        
+        Returns:
+            tuple: (pendentes, criado_em da mais antiga em epoch ou None)
+        """
+        row = self.conn.execute('''
+            SELECT MAX(id) - MIN(id) + 1,
+                   (SELECT criado_em FROM alteracoes ORDER BY id LIMIT 1)
+            FROM alteracoes
+        ''').fetchone()
+        return (row[0] or 0), row[1]
+    
+    def _ultimo_id_lote(self, limite):
+        """id da alteração que fecha o lote das 'limite' mais antigas (None = log vazio)"""
+        ultimo_id = self.conn.execute(
+            'SELECT id FROM alteracoes ORDER BY id LIMIT 1 OFFSET ?', (max(limite, 1) - 1,)
+        ).fetchone()
+        return ultimo_id[0] if ultimo_id else self.conn.execute('SELECT MAX(id) FROM alteracoes').fetchone()[0]
+    
+    def get_valores_lote_alteracoes(self, limite):
+        """
+        Veículos com valores no próximo lote do log, por mês (para validar o lote antes do envio).
+        
+        Args:
+            limite: Máximo de alterações do lote (o mesmo de ler_lote_alteracoes)
+        
+        Returns:
+            tuple: (ultimo_id, {mes: [veiculo_id]}); ultimo_id None se o log está vazio
+        """
+        ultimo_id = self._ultimo_id_lote(limite)
+        if ultimo_id is None:
+            return None, {}
+        por_mes = {}
+        for veiculo_id, mes in self.conn.execute('''
+            SELECT DISTINCT json_extract(chave, '$[0]'), json_extract(chave, '$[1]')
+            FROM alteracoes WHERE tabela = 'valores' AND id <= ?
+        ''', (ultimo_id,)):
+            por_mes.setdefault(mes, []).append(veiculo_id)
+        return ultimo_id, por_mes
+    
+    def ler_lote_alteracoes(self, limite, ultimo_id=None):
+        """
+        Lê as alterações mais antigas do log (até 'limite') e as linhas atuais correspondentes,
+        sem duplicatas. Uma chave gravada várias vezes no lote vira uma linha só.
+        
+        Valores em quarentena não saem (voltam ao log ao serem liberados). Valores
+        regravados depois do lote ficam para o lote da alteração nova: o valor atual
+        só sai depois de validado (get_valores_lote_alteracoes + validar_lote_alteracoes).
+        
+        Args:
+            limite: Máximo de alterações do lote
+            ultimo_id: Fecha o lote neste id, o mesmo da validação (None = calculado por 'limite')
+        
+        Returns:
+            tuple: (ultimo_id, alteracoes, {tabela: [sqlite3.Row]} em ordem de dependência);
+                   ultimo_id None se o log está vazio
+        """
+        if ultimo_id is None:
+            ultimo_id = self._ultimo_id_lote(limite)
+        if ultimo_id is None:
+            return None, 0, {}
+        
+        # Uma transação de leitura: o lote não vê gravações feitas no meio da consulta
+        with self.write_lock:
+            self.conn.execute('BEGIN')
+            try:
+                alteracoes = self.conn.execute(
+                    'SELECT COUNT(*) FROM alteracoes WHERE id <= ?', (ultimo_id,)
+                ).fetchone()[0]
+                linhas = {}
+                for tabela, colunas in _CHAVES_LOG_ALTERACOES.items():
+                    chaves = f'''
+                        SELECT {', '.join(f"json_extract(chave, '$[{i}]')" for i in range(len(colunas)))}
+                        FROM alteracoes WHERE tabela = '{tabela}' AND id <= {int(ultimo_id)}
+                    '''
+                    if tabela == 'valores':
+                        # Sem os em quarentena e os regravados depois do lote (saem com a alteração nova)
+                        sql = f'''
+                            {_sql_valores_fipe("valores", "veiculos")}
+                            WHERE (v.veiculo_id, v.mes) IN ({chaves})
+                              AND (v.veiculo_id, v.mes) NOT IN (
+                                  SELECT json_extract(chave, '$[0]'), json_extract(chave, '$[1]')
+                                  FROM alteracoes WHERE tabela = 'valores' AND id > {int(ultimo_id)}
+                              )
+                              AND NOT {_SQL_VALOR_RETIDO}
+                        '''
+                    else:
+                        sql = _SQL_LINHAS_ALTERADAS[tabela].format(chaves=chaves)
+                    rows = self.conn.execute(sql).fetchall()
+                    if rows:
+                        linhas[tabela] = rows
+                self.conn.execute('COMMIT')
+            except Exception:
+                self.conn.execute('ROLLBACK')
+                raise
+        return ultimo_id, alteracoes, linhas
+    
+    def confirmar_alteracoes(self, ultimo_id):
+        """Remove do log as alterações já enviadas (id até ultimo_id) e registra o progresso"""
+        with self.write_lock:
+            self.conn.execute('BEGIN IMMEDIATE')
+            try:
+                self.conn.execute('DELETE FROM alteracoes WHERE id <= ?', (ultimo_id,))
+                self._registrar_progresso()
+                self.conn.execute('COMMIT')
+            except Exception:
+                self.conn.execute('ROLLBACK')
+                raise
+    
+    def registrar_progresso_sincronizacao(self):
+        """Sincronizador em dia (sem falhas): mantém o backpressure valendo para o crawler"""
+        with self.write_lock:
+            self._registrar_progresso()
+    
+    def _registrar_progresso(self):
+        self.conn.execute(
+            'INSERT OR REPLACE INTO sincronizacao_continua (id, progresso_em) VALUES (1, ?)',
+            (time.time(),)
+        )
+    
+    def aguardar_sincronizacao(self):
+        """
+        Backpressure da sincronização contínua: antes de uma gravação em lote, espera
+        enquanto o log tiver mais de LIMITE_PENDENTES_SINCRONIZACAO alterações e o
+        sincronizador estiver progredindo. Consulta o banco no máximo 1 vez por segundo;
+        sincronizador parado ou sem conseguir enviar não segura a coleta.
+        
+        Returns:
+            float: Segundos esperados
+        """
+        agora = time.monotonic()
+        if agora < self._proxima_verificacao_pendentes:
+            return 0.0
+        self._proxima_verificacao_pendentes = agora + 1.0
+        
+        inicio = agora
+        avisou = False
+        while True:
+            pendentes, progresso_em = self.conn.execute('''
+                SELECT (SELECT MAX(id) - MIN(id) + 1 FROM alteracoes),
+                       (SELECT progresso_em FROM sincronizacao_continua WHERE id = 1)
+            ''').fetchone()
+            if (not pendentes or pendentes <= LIMITE_PENDENTES_SINCRONIZACAO or progresso_em is None
+                    or time.time() - progresso_em > SINCRONIZACAO_INATIVA_APOS):
+                break
+            if not avisou:
+                print(f"⏸️  {pendentes} alterações aguardando o Supabase: gravação em espera")
+                avisou = True
+            time.sleep(0.5)
+        
+        espera = time.monotonic() - inicio
+        if avisou:
+            print(f"▶️  Gravação retomada após {espera:.1f}s")
+        return espera
+    
     def close(self):
         """Fecha conexão com banco local"""
         self.conn.close()
@@ -497,3 +2301,17 @@ class FipeLocalCache:
         """Fecha conexão ao destruir objeto"""
         if hasattr(self, 'conn'):
             self.conn.close()
+
+
+def _recortar_serie(meses, centavos, de, ate):
+    """Pontos de uma série decodificada dentro de [de, ate] (meses em ordem crescente)"""
+    inicio = 0 if de is None else bisect_left(meses, de)
+    fim = len(meses) if ate is None else bisect_right(meses, ate)
+    if inicio == 0 and fim == len(meses):
+        return meses, centavos
+    return meses[inicio:fim], centavos[inicio:fim]
+
+
+def _sao_registros(itens):
+    """True se a lista já contém registros tipados (tuplas) em vez de dicts da API"""
+    return bool(itens) and isinstance(itens[0], tuple)
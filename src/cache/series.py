@@ -0,0 +1,82 @@
+"""
+Codificação compacta da série de preços de um veículo (tabela series_valores).
+
+Um bloco por veículo, com os pontos (mês, centavos) em ordem de mês:
+    int32 × pontos   primeiro mês YYYYMM, depois a diferença para o mês anterior
+                     (1 entre meses consecutivos, 89 de dezembro para janeiro)
+    int64 × pontos   primeiro valor em centavos, depois a diferença para o anterior
+comprimido com deflate (sem cabeçalho zlib; a quantidade de pontos fica na tabela).
+
+As diferenças são pequenas e repetitivas, então o deflate as reduz a ~5 bytes por
+ponto; decodificar é descompressão + soma acumulada, ambas em C (itertools.accumulate).
+"""
+import sys
+import zlib
+from array import array
+from itertools import accumulate
+from operator import sub
+
+
+# Deflate cru com janela de 512 bytes e pouca memória: blocos têm centenas de bytes
+# e o custo de inicializar o compressor domina (janela padrão = ~2x mais lento)
+JANELA_DEFLATE = -9
+NIVEL_DEFLATE = 6
+MEMORIA_DEFLATE = 1
+
+_BIG_ENDIAN = sys.byteorder == 'big'  # Blocos são little-endian em qualquer máquina
+
+
+def mes_para_indice(mes):
+    """YYYYMM → meses desde o ano 0 (distância entre meses = subtração)"""
+    return (mes // 100) * 12 + mes % 100 - 1
+
+
+def indice_para_mes(indice):
+    """Inverso de mes_para_indice"""
+    return (indice // 12) * 100 + indice % 12 + 1
+
+
+def codificar_serie(pontos):
+    """
+    Bloco de uma série.
+    
+    Args:
+        pontos: Pares (mes YYYYMM, valor_centavos) em ordem crescente de mês
+    
+    Returns:
+        bytes: Bloco comprimido
+    """
+    meses = [mes for mes, _ in pontos]
+    valores = [centavos for _, centavos in pontos]
+    diferencas_meses = array('i', meses[:1])
+    diferencas_meses.extend(map(sub, meses[1:], meses))
+    diferencas_valores = array('q', valores[:1])
+    diferencas_valores.extend(map(sub, valores[1:], valores))
+    if _BIG_ENDIAN:
+        diferencas_meses.byteswap()
+        diferencas_valores.byteswap()
+    
+    compressor = zlib.compressobj(NIVEL_DEFLATE, zlib.DEFLATED, JANELA_DEFLATE, MEMORIA_DEFLATE)
+    return compressor.compress(diferencas_meses.tobytes() + diferencas_valores.tobytes()) + compressor.flush()
+
+
+def decodificar_serie(bloco, pontos):
+    """
+    Pontos de um bloco de codificar_serie.
+    
+    Args:
+        bloco: Bloco comprimido
+        pontos: Quantidade de pontos (coluna series_valores.pontos)
+    
+    Returns:
+        tuple: (array('i') de meses YYYYMM, array('q') de centavos)
+    """
+    dados = zlib.decompress(bloco, JANELA_DEFLATE)
+    diferencas_meses = array('i')
+    diferencas_meses.frombytes(dados[:4 * pontos])
+    diferencas_valores = array('q')
+    diferencas_valores.frombytes(dados[4 * pontos:])
+    if _BIG_ENDIAN:
+        diferencas_meses.byteswap()
+        diferencas_valores.byteswap()
+    return array('i', accumulate(diferencas_meses)), array('q', accumulate(diferencas_valores))
@@ -29,6 +29,19 @@ def get_delay_padrao():
 # Delay fixo após receber erro 429 (Too Many Requests)
 DELAY_RATE_LIMIT_429 = 30  # segundos
 
+# Tempo médio de resposta da API FIPE (sem o delay), usado nas estimativas de tempo
+LATENCIA_MEDIA_API = 0.6  # segundos
+
+# Teto global de requisições por segundo, somando todos os workers do processo
+# (token bucket em src/crawler/limitador.py)
+TAXA_MAXIMA_API = 2.0
+
+# Requisições que podem sair de uma vez depois de um período ocioso
+RAJADA_API = 4
+
+# Intervalo mínimo entre consultas do monitor de tabela de referência
+INTERVALO_MONITOR_REFERENCIA = 30  # minutos
+
 
 # =============================================================================
 # CONFIGURAÇÕES DE RETRY
@@ -48,9 +61,72 @@ RETRY_BASE_WAIT = 5  # segundos
 # Número de workers paralelos para popular banco
 NUM_WORKERS = 5
 
+# Requisições por sub-unidade ao quebrar o plano de uma marca grande entre workers
+LOTE_SUBUNIDADE = 15
+
+# Workers por estágio do pipeline de popular_completo.py
+# (None em 'anos' = max_workers do script menos os workers de 'modelos')
+PIPELINE_WORKERS = {
+    'marcas': 1,
+    'modelos': 2,
+    'plano': 1,
+    'anos': None,
+    'gravacao': 1
+}
+
+# Capacidade das filas entre estágios (backpressure); a do escritor é 10x maior
+PIPELINE_TAMANHO_FILA = 20
+
 # Tamanho dos lotes para upload ao Supabase
 BATCH_SIZE = 1000
 
+# Sincronização contínua (scripts/3_sincronizacao/sincronizar_continuo.py):
+# alterações por micro-lote e atraso máximo até enviar um lote incompleto
+LOTE_SINCRONIZACAO_CONTINUA = 500
+ATRASO_MAXIMO_SINCRONIZACAO = 5  # segundos
+
+# Backpressure: acima deste número de alterações pendentes no log, as gravações em
+# lote do cache esperam o sincronizador (só enquanto ele estiver enviando normalmente)
+LIMITE_PENDENTES_SINCRONIZACAO = 20000
+
+# Sincronizador sem progresso há mais que isso (parado ou Supabase fora) não segura o crawler
+SINCRONIZACAO_INATIVA_APOS = 30  # segundos
+
+
+# =============================================================================
+# SERVIÇO DE CONSULTA LOCAL (scripts/4_consulta/servidor_consulta.py)
+# =============================================================================
+
+# Endereço padrão do servidor HTTP de preços
+HOST_CONSULTA = '127.0.0.1'
+PORTA_CONSULTA = 8765
+
+# Conexões somente leitura no pool (= consultas simultâneas ao SQLite)
+CONEXOES_CONSULTA = 8
+
+# Chaves (veículo/código FIPE + mês) mantidas no LRU em memória
+TAMANHO_CACHE_CONSULTA = 50000
+
+# Itens aceitos por requisição em POST /lote
+MAX_ITENS_LOTE_CONSULTA = 1000
+
+# Latências guardadas por rota para p50/p99 em GET /metricas
+AMOSTRAS_LATENCIA_CONSULTA = 10000
+
+# Snapshot binário dos preços do mês (src/consulta/snapshot.py), lido via mmap pelos workers
+ARQUIVO_SNAPSHOT_PRECOS = 'fipe_precos.snapshot'
+
+
+# =============================================================================
+# VALIDAÇÃO DOS VALORES ANTES DA SINCRONIZAÇÃO (src/analise/qualidade.py)
+# =============================================================================
+
+# Salto mês a mês suspeito: z-score robusto (mediana/MAD da variação do tipo de veículo)
+# acima do limite E variação acima do mínimo (evita quarentena de ajustes pequenos
+# em meses em que quase nada muda e o MAD é minúsculo)
+LIMITE_Z_ROBUSTO = 10.0
+VARIACAO_MINIMA_QUARENTENA = 30.0  # % (para cima ou para baixo)
+
 
 # =============================================================================
 # CONFIGURAÇÕES DA API FIPE
@@ -73,6 +149,34 @@ TIPO_VEICULO_CAMINHOES = 3
 # Código especial para veículos Zero Km
 CODIGO_ZERO_KM = "32000"
 
+# A FIPE lista um ano-modelo a partir do ano anterior (ex: modelo 2025 desde 2024);
+# meses mais antigos que isso não são consultados na carga histórica
+ANTECEDENCIA_ANO_MODELO = 1
+
+# Veículos sem valor na API ficam em quarentena (tabela descontinuados) e são
+# reconsultados a cada 1, 2, 4, 8... meses conforme as faltas, até este teto
+MAX_INTERVALO_DESCONTINUADOS = 12  # meses
+
+# Faixas de prioridade da atualização mensal de valores (src/crawler/prioridades.py),
+# processadas e publicadas em ordem; o que não cair em nenhuma vai para a faixa 'demais'.
+# Filtros opcionais: 'tipos', 'marcas' (códigos) e 'anos_recentes' (Zero Km sempre entra)
+PRIORIDADES_VALORES = [
+    {'nome': 'carros_recentes', 'tipos': (1,), 'anos_recentes': 5},
+    {'nome': 'motos_recentes', 'tipos': (2,), 'anos_recentes': 5},
+    {'nome': 'recentes', 'anos_recentes': 10},
+]
+
+# Códigos de combustível FIPE
+COMBUSTIVEIS = {
+    1: "Gasolina",
+    2: "Álcool/Etanol",
+    3: "Diesel",
+    4: "Elétrico",
+    5: "Flex",
+    6: "Híbrido",
+    7: "Gás Natural"
+}
+
 
 # =============================================================================
 # CONVERSÃO DE MÊS DE REFERÊNCIA
@@ -115,40 +219,9 @@ def mes_pt_para_yyyymm(mes_referencia):
         >>> mes_pt_para_yyyymm("202601")
         "202601"
     """
-    if not mes_referencia:
-        return None
-    
-    # Se já está no formato YYYYMM, retorna direto
-    if mes_referencia.isdigit() and len(mes_referencia) == 6:
-        return mes_referencia
-    
-    try:
-        # Remove espaços extras e converte para minúsculas
-        mes_ref_limpo = mes_referencia.strip().lower()
-        
-        # Separa mês e ano (trata ambos formatos: "/" e " de ")
-        if '/' in mes_ref_limpo:
-            mes_nome, ano = mes_ref_limpo.split('/')
-        elif ' de ' in mes_ref_limpo:
-            mes_nome, ano = mes_ref_limpo.split(' de ')
-        else:
-            raise ValueError(f"Formato inválido: {mes_referencia}")
-        
-        mes_nome = mes_nome.strip()
-        ano = ano.strip()
-        
-        # Busca número do mês
-        if mes_nome not in MESES_PT:
-            raise ValueError(f"Mês inválido: {mes_nome}")
-        
-        mes_num = MESES_PT[mes_nome]
-        
-        # Formata como YYYYMM
-        return f"{ano}{mes_num:02d}"
-    
-    except Exception as e:
-        print(f"⚠️ Erro ao converter mês '{mes_referencia}': {e}")
-        return None
+    # Implementação única (memoizada) em src/normalizacao.py
+    from src.normalizacao import mes_para_yyyymm
+    return mes_para_yyyymm(mes_referencia)
 
 
 def yyyymm_para_mes_display(yyyymm):
@@ -0,0 +1,8 @@
+"""
+Módulo de consulta de preços sobre o cache local (somente leitura)
+"""
+from .precos import ConsultaPrecos
+from .servidor import criar_servidor
+from .snapshot import SnapshotPrecos, exportar_snapshot
+
+__all__ = ['ConsultaPrecos', 'criar_servidor', 'SnapshotPrecos', 'exportar_snapshot']
@@ -0,0 +1,322 @@
+"""
+Consulta de preços direto do cache local (fipe_local.db), sem rede.
+
+Substitui, para leitura, o FipeCache.get_valor_fipe (Supabase, filtro em 4 colunas
+e ordenação por data_consulta a cada chamada) e a API FIPE ao vivo:
+- pool de conexões somente leitura (mode=ro, query_only), com os arquivos anuais
+  de valores anexados como no FipeLocalCache;
+- consultas fixas pelos índices existentes (veiculos por chave ou codigo_fipe,
+  valores por (veiculo_id, mes)), reaproveitadas pelo cache de statements do sqlite3;
+- LRU em memória das chaves mais consultadas, esvaziado quando o banco muda
+  (PRAGMA data_version, verificado no máximo 1 vez por segundo); se a mudança
+  criou ou removeu arquivos anuais, as conexões do pool são refeitas com os anexos atuais.
+"""
+import sqlite3
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from pathlib import Path
+from queue import LifoQueue
+from threading import Lock
+
+from ..cache.fipe_local_cache import MAX_ARQUIVOS_ANEXADOS, anos_arquivados, caminho_arquivo_valores
+from ..config import CONEXOES_CONSULTA, TAMANHO_CACHE_CONSULTA
+from ..normalizacao import centavos_para_texto
+
+
+_COLUNAS_VEICULO = '''
+    id, codigo_fipe, tipo_veiculo, codigo_marca, marca, codigo_modelo, modelo,
+    ano_modelo, codigo_combustivel, combustivel
+'''
+
+_SQL_VEICULO = f'''
+    SELECT {_COLUNAS_VEICULO} FROM veiculos
+    WHERE tipo_veiculo = ? AND codigo_marca = ? AND codigo_modelo = ?
+        AND ano_modelo = ? AND codigo_combustivel = ?
+'''
+
+_SQL_VEICULOS_CODIGO_FIPE = f'''
+    SELECT {_COLUNAS_VEICULO} FROM veiculos
+    WHERE codigo_fipe = ?
+    ORDER BY tipo_veiculo, ano_modelo DESC, codigo_combustivel
+'''
+
+_SQL_VALOR_MES = '''
+    SELECT mes, valor_centavos, codigo_referencia, data_consulta FROM valores_historico
+    WHERE veiculo_id = ? AND mes = ?
+'''
+
+_SQL_VALOR_RECENTE = '''
+    SELECT mes, valor_centavos, codigo_referencia, data_consulta FROM valores_historico
+    WHERE veiculo_id = ?
+    ORDER BY mes DESC LIMIT 1
+'''
+
+_SQL_HISTORICO = '''
+    SELECT mes, valor_centavos FROM valores_historico
+    WHERE veiculo_id = ?
+    ORDER BY mes
+'''
+
+# Campos da chave de um veículo (parâmetros das consultas e itens do lote)
+CAMPOS_VEICULO = ('tipo_veiculo', 'codigo_marca', 'codigo_modelo', 'ano_modelo', 'codigo_combustivel')
+
+
+class ConsultaPrecos:
+    """
+    Consultas de preço thread-safe sobre o cache local, para o servidor HTTP
+    (src/consulta/servidor.py) ou uso direto por outras aplicações Python.
+    """
+    
+    def __init__(self, db_path='fipe_local.db', conexoes=CONEXOES_CONSULTA, tamanho_cache=TAMANHO_CACHE_CONSULTA):
+        """
+        Args:
+            db_path: Banco principal (precisa existir; nunca é alterado)
+            conexoes: Conexões somente leitura no pool (= consultas simultâneas)
+            tamanho_cache: Chaves no LRU (0 = sem cache)
+        """
+        if not Path(db_path).exists():
+            raise FileNotFoundError(f"Banco local não encontrado: {db_path}")
+        self.db_path = db_path
+        self.tamanho_cache = tamanho_cache
+        
+        # Pool de (geração, conexão): a geração muda quando os arquivos anuais mudam,
+        # e conexões de gerações anteriores são refeitas ao serem emprestadas
+        self._anos = anos_arquivados(db_path)[:MAX_ARQUIVOS_ANEXADOS]
+        self._geracao = 0
+        self._pool = LifoQueue()
+        for _ in range(max(conexoes, 1)):
+            self._pool.put((self._geracao, self._conectar()))
+        
+        self._cache = OrderedDict()
+        self._cache_lock = Lock()
+        self.acertos = 0
+        self.falhas = 0
+        
+        # Detecta gravações de outros processos (atualização mensal, sincronização)
+        self._sentinela = self._conectar()
+        self._sentinela_lock = Lock()
+        self._versao = self._sentinela.execute('PRAGMA data_version').fetchone()[0]
+        self._proxima_verificacao = time.monotonic() + 1.0
+    
+    def _conectar(self):
+        """Conexão somente leitura com os arquivos anuais anexados e a view valores_historico"""
+        uri = Path(self.db_path).resolve().as_uri() + '?mode=ro'
+        conn = sqlite3.connect(uri, uri=True, check_same_thread=False, cached_statements=32)
+        
+        partes = ['SELECT veiculo_id, mes, valor_centavos, codigo_referencia, data_consulta FROM main.valores']
+        for ano in self._anos:
+            arquivo_uri = caminho_arquivo_valores(self.db_path, ano).resolve().as_uri() + '?mode=ro'
+            conn.execute(f'ATTACH DATABASE ? AS arq_{ano}', (arquivo_uri,))
+            partes.append(
+                f'SELECT veiculo_id, mes, valor_centavos, codigo_referencia, data_consulta FROM arq_{ano}.valores'
+            )
+        conn.execute(f"CREATE TEMP VIEW valores_historico AS {' UNION ALL '.join(partes)}")
+        # Depois da view TEMP: query_only barra até escritas no esquema temporário
+        conn.execute('PRAGMA query_only = 1')
+        return conn
+    
+    @contextmanager
+    def _conexao(self):
+        """Empresta uma conexão do pool (espera se todas estiverem em uso)"""
+        geracao, conn = self._pool.get()
+        try:
+            if geracao != self._geracao:
+                # Anexos e view valores_historico de antes de um arquivamento: refaz a conexão
+                conn.close()
+                geracao, conn = self._geracao, self._conectar()
+            yield conn
+        finally:
+            self._pool.put((geracao, conn))
+    
+    def _verificar_versao(self):
+        """
+        Esvazia o LRU se outro processo gravou no banco desde a última verificação.
+        Se os arquivos anuais mudaram (arquivar_ano), passa o pool para uma nova geração.
+        """
+        agora = time.monotonic()
+        if agora < self._proxima_verificacao:
+            return
+        with self._sentinela_lock:
+            if agora < self._proxima_verificacao:
+                return
+            self._proxima_verificacao = agora + 1.0
+            versao = self._sentinela.execute('PRAGMA data_version').fetchone()[0]
+            if versao != self._versao:
+                self._versao = versao
+                anos = anos_arquivados(self.db_path)[:MAX_ARQUIVOS_ANEXADOS]
+                if anos != self._anos:
+                    self._anos = anos
+                    self._geracao += 1
+                self.limpar_cache()
+    
+    def _em_cache(self, chave, calcular):
+        """Resultado do LRU ou calculado (e guardado) com uma conexão do pool"""
+        self._verificar_versao()
+        if not self.tamanho_cache:
+            with self._conexao() as conn:
+                return calcular(conn)
+        
+        with self._cache_lock:
+            if chave in self._cache:
+                self._cache.move_to_end(chave)
+                self.acertos += 1
+                return self._cache[chave]
+            self.falhas += 1
+        
+        with self._conexao() as conn:
+            resultado = calcular(conn)
+        
+        with self._cache_lock:
+            self._cache[chave] = resultado
+            self._cache.move_to_end(chave)
+            while len(self._cache) > self.tamanho_cache:
+                self._cache.popitem(last=False)
+        return resultado
+    
+    def limpar_cache(self):
+        """Descarta o LRU (próximas consultas vão ao banco)"""
+        with self._cache_lock:
+            self._cache.clear()
+    
+    def cotar_veiculo(self, tipo_veiculo, codigo_marca, codigo_modelo, ano_modelo, codigo_combustivel, mes=None):
+        """
+        Preço de um veículo num mês.
+        
+        Args:
+            tipo_veiculo, codigo_marca, codigo_modelo, ano_modelo, codigo_combustivel: Chave do veículo
+            mes: Mês YYYYMM (None = mês mais recente com valor)
+        
+        Returns:
+            dict: Cotação (ver _cotacao) ou None se não houver valor
+        """
+        chave = _chave_veiculo(tipo_veiculo, codigo_marca, codigo_modelo, ano_modelo, codigo_combustivel)
+        mes = int(mes) if mes is not None else None
+        return self._em_cache(('veiculo', chave, mes), lambda conn: _cotar_veiculo(conn, chave, mes))
+    
+    def cotar_codigo_fipe(self, codigo_fipe, mes=None):
+        """
+        Preços de todos os anos/combustíveis de um código FIPE num mês.
+        
+        Args:
+            codigo_fipe: Código FIPE (ex: "001004-9")
+            mes: Mês YYYYMM (None = mês mais recente de cada veículo)
+        
+        Returns:
+            list: Cotações, do ano-modelo mais novo ao mais antigo
+        """
+        codigo_fipe = str(codigo_fipe).strip()
+        mes = int(mes) if mes is not None else None
+        return self._em_cache(('codigo_fipe', codigo_fipe, mes), lambda conn: _cotar_codigo_fipe(conn, codigo_fipe, mes))
+    
+    def historico(self, tipo_veiculo, codigo_marca, codigo_modelo, ano_modelo, codigo_combustivel):
+        """
+        Histórico de preços de um veículo, do mês mais antigo ao mais recente.
+        
+        Returns:
+            list: {'mes_referencia', 'valor', 'valor_centavos'} (vazia se o veículo não tem valores)
+        """
+        chave = _chave_veiculo(tipo_veiculo, codigo_marca, codigo_modelo, ano_modelo, codigo_combustivel)
+        return self._em_cache(('historico', chave), lambda conn: _historico(conn, chave))
+    
+    def cotar_lote(self, itens):
+        """
+        Várias cotações numa chamada, na ordem dos itens.
+        
+        Args:
+            itens: dicts com 'codigo_fipe' ou os CAMPOS_VEICULO, e 'mes' opcional
+        
+        Returns:
+            list: Por item, a cotação (dict), a lista do código FIPE, None ou {'erro': mensagem}
+        """
+        resultados = []
+        for item in itens:
+            try:
+                if not isinstance(item, dict):
+                    raise ValueError("item deve ser um objeto")
+                if item.get('codigo_fipe'):
+                    resultados.append(self.cotar_codigo_fipe(item['codigo_fipe'], item.get('mes')))
+                else:
+                    faltando = [campo for campo in CAMPOS_VEICULO if item.get(campo) in (None, '')]
+                    if faltando:
+                        raise ValueError(f"faltam {', '.join(faltando)}")
+                    resultados.append(self.cotar_veiculo(*(item[campo] for campo in CAMPOS_VEICULO), item.get('mes')))
+            except (TypeError, ValueError) as e:
+                resultados.append({'erro': str(e)})
+        return resultados
+    
+    def estatisticas_cache(self):
+        """Tamanho, acertos e falhas do LRU"""
+        with self._cache_lock:
+            consultas = self.acertos + self.falhas
+            return {
+                'chaves': len(self._cache),
+                'capacidade': self.tamanho_cache,
+                'acertos': self.acertos,
+                'falhas': self.falhas,
+                'taxa_acerto': round(self.acertos / consultas, 4) if consultas else None
+            }
+    
+    def close(self):
+        """Fecha as conexões do pool"""
+        while not self._pool.empty():
+            self._pool.get_nowait()[1].close()
+        self._sentinela.close()
+
+
+def _chave_veiculo(tipo_veiculo, codigo_marca, codigo_modelo, ano_modelo, codigo_combustivel):
+    """Chave do veículo em inteiros (colunas INTEGER da dimensão veiculos); ValueError se inválida"""
+    return (int(tipo_veiculo), int(codigo_marca), int(codigo_modelo), int(ano_modelo), int(codigo_combustivel))
+
+
+def _cotacao(veiculo, valor):
+    """Cotação no formato de resposta (mesmos nomes da view valores_fipe)"""
+    return {
+        'codigo_fipe': veiculo[1],
+        'tipo_veiculo': veiculo[2],
+        'codigo_marca': veiculo[3],
+        'marca': veiculo[4],
+        'codigo_modelo': veiculo[5],
+        'modelo': veiculo[6],
+        'ano_modelo': veiculo[7],
+        'codigo_combustivel': veiculo[8],
+        'combustivel': veiculo[9],
+        'mes_referencia': str(valor[0]),
+        'valor': centavos_para_texto(valor[1]),
+        'valor_numerico': valor[1] / 100 if valor[1] is not None else None,
+        'codigo_referencia': valor[2],
+        'data_consulta': valor[3]
+    }
+
+
+def _valor(conn, veiculo_id, mes):
+    if mes is None:
+        return conn.execute(_SQL_VALOR_RECENTE, (veiculo_id,)).fetchone()
+    return conn.execute(_SQL_VALOR_MES, (veiculo_id, mes)).fetchone()
+
+
+def _cotar_veiculo(conn, chave, mes):
+    veiculo = conn.execute(_SQL_VEICULO, chave).fetchone()
+    if veiculo is None:
+        return None
+    valor = _valor(conn, veiculo[0], mes)
+    return _cotacao(veiculo, valor) if valor else None
+
+
+def _cotar_codigo_fipe(conn, codigo_fipe, mes):
+    cotacoes = []
+    for veiculo in conn.execute(_SQL_VEICULOS_CODIGO_FIPE, (codigo_fipe,)).fetchall():
+        valor = _valor(conn, veiculo[0], mes)
+        if valor:
+            cotacoes.append(_cotacao(veiculo, valor))
+    return cotacoes
+
+
+def _historico(conn, chave):
+    veiculo = conn.execute(_SQL_VEICULO, chave).fetchone()
+    if veiculo is None:
+        return []
+    return [
+        {'mes_referencia': str(mes), 'valor': centavos_para_texto(centavos), 'valor_centavos': centavos}
+        for mes, centavos in conn.execute(_SQL_HISTORICO, (veiculo[0],)).fetchall()
+    ]
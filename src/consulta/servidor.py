@@ -0,0 +1,188 @@
+"""
+Servidor HTTP de consulta de preços (biblioteca padrão, ThreadingHTTPServer).
+
+Rotas (respostas JSON):
+    GET  /valor?codigo_fipe=001004-9[&mes=202601]
+    GET  /valor?tipo_veiculo=1&codigo_marca=59&codigo_modelo=5940&ano_modelo=2024&codigo_combustivel=1[&mes=202601]
+    GET  /historico?tipo_veiculo=1&codigo_marca=59&codigo_modelo=5940&ano_modelo=2024&codigo_combustivel=1
+    POST /lote          {"itens": [{"codigo_fipe": ...} ou {"tipo_veiculo": ..., ...}, ...]}
+    GET  /metricas      requisições, erros e latência p50/p99 por rota + LRU
+    GET  /saude
+
+Latência medida no servidor (da leitura da requisição ao fim da resposta), sem a rede.
+"""
+import json
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Lock
+from urllib.parse import parse_qs, urlsplit
+
+from ..config import MAX_ITENS_LOTE_CONSULTA, AMOSTRAS_LATENCIA_CONSULTA
+from .precos import CAMPOS_VEICULO
+
+
+class Metricas:
+    """Contagens e últimas AMOSTRAS_LATENCIA_CONSULTA latências por rota (thread-safe)"""
+    
+    def __init__(self, amostras=AMOSTRAS_LATENCIA_CONSULTA):
+        self.amostras = amostras
+        self._rotas = {}
+        self._lock = Lock()
+        self.inicio = time.time()
+    
+    def registrar(self, rota, segundos, erro=False):
+        with self._lock:
+            dados = self._rotas.get(rota)
+            if dados is None:
+                dados = self._rotas[rota] = {'requisicoes': 0, 'erros': 0, 'latencias': deque(maxlen=self.amostras)}
+            dados['requisicoes'] += 1
+            dados['erros'] += erro
+            dados['latencias'].append(segundos)
+    
+    def resumo(self):
+        """{rota: {'requisicoes', 'erros', 'p50_ms', 'p99_ms', 'max_ms'}} sobre as amostras guardadas"""
+        with self._lock:
+            copia = {rota: (d['requisicoes'], d['erros'], sorted(d['latencias'])) for rota, d in self._rotas.items()}
+        return {
+            rota: {
+                'requisicoes': requisicoes,
+                'erros': erros,
+                'p50_ms': _percentil_ms(latencias, 50),
+                'p99_ms': _percentil_ms(latencias, 99),
+                'max_ms': round(latencias[-1] * 1000, 3) if latencias else None
+            }
+            for rota, (requisicoes, erros, latencias) in copia.items()
+        }
+
+
+def _percentil_ms(ordenadas, percentil):
+    """Percentil pelo posto mais próximo, em milissegundos"""
+    if not ordenadas:
+        return None
+    posicao = max(-(-len(ordenadas) * percentil // 100) - 1, 0)
+    return round(ordenadas[posicao] * 1000, 3)
+
+
+class ErroRequisicao(Exception):
+    """Parâmetros inválidos: resposta 400 com a mensagem"""
+
+
+class ManipuladorConsulta(BaseHTTPRequestHandler):
+    """Uma requisição; self.server.consulta (ConsultaPrecos) e self.server.metricas são compartilhados"""
+    
+    protocol_version = 'HTTP/1.1'  # Keep-alive: clientes reaproveitam a conexão TCP
+    # Cabeçalhos e corpo num único envio, sem Nagle: com keep-alive, duas escritas
+    # pequenas esperam o ACK atrasado do cliente (~40ms por resposta)
+    wbufsize = -1
+    disable_nagle_algorithm = True
+    
+    def do_GET(self):
+        url = urlsplit(self.path)
+        parametros = {nome: valores[-1] for nome, valores in parse_qs(url.query).items()}
+        rotas = {
+            '/valor': self._valor,
+            '/historico': self._historico,
+            '/metricas': self._metricas,
+            '/saude': lambda _: (200, {'status': 'ok'}),
+        }
+        self._atender(url.path, rotas.get(url.path), parametros)
+    
+    def do_POST(self):
+        url = urlsplit(self.path)
+        self._atender(url.path, self._lote if url.path == '/lote' else None, None)
+    
+    def _atender(self, rota, funcao, parametros):
+        inicio = time.perf_counter()
+        if funcao is None:
+            status, corpo = 404, {'erro': f"rota desconhecida: {rota}"}
+            rota = 'desconhecida'
+        else:
+            try:
+                status, corpo = funcao(parametros)
+            except ErroRequisicao as e:
+                status, corpo = 400, {'erro': str(e)}
+            except Exception as e:
+                status, corpo = 500, {'erro': f"{type(e).__name__}: {e}"}
+        
+        dados = json.dumps(corpo, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(dados)))
+        self.end_headers()
+        self.wfile.write(dados)
+        
+        if rota != '/metricas':
+            self.server.metricas.registrar(rota, time.perf_counter() - inicio, erro=status >= 400 and status != 404)
+    
+    def _valor(self, parametros):
+        consulta = self.server.consulta
+        mes = _inteiro(parametros, 'mes', obrigatorio=False)
+        if parametros.get('codigo_fipe'):
+            cotacoes = consulta.cotar_codigo_fipe(parametros['codigo_fipe'], mes)
+            return (200, {'cotacoes': cotacoes}) if cotacoes else (404, {'erro': 'código FIPE sem valor'})
+        cotacao = consulta.cotar_veiculo(*_chave(parametros), mes)
+        return (200, cotacao) if cotacao else (404, {'erro': 'veículo sem valor'})
+    
+    def _historico(self, parametros):
+        historico = self.server.consulta.historico(*_chave(parametros))
+        return (200, {'historico': historico}) if historico else (404, {'erro': 'veículo sem valores'})
+    
+    def _lote(self, _):
+        tamanho = int(self.headers.get('Content-Length') or 0)
+        try:
+            corpo = json.loads(self.rfile.read(tamanho) or b'{}')
+        except ValueError:
+            raise ErroRequisicao("corpo JSON inválido")
+        itens = corpo.get('itens') if isinstance(corpo, dict) else None
+        if not isinstance(itens, list):
+            raise ErroRequisicao("esperado {\"itens\": [...]}")
+        if len(itens) > MAX_ITENS_LOTE_CONSULTA:
+            raise ErroRequisicao(f"máximo de {MAX_ITENS_LOTE_CONSULTA} itens por lote")
+        return 200, {'resultados': self.server.consulta.cotar_lote(itens)}
+    
+    def _metricas(self, _):
+        return 200, {
+            'rotas': self.server.metricas.resumo(),
+            'cache': self.server.consulta.estatisticas_cache(),
+            'ativo_ha_s': round(time.time() - self.server.metricas.inicio, 1)
+        }
+    
+    def log_message(self, formato, *args):
+        """Sem log por requisição (custaria mais que a própria consulta)"""
+
+
+def _inteiro(parametros, nome, obrigatorio=True):
+    valor = parametros.get(nome)
+    if valor in (None, ''):
+        if obrigatorio:
+            raise ErroRequisicao(f"parâmetro obrigatório: {nome}")
+        return None
+    try:
+        return int(valor)
+    except ValueError:
+        raise ErroRequisicao(f"{nome} deve ser inteiro: {valor}")
+
+
+def _chave(parametros):
+    """CAMPOS_VEICULO dos parâmetros da URL, em inteiros"""
+    return tuple(_inteiro(parametros, campo) for campo in CAMPOS_VEICULO)
+
+
+def criar_servidor(consulta, host='127.0.0.1', porta=8765):
+    """
+    Servidor HTTP com uma thread por conexão sobre uma ConsultaPrecos.
+    
+    Args:
+        consulta: ConsultaPrecos (pool e LRU compartilhados pelas threads)
+        host: Interface de escuta
+        porta: Porta TCP (0 = livre, escolhida pelo sistema)
+    
+    Returns:
+        ThreadingHTTPServer: chamar serve_forever(); server_address tem a porta efetiva
+    """
+    servidor = ThreadingHTTPServer((host, porta), ManipuladorConsulta)
+    servidor.daemon_threads = True
+    servidor.consulta = consulta
+    servidor.metricas = Metricas()
+    return servidor
@@ -0,0 +1,259 @@
+"""
+Snapshot binário dos preços de um mês, para leitura via mmap.
+
+Arquivo imutável, gerado a partir do cache local (exportar_snapshot) e lido por
+SnapshotPrecos sem desserializar nada: o sistema operacional mantém as páginas em
+cache e todos os processos que abrirem o mesmo arquivo as compartilham.
+
+Layout (little-endian):
+    cabeçalho   CABECALHO (64 bytes): magic, versão, mês, código de referência,
+                total de registros, offsets dos registros e da tabela de strings
+    registros   total × REGISTRO (40 bytes), ordenados pela chave
+                chave 11s = codigo_fipe 8s | ano_modelo H | codigo_combustivel B (big-endian:
+                a ordem dos bytes é a ordem de (codigo_fipe, ano_modelo, codigo_combustivel))
+                tipo_veiculo B | codigo_marca I | codigo_modelo I | valor_centavos Q |
+                marca I | modelo I | combustivel I
+    strings     nomes sem repetição: tamanho H + UTF-8; os registros guardam o offset
+                (relativo ao início da tabela)
+
+Busca = pesquisa binária comparando os 11 bytes da chave direto no mmap.
+"""
+import mmap
+import os
+import sqlite3
+import struct
+import time
+from pathlib import Path
+
+from ..normalizacao import centavos_para_texto
+
+
+MAGIC = b'FIPESNAP'
+VERSAO = 1
+
+# magic, versão, mês, codigo_referencia, registros, offset registros, offset strings,
+# tamanho strings, gerado_em (epoch); completado até 64 bytes
+CABECALHO = struct.Struct('<8sHxxIIIQQQd8x')
+REGISTRO = struct.Struct('<11sBIIQIII')
+CHAVE = struct.Struct('>8sHB')  # Primeiro campo de REGISTRO, comparado como bytes na pesquisa binária
+CENTAVOS = struct.Struct('<Q')
+OFFSET_CENTAVOS = 20  # Posição de valor_centavos no registro (chave 11 + tipo 1 + marca 4 + modelo 4)
+TAMANHO_STRING = struct.Struct('<H')
+
+# Código FIPE no formato "NNNNNN-N" (8 bytes ASCII)
+TAMANHO_CODIGO_FIPE = 8
+
+
+def exportar_snapshot(db_path, destino, mes=None):
+    """
+    Grava o snapshot do mês (padrão: mais recente em valores) a partir do cache local.
+    Escreve num arquivo temporário e substitui o destino com os.replace: leitores com
+    o arquivo antigo aberto continuam lendo a versão anterior até reabrirem.
+    
+    Args:
+        db_path: Banco SQLite local (aberto somente leitura)
+        destino: Caminho do arquivo de snapshot
+        mes: Mês YYYYMM (None = mais recente)
+    
+    Returns:
+        dict: {'mes', 'registros', 'ignorados', 'strings', 'bytes'}
+    """
+    uri = Path(db_path).resolve().as_uri() + '?mode=ro'
+    conn = sqlite3.connect(uri, uri=True)
+    try:
+        if mes is None:
+            mes = conn.execute('SELECT MAX(mes) FROM valores').fetchone()[0]
+            if mes is None:
+                raise ValueError("Nenhum valor no cache local para exportar")
+        mes = int(mes)
+        codigo_referencia = conn.execute(
+            'SELECT MAX(codigo_referencia) FROM valores WHERE mes = ?', (mes,)
+        ).fetchone()[0]
+        linhas = conn.execute('''
+            SELECT d.codigo_fipe, d.ano_modelo, d.codigo_combustivel, d.tipo_veiculo,
+                   d.codigo_marca, d.codigo_modelo, v.valor_centavos,
+                   d.marca, d.modelo, d.combustivel
+            FROM valores v
+            JOIN veiculos d ON d.id = v.veiculo_id
+            WHERE v.mes = ? AND v.valor_centavos IS NOT NULL AND d.codigo_fipe IS NOT NULL
+        ''', (mes,)).fetchall()
+    finally:
+        conn.close()
+    
+    strings = bytearray()
+    offsets = {}
+    
+    def offset_string(texto):
+        texto = texto or ''
+        offset = offsets.get(texto)
+        if offset is None:
+            dados = texto.encode('utf-8')[:0xFFFF]
+            offset = offsets[texto] = len(strings)
+            strings.extend(TAMANHO_STRING.pack(len(dados)))
+            strings.extend(dados)
+        return offset
+    
+    registros = []
+    ignorados = 0
+    for codigo_fipe, ano, combustivel, tipo, marca, modelo, centavos, nome_marca, nome_modelo, nome_combustivel in linhas:
+        codigo = codigo_fipe.strip().encode('ascii', 'replace')
+        if len(codigo) > TAMANHO_CODIGO_FIPE:
+            ignorados += 1
+            continue
+        registros.append((
+            CHAVE.pack(codigo.ljust(TAMANHO_CODIGO_FIPE, b'\0'), ano, combustivel), tipo, marca, modelo, centavos,
+            offset_string(nome_marca), offset_string(nome_modelo), offset_string(nome_combustivel)
+        ))
+    registros.sort()
+    
+    offset_registros = CABECALHO.size
+    offset_strings = offset_registros + len(registros) * REGISTRO.size
+    destino = Path(destino)
+    temporario = destino.with_name(destino.name + '.tmp')
+    with open(temporario, 'wb') as arquivo:
+        arquivo.write(CABECALHO.pack(
+            MAGIC, VERSAO, mes, codigo_referencia or 0, len(registros),
+            offset_registros, offset_strings, len(strings), time.time()
+        ))
+        for registro in registros:
+            arquivo.write(REGISTRO.pack(*registro))
+        arquivo.write(strings)
+        arquivo.flush()
+        os.fsync(arquivo.fileno())
+    os.replace(temporario, destino)
+    
+    return {
+        'mes': mes,
+        'registros': len(registros),
+        'ignorados': ignorados,
+        'strings': len(offsets),
+        'bytes': offset_strings + len(strings)
+    }
+
+
+class SnapshotPrecos:
+    """
+    Leitor do snapshot via mmap (somente leitura, compartilhável entre processos).
+    Uso: with SnapshotPrecos('fipe_snapshot.bin') as snapshot: snapshot.buscar(...)
+    """
+    
+    def __init__(self, caminho):
+        self.caminho = str(caminho)
+        with open(self.caminho, 'rb') as arquivo:
+            self._mmap = mmap.mmap(arquivo.fileno(), 0, access=mmap.ACCESS_READ)
+        
+        if len(self._mmap) < CABECALHO.size:
+            self._mmap.close()
+            raise ValueError(f"Snapshot inválido (arquivo truncado): {self.caminho}")
+        (magic, versao, self.mes, self.codigo_referencia, self.total,
+         self._offset_registros, self._offset_strings, tamanho_strings, self.gerado_em) = CABECALHO.unpack_from(self._mmap, 0)
+        if magic != MAGIC or versao != VERSAO:
+            self._mmap.close()
+            raise ValueError(f"Snapshot inválido ou de outra versão: {self.caminho}")
+        if self._offset_strings + tamanho_strings > len(self._mmap):
+            self._mmap.close()
+            raise ValueError(f"Snapshot inválido (arquivo truncado): {self.caminho}")
+    
+    def __len__(self):
+        return self.total
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *_):
+        self.close()
+    
+    def close(self):
+        self._mmap.close()
+    
+    def _primeiro_indice(self, chave):
+        """Menor índice com chave de registro >= chave (bytes de CHAVE), por pesquisa binária no mmap"""
+        buffer, base, tamanho, fim = self._mmap, self._offset_registros, REGISTRO.size, CHAVE.size
+        baixo, alto = 0, self.total
+        while baixo < alto:
+            meio = (baixo + alto) // 2
+            inicio = base + meio * tamanho
+            if buffer[inicio:inicio + fim] < chave:
+                baixo = meio + 1
+            else:
+                alto = meio
+        return baixo
+    
+    def _chave_em(self, indice):
+        inicio = self._offset_registros + indice * REGISTRO.size
+        return self._mmap[inicio:inicio + CHAVE.size]
+    
+    def chave(self, indice):
+        """(codigo_fipe, ano_modelo, codigo_combustivel) do registro na posição indice"""
+        codigo, ano, combustivel = CHAVE.unpack(self._chave_em(indice))
+        return codigo.rstrip(b'\0').decode('ascii'), ano, combustivel
+    
+    def _registro(self, indice):
+        return REGISTRO.unpack_from(self._mmap, self._offset_registros + indice * REGISTRO.size)
+    
+    def _string(self, offset):
+        inicio = self._offset_strings + offset
+        (tamanho,) = TAMANHO_STRING.unpack_from(self._mmap, inicio)
+        inicio += TAMANHO_STRING.size
+        return self._mmap[inicio:inicio + tamanho].decode('utf-8')
+    
+    def _cotacao(self, registro):
+        chave, tipo, marca, modelo, centavos, nome_marca, nome_modelo, nome_combustivel = registro
+        codigo, ano, combustivel = CHAVE.unpack(chave)
+        return {
+            'codigo_fipe': codigo.rstrip(b'\0').decode('ascii'),
+            'tipo_veiculo': tipo,
+            'codigo_marca': marca,
+            'marca': self._string(nome_marca),
+            'codigo_modelo': modelo,
+            'modelo': self._string(nome_modelo),
+            'ano_modelo': ano,
+            'codigo_combustivel': combustivel,
+            'combustivel': self._string(nome_combustivel),
+            'mes_referencia': str(self.mes),
+            'valor': centavos_para_texto(centavos),
+            'valor_numerico': centavos / 100,
+            'codigo_referencia': self.codigo_referencia
+        }
+    
+    def _indice(self, codigo_fipe, ano_modelo, codigo_combustivel):
+        codigo = _codigo(codigo_fipe)
+        if codigo is None:
+            return None
+        chave = CHAVE.pack(codigo, int(ano_modelo), int(codigo_combustivel))
+        indice = self._primeiro_indice(chave)
+        if indice < self.total and self._chave_em(indice) == chave:
+            return indice
+        return None
+    
+    def buscar_centavos(self, codigo_fipe, ano_modelo, codigo_combustivel):
+        """Só o valor em centavos (caminho mais curto: nenhuma string lida), ou None"""
+        indice = self._indice(codigo_fipe, ano_modelo, codigo_combustivel)
+        if indice is None:
+            return None
+        return CENTAVOS.unpack_from(self._mmap, self._offset_registros + indice * REGISTRO.size + OFFSET_CENTAVOS)[0]
+    
+    def buscar(self, codigo_fipe, ano_modelo, codigo_combustivel):
+        """Cotação de um veículo (mesmos campos do servidor de consulta) ou None"""
+        indice = self._indice(codigo_fipe, ano_modelo, codigo_combustivel)
+        return self._cotacao(self._registro(indice)) if indice is not None else None
+    
+    def buscar_codigo_fipe(self, codigo_fipe):
+        """Cotações de todos os anos/combustíveis de um código FIPE (ordem crescente de ano)"""
+        codigo = _codigo(codigo_fipe)
+        if codigo is None:
+            return []
+        indice = self._primeiro_indice(codigo)
+        cotacoes = []
+        while indice < self.total and self._chave_em(indice)[:TAMANHO_CODIGO_FIPE] == codigo:
+            cotacoes.append(self._cotacao(self._registro(indice)))
+            indice += 1
+        return cotacoes
+
+
+def _codigo(codigo_fipe):
+    """Código FIPE no formato da chave (8 bytes completados com \\0); None se não cabe"""
+    codigo = str(codigo_fipe).strip().encode('ascii', 'replace')
+    if len(codigo) > TAMANHO_CODIGO_FIPE:
+        return None
+    return codigo.ljust(TAMANHO_CODIGO_FIPE, b'\0')
@@ -10,6 +10,8 @@ from .fipe_crawler import (
     buscar_valor_veiculo,
     obter_codigo_referencia_atual
 )
+from .planejador import planejar_marca, estimar_tempo
+from .limitador import LimitadorTaxa, limitador_global
 
 __all__ = [
     'buscar_tabela_referencia',
@@ -18,5 +20,9 @@ __all__ = [
     'buscar_anos_modelo',
     'buscar_modelos_por_ano',
     'buscar_valor_veiculo',
-    'obter_codigo_referencia_atual'
+    'obter_codigo_referencia_atual',
+    'planejar_marca',
+    'estimar_tempo',
+    'LimitadorTaxa',
+    'limitador_global'
 ]
@@ -0,0 +1,193 @@
+"""
+Carga histórica de valores FIPE: preenche um intervalo de tabelas de referência.
+
+A API aceita qualquer codigoTabelaReferencia em ConsultarValorComTodosParametros,
+mas a atualização mensal só consulta a tabela mais recente. A carga histórica
+consulta, para cada veículo do cache, os meses do intervalo que ainda não têm
+valor nem ausência registrada.
+
+Ordem das consultas: veículo por veículo, do mês mais recente para o mais antigo.
+Assim o que já se sabe do veículo é reaproveitado para cortar requisições:
+- meses anteriores ao ano-modelo (menos ANTECEDENCIA_ANO_MODELO) nem são planejados;
+- depois de encontrar valor, o primeiro mês sem valor marca o lançamento do
+  veículo: os meses mais antigos são registrados como ausentes (inferidos) sem consulta.
+
+Os workers consultam em paralelo, todos sob o mesmo LimitadorTaxa (aplicado
+pelo próprio fipe_crawler a cada requisição).
+"""
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from threading import Lock
+from typing import NamedTuple
+
+from ..config import NUM_WORKERS, CODIGO_ZERO_KM, ANTECEDENCIA_ANO_MODELO
+from ..registros import ValorFipe
+from .planejador import formatar_tempo
+
+
+# Valores/ausências gravados por vez durante a coleta de um veículo
+LOTE_GRAVACAO = 12
+
+
+class MesReferencia(NamedTuple):
+    """Tabela de referência da FIPE: código e mês (YYYYMM)"""
+    codigo: int
+    mes: int
+
+
+class PendenciaVeiculo(NamedTuple):
+    """Meses a consultar de um veículo (mais recente primeiro)"""
+    tipo_veiculo: int
+    codigo_marca: str
+    codigo_modelo: int
+    codigo_ano_combustivel: str
+    meses: list
+    ultimo_com_valor: int  # Mês mais recente do intervalo já com valor (0 = nenhum)
+
+
+def mes_minimo_do_ano(codigo_ano_combustivel):
+    """Primeiro mês (YYYYMM) em que o ano-modelo pode constar na tabela FIPE"""
+    ano = int(codigo_ano_combustivel.partition('-')[0])
+    if ano == int(CODIGO_ZERO_KM):
+        return 0
+    return (ano - ANTECEDENCIA_ANO_MODELO) * 100 + 1
+
+
+def planejar_carga(cache, meses, tipos_veiculo=(1, 2, 3)):
+    """
+    Lista o que falta consultar no intervalo, por veículo.
+    
+    Args:
+        cache: FipeLocalCache
+        meses: Lista de MesReferencia do intervalo
+        tipos_veiculo: Tipos de veículo a considerar
+    
+    Returns:
+        list: PendenciaVeiculo dos veículos com algum mês pendente
+    """
+    meses = sorted(meses, key=lambda m: m.mes, reverse=True)
+    if not meses:
+        return []
+    com_valor, sem_valor = cache.get_meses_cobertos(meses[-1].mes, meses[0].mes)
+    
+    plano = []
+    for veiculo in cache.get_veiculos_catalogo(tipos_veiculo):
+        minimo = mes_minimo_do_ano(veiculo[3])
+        valorados = com_valor.get(veiculo, set())
+        resolvidos = valorados | sem_valor.get(veiculo, set())
+        pendentes = [m for m in meses if m.mes >= minimo and m.mes not in resolvidos]
+        if pendentes:
+            plano.append(PendenciaVeiculo(*veiculo, pendentes, max(valorados, default=0)))
+    return plano
+
+
+class CargaHistorica:
+    """
+    Executa um plano de carga histórica com workers paralelos sob o limitador global.
+    Gravações no cache são feitas pelos próprios workers (FipeLocalCache é thread-safe).
+    """
+    
+    def __init__(self, cache, workers=NUM_WORKERS, buscar=None):
+        self.cache = cache
+        self.workers = max(workers, 1)
+        if buscar is None:
+            from .fipe_crawler import buscar_valor_veiculo as buscar
+        self.buscar = buscar
+        self.lock = Lock()
+        self.stats = {
+            'veiculos': 0,
+            'requisicoes': 0,
+            'valores': 0,
+            'sem_valor': 0,
+            'inferidos': 0,
+            'erros': 0
+        }
+    
+    def executar(self, plano):
+        """
+        Consulta todos os veículo-mês do plano.
+        
+        Returns:
+            dict: Estatísticas da execução
+        """
+        total = len(plano)
+        inicio = time.time()
+        
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='historico') as executor:
+            for concluidos, _ in enumerate(executor.map(self._coletar_veiculo, plano), 1):
+                if concluidos % 50 == 0 or concluidos == total:
+                    self._imprimir_progresso(concluidos, total, time.time() - inicio)
+        
+        return dict(self.stats)
+    
+    def _coletar_veiculo(self, pendencia):
+        """Consulta os meses pendentes de um veículo, do mais recente para o mais antigo"""
+        tipo, marca, modelo, codigo_ano, meses, ultimo_com_valor = pendencia
+        ano_modelo, _, codigo_combustivel = codigo_ano.partition('-')
+        chave = (tipo, marca, modelo, codigo_ano)
+        valores, ausentes = [], []
+        encontrou = False
+        
+        for i, referencia in enumerate(meses):
+            encontrou = encontrou or ultimo_com_valor > referencia.mes
+            
+            dados = self.buscar(marca, modelo, ano_modelo, codigo_combustivel, tipo, referencia.codigo)
+            self._contar('requisicoes')
+            
+            if dados is None:
+                # Erro de rede/rate limit persistente: o restante fica para a próxima execução
+                self._contar('erros')
+                break
+            
+            if dados.get('Valor'):
+                valor = ValorFipe.da_api(
+                    dados, marca, modelo, tipo, ano_modelo, codigo_combustivel, referencia.codigo,
+                    data_consulta=datetime.now().isoformat()
+                )
+                # O mês é o da tabela consultada (não depende do texto MesReferencia)
+                valores.append(valor._replace(mes=referencia.mes))
+                encontrou = True
+            else:
+                ausentes.append(chave + (referencia.mes, 0))
+                if encontrou:
+                    # Sem valor depois de já ter valor mais recente: veículo ainda não existia
+                    ausentes.extend(chave + (m.mes, 1) for m in meses[i + 1:])
+                    self._contar('inferidos', len(meses) - i - 1)
+                    break
+            
+            if len(valores) + len(ausentes) >= LOTE_GRAVACAO:
+                self._gravar(valores, ausentes)
+                valores, ausentes = [], []
+        
+        self._gravar(valores, ausentes)
+        self._contar('veiculos')
+    
+    def _gravar(self, valores, ausentes):
+        if valores:
+            self.cache.save_valores_fipe(valores)
+        self.cache.save_valores_ausentes(ausentes)
+        self._contar('valores', len(valores))
+        self._contar('sem_valor', sum(1 for a in ausentes if not a[5]))
+    
+    def _contar(self, chave, quantidade=1):
+        with self.lock:
+            self.stats[chave] += quantidade
+    
+    def _imprimir_progresso(self, concluidos, total, decorrido):
+        with self.lock:
+            s = dict(self.stats)
+        taxa = s['requisicoes'] / decorrido if decorrido else 0
+        print(f"    📊 [{concluidos}/{total}] veículos | ✅ {s['valores']} valores | "
+              f"⏭️ {s['sem_valor']} sem valor (+{s['inferidos']} inferidos) | ❌ {s['erros']} erros | "
+              f"{taxa:.2f} req/s | {formatar_tempo(decorrido)}")
+
+
+def imprimir_completude(linhas):
+    """Imprime o relatório de completude_meses"""
+    print(f"{'Mês':>8} {'Código':>7} {'Esperados':>10} {'Com valor':>10} {'Sem valor':>10} {'Pendentes':>10} {'%':>6}")
+    print("-" * 70)
+    for mes, codigo, esperados, com_valor, sem_valor, _ in linhas:
+        pendentes = max(esperados - com_valor - sem_valor, 0)
+        percentual = (esperados - pendentes) * 100 / esperados if esperados else 100.0
+        print(f"{mes:>8} {codigo or '-':>7} {esperados:>10} {com_valor:>10} {sem_valor:>10} {pendentes:>10} {percentual:>5.1f}%")
@@ -0,0 +1,179 @@
+"""
+Descoberta mensal de lançamentos (modelos novos e versões Zero Km) de todos os tipos de veículo.
+
+Por marca:
+1. ConsultarModelos (1 requisição): lista completa de modelos e os anos da marca ('Anos')
+2. Para cada combustível com Zero Km na lista 'Anos' → ConsultarModelosAtravesDoAno:
+   modelos já cadastrados que ganharam versão Zero Km nesse combustível
+   (antes eram 7 consultas por marca, uma por combustível, existindo ou não)
+3. Modelos ausentes do cache → ConsultarAnoModelo de cada um (todos os anos do modelo)
+
+Marca nova (ausente do cache) pula o passo 2: todos os modelos dela passam pelo passo 3.
+
+As marcas de todos os tipos vão para a mesma fila de workers; o ritmo das
+requisições é controlado pelo limitador global do fipe_crawler.
+"""
+import time
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
+
+from ..config import NUM_WORKERS, CODIGO_ZERO_KM
+from ..registros import AnoCombustivel
+from .planejador import formatar_tempo
+
+
+TIPOS_NOME = {1: "Carros", 2: "Motos", 3: "Caminhões"}
+
+
+def combustiveis_zero_km(anos_api):
+    """Itens de 'Anos' (ConsultarModelos) que são Zero Km, ex: {'Value': '32000-5', ...}"""
+    prefixo = f"{CODIGO_ZERO_KM}-"
+    return [a for a in anos_api or [] if a['Value'].startswith(prefixo)]
+
+
+class DescobertaModelos:
+    """
+    Descobre modelos novos e versões Zero Km novas de vários tipos de veículo em paralelo.
+    Gravações no cache são feitas pelos próprios workers (FipeLocalCache é thread-safe).
+    """
+    
+    def __init__(self, cache, workers=NUM_WORKERS):
+        from . import fipe_crawler
+        self.api = fipe_crawler
+        self.cache = cache
+        self.workers = max(workers, 1)
+        self.lock = Lock()
+        self.tipos_sem_marcas = []
+        self.stats = {}
+    
+    def executar(self, tipos_veiculo=(1, 2, 3)):
+        """
+        Descobre os lançamentos de todas as marcas dos tipos informados.
+        
+        Returns:
+            dict: {tipo_veiculo: estatísticas}; 'modelos' traz as chaves
+                  (tipo, marca, modelo) dos modelos novos ou com Zero Km novo.
+                  Tipos cuja lista de marcas falhou ficam em self.tipos_sem_marcas.
+        """
+        self.stats = {tipo: self._stats_vazias() for tipo in tipos_veiculo}
+        inicio = time.time()
+        
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='descoberta') as executor:
+            tarefas = []
+            for tipo, marcas in zip(tipos_veiculo, executor.map(self._marcas_do_tipo, tipos_veiculo)):
+                tarefas.extend((tipo, marca, nova) for marca, nova in marcas)
+            
+            total = len(tarefas)
+            for concluidas, _ in enumerate(executor.map(self._descobrir_marca, tarefas), 1):
+                if concluidas % 25 == 0 or concluidas == total:
+                    self._imprimir_progresso(concluidas, total, time.time() - inicio)
+        
+        return self.stats
+    
+    def _marcas_do_tipo(self, tipo):
+        """Marcas da API (com indicação de marca nova); marcas novas já são gravadas"""
+        marcas_api = self.api.buscar_marcas_carros(tipo)
+        self._contar(tipo, 'requisicoes')
+        if not marcas_api:
+            print(f"❌ [{TIPOS_NOME.get(tipo, tipo)}] Não foi possível buscar as marcas")
+            with self.lock:
+                self.tipos_sem_marcas.append(tipo)
+            return []
+        
+        codigos_cache = {marca.codigo for marca in self.cache.get_all_marcas(tipo)}
+        novas = [marca for marca in marcas_api if marca['Value'] not in codigos_cache]
+        if novas:
+            self.cache.save_marcas(novas, tipo)
+            self._contar(tipo, 'marcas_novas', len(novas))
+            for marca in novas:
+                print(f"🆕 [{TIPOS_NOME.get(tipo, tipo)}] Marca nova: {marca['Label']} (código {marca['Value']})")
+        return [(marca, marca['Value'] not in codigos_cache) for marca in marcas_api]
+    
+    def _descobrir_marca(self, tarefa):
+        """Passos 1-3 da descrição do módulo para uma marca"""
+        tipo, marca, marca_nova = tarefa
+        codigo_marca, nome_marca = marca['Value'], marca['Label']
+        anos_por_modelo = {} if marca_nova else self.cache.get_anos_por_modelo(codigo_marca, tipo)
+        
+        resultado = self.api.buscar_modelos(codigo_marca, tipo_veiculo=tipo, nome_marca=nome_marca)
+        self._contar(tipo, 'requisicoes')
+        if not resultado or 'Modelos' not in resultado:
+            self._contar(tipo, 'erros')
+            return
+        
+        novos = {str(m['Value']): m for m in resultado['Modelos'] if str(m['Value']) not in anos_por_modelo}
+        zero_km_novos = 0
+        descobertos = set()
+        
+        if not marca_nova:
+            for ano in combustiveis_zero_km(resultado.get('Anos')):
+                codigo_combustivel = int(ano['Value'].partition('-')[2])
+                modelos_ano = self.api.buscar_modelos_por_ano(
+                    codigo_marca, ano_modelo=CODIGO_ZERO_KM, codigo_combustivel=codigo_combustivel,
+                    nome_marca=nome_marca, tipo_veiculo=tipo
+                )
+                self._contar(tipo, 'requisicoes')
+                
+                registro_ano = AnoCombustivel.da_api(ano)
+                relacionamentos = []
+                for modelo in modelos_ano:
+                    codigo_modelo = str(modelo['Value'])
+                    if codigo_modelo not in anos_por_modelo:
+                        # Ainda não listado em ConsultarModelos: tratado como modelo novo
+                        novos.setdefault(codigo_modelo, modelo)
+                    elif ano['Value'] not in anos_por_modelo[codigo_modelo]:
+                        relacionamentos.append((int(codigo_modelo), registro_ano))
+                        descobertos.add(codigo_modelo)
+                self.cache.save_relacionamentos(codigo_marca, tipo, relacionamentos)
+                zero_km_novos += len(relacionamentos)
+        
+        if novos:
+            self.cache.save_modelos(list(novos.values()), codigo_marca, tipo)
+        anos_novos = 0
+        for codigo_modelo, modelo in novos.items():
+            anos = self.api.buscar_anos_modelo(codigo_marca, codigo_modelo, tipo_veiculo=tipo, nome_modelo=modelo['Label'])
+            self._contar(tipo, 'requisicoes')
+            if anos:
+                self.cache.save_anos_modelo(anos, codigo_marca, codigo_modelo, tipo_veiculo=tipo)
+                anos_novos += len(anos)
+            else:
+                self._contar(tipo, 'erros')
+        
+        descobertos.update(novos)
+        with self.lock:
+            stats = self.stats[tipo]
+            stats['marcas_processadas'] += 1
+            stats['novos_modelos'] += len(novos)
+            stats['novos_zero_km'] += zero_km_novos
+            stats['novos_anos'] += anos_novos
+            stats['modelos'].update((tipo, str(codigo_marca), codigo) for codigo in descobertos)
+        
+        if novos or zero_km_novos:
+            print(f"    ✅ [{TIPOS_NOME.get(tipo, tipo)}] {nome_marca}: {len(novos)} modelos novos, "
+                  f"{zero_km_novos} versões Zero Km novas")
+    
+    def _contar(self, tipo, chave, quantidade=1):
+        with self.lock:
+            self.stats[tipo][chave] += quantidade
+    
+    def _imprimir_progresso(self, concluidas, total, decorrido):
+        with self.lock:
+            requisicoes = sum(s['requisicoes'] for s in self.stats.values())
+            novos = sum(s['novos_modelos'] for s in self.stats.values())
+            erros = sum(s['erros'] for s in self.stats.values())
+        taxa = requisicoes / decorrido if decorrido else 0
+        print(f"    📊 [{concluidas}/{total}] marcas | 🆕 {novos} modelos novos | ❌ {erros} erros | "
+              f"{requisicoes} requisições ({taxa:.2f} req/s) | {formatar_tempo(decorrido)}")
+    
+    @staticmethod
+    def _stats_vazias():
+        return {
+            'marcas_processadas': 0,
+            'marcas_novas': 0,
+            'novos_modelos': 0,
+            'novos_zero_km': 0,
+            'novos_anos': 0,
+            'requisicoes': 0,
+            'erros': 0,
+            'modelos': set()
+        }
@@ -0,0 +1,104 @@
+"""
+Detector de veículos descontinuados por diferença de listagens da API.
+
+Em vez de verificar veículo a veículo (ConsultarModelos + ConsultarAnoModelo
+por linha), os candidatos são agrupados:
+- por (tipo, marca): ConsultarModelos uma vez → modelos fora da listagem têm
+  todos os anos candidatos confirmados;
+- por modelo ainda listado: ConsultarAnoModelo uma vez → anos candidatos fora
+  da listagem confirmados, os demais ainda existem.
+
+Custo: 1 requisição por marca + 1 por modelo afetado ainda listado, não
+importa quantos anos de cada modelo estejam entre os candidatos.
+"""
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from typing import NamedTuple
+
+from ..config import NUM_WORKERS
+
+
+class Candidato(NamedTuple):
+    """Veículo sem valor na API, a confirmar (nomes só para relatório)"""
+    tipo_veiculo: int
+    codigo_marca: str
+    codigo_modelo: str
+    codigo_ano_combustivel: str
+    nome_marca: str = ''
+    nome_modelo: str = ''
+    
+    @property
+    def chave(self):
+        """(tipo_veiculo, codigo_marca, codigo_modelo, codigo_ano_combustivel)"""
+        return self[:4]
+
+
+class ResultadoVerificacao(NamedTuple):
+    confirmados: list       # Fora das listagens da API: podem ser removidos
+    existentes: list        # Ainda listados (falso positivo: mantidos)
+    nao_verificados: list   # Listagem indisponível (mantidos por segurança)
+    requisicoes: int
+
+
+def verificar_listagens(candidatos, workers=NUM_WORKERS):
+    """
+    Confirma candidatos comparando com as listagens de modelos e de anos da API.
+    Marcas são verificadas em paralelo (sob o limitador global do fipe_crawler).
+    
+    Args:
+        candidatos: Lista de Candidato (duplicatas são ignoradas)
+        workers: Marcas verificadas em paralelo
+    
+    Returns:
+        ResultadoVerificacao
+    """
+    from . import fipe_crawler
+    
+    grupos = defaultdict(dict)
+    for candidato in candidatos:
+        grupos[(candidato.tipo_veiculo, candidato.codigo_marca)].setdefault(candidato.chave, candidato)
+    
+    def verificar(item):
+        (tipo, marca), por_chave = item
+        return _verificar_marca(fipe_crawler, tipo, marca, list(por_chave.values()))
+    
+    confirmados, existentes, nao_verificados, requisicoes = [], [], [], 0
+    with ThreadPoolExecutor(max_workers=max(workers, 1), thread_name_prefix='descontinuados') as executor:
+        for resultado in executor.map(verificar, grupos.items()):
+            confirmados.extend(resultado.confirmados)
+            existentes.extend(resultado.existentes)
+            nao_verificados.extend(resultado.nao_verificados)
+            requisicoes += resultado.requisicoes
+    return ResultadoVerificacao(confirmados, existentes, nao_verificados, requisicoes)
+
+
+def _verificar_marca(api, tipo, marca, candidatos):
+    """Uma listagem de modelos da marca + uma listagem de anos por modelo afetado ainda listado"""
+    resultado = api.buscar_modelos(marca, tipo_veiculo=tipo, nome_marca=candidatos[0].nome_marca or None)
+    requisicoes = 1
+    if not resultado or 'Modelos' not in resultado:
+        return ResultadoVerificacao([], [], candidatos, requisicoes)
+    
+    listados = {str(m['Value']) for m in resultado['Modelos']}
+    por_modelo = defaultdict(list)
+    for candidato in candidatos:
+        por_modelo[str(candidato.codigo_modelo)].append(candidato)
+    
+    confirmados, existentes, nao_verificados = [], [], []
+    for modelo, itens in por_modelo.items():
+        if modelo not in listados:
+            confirmados.extend(itens)
+            continue
+        
+        anos = api.buscar_anos_modelo(marca, modelo, tipo_veiculo=tipo, nome_modelo=itens[0].nome_modelo or None)
+        requisicoes += 1
+        if not anos:
+            # Modelo listado sem anos: erro da API, não dá para confirmar
+            nao_verificados.extend(itens)
+            continue
+        
+        codigos = {a['Value'] for a in anos}
+        for candidato in itens:
+            (existentes if candidato.codigo_ano_combustivel in codigos else confirmados).append(candidato)
+    
+    return ResultadoVerificacao(confirmados, existentes, nao_verificados, requisicoes)
@@ -0,0 +1,60 @@
+"""
+Escalonamento da coleta: unidades de trabalho e prioridades.
+
+Processar carros, motos e caminhões em fases separadas deixa workers ociosos no
+fim de cada fase, esperando a última marca grande terminar. Aqui todas as
+unidades (tipo, marca) são ordenadas juntas, da mais cara para a mais barata
+(estimativa pelo número de modelos no cache), e o plano de uma marca grande é
+quebrado em sub-unidades (lotes de modelos e de anos) que qualquer worker
+ocioso pode pegar. As filas com prioridade ficam em src.crawler.pipeline.
+"""
+from typing import NamedTuple, Optional
+
+from ..config import LOTE_SUBUNIDADE
+
+
+class UnidadeTrabalho(NamedTuple):
+    """Unidade da fila: uma marca inteira ou um lote do plano de uma marca"""
+    custo: float          # Requisições estimadas (ordena a fila, maior primeiro)
+    tipo_veiculo: int
+    marca: dict           # {'Value', 'Label'} da API
+    modelos: Optional[list] = None  # Lote de modelos do plano (sub-unidade)
+    anos: Optional[list] = None     # Lote de anos do plano (sub-unidade)
+    
+    @property
+    def eh_marca(self):
+        """True se ainda falta listar e planejar a marca"""
+        return self.modelos is None and self.anos is None
+
+
+def estimar_custo_marca(num_modelos_cache, custo_desconhecido):
+    """
+    Custo estimado de uma marca: listagem + modelos já vistos no cache.
+    Marca sem modelos no cache recebe custo_desconhecido (entra cedo na fila).
+    """
+    return 1 + (num_modelos_cache or custo_desconhecido)
+
+
+def dividir_plano(plano, tipo_veiculo, marca, tamanho_lote=LOTE_SUBUNIDADE):
+    """
+    Quebra o plano de uma marca em sub-unidades de até tamanho_lote requisições.
+    
+    Args:
+        plano: PlanoMarca (src.crawler.planejador)
+        tipo_veiculo: Tipo de veículo
+        marca: {'Value', 'Label'} da API
+        tamanho_lote: Máximo de requisições por sub-unidade
+    
+    Returns:
+        list: UnidadeTrabalho com modelos OU anos preenchidos
+    """
+    tamanho_lote = max(tamanho_lote, 1)
+    unidades = []
+    for i in range(0, len(plano.modelos), tamanho_lote):
+        lote = plano.modelos[i:i + tamanho_lote]
+        unidades.append(UnidadeTrabalho(len(lote), tipo_veiculo, marca, modelos=lote))
+    for i in range(0, len(plano.anos), tamanho_lote):
+        lote = plano.anos[i:i + tamanho_lote]
+        unidades.append(UnidadeTrabalho(len(lote), tipo_veiculo, marca, anos=lote))
+    return unidades
+
@@ -0,0 +1,241 @@
+"""
+Estimativa de custo (modo --plan) das coletas na API FIPE, sem executá-las.
+
+Lê o cache local e, no máximo, as listagens mais baratas da API
+(ConsultarMarcas, ConsultarModelos e ConsultarTabelaDeReferencia) para dizer,
+por tipo e por marca, quantas requisições cada etapa vai emitir e quanto tempo
+levará com o delay/latência configurados. Com offline=True nada é consultado:
+marcas, modelos e anos vêm só do cache (estimativa por baixo).
+"""
+from typing import NamedTuple
+
+from ..config import get_delay_padrao, LATENCIA_MEDIA_API
+from .limitador import limitador_global
+from .planejador import planejar_marca, formatar_tempo, limitar_pela_taxa
+
+
+TIPOS_VEICULO = {1: 'Carros', 2: 'Motos', 3: 'Caminhões'}
+
+
+class EstimativaMarca(NamedTuple):
+    """Custo estimado de uma marca"""
+    tipo_veiculo: int
+    codigo_marca: str
+    nome_marca: str
+    requisicoes: dict   # {etapa: quantidade}, ex: {'listagem': 1, 'anos por modelo': 12}
+    segundos: float     # Tempo sequencial da marca (requisições + pausas fixas)
+    reaproveitado: str  # O que do cache evita requisições (texto para o relatório)
+    
+    @property
+    def total_requisicoes(self):
+        return sum(self.requisicoes.values())
+
+
+def custo_requisicao():
+    """Segundos por requisição: delay padrão + latência média da API"""
+    return get_delay_padrao() + LATENCIA_MEDIA_API
+
+
+def estimar_relacionamentos(cache, tipos_veiculo, usar_cache=True, offline=False, pausa_marca=2.0, pausa_ano=0.0):
+    """
+    Estima a coleta de modelos e anos (popular_completo / corrigir_relacionamentos).
+    
+    Args:
+        cache: FipeLocalCache
+        tipos_veiculo: Tipos a estimar (1, 2, 3)
+        usar_cache: True = só o que falta no cache (popular_completo);
+                    False = repopula tudo (corrigir_relacionamentos)
+        offline: True = não consulta a API (marcas/modelos/anos do cache)
+        pausa_marca: Pausa fixa por marca do script estimado (segundos)
+        pausa_ano: Pausa fixa extra por requisição "modelos por ano" (segundos)
+    
+    Returns:
+        list: EstimativaMarca de todas as marcas
+    """
+    if not offline:
+        from .fipe_crawler import buscar_marcas_carros, buscar_modelos
+    
+    custo = custo_requisicao()
+    estimativas = []
+    
+    for tipo_veiculo in tipos_veiculo:
+        if offline:
+            marcas = _marcas_do_cache(cache, tipo_veiculo)
+        else:
+            marcas = buscar_marcas_carros(tipo_veiculo) or []
+        
+        for marca in marcas:
+            codigo_marca = marca['Value']
+            anos_por_modelo = cache.get_anos_por_modelo(codigo_marca, tipo_veiculo)
+            
+            if offline:
+                modelos_api, anos_api = _listagem_do_cache(cache, codigo_marca, tipo_veiculo, anos_por_modelo)
+            else:
+                resultado = buscar_modelos(codigo_marca, tipo_veiculo, marca['Label']) or {}
+                modelos_api = resultado.get('Modelos', [])
+                anos_api = resultado.get('Anos', [])
+            
+            plano = planejar_marca(modelos_api, anos_api, anos_por_modelo if usar_cache else {})
+            
+            requisicoes = {
+                'listagem': 1,
+                'anos por modelo': len(plano.modelos),
+                'modelos por ano': len(plano.anos)
+            }
+            segundos = sum(requisicoes.values()) * custo + len(plano.anos) * pausa_ano
+            if plano.total_requisicoes:
+                segundos += pausa_marca
+            
+            estimativas.append(EstimativaMarca(
+                tipo_veiculo, codigo_marca, marca['Label'], requisicoes, segundos,
+                _descrever_reaproveitamento(modelos_api, anos_por_modelo, usar_cache)
+            ))
+    
+    return estimativas
+
+
+def estimar_valores(cache, mes):
+    """
+    Estima a atualização de valores de um mês (2_atualizar_valores).
+    Usa só o cache: 1 requisição por veículo sem valor no mês.
+    
+    Args:
+        cache: FipeLocalCache
+        mes: Mês de referência YYYYMM (int ou str)
+    
+    Returns:
+        list: EstimativaMarca por marca com veículos pendentes ou já atualizados
+    """
+    cursor = cache.conn.execute('''
+        SELECT ma.tipo_veiculo, ma.codigo_marca, COALESCE(m.nome, ma.codigo_marca),
+               SUM(vf.veiculo_id IS NULL) AS pendentes,
+               SUM(vf.veiculo_id IS NOT NULL) AS atualizados
+        FROM modelos_anos_veiculos ma
+        LEFT JOIN marcas m
+            ON m.codigo = ma.codigo_marca AND m.tipo_veiculo = ma.tipo_veiculo
+        LEFT JOIN valores vf
+            ON vf.veiculo_id = ma.veiculo_id AND vf.mes = ?
+        GROUP BY ma.tipo_veiculo, ma.codigo_marca
+        ORDER BY ma.tipo_veiculo, pendentes DESC
+    ''', (int(mes),))
+    
+    custo = custo_requisicao()
+    return [
+        EstimativaMarca(
+            tipo_veiculo, codigo_marca, nome_marca,
+            {'valores': pendentes}, pendentes * custo,
+            f"{atualizados} valores do mês já no cache" if atualizados else ""
+        )
+        for tipo_veiculo, codigo_marca, nome_marca, pendentes, atualizados in cursor.fetchall()
+    ]
+
+
+def tempo_total(estimativas, workers=1, divide_marcas=False):
+    """
+    Tempo de parede estimado com marcas distribuídas entre workers.
+    Sem divide_marcas, nunca menor que a marca mais demorada (uma marca roda em
+    um único worker); com divide_marcas (fila com sub-unidades, ver
+    src.crawler.escalonador) o trabalho se reparte por igual. Em qualquer caso,
+    nunca menor que o total de requisições no teto do limitador global.
+    """
+    if not estimativas:
+        return 0.0
+    soma = sum(e.segundos for e in estimativas)
+    requisicoes = sum(e.total_requisicoes for e in estimativas)
+    if divide_marcas:
+        return limitar_pela_taxa(soma / max(workers, 1), requisicoes)
+    return limitar_pela_taxa(max(soma / max(workers, 1), max(e.segundos for e in estimativas)), requisicoes)
+
+
+def imprimir_estimativa(titulo, estimativas, workers=1, requisicoes_extras=0, divide_marcas=False):
+    """
+    Imprime o relatório do modo --plan.
+    
+    Args:
+        titulo: Título do relatório
+        estimativas: Lista de EstimativaMarca
+        workers: Workers paralelos do script estimado
+        requisicoes_extras: Requisições fora das marcas (ex: listagem de marcas por tipo)
+        divide_marcas: True se o script divide marcas grandes entre workers
+    """
+    print("=" * 70)
+    print(f"📋 PLANO (sem executar): {titulo}")
+    print("=" * 70)
+    print(f"⚙️  {workers} worker(s), ~{custo_requisicao():.1f}s por requisição "
+          f"(delay {get_delay_padrao():.1f}s + latência {LATENCIA_MEDIA_API:.1f}s), "
+          f"teto de {limitador_global().taxa:.1f} req/s")
+    print()
+    
+    total_geral = requisicoes_extras
+    etapas_geral = {}
+    
+    for tipo_veiculo, nome_tipo in TIPOS_VEICULO.items():
+        do_tipo = [e for e in estimativas if e.tipo_veiculo == tipo_veiculo]
+        if not do_tipo:
+            continue
+        
+        # Marcas que precisam de mais que a própria listagem
+        com_trabalho = [e for e in do_tipo if e.total_requisicoes > e.requisicoes.get('listagem', 0)]
+        print(f"🚘 {nome_tipo.upper()}: {len(do_tipo)} marcas, {len(com_trabalho)} com trabalho")
+        print("-" * 70)
+        
+        for e in sorted(com_trabalho, key=lambda e: e.total_requisicoes, reverse=True):
+            etapas = ", ".join(f"{etapa}: {n}" for etapa, n in e.requisicoes.items() if n)
+            print(f"   • {e.nome_marca} ({e.codigo_marca}): {e.total_requisicoes} req "
+                  f"[{etapas}] ~{formatar_tempo(e.segundos)}")
+            if e.reaproveitado:
+                print(f"       ♻️  {e.reaproveitado}")
+        
+        reaproveitadas = [e for e in do_tipo if e not in com_trabalho]
+        if reaproveitadas:
+            print(f"   ♻️  {len(reaproveitadas)} marcas já completas no cache")
+        
+        total_tipo = sum(e.total_requisicoes for e in do_tipo)
+        for e in do_tipo:
+            for etapa, n in e.requisicoes.items():
+                etapas_geral[etapa] = etapas_geral.get(etapa, 0) + n
+        total_geral += total_tipo
+        print(f"   📊 Subtotal: {total_tipo} requisições, ~{formatar_tempo(tempo_total(do_tipo, workers, divide_marcas))}")
+        print()
+    
+    print("=" * 70)
+    print(f"📊 TOTAL: {total_geral} requisições")
+    for etapa, n in etapas_geral.items():
+        print(f"   • {etapa}: {n}")
+    eta = limitar_pela_taxa(
+        tempo_total(estimativas, workers, divide_marcas) + requisicoes_extras * custo_requisicao(), total_geral
+    )
+    print(f"⏱️  ETA: ~{formatar_tempo(eta)}")
+    print("=" * 70)
+
+
+def _marcas_do_cache(cache, tipo_veiculo):
+    """Marcas de um tipo no formato da API ({'Value', 'Label'})"""
+    cursor = cache.conn.execute(
+        'SELECT codigo, nome FROM marcas WHERE tipo_veiculo = ? ORDER BY nome', (tipo_veiculo,)
+    )
+    return [{'Value': row[0], 'Label': row[1]} for row in cursor.fetchall()]
+
+
+def _listagem_do_cache(cache, codigo_marca, tipo_veiculo, anos_por_modelo):
+    """Reconstrói a resposta de ConsultarModelos (Modelos + Anos) a partir do cache"""
+    cursor = cache.conn.execute(
+        'SELECT codigo, nome FROM modelos WHERE codigo_marca = ? AND tipo_veiculo = ?',
+        (codigo_marca, tipo_veiculo)
+    )
+    modelos = [{'Value': row[0], 'Label': row[1]} for row in cursor.fetchall()]
+    
+    anos = set()
+    for anos_modelo in anos_por_modelo.values():
+        anos |= anos_modelo
+    return modelos, [{'Value': codigo, 'Label': codigo} for codigo in sorted(anos)]
+
+
+def _descrever_reaproveitamento(modelos_api, anos_por_modelo, usar_cache):
+    """Texto com o que o cache já cobre para a marca"""
+    if not usar_cache:
+        return ""
+    completos = sum(1 for m in modelos_api if anos_por_modelo.get(str(m['Value'])))
+    if not completos:
+        return ""
+    return f"{completos}/{len(modelos_api)} modelos com anos no cache"
@@ -53,6 +53,16 @@ def get_session():
     return _session
 
 
+def _aguardar_limite():
+    """Teto global de requisições do processo (LimitadorTaxa compartilhado entre threads)"""
+    try:
+        from .limitador import limitador_global
+    except ImportError:
+        # Módulo executado fora do pacote src.crawler: vale só o delay padrão
+        return
+    limitador_global().adquirir()
+
+
 def buscar_tabela_referencia():
     """
     Busca a tabela de referência com todos os meses/anos disponíveis.
@@ -68,6 +78,7 @@ def buscar_tabela_referencia():
     
     for retry in range(MAX_RETRIES):
         try:
+            _aguardar_limite()
             response = session.post(url, data={}, verify=False)
             response.raise_for_status()
             
@@ -131,6 +142,7 @@ def buscar_marcas_carros(tipo_veiculo=1):
     
     for retry in range(MAX_RETRIES):
         try:
+            _aguardar_limite()
             response = session.post(url, data=payload, verify=False)
             response.raise_for_status()  # Levanta exceção se houver erro HTTP
             
@@ -188,6 +200,7 @@ def buscar_modelos(codigo_marca, tipo_veiculo=1, nome_marca=None):
     
     for retry in range(MAX_RETRIES):
         try:
+            _aguardar_limite()
             response = session.post(url, data=payload, verify=False)
             response.raise_for_status()
             
@@ -244,6 +257,7 @@ def buscar_anos_modelo(codigo_marca, codigo_modelo, tipo_veiculo=1, nome_modelo=
     
     for retry in range(MAX_RETRIES):
         try:
+            _aguardar_limite()
             response = session.post(url, data=payload, verify=False)
             response.raise_for_status()
             
@@ -360,6 +374,7 @@ def buscar_modelos_por_ano(codigo_marca, ano_modelo="32000", codigo_combustivel=
     
     for retry in range(MAX_RETRIES):
         try:
+            _aguardar_limite()
             response = session.post(url, data=payload, verify=False)
             response.raise_for_status()
             
@@ -484,6 +499,7 @@ def buscar_valor_veiculo(codigo_marca, codigo_modelo, ano_modelo, codigo_combust
     
     for retry in range(MAX_RETRIES):
         try:
+            _aguardar_limite()
             response = session.post(url, data=payload, verify=False)
             response.raise_for_status()
             
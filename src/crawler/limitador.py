@@ -0,0 +1,94 @@
+"""
+Limite global de requisições à API FIPE (token bucket).
+
+O delay fixo de cada função do crawler vale por thread: com N workers a taxa
+real é N vezes maior. O limitador é compartilhado por todas as threads do
+processo e garante o teto (TAXA_MAXIMA_API) independente do número de workers.
+
+Todas as funções do fipe_crawler chamam limitador_global().adquirir() antes de
+cada requisição; scripts só ajustam a taxa:
+    limitador_global().definir_taxa(3.0)
+"""
+import time
+from threading import Lock
+
+from ..config import TAXA_MAXIMA_API, RAJADA_API
+
+
+class LimitadorTaxa:
+    """
+    Token bucket thread-safe: `taxa` fichas por segundo, acumulando até `rajada`.
+    Cada requisição consome uma ficha; sem ficha, a thread espera a próxima.
+    """
+    
+    def __init__(self, taxa=TAXA_MAXIMA_API, rajada=RAJADA_API):
+        if taxa <= 0:
+            raise ValueError("taxa deve ser positiva")
+        self.taxa = taxa
+        self.rajada = max(rajada, 1)
+        self._fichas = float(self.rajada)
+        self._ultimo = time.monotonic()
+        self._lock = Lock()
+        
+        # Métricas
+        self.concedidas = 0
+        self.tempo_espera = 0.0
+    
+    def adquirir(self, fichas=1):
+        """
+        Bloqueia até haver `fichas` disponíveis e as consome.
+        
+        Returns:
+            float: Segundos esperados
+        """
+        esperado = 0.0
+        while True:
+            with self._lock:
+                agora = time.monotonic()
+                self._fichas = min(self.rajada, self._fichas + (agora - self._ultimo) * self.taxa)
+                self._ultimo = agora
+                if self._fichas >= fichas:
+                    self._fichas -= fichas
+                    self.concedidas += 1
+                    self.tempo_espera += esperado
+                    return esperado
+                espera = (fichas - self._fichas) / self.taxa
+            time.sleep(espera)
+            esperado += espera
+    
+    def definir_taxa(self, taxa):
+        """Altera a taxa em execução (ex: reduzir após rate limit)"""
+        if taxa <= 0:
+            raise ValueError("taxa deve ser positiva")
+        with self._lock:
+            agora = time.monotonic()
+            self._fichas = min(self.rajada, self._fichas + (agora - self._ultimo) * self.taxa)
+            self._ultimo = agora
+            self.taxa = taxa
+    
+    def metricas(self):
+        """Dicionário com requisições liberadas e tempo total de espera"""
+        with self._lock:
+            return {
+                'taxa': self.taxa,
+                'concedidas': self.concedidas,
+                'tempo_espera': self.tempo_espera
+            }
+
+
+_limitador_global = None
+_lock_global = Lock()
+
+
+def limitador_global():
+    """Limitador único do processo (criado na primeira chamada com TAXA_MAXIMA_API)"""
+    global _limitador_global
+    with _lock_global:
+        if _limitador_global is None:
+            _limitador_global = LimitadorTaxa()
+        return _limitador_global
+
+
+def descrever_teto():
+    """Teto ativo do limitador global, para o cabeçalho dos scripts"""
+    return f"🚦 Teto da API FIPE: {limitador_global().taxa:.1f} req/s no total (todos os workers)"
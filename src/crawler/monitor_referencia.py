@@ -0,0 +1,97 @@
+"""
+Monitor de tabela de referência: detecta quando a FIPE publica um mês novo.
+
+Uma única requisição (ConsultarTabelaDeReferencia) comparada com
+tabelas_referencia do cache local. As consultas ficam registradas no cache
+(verificacoes_referencia), então execuções seguidas (ex: cron a cada minuto)
+consultam a API no máximo uma vez a cada `intervalo_minutos`.
+
+Códigos de saída do monitorar_referencia.py:
+    SAIDA_SEM_NOVIDADE (0)  Nada novo, ou consulta adiada pelo intervalo mínimo
+    SAIDA_ERRO (1)          Falha ao consultar a API ou ao executar o comando
+    SAIDA_NOVO_MES (10)     Mês novo publicado
+"""
+import time
+from typing import NamedTuple
+
+from ..config import INTERVALO_MONITOR_REFERENCIA
+from ..normalizacao import mes_para_yyyymm
+
+
+SAIDA_SEM_NOVIDADE = 0
+SAIDA_ERRO = 1
+SAIDA_NOVO_MES = 10
+
+
+class Verificacao(NamedTuple):
+    """
+    Resultado de uma verificação.
+    
+    status: 'novo', 'sem_novidade', 'adiado' ou 'erro'
+    novas: Tabelas da API ausentes no cache ({'Codigo', 'Mes'}, mais recente primeiro)
+    espera: Segundos até a próxima consulta permitida (status 'adiado')
+    """
+    status: str
+    novas: list
+    espera: float = 0.0
+    
+    @property
+    def mais_recente(self):
+        return self.novas[0] if self.novas else None
+
+
+class MonitorReferencia:
+    """Compara a tabela de referência da API com o cache, respeitando o intervalo mínimo"""
+    
+    def __init__(self, cache, intervalo_minutos=INTERVALO_MONITOR_REFERENCIA, buscar=None):
+        self.cache = cache
+        self.intervalo = intervalo_minutos * 60
+        if buscar is None:
+            from .fipe_crawler import buscar_tabela_referencia as buscar
+        self.buscar = buscar
+    
+    def espera_restante(self):
+        """Segundos até a próxima consulta permitida (0 = pode consultar)"""
+        ultima = self.cache.get_ultima_verificacao_referencia()
+        if ultima is None:
+            return 0.0
+        return max(ultima + self.intervalo - time.time(), 0.0)
+    
+    def verificar(self, forcar=False):
+        """
+        Consulta a API (se o intervalo mínimo já passou) e compara com o cache.
+        Não grava as tabelas novas: ver registrar().
+        
+        Returns:
+            Verificacao
+        """
+        espera = 0.0 if forcar else self.espera_restante()
+        if espera > 0:
+            return Verificacao('adiado', [], espera)
+        
+        tabelas = self.buscar()
+        if not tabelas:
+            self.cache.registrar_verificacao_referencia(time.time(), None, 0)
+            return Verificacao('erro', [])
+        
+        conhecida = self.cache.get_codigo_referencia_mais_recente() or 0
+        novas = sorted(
+            (t for t in tabelas if int(t['Codigo']) > conhecida),
+            key=lambda t: int(t['Codigo']), reverse=True
+        )
+        self.cache.registrar_verificacao_referencia(time.time(), int(tabelas[0]['Codigo']), len(novas))
+        return Verificacao('novo' if novas else 'sem_novidade', novas)
+    
+    def registrar(self, tabelas):
+        """Grava as tabelas em tabelas_referencia: o mês deixa de ser novidade"""
+        for tabela in tabelas:
+            self.cache.save_tabela_referencia(tabela['Codigo'], tabela['Mes'])
+
+
+def descrever_tabela(tabela):
+    """Dicionário do evento de mês novo (código, mês YYYYMM e texto da API)"""
+    return {
+        'codigo_referencia': int(tabela['Codigo']),
+        'mes': mes_para_yyyymm(tabela['Mes']),
+        'mes_api': tabela['Mes'].strip()
+    }
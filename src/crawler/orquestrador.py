@@ -0,0 +1,228 @@
+"""
+Orquestrador de etapas com dependências (DAG), executado no próprio processo.
+
+Cada Etapa declara de quais outras depende. Etapas cujas dependências já
+concluíram rodam em paralelo (threads, até `max_paralelo`); as demais esperam.
+Uma etapa que levanta exceção é repetida até `tentativas` vezes com espera
+crescente; se esgotar, as etapas que dependem dela são ignoradas e os ramos
+independentes continuam.
+
+Uma etapa pode levantar FluxoEncerrado para encerrar o fluxo sem erro (ex:
+nenhum mês novo na FIPE): as etapas que dependem dela não rodam.
+
+Status de cada etapa no resumo:
+    ok          Concluída
+    falhou      Esgotou as tentativas
+    ignorada    Alguma dependência falhou
+    encerrada   Alguma dependência encerrou o fluxo (FluxoEncerrado)
+    desativada  Etapa desligada na execução (conta como concluída para as dependentes)
+    interrompida  Ctrl+C durante a execução
+
+Uso:
+    etapas = [
+        Etapa('referencia', buscar_referencia),
+        Etapa('modelos', atualizar_modelos, depende=('referencia',), tentativas=3),
+        Etapa('valores', atualizar_valores, depende=('referencia',)),
+        Etapa('sincronizacao', sincronizar, depende=('modelos', 'valores')),
+    ]
+    resumo = Orquestrador(etapas, max_paralelo=2).executar(contexto={})
+"""
+import time
+from datetime import datetime
+from queue import Queue
+from threading import Thread
+from typing import NamedTuple, Callable
+
+
+# Espera antes da 2ª tentativa de uma etapa (dobra a cada nova tentativa)
+ESPERA_RETRY_ETAPA = 30  # segundos
+
+
+class FluxoEncerrado(Exception):
+    """Levantada por uma etapa para encerrar o fluxo sem erro (dependentes não rodam)"""
+    
+    def __init__(self, motivo, resultado=None):
+        super().__init__(motivo)
+        self.resultado = resultado
+
+
+class Etapa(NamedTuple):
+    """
+    Nó do grafo.
+    
+    funcao: Recebe o dicionário de contexto compartilhado e devolve o resultado
+            da etapa (dict JSON-serializável ou None), gravado no resumo
+    """
+    nome: str
+    funcao: Callable
+    depende: tuple = ()
+    tentativas: int = 1
+    ativa: bool = True
+
+
+class Orquestrador:
+    """Executa um grafo de Etapas respeitando dependências, paralelismo e retries"""
+    
+    def __init__(self, etapas, max_paralelo=4, espera_retry=ESPERA_RETRY_ETAPA):
+        self.etapas = {etapa.nome: etapa for etapa in etapas}
+        if len(self.etapas) != len(etapas):
+            raise ValueError("Nomes de etapa repetidos")
+        for etapa in etapas:
+            desconhecidas = set(etapa.depende) - set(self.etapas)
+            if desconhecidas:
+                raise ValueError(f"Etapa {etapa.nome} depende de etapas inexistentes: {sorted(desconhecidas)}")
+        self.ordem = self._ordenar()
+        self.max_paralelo = max(max_paralelo, 1)
+        self.espera_retry = espera_retry
+    
+    def _ordenar(self):
+        """Ordem topológica (mantém a ordem de declaração entre etapas independentes)"""
+        ordem, visitadas, em_visita = [], set(), set()
+        
+        def visitar(nome):
+            if nome in visitadas:
+                return
+            if nome in em_visita:
+                raise ValueError(f"Ciclo de dependências envolvendo a etapa {nome}")
+            em_visita.add(nome)
+            for dependencia in self.etapas[nome].depende:
+                visitar(dependencia)
+            em_visita.discard(nome)
+            visitadas.add(nome)
+            ordem.append(nome)
+        
+        for nome in self.etapas:
+            visitar(nome)
+        return ordem
+    
+    def executar(self, contexto=None):
+        """
+        Executa o grafo até todas as etapas terminarem (ou serem ignoradas).
+        
+        Args:
+            contexto: Dicionário compartilhado entre as etapas (resultados intermediários)
+        
+        Returns:
+            dict: Resumo JSON-serializável: status geral ('ok', 'falhou', 'encerrado' ou
+                  'interrompido'), horários, duração e o registro de cada etapa
+        """
+        contexto = {} if contexto is None else contexto
+        inicio = time.time()
+        registros = {nome: self._registro('pendente') for nome in self.ordem}
+        for nome in self.ordem:
+            if not self.etapas[nome].ativa:
+                registros[nome]['status'] = 'desativada'
+        
+        concluidas = Queue()
+        em_execucao = set()
+        
+        try:
+            while True:
+                for nome in self.ordem:
+                    if registros[nome]['status'] != 'pendente' or len(em_execucao) >= self.max_paralelo:
+                        continue
+                    bloqueio = self._bloqueio(nome, registros)
+                    if bloqueio == 'aguardar':
+                        continue
+                    if bloqueio:
+                        registros[nome]['status'] = bloqueio
+                        print(f"⏭️  [{nome}] {bloqueio} (dependência não concluída)")
+                        continue
+                    registros[nome]['status'] = 'executando'
+                    em_execucao.add(nome)
+                    Thread(
+                        target=self._rodar, args=(self.etapas[nome], contexto, concluidas),
+                        name=f"etapa-{nome}", daemon=True
+                    ).start()
+                
+                if not em_execucao:
+                    break
+                
+                nome, registro = concluidas.get()
+                em_execucao.discard(nome)
+                registros[nome] = registro
+        
+        except KeyboardInterrupt:
+            print("\n⚠️  Interrompido pelo usuário")
+            for nome in em_execucao:
+                registros[nome]['status'] = 'interrompida'
+            for registro in registros.values():
+                if registro['status'] == 'pendente':
+                    registro['status'] = 'ignorada'
+        
+        return {
+            'status': self._status_geral(registros),
+            'inicio': datetime.fromtimestamp(inicio).isoformat(timespec='seconds'),
+            'fim': datetime.now().isoformat(timespec='seconds'),
+            'duracao': round(time.time() - inicio, 1),
+            'etapas': registros
+        }
+    
+    def _bloqueio(self, nome, registros):
+        """None = pode rodar, 'aguardar', ou o status herdado das dependências"""
+        status = [registros[d]['status'] for d in self.etapas[nome].depende]
+        encerrou = any(registros[d].get('encerrou') for d in self.etapas[nome].depende)
+        if any(s in ('falhou', 'ignorada', 'interrompida') for s in status):
+            return 'ignorada'
+        if encerrou or 'encerrada' in status:
+            return 'encerrada'
+        if all(s in ('ok', 'desativada') for s in status):
+            return None
+        return 'aguardar'
+    
+    def _rodar(self, etapa, contexto, concluidas):
+        """Executa uma etapa com retries (thread própria) e publica o registro"""
+        registro = self._registro('falhou')
+        inicio = time.time()
+        registro['inicio'] = datetime.fromtimestamp(inicio).isoformat(timespec='seconds')
+        
+        total = max(etapa.tentativas, 1)
+        for tentativa in range(1, total + 1):
+            registro['tentativas'] = tentativa
+            print(f"▶️  [{etapa.nome}] iniciando (tentativa {tentativa}/{total})")
+            try:
+                registro['resultado'] = etapa.funcao(contexto)
+                registro['status'] = 'ok'
+                registro['erro'] = None
+                break
+            except FluxoEncerrado as e:
+                registro.update(status='ok', erro=None, encerrou=str(e), resultado=e.resultado)
+                print(f"🛑 [{etapa.nome}] fluxo encerrado: {e}")
+                break
+            except Exception as e:
+                registro['erro'] = f"{type(e).__name__}: {e}"
+                if tentativa < total:
+                    espera = self.espera_retry * 2 ** (tentativa - 1)
+                    print(f"⚠️  [{etapa.nome}] falhou ({registro['erro']}); nova tentativa em {espera:.0f}s")
+                    time.sleep(espera)
+        
+        registro['fim'] = datetime.now().isoformat(timespec='seconds')
+        registro['duracao'] = round(time.time() - inicio, 1)
+        if registro['status'] == 'ok':
+            print(f"✅ [{etapa.nome}] concluída em {registro['duracao']:.1f}s")
+        else:
+            print(f"❌ [{etapa.nome}] falhou após {registro['tentativas']} tentativa(s): {registro['erro']}")
+        concluidas.put((etapa.nome, registro))
+    
+    @staticmethod
+    def _registro(status):
+        return {
+            'status': status,
+            'tentativas': 0,
+            'inicio': None,
+            'fim': None,
+            'duracao': 0.0,
+            'erro': None,
+            'resultado': None
+        }
+    
+    @staticmethod
+    def _status_geral(registros):
+        status = {r['status'] for r in registros.values()}
+        if 'interrompida' in status:
+            return 'interrompido'
+        if 'falhou' in status or 'ignorada' in status:
+            return 'falhou'
+        if 'encerrada' in status or any(r.get('encerrou') for r in registros.values()):
+            return 'encerrado'
+        return 'ok'
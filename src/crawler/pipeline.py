@@ -0,0 +1,168 @@
+"""
+Pipeline de estágios produtor/consumidor com filas limitadas.
+
+Cada estágio tem sua própria fila de entrada (limitada, com prioridade) e seu
+próprio número de threads. Um estágio entrega itens ao seguinte com emitir();
+se a fila do próximo estágio está cheia, emitir() bloqueia (backpressure), de
+modo que um estágio rápido nunca acumula trabalho sem limite na memória.
+
+Assim, workers de API não esperam pelo SQLite (gravação num estágio próprio)
+e o SQLite não espera pela API.
+
+Uso:
+    pipeline = Pipeline([
+        Estagio('listagem', listar, workers=1),
+        Estagio('busca', buscar, workers=4),
+        Estagio('gravacao', gravar, workers=1),
+    ])
+    pipeline.executar([item_inicial])
+    pipeline.imprimir_metricas()
+
+A função de cada estágio recebe (item, emitir). emitir(item) entrega ao estágio
+seguinte; emitir(item, destino='gravacao') entrega a qualquer estágio posterior
+pelo nome (ex: listagens que já têm algo para gravar). O último estágio não emite.
+"""
+import time
+from itertools import count
+from queue import PriorityQueue
+from threading import Lock, Thread
+
+from .planejador import formatar_tempo
+
+
+_FIM = object()  # Sentinela de fim de fluxo (ordena depois de qualquer item)
+
+
+class Estagio:
+    """Estágio do pipeline: fila de entrada limitada + threads + métricas"""
+    
+    def __init__(self, nome, funcao, workers=1, tamanho_fila=20):
+        self.nome = nome
+        self.funcao = funcao
+        self.workers = max(workers, 1)
+        self.fila = PriorityQueue(maxsize=max(tamanho_fila, 1))
+        self._ordem = count()  # Desempate estável: ordem de chegada
+        self._lock = Lock()
+        self.threads = []
+        
+        # Métricas
+        self.recebidos = 0
+        self.processados = 0
+        self.erros = 0
+        self.pico_fila = 0
+        self.tempo_trabalho = 0.0    # Dentro da função do estágio (inclui bloqueio na saída)
+        self.tempo_ocioso = 0.0      # Esperando item na fila de entrada
+        self.tempo_bloqueado = 0.0   # Esperando vaga na fila do próximo estágio
+    
+    def colocar(self, item, prioridade=0):
+        """Coloca um item na fila (bloqueia se cheia). Maior prioridade sai primeiro."""
+        self.fila.put((-prioridade, next(self._ordem), item))
+        with self._lock:
+            self.recebidos += 1
+            self.pico_fila = max(self.pico_fila, self.fila.qsize())
+    
+    def _encerrar(self):
+        for _ in range(self.workers):
+            self.fila.put((float('inf'), next(self._ordem), _FIM))
+    
+    def _executar(self, posteriores):
+        """Loop de uma thread do estágio; posteriores = estágios seguintes, em ordem"""
+        por_nome = {e.nome: e for e in posteriores}
+        
+        def emitir(item, prioridade=0, destino=None):
+            if not posteriores:
+                raise RuntimeError(f"Estágio final '{self.nome}' não pode emitir itens")
+            alvo = posteriores[0] if destino is None else por_nome.get(destino)
+            if alvo is None:
+                raise ValueError(f"'{destino}' não é um estágio posterior a '{self.nome}'")
+            inicio = time.time()
+            alvo.colocar(item, prioridade)
+            with self._lock:
+                self.tempo_bloqueado += time.time() - inicio
+        
+        while True:
+            inicio = time.time()
+            _, _, item = self.fila.get()
+            ocioso = time.time() - inicio
+            if item is _FIM:
+                with self._lock:
+                    self.tempo_ocioso += ocioso
+                return
+            
+            inicio = time.time()
+            try:
+                self.funcao(item, emitir)
+                erro = 0
+            except Exception as e:
+                print(f"❌ [{self.nome}] Erro: {e}")
+                erro = 1
+            with self._lock:
+                self.tempo_ocioso += ocioso
+                self.tempo_trabalho += time.time() - inicio
+                self.processados += 1
+                self.erros += erro
+    
+    def metricas(self):
+        """Dicionário com as métricas do estágio"""
+        with self._lock:
+            return {
+                'workers': self.workers,
+                'recebidos': self.recebidos,
+                'processados': self.processados,
+                'erros': self.erros,
+                'pico_fila': self.pico_fila,
+                'tempo_trabalho': self.tempo_trabalho,
+                'tempo_ocioso': self.tempo_ocioso,
+                'tempo_bloqueado': self.tempo_bloqueado
+            }
+
+
+class Pipeline:
+    """Sequência linear de estágios ligados por filas limitadas"""
+    
+    def __init__(self, estagios):
+        self.estagios = list(estagios)
+        self.tempo_total = 0.0
+    
+    def executar(self, itens_iniciais):
+        """
+        Roda o pipeline até todos os estágios esvaziarem.
+        
+        Args:
+            itens_iniciais: Itens para o primeiro estágio
+        """
+        inicio = time.time()
+        
+        for i, estagio in enumerate(self.estagios):
+            posteriores = self.estagios[i + 1:]
+            estagio.threads = [
+                Thread(target=estagio._executar, args=(posteriores,), name=f"{estagio.nome}-{n}", daemon=True)
+                for n in range(1, estagio.workers + 1)
+            ]
+            for thread in estagio.threads:
+                thread.start()
+        
+        primeiro = self.estagios[0]
+        for item in itens_iniciais:
+            primeiro.colocar(item)
+        
+        # Encerra em cascata: como só se emite para estágios posteriores, quando
+        # todos os anteriores terminaram nenhum item novo chega a este estágio
+        for estagio in self.estagios:
+            estagio._encerrar()
+            for thread in estagio.threads:
+                thread.join()
+        
+        self.tempo_total = time.time() - inicio
+    
+    def imprimir_metricas(self):
+        """Imprime as métricas de cada estágio"""
+        print(f"🔧 PIPELINE ({formatar_tempo(self.tempo_total)}):")
+        for estagio in self.estagios:
+            m = estagio.metricas()
+            capacidade = m['workers'] * self.tempo_total
+            ocupacao = (m['tempo_trabalho'] - m['tempo_bloqueado']) / capacidade * 100 if capacidade else 0
+            print(f"   • {estagio.nome} ({m['workers']} worker(s)): {m['processados']} itens, "
+                  f"{m['erros']} erros, ocupação {ocupacao:.0f}%, "
+                  f"bloqueado {m['tempo_bloqueado']:.1f}s, pico da fila {m['pico_fila']}")
+
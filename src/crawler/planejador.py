@@ -0,0 +1,184 @@
+"""
+Planejador de coleta de relacionamentos modelo → ano/combustível.
+
+A API FIPE oferece dois caminhos para descobrir quais anos existem para cada modelo:
+- ConsultarAnoModelo (1 requisição por modelo): todos os anos de um modelo
+- ConsultarModelosAtravesDoAno (1 requisição por ano): todos os modelos de um ano
+
+Cada par (modelo, ano) ainda desconhecido fica coberto se o modelo OU o ano for
+consultado. Como toda requisição custa 1, a menor cobertura de conjuntos é a
+cobertura mínima de vértices do grafo bipartido modelos × anos, resolvida de
+forma exata pelo teorema de König (emparelhamento máximo de Hopcroft-Karp).
+
+Exemplo: 40 modelos novos e 120 anos → 40 requisições por modelo; se só 3 anos
+novos apareceram para 300 modelos já completos → 3 requisições por ano.
+"""
+from collections import deque
+from typing import NamedTuple
+
+from ..config import get_delay_padrao, LATENCIA_MEDIA_API, NUM_WORKERS
+from .limitador import limitador_global
+
+
+class PlanoMarca(NamedTuple):
+    """Plano de requisições de uma marca"""
+    modelos: list       # Modelos da API a consultar em ConsultarAnoModelo
+    anos: list          # Anos da API a consultar em ConsultarModelosAtravesDoAno
+    pares_pendentes: int  # Pares (modelo, ano) ainda não verificados
+    
+    @property
+    def total_requisicoes(self):
+        return len(self.modelos) + len(self.anos)
+    
+    def tempo_estimado(self, workers=1):
+        """Tempo estimado em segundos (ver estimar_tempo)"""
+        return estimar_tempo(self.total_requisicoes, workers)
+    
+    def descricao(self):
+        """Resumo de uma linha para logs"""
+        return (f"{self.total_requisicoes} requisições "
+                f"({len(self.modelos)} por modelo + {len(self.anos)} por ano) "
+                f"para {self.pares_pendentes} pares pendentes, ~{formatar_tempo(self.tempo_estimado())}")
+
+
+def planejar_marca(modelos_api, anos_api, anos_por_modelo):
+    """
+    Calcula o menor conjunto de requisições que verifica todos os pares pendentes.
+    
+    Pares pendentes:
+    - Modelo sem anos no cache (novo ou incompleto): todos os anos da marca
+    - Modelo com anos no cache: só os anos da marca que ainda não aparecem no cache
+    
+    Args:
+        modelos_api: Lista 'Modelos' de ConsultarModelos ({'Value', 'Label'})
+        anos_api: Lista 'Anos' de ConsultarModelos ({'Value': '2024-1', 'Label'})
+        anos_por_modelo: {codigo_modelo (str): set de códigos de ano} do cache local
+    
+    Returns:
+        PlanoMarca: Modelos e anos a consultar
+    """
+    anos_conhecidos = set()
+    for anos in anos_por_modelo.values():
+        anos_conhecidos |= anos
+    
+    codigos_anos = [a['Value'] for a in anos_api]
+    anos_novos = [a for a in codigos_anos if a not in anos_conhecidos]
+    
+    # Sem lista de anos da marca só resta consultar modelo a modelo
+    if not anos_api:
+        modelos = [m for m in modelos_api if not anos_por_modelo.get(str(m['Value']))]
+        return PlanoMarca(modelos, [], len(modelos))
+    
+    # Grafo bipartido: modelo → anos pendentes
+    adjacencia = {}
+    for modelo in modelos_api:
+        codigo = str(modelo['Value'])
+        pendentes = codigos_anos if not anos_por_modelo.get(codigo) else anos_novos
+        if pendentes:
+            adjacencia[codigo] = pendentes
+    
+    if not adjacencia:
+        return PlanoMarca([], [], 0)
+    
+    modelos_cobertura, anos_cobertura = _cobertura_minima(adjacencia)
+    
+    return PlanoMarca(
+        modelos=[m for m in modelos_api if str(m['Value']) in modelos_cobertura],
+        anos=[a for a in anos_api if a['Value'] in anos_cobertura],
+        pares_pendentes=sum(len(anos) for anos in adjacencia.values())
+    )
+
+
+def estimar_tempo(requisicoes, workers=NUM_WORKERS):
+    """
+    Estima o tempo de parede (segundos) de um lote de requisições.
+    
+    Cada requisição custa o delay padrão + a latência média da API; workers
+    paralelos dividem o total, mas nunca passam do teto do limitador global
+    (TAXA_MAXIMA_API req/s somando todos).
+    """
+    return limitar_pela_taxa(requisicoes * (get_delay_padrao() + LATENCIA_MEDIA_API) / max(workers, 1), requisicoes)
+
+
+def limitar_pela_taxa(segundos, requisicoes):
+    """Tempo estimado respeitando o teto do limitador global: no mínimo requisicoes / taxa"""
+    return max(segundos, requisicoes / limitador_global().taxa)
+
+
+def formatar_tempo(segundos):
+    """Formata segundos como '45s', '12.5 min' ou '3.2 h'"""
+    if segundos < 60:
+        return f"{segundos:.0f}s"
+    if segundos < 3600:
+        return f"{segundos / 60:.1f} min"
+    return f"{segundos / 3600:.1f} h"
+
+
+def _cobertura_minima(adjacencia):
+    """
+    Cobertura mínima de vértices de um grafo bipartido (teorema de König).
+    
+    Args:
+        adjacencia: {modelo: [anos]}
+    
+    Returns:
+        tuple: (set de modelos, set de anos) que cobrem todas as arestas
+    """
+    par_modelo = {m: None for m in adjacencia}
+    par_ano = {}
+    infinito = float('inf')
+    
+    # Hopcroft-Karp: camadas por BFS e caminhos aumentantes por DFS
+    def bfs():
+        distancia = {}
+        fila = deque()
+        for m in adjacencia:
+            if par_modelo[m] is None:
+                distancia[m] = 0
+                fila.append(m)
+        encontrou = False
+        while fila:
+            m = fila.popleft()
+            for a in adjacencia[m]:
+                proximo = par_ano.get(a)
+                if proximo is None:
+                    encontrou = True
+                elif proximo not in distancia:
+                    distancia[proximo] = distancia[m] + 1
+                    fila.append(proximo)
+        return encontrou, distancia
+    
+    def dfs(m, distancia):
+        for a in adjacencia[m]:
+            proximo = par_ano.get(a)
+            if proximo is None or (distancia.get(proximo) == distancia[m] + 1 and dfs(proximo, distancia)):
+                par_modelo[m] = a
+                par_ano[a] = m
+                return True
+        distancia[m] = infinito
+        return False
+    
+    while True:
+        encontrou, distancia = bfs()
+        if not encontrou:
+            break
+        for m in adjacencia:
+            if par_modelo[m] is None:
+                dfs(m, distancia)
+    
+    # König: a partir dos modelos livres, alterna arestas livres (→ ano) e emparelhadas (→ modelo)
+    visitados_modelos = set()
+    visitados_anos = set()
+    fila = deque(m for m in adjacencia if par_modelo[m] is None)
+    visitados_modelos.update(fila)
+    while fila:
+        m = fila.popleft()
+        for a in adjacencia[m]:
+            if a not in visitados_anos and par_modelo[m] != a:
+                visitados_anos.add(a)
+                proximo = par_ano.get(a)
+                if proximo is not None and proximo not in visitados_modelos:
+                    visitados_modelos.add(proximo)
+                    fila.append(proximo)
+    
+    return set(adjacencia) - visitados_modelos, visitados_anos
@@ -0,0 +1,85 @@
+"""
+Faixas de prioridade da atualização mensal de valores.
+
+Os veículos pendentes do mês são divididos em faixas (config PRIORIDADES_VALORES),
+processadas em ordem: cada veículo fica na primeira faixa que o abrange, e o que
+sobra vai para a faixa final 'demais'. Assim os preços mais consultados (ex: carros
+recentes) ficam completos — e podem ser publicados — antes do resto do catálogo.
+
+Filtros de uma faixa (todos opcionais, combinados com E):
+    tipos           Tipos de veículo (1 carros, 2 motos, 3 caminhões)
+    marcas          Códigos de marca
+    anos_recentes   Anos-modelo a partir de (ano do mês de referência - N); Zero Km sempre entra
+"""
+from typing import NamedTuple
+
+from ..config import PRIORIDADES_VALORES, CODIGO_ZERO_KM
+
+
+FAIXA_DEMAIS = 'demais'
+
+
+class Faixa(NamedTuple):
+    nome: str
+    tipos: tuple = None
+    marcas: tuple = None
+    anos_recentes: int = None
+    
+    def abrange(self, tipo_veiculo, codigo_marca, ano_modelo, ano_referencia):
+        """True se o veículo passa em todos os filtros da faixa"""
+        if self.tipos is not None and tipo_veiculo not in self.tipos:
+            return False
+        if self.marcas is not None and str(codigo_marca) not in self.marcas:
+            return False
+        if self.anos_recentes is not None and ano_modelo != CODIGO_ZERO_KM:
+            return ano_modelo.isdigit() and int(ano_modelo) >= ano_referencia - self.anos_recentes
+        return True
+
+
+def carregar_faixas(prioridades=PRIORIDADES_VALORES):
+    """
+    Faixas na ordem de prioridade, terminando sempre na faixa 'demais' (sem filtros).
+    
+    Args:
+        prioridades: Lista de dicts {'nome', 'tipos', 'marcas', 'anos_recentes'}
+    
+    Returns:
+        list: Faixa
+    """
+    faixas = []
+    for item in prioridades:
+        marcas = item.get('marcas')
+        faixas.append(Faixa(
+            item['nome'],
+            tuple(item['tipos']) if item.get('tipos') is not None else None,
+            tuple(str(m) for m in marcas) if marcas is not None else None,
+            item.get('anos_recentes')
+        ))
+    if len({f.nome for f in faixas}) != len(faixas):
+        raise ValueError("Nomes de faixa repetidos em PRIORIDADES_VALORES")
+    if FAIXA_DEMAIS not in {f.nome for f in faixas}:
+        faixas.append(Faixa(FAIXA_DEMAIS))
+    return faixas
+
+
+def separar_por_faixa(veiculos, faixas, mes):
+    """
+    Distribui os veículos pelas faixas, mantendo a ordem original dentro de cada uma.
+    
+    Args:
+        veiculos: Tuplas (codigo_marca, codigo_modelo, tipo_veiculo, codigo_ano_combustivel, ...)
+        faixas: Lista de Faixa (carregar_faixas)
+        mes: Mês de referência YYYYMM (ano usado em anos_recentes)
+    
+    Returns:
+        list: (Faixa, lista de veículos) na ordem das faixas, incluindo faixas vazias
+    """
+    ano_referencia = int(mes) // 100
+    grupos = [(faixa, []) for faixa in faixas]
+    for veiculo in veiculos:
+        ano_modelo = veiculo[3].partition('-')[0]
+        for faixa, itens in grupos:
+            if faixa.abrange(veiculo[2], veiculo[0], ano_modelo, ano_referencia):
+                itens.append(veiculo)
+                break
+    return grupos
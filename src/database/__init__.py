@@ -2,5 +2,6 @@
 Módulo de clientes de banco de dados
 """
 from .supabase_client import get_supabase_client
+from .sincronizacao_continua import SincronizadorContinuo
 
-__all__ = ['get_supabase_client']
+__all__ = ['get_supabase_client', 'SincronizadorContinuo']
@@ -0,0 +1,153 @@
+"""
+Sincronização contínua SQLite → Supabase durante a coleta.
+
+Com o log de alterações ativado (FipeLocalCache.ativar_log_alteracoes), triggers
+registram na tabela 'alteracoes' cada linha gravada em marcas, anos_combustivel,
+modelos, modelos_anos e valores. O SincronizadorContinuo acompanha o log em ordem
+de id e envia micro-lotes ao Supabase enquanto o crawler grava:
+- envia quando há LOTE_SINCRONIZACAO_CONTINUA alterações pendentes ou quando a mais
+  antiga passa de ATRASO_MAXIMO_SINCRONIZACAO segundos (atraso limitado);
+- tabelas em ordem de dependência (marcas antes de modelos, modelos antes de
+  modelos_anos), com os mesmos upserts idempotentes do sincronizar_supabase.py;
+- valores de cada micro-lote são validados antes do envio (validar_lote_alteracoes):
+  os suspeitos vão para a quarentena e não saem até serem liberados;
+- alterações só saem do log depois de enviadas; falha = nova tentativa com backoff;
+- backpressure: o crawler espera nas gravações em lote se o log passar de
+  LIMITE_PENDENTES_SINCRONIZACAO (FipeLocalCache.aguardar_sincronizacao).
+
+Remoções (ex: descontinuados) não passam pelo log: continuam no sincronizar_supabase.py.
+"""
+import threading
+import time
+
+from ..analise.qualidade import validar_lote_alteracoes
+from ..config import (
+    BATCH_SIZE, RETRY_BASE_WAIT, LOTE_SINCRONIZACAO_CONTINUA, ATRASO_MAXIMO_SINCRONIZACAO
+)
+from ..registros import COLUNAS_VALORES_FIPE
+
+
+# Tabela do log → (tabela no Supabase, on_conflict); ordem de envio = ordem do cache
+DESTINOS = {
+    'marcas': ('marcas', 'codigo,tipo_veiculo'),
+    'anos_combustivel': ('anos_combustivel', 'codigo'),
+    'modelos': ('modelos', 'codigo,codigo_marca,tipo_veiculo'),
+    'modelos_anos': ('modelos_anos', 'codigo_marca,codigo_modelo,tipo_veiculo,codigo_ano_combustivel'),
+    'valores': ('valores_fipe', 'codigo_marca,codigo_modelo,tipo_veiculo,ano_modelo,codigo_combustivel,mes_referencia'),
+}
+
+# Teto do backoff entre tentativas de envio com o Supabase fora
+MAX_ESPERA_FALHA = 300  # segundos
+
+
+class SincronizadorContinuo:
+    """
+    Acompanha o log de alterações do cache local e envia micro-lotes ao Supabase.
+    """
+    
+    def __init__(self, cache, supabase=None, lote=LOTE_SINCRONIZACAO_CONTINUA,
+                 atraso_maximo=ATRASO_MAXIMO_SINCRONIZACAO, intervalo=0.5):
+        """
+        Args:
+            cache: FipeLocalCache com o log de alterações
+            supabase: Cliente Supabase (None = get_supabase_client())
+            lote: Alterações por micro-lote
+            atraso_maximo: Segundos até enviar um lote incompleto
+            intervalo: Segundos entre consultas ao log quando não há o que enviar
+        """
+        if supabase is None:
+            from .supabase_client import get_supabase_client
+            supabase = get_supabase_client()
+        self.cache = cache
+        self.supabase = supabase
+        self.lote = lote
+        self.atraso_maximo = atraso_maximo
+        self.intervalo = intervalo
+        self.stats = {
+            'lotes': 0,
+            'alteracoes': 0,
+            'registros': 0,
+            'falhas': 0,
+            'retidos': 0,
+            'maior_atraso': 0.0
+        }
+    
+    def enviar_lote(self):
+        """
+        Valida e envia as alterações mais antigas (até self.lote) e as tira do log.
+        
+        Returns:
+            int: Alterações confirmadas (0 = log vazio)
+        """
+        # Validação só dos veículos do lote; o lote lido é o mesmo (ultimo_id) que foi validado
+        ultimo_id, retidos = validar_lote_alteracoes(self.cache, self.lote)
+        if ultimo_id is None:
+            return 0
+        ultimo_id, alteracoes, linhas = self.cache.ler_lote_alteracoes(self.lote, ultimo_id)
+        
+        registros = 0
+        for tabela, rows in linhas.items():
+            destino, on_conflict = DESTINOS[tabela]
+            if tabela == 'valores':
+                dados = [{coluna: row[coluna] for coluna in COLUNAS_VALORES_FIPE} for row in rows]
+            else:
+                dados = [dict(row) for row in rows]
+            for inicio in range(0, len(dados), BATCH_SIZE):
+                self.supabase.table(destino).upsert(dados[inicio:inicio + BATCH_SIZE], on_conflict=on_conflict).execute()
+            registros += len(dados)
+        
+        self.cache.confirmar_alteracoes(ultimo_id)
+        self.stats['lotes'] += 1
+        self.stats['alteracoes'] += alteracoes
+        self.stats['registros'] += registros
+        self.stats['retidos'] += retidos
+        return alteracoes
+    
+    def executar(self, parar=None, ate_esvaziar=False):
+        """
+        Loop de sincronização até 'parar' ser sinalizado (enviando o que restar) ou,
+        com ate_esvaziar, até o log ficar vazio.
+        
+        Args:
+            parar: threading.Event para encerrar (None = só com ate_esvaziar ou Ctrl+C)
+            ate_esvaziar: Encerra assim que não houver alterações pendentes
+        
+        Returns:
+            dict: Estatísticas
+        """
+        parar = parar or threading.Event()
+        falhas_seguidas = 0
+        
+        while True:
+            encerrando = ate_esvaziar or parar.is_set()
+            pendentes, mais_antiga = self.cache.get_alteracoes_pendentes()
+            atraso = time.time() - mais_antiga if mais_antiga is not None else 0.0
+            
+            if pendentes and (encerrando or pendentes >= self.lote or atraso >= self.atraso_maximo):
+                try:
+                    enviadas = self.enviar_lote()
+                except Exception as e:
+                    falhas_seguidas += 1
+                    self.stats['falhas'] += 1
+                    espera = min(RETRY_BASE_WAIT * 2 ** (falhas_seguidas - 1), MAX_ESPERA_FALHA)
+                    print(f"   ❌ Erro ao enviar lote ({pendentes} pendentes): {e}")
+                    # Encerrando com o Supabase fora: o log fica para a próxima execução
+                    if encerrando and falhas_seguidas >= 3:
+                        print(f"   ⚠️ {pendentes} alterações mantidas no log")
+                        break
+                    print(f"   ⏳ Nova tentativa em {espera}s")
+                    parar.wait(espera)
+                    continue
+                
+                falhas_seguidas = 0
+                self.stats['maior_atraso'] = max(self.stats['maior_atraso'], atraso)
+                print(f"   📤 {enviadas} alterações enviadas (atraso {atraso:.1f}s, {max(pendentes - enviadas, 0)} pendentes)")
+                continue
+            
+            if encerrando and not pendentes:
+                break
+            
+            self.cache.registrar_progresso_sincronizacao()
+            parar.wait(self.intervalo)
+        
+        return self.stats
@@ -0,0 +1,194 @@
+"""
+Normalização de valores e meses de referência da FIPE.
+
+Ponto único de conversão usado pelo crawler, cache local, sincronização e migrações:
+- Valores: "R$ 69.252,00" → 6925200 (centavos, inteiro)
+- Meses: "janeiro/2026", "janeiro de 2026" ou "202601" → "202601"
+
+As conversões de mês são memoizadas (a mesma dúzia de strings se repete em
+milhões de linhas) e há versões em lote para colunas inteiras, que devolvem
+arrays NumPy int64 (migrações e src/analise).
+"""
+from functools import lru_cache
+
+import numpy as np
+
+from .config import MESES_PT
+
+
+# Valor ou mês vazio/inválido nas versões em lote (centavos e meses nunca são negativos)
+SEM_VALOR = -1
+
+
+# =============================================================================
+# VALORES
+# =============================================================================
+
+def valor_para_centavos(valor):
+    """
+    Converte valor FIPE em centavos inteiros.
+
+    Args:
+        valor: String no formato da API ("R$ 69.252,00") ou número em reais
+
+    Returns:
+        int: Valor em centavos (ex: 6925200), ou None se vazio/inválido
+
+    Examples:
+        >>> valor_para_centavos("R$ 69.252,00")
+        6925200
+        >>> valor_para_centavos("R$ 1.234,5")
+        123450
+        >>> valor_para_centavos("")
+        None
+        >>> valor_para_centavos(0)
+        0
+    """
+    if valor is None or valor == '':
+        return None
+    if isinstance(valor, (int, float)):
+        return int(round(valor * 100))
+    try:
+        inteiro, _, centavos = valor.replace('R$', '').replace('.', '').strip().partition(',')
+        if centavos:
+            return int(inteiro) * 100 + int((centavos + '0')[:2])
+        return int(inteiro) * 100
+    except (AttributeError, ValueError):
+        return None
+
+
+def valor_para_reais(valor):
+    """
+    Converte valor FIPE em reais (float), passando pelos centavos.
+
+    Returns:
+        float: Valor em reais (ex: 69252.0), ou None se vazio/inválido
+    """
+    centavos = valor_para_centavos(valor)
+    return centavos / 100 if centavos is not None else None
+
+
+def centavos_para_texto(centavos):
+    """
+    Formata centavos no padrão da API.
+
+    Examples:
+        >>> centavos_para_texto(6925200)
+        "R$ 69.252,00"
+    """
+    if centavos is None:
+        return None
+    reais, cents = divmod(int(centavos), 100)
+    return f"R$ {reais:,}".replace(',', '.') + f",{cents:02d}"
+
+
+def valores_para_centavos(valores):
+    """
+    Versão em lote de valor_para_centavos() para colunas inteiras.
+
+    Arrays numéricos (reais) são convertidos de forma vetorizada; textos repetidos
+    (comuns no histórico) são convertidos uma única vez.
+
+    Args:
+        valores: Iterável ou array de strings/números
+
+    Returns:
+        np.ndarray: Centavos (int64) na mesma ordem, SEM_VALOR para vazio/inválido
+    """
+    if isinstance(valores, np.ndarray) and valores.dtype.kind in 'iuf':
+        reais = valores.astype(np.float64)
+        centavos = np.full(len(reais), SEM_VALOR, dtype=np.int64)
+        validos = ~np.isnan(reais)
+        centavos[validos] = np.rint(reais[validos] * 100)
+        return centavos
+    return _converter_coluna(valores, valor_para_centavos)
+
+
+# =============================================================================
+# MESES DE REFERÊNCIA
+# =============================================================================
+
+@lru_cache(maxsize=None)
+def mes_para_yyyymm(mes_referencia):
+    """
+    Converte mês de referência do formato português para YYYYMM (memoizado).
+
+    Formatos aceitos:
+    - "janeiro/2026" (formato da API)
+    - "janeiro de 2026" (formato antigo do banco)
+    - "202601" ou 202601 (já convertido - retorna direto)
+
+    Returns:
+        str: Mês no formato YYYYMM (ex: "202601"), ou None se inválido
+    """
+    if not mes_referencia:
+        return None
+
+    if isinstance(mes_referencia, int):
+        mes_referencia = str(mes_referencia)
+
+    # Se já está no formato YYYYMM, retorna direto
+    if mes_referencia.isdigit() and len(mes_referencia) == 6:
+        return mes_referencia
+
+    # Remove espaços extras e converte para minúsculas
+    mes_ref_limpo = mes_referencia.strip().lower()
+
+    # Separa mês e ano (trata ambos formatos: "/" e " de ")
+    if '/' in mes_ref_limpo:
+        mes_nome, _, ano = mes_ref_limpo.partition('/')
+    elif ' de ' in mes_ref_limpo:
+        mes_nome, _, ano = mes_ref_limpo.partition(' de ')
+    else:
+        print(f"⚠️ Erro ao converter mês '{mes_referencia}': formato inválido")
+        return None
+
+    mes_num = MESES_PT.get(mes_nome.strip())
+    ano = ano.strip()
+
+    if mes_num is None or not (ano.isdigit() and len(ano) == 4):
+        print(f"⚠️ Erro ao converter mês '{mes_referencia}': mês ou ano inválido")
+        return None
+
+    return f"{ano}{mes_num:02d}"
+
+
+def mes_para_inteiro(mes_referencia):
+    """
+    Converte mês de referência para inteiro YYYYMM (ex: 202601).
+
+    Returns:
+        int: Mês como inteiro, ou None se inválido
+    """
+    yyyymm = mes_para_yyyymm(mes_referencia)
+    return int(yyyymm) if yyyymm else None
+
+
+def meses_para_inteiros(meses):
+    """
+    Versão em lote de mes_para_inteiro() para colunas inteiras.
+
+    Args:
+        meses: Iterável ou array de meses em qualquer formato aceito
+
+    Returns:
+        np.ndarray: Meses YYYYMM (int64) na mesma ordem, SEM_VALOR para inválido
+    """
+    if isinstance(meses, np.ndarray) and meses.dtype.kind in 'iu':
+        return meses.astype(np.int64)
+    return _converter_coluna(meses, mes_para_inteiro)
+
+
+def _converter_coluna(valores, converter):
+    """Aplica a conversão uma vez por valor distinto e monta o array int64"""
+    convertidos = {}
+
+    def converter_memoizado(valor):
+        try:
+            return convertidos[valor]
+        except KeyError:
+            resultado = converter(valor)
+            convertidos[valor] = SEM_VALOR if resultado is None else resultado
+            return convertidos[valor]
+
+    return np.fromiter(map(converter_memoizado, valores), dtype=np.int64)
@@ -0,0 +1,188 @@
+"""
+Registros tipados do caminho coleta → cache local → sincronização.
+
+Substituem os dicionários montados linha a linha com chaves em string.
+Como são NamedTuples (tuplas), vão direto para executemany() sem conversão:
+a ordem dos campos é a mesma ordem das colunas nos INSERTs do FipeLocalCache.
+"""
+from typing import NamedTuple, Optional
+
+from .config import COMBUSTIVEIS
+from .normalizacao import mes_para_inteiro, valor_para_centavos, centavos_para_texto
+
+
+class Marca(NamedTuple):
+    """Linha da tabela marcas: (codigo, tipo_veiculo, nome)"""
+    codigo: str
+    tipo_veiculo: int
+    nome: str
+
+    @classmethod
+    def da_api(cls, item, tipo_veiculo=1):
+        """Cria a partir de um item de ConsultarMarcas ({'Value', 'Label'})"""
+        return _nova_tupla(cls, (item['Value'], tipo_veiculo, item['Label']))
+
+    @classmethod
+    def lista_da_api(cls, itens, tipo_veiculo=1):
+        """Converte a resposta inteira de ConsultarMarcas"""
+        return [_nova_tupla(cls, (i['Value'], tipo_veiculo, i['Label'])) for i in itens]
+
+    @classmethod
+    def da_linha(cls, row):
+        """Cria a partir de uma linha SQLite (codigo, tipo_veiculo, nome)"""
+        return cls._make(row)
+
+
+class Modelo(NamedTuple):
+    """Linha da tabela modelos: (codigo, codigo_marca, tipo_veiculo, nome)"""
+    codigo: int
+    codigo_marca: str
+    tipo_veiculo: int
+    nome: str
+
+    @classmethod
+    def da_api(cls, item, codigo_marca, tipo_veiculo=1):
+        """Cria a partir de um item de ConsultarModelos ({'Value', 'Label'})"""
+        return _nova_tupla(cls, (item['Value'], codigo_marca, tipo_veiculo, item['Label']))
+
+    @classmethod
+    def lista_da_api(cls, itens, codigo_marca, tipo_veiculo=1):
+        """Converte uma lista de modelos da API"""
+        return [_nova_tupla(cls, (i['Value'], codigo_marca, tipo_veiculo, i['Label'])) for i in itens]
+
+    @classmethod
+    def da_linha(cls, row):
+        """Cria a partir de uma linha SQLite (codigo, codigo_marca, tipo_veiculo, nome)"""
+        return cls._make(row)
+
+
+class AnoCombustivel(NamedTuple):
+    """Linha da tabela anos_combustivel: (codigo, nome, ano, codigo_combustivel, combustivel)"""
+    codigo: str
+    nome: str
+    ano: str
+    codigo_combustivel: Optional[int]
+    combustivel: Optional[str]
+
+    @classmethod
+    def da_api(cls, item):
+        """
+        Cria a partir de um item de ConsultarAnoModelo ({'Value': '2024-1', 'Label': '2024 Gasolina'}).
+        Códigos sem combustível (ex: "32000" em formato antigo) ficam com combustível None.
+        """
+        codigo = item['Value']
+        ano, sep, combustivel = codigo.partition('-')
+        if sep:
+            codigo_combustivel = int(combustivel)
+            return _nova_tupla(cls, (codigo, item['Label'], ano, codigo_combustivel,
+                                     COMBUSTIVEIS.get(codigo_combustivel)))
+        return _nova_tupla(cls, (codigo, item['Label'], codigo, None, None))
+
+    @classmethod
+    def lista_da_api(cls, itens):
+        """Converte uma lista de anos da API"""
+        return [cls.da_api(i) for i in itens]
+
+    @classmethod
+    def da_linha(cls, row):
+        """Cria a partir de uma linha SQLite (codigo, nome, ano, codigo_combustivel, combustivel)"""
+        return cls._make(row)
+
+
+class ValorFipe(NamedTuple):
+    """
+    Valor FIPE de um veículo em um mês.
+
+    Os 9 primeiros campos são as colunas da tabela "valores" (centavos e mês inteiros);
+    os 4 últimos são os textos da dimensão "veiculos". Ver FipeLocalCache.save_valores_fipe().
+    """
+    codigo_marca: int
+    codigo_modelo: int
+    tipo_veiculo: int
+    ano_modelo: int
+    codigo_combustivel: int
+    mes: Optional[int]
+    valor_centavos: Optional[int]
+    codigo_referencia: Optional[int]
+    data_consulta: Optional[str]
+    codigo_fipe: Optional[str]
+    marca: Optional[str]
+    modelo: Optional[str]
+    combustivel: Optional[str]
+
+    @property
+    def valor(self):
+        """Valor no formato da API ("R$ 69.252,00")"""
+        return centavos_para_texto(self.valor_centavos)
+
+    @property
+    def valor_numerico(self):
+        """Valor em reais (float)"""
+        return self.valor_centavos / 100 if self.valor_centavos is not None else None
+
+    @classmethod
+    def da_api(cls, dados, codigo_marca, codigo_modelo, tipo_veiculo, ano_modelo,
+               codigo_combustivel, codigo_referencia, data_consulta=None):
+        """
+        Cria a partir da resposta de ConsultarValorComTodosParametros.
+
+        Args:
+            dados: Dicionário retornado por buscar_valor_veiculo()
+            codigo_marca, codigo_modelo, tipo_veiculo, ano_modelo, codigo_combustivel: Chave do veículo
+            codigo_referencia: Código da tabela de referência consultada
+            data_consulta: Timestamp ISO da consulta (opcional)
+        """
+        return _nova_tupla(cls, (
+            int(codigo_marca),
+            int(codigo_modelo),
+            int(tipo_veiculo),
+            int(ano_modelo),
+            int(codigo_combustivel),
+            mes_para_inteiro(dados.get('MesReferencia')),
+            valor_para_centavos(dados.get('Valor')),
+            codigo_referencia,
+            data_consulta,
+            dados.get('CodigoFipe'),
+            dados.get('Marca'),
+            dados.get('Modelo'),
+            dados.get('Combustivel')
+        ))
+
+    @classmethod
+    def do_dict(cls, valor_data):
+        """Compatibilidade com o formato antigo em dicionário (valor_data)"""
+        return _nova_tupla(cls, (
+            valor_data['codigo_marca'],
+            valor_data['codigo_modelo'],
+            valor_data.get('tipo_veiculo', 1),
+            valor_data['ano_modelo'],
+            valor_data['codigo_combustivel'],
+            mes_para_inteiro(valor_data['mes_referencia']),
+            valor_para_centavos(valor_data['valor']),
+            valor_data['codigo_referencia'],
+            valor_data.get('data_consulta'),
+            valor_data['codigo_fipe'],
+            valor_data['marca'],
+            valor_data['modelo'],
+            valor_data['combustivel']
+        ))
+
+    @classmethod
+    def da_linha(cls, row):
+        """Cria a partir de uma linha SQLite com as colunas em ValorFipe._fields"""
+        return cls._make(row)
+
+
+# Colunas da view valores_fipe (layout antigo, usado na sincronização com o Supabase)
+COLUNAS_VALORES_FIPE = (
+    'codigo_marca', 'codigo_modelo', 'tipo_veiculo', 'ano_modelo', 'codigo_combustivel',
+    'valor', 'valor_numerico', 'codigo_fipe', 'mes_referencia', 'codigo_referencia',
+    'marca', 'modelo', 'combustivel', 'data_consulta'
+)
+
+
+# Construção direta da tupla, sem passar pelo __new__ gerado com argumentos nomeados
+# nem conferir o número de campos: só para tuplas montadas no código com a largura
+# fixa (caminho da API). Linhas lidas do SQLite passam por da_linha() (_make confere)
+_nova_tupla = tuple.__new__
+
@@ -0,0 +1,38 @@
+"""
+Consulta de preços (ConsultaPrecos) sobre um cache local temporário.
+"""
+import sys
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).parent.parent
+sys.path.insert(0, str(ROOT_DIR))
+
+from src.cache.fipe_local_cache import FipeLocalCache
+from src.consulta.precos import ConsultaPrecos
+from src.registros import ValorFipe
+
+
+def valor(mes, centavos):
+    return ValorFipe(21, 1001, 1, 2020, 1, mes, centavos, 330, None, '001001-1', 'Fiat', 'Uno 1.0', 'Gasolina')
+
+
+def test_arquivamento_com_o_servico_aberto(tmp_path):
+    """Ano arquivado depois que o pool abriu: as conexões passam a anexar o arquivo novo"""
+    db_path = str(tmp_path / 'fipe_local.db')
+    cache = FipeLocalCache(db_path)
+    cache.save_valores_fipe([valor(202412, 4800000), valor(202501, 4900000), valor(202601, 5000000)])
+    
+    for tamanho_cache in (0, 100):
+        consulta = ConsultaPrecos(db_path, conexoes=2, tamanho_cache=tamanho_cache)
+        try:
+            chave = (1, 21, 1001, 2020, 1)
+            assert [h['mes_referencia'] for h in consulta.historico(*chave)] == ['202412', '202501', '202601']
+            
+            cache.arquivar_ano(2024 if tamanho_cache == 0 else 2025)
+            consulta._proxima_verificacao = 0  # sem esperar o intervalo de 1s
+            
+            assert [h['mes_referencia'] for h in consulta.historico(*chave)] == ['202412', '202501', '202601']
+            assert consulta.cotar_veiculo(*chave, mes=202412)['valor_numerico'] == 48000.0
+        finally:
+            consulta.close()
+    cache.close()
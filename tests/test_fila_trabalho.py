@@ -0,0 +1,109 @@
+"""
+Regras de lease da fila de trabalho (FilaTrabalho) em arquivos temporários.
+"""
+import sys
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).parent.parent
+sys.path.insert(0, str(ROOT_DIR))
+
+from src.cache.fila_trabalho import FilaTrabalho, MAX_TENTATIVAS
+
+
+def fila_com_tarefas(caminho, quantidade, **kwargs):
+    fila = FilaTrabalho(str(caminho), **kwargs)
+    fila.criar_lote('valores:202601')
+    fila.enfileirar('valores:202601', 'valor', [{'n': i} for i in range(quantidade)])
+    return fila
+
+
+def test_reivindicacoes_sao_disjuntas(tmp_path):
+    """Dois workers (conexões distintas no mesmo arquivo) nunca recebem a mesma tarefa"""
+    caminho = tmp_path / 'fila.db'
+    fila_a = fila_com_tarefas(caminho, 50)
+    fila_b = FilaTrabalho(str(caminho))
+    try:
+        ids_a, ids_b = [], []
+        while True:
+            lote_a = fila_a.reivindicar('valores:202601', 'A', quantidade=7)
+            lote_b = fila_b.reivindicar('valores:202601', 'B', quantidade=5)
+            if not lote_a and not lote_b:
+                break
+            ids_a += [t.id for t in lote_a]
+            ids_b += [t.id for t in lote_b]
+        
+        assert not set(ids_a) & set(ids_b)
+        assert len(ids_a) + len(ids_b) == 50
+        assert fila_a.resumo('valores:202601')['em_andamento'] == 50
+    finally:
+        fila_a.close()
+        fila_b.close()
+
+
+def test_lease_vencido_volta_para_a_fila(tmp_path):
+    """Worker que morre perde as tarefas quando o prazo vence; a conclusão tardia é ignorada"""
+    fila = fila_com_tarefas(tmp_path / 'fila.db', 3)
+    try:
+        perdidas = fila.reivindicar('valores:202601', 'morto', quantidade=3, lease=-1)
+        assert len(perdidas) == 3
+        
+        retomadas = fila.reivindicar('valores:202601', 'vivo', quantidade=3)
+        assert [t.id for t in retomadas] == [t.id for t in perdidas]
+        
+        # O dono original não pode mais concluir nem renovar
+        assert fila.concluir([t.id for t in perdidas], 'morto') == 0
+        assert fila.renovar([t.id for t in perdidas], 'morto') == 0
+        assert fila.concluir([t.id for t in retomadas], 'vivo') == 3
+        assert fila.resumo('valores:202601')['concluida'] == 3
+    finally:
+        fila.close()
+
+
+def test_lease_valido_nao_e_retomado(tmp_path):
+    fila = fila_com_tarefas(tmp_path / 'fila.db', 2)
+    try:
+        assert len(fila.reivindicar('valores:202601', 'A', quantidade=2)) == 2
+        assert fila.reivindicar('valores:202601', 'B', quantidade=2) == []
+    finally:
+        fila.close()
+
+
+def test_falhou_apos_max_tentativas_por_lease_vencido(tmp_path):
+    fila = fila_com_tarefas(tmp_path / 'fila.db', 1)
+    try:
+        for tentativa in range(MAX_TENTATIVAS):
+            assert len(fila.reivindicar('valores:202601', f'W{tentativa}', lease=-1)) == 1
+        
+        # Esgotou as tentativas: não é reivindicada de novo e vira 'falhou'
+        assert fila.reivindicar('valores:202601', 'W-final') == []
+        resumo = fila.resumo('valores:202601')
+        assert resumo.get('falhou') == 1
+        assert 'em_andamento' not in resumo
+    finally:
+        fila.close()
+
+
+def test_falhou_apos_max_tentativas_por_erro(tmp_path):
+    fila = fila_com_tarefas(tmp_path / 'fila.db', 1)
+    try:
+        for tentativa in range(1, MAX_TENTATIVAS + 1):
+            [tarefa] = fila.reivindicar('valores:202601', 'W')
+            fila.falhar(tarefa.id, 'W', 'HTTP 500')
+            estado_esperado = 'falhou' if tentativa == MAX_TENTATIVAS else 'pendente'
+            assert fila.resumo('valores:202601').get(estado_esperado) == 1
+        
+        assert fila.reivindicar('valores:202601', 'W') == []
+    finally:
+        fila.close()
+
+
+def test_fila_compartilhada_nao_usa_wal(tmp_path):
+    """WAL não funciona em disco de rede: a fila compartilhada usa o journal tradicional"""
+    local = FilaTrabalho(str(tmp_path / 'local.db'))
+    compartilhada = FilaTrabalho(str(tmp_path / 'rede.db'), compartilhada=True)
+    try:
+        assert local.conn.execute('PRAGMA journal_mode').fetchone()[0] == 'wal'
+        assert compartilhada.conn.execute('PRAGMA journal_mode').fetchone()[0] == 'delete'
+    finally:
+        local.close()
+        compartilhada.close()
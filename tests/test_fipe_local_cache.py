@@ -0,0 +1,227 @@
+"""
+Regressões do cache local (FipeLocalCache) em bancos temporários.
+"""
+import sqlite3
+import sys
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).parent.parent
+sys.path.insert(0, str(ROOT_DIR))
+
+from src.analise import validar_lote_alteracoes, validar_mes
+from src.cache.fipe_local_cache import FipeLocalCache
+from src.registros import ValorFipe
+
+
+def valor(modelo, codigo_fipe='001001-1', mes=202601, centavos=5000000, codigo_modelo=1001):
+    return ValorFipe(21, codigo_modelo, 1, 2020, 1, mes, centavos, 330, None, codigo_fipe, 'Fiat', modelo, 'Gasolina')
+
+
+def modelos_enviados(cache):
+    """Valida, lê e confirma um lote do log como o SincronizadorContinuo; retorna os modelos dos valores enviados"""
+    ultimo_id, _ = validar_lote_alteracoes(cache, 100)
+    if ultimo_id is None:
+        return []
+    ultimo_id, _, linhas = cache.ler_lote_alteracoes(100, ultimo_id)
+    cache.confirmar_alteracoes(ultimo_id)
+    return sorted(row['modelo'] for row in linhas.get('valores', []))
+
+
+def test_deriva_repetida_nao_quebra_gravacao(tmp_path):
+    """Textos do veículo mudando várias vezes antes da liberação: upsert + trigger de deriva"""
+    cache = FipeLocalCache(str(tmp_path / 'fipe_local.db'))
+    try:
+        cache.save_valores_fipe([valor('Uno 1.0')])
+        cache.save_valores_fipe([valor('Uno 1.0 Fire', codigo_fipe='001001-2')])
+        cache.save_valores_fipe([valor('Uno Mille')])
+        
+        alterados = cache.get_veiculos_alterados()
+        assert len(alterados) == 1
+        # Fica o texto publicado antes da primeira mudança
+        assert alterados[0]['modelo'] == 'Uno 1.0'
+        assert alterados[0]['codigo_fipe'] == '001001-1'
+        assert alterados[0]['modelo_atual'] == 'Uno Mille'
+    finally:
+        cache.close()
+
+
+def test_upsert_de_valores_com_mes_pendente_nas_series(tmp_path):
+    """Upsert DO UPDATE em valores com o mês já marcado em series_pendentes (mescla de shards)"""
+    cache = FipeLocalCache(str(tmp_path / 'fipe_local.db'))
+    try:
+        cache.save_valores_fipe([valor('Uno 1.0')])
+        assert cache.get_meses_series_pendentes() == [202601]
+        cache.conn.execute('''
+            INSERT INTO valores (veiculo_id, mes, valor_centavos)
+            SELECT veiculo_id, mes, valor_centavos + 100 FROM valores WHERE true
+            ON CONFLICT (veiculo_id, mes) DO UPDATE SET valor_centavos = excluded.valor_centavos
+        ''')
+        assert cache.conn.execute('SELECT valor_centavos FROM valores').fetchone()[0] == 5000100
+    finally:
+        cache.close()
+
+
+def test_log_de_valores_valida_cada_lote(tmp_path):
+    """Sincronização contínua: cada micro-lote é validado antes do envio; liberados voltam ao log"""
+    modelos = {1000 + i: f'Modelo {i}' for i in range(1, 9)}
+    cache = FipeLocalCache(str(tmp_path / 'fipe_local.db'))
+    try:
+        cache.save_valores_fipe([
+            valor(nome, f'00100{i}-1', mes=202512, centavos=5000000, codigo_modelo=codigo)
+            for i, (codigo, nome) in enumerate(modelos.items())
+        ])
+        cache.ativar_log_alteracoes()
+        
+        # Variações normais saem no mesmo lote; o valor zerado fica na quarentena
+        cache.save_valores_fipe([
+            valor(nome, f'00100{i}-1', centavos=5000000 + 5000 * i if codigo != 1008 else 0, codigo_modelo=codigo)
+            for i, (codigo, nome) in enumerate(modelos.items())
+            if codigo != 1007
+        ])
+        assert modelos_enviados(cache) == sorted(nome for codigo, nome in modelos.items() if codigo < 1007)
+        
+        # Lote de um veículo só: o salto é medido contra o mês inteiro, não contra ele mesmo
+        cache.save_valores_fipe([valor('Modelo 7', '001006-1', centavos=9000000, codigo_modelo=1007)])
+        assert modelos_enviados(cache) == []
+        assert sorted(row['motivo'] for row in cache.get_quarentena_valores(202601)) == ['salto', 'valor_invalido']
+        
+        salto = [row['veiculo_id'] for row in cache.get_quarentena_valores(202601) if row['motivo'] == 'salto']
+        assert cache.liberar_quarentena_valores(202601, salto) == 1
+        assert modelos_enviados(cache) == ['Modelo 7']
+        assert cache.get_alteracoes_pendentes() == (0, None)
+    finally:
+        cache.close()
+
+
+def test_valor_regravado_depois_da_validacao_do_lote_espera_o_proximo(tmp_path):
+    cache = FipeLocalCache(str(tmp_path / 'fipe_local.db'))
+    try:
+        cache.ativar_log_alteracoes()
+        cache.save_valores_fipe([valor('Uno 1.0')])
+        ultimo_id, _ = validar_lote_alteracoes(cache, 100)
+        
+        # Gravado entre a validação e a leitura: o valor atual ainda não foi validado
+        cache.save_valores_fipe([valor('Uno 1.0', centavos=0)])
+        _, _, linhas = cache.ler_lote_alteracoes(100, ultimo_id)
+        cache.confirmar_alteracoes(ultimo_id)
+        assert 'valores' not in linhas
+        
+        assert modelos_enviados(cache) == []
+        assert [row['motivo'] for row in cache.get_quarentena_valores(202601)] == ['valor_invalido']
+    finally:
+        cache.close()
+
+
+def test_validacao_de_faixa_so_substitui_a_quarentena_dos_seus_veiculos(tmp_path):
+    """Faixa de prioridade: valida e substitui a quarentena só dos veículos dela"""
+    cache = FipeLocalCache(str(tmp_path / 'fipe_local.db'))
+    try:
+        cache.save_valores_fipe([valor('Uno 1.0', centavos=0), valor('Palio 1.0', '001002-1', codigo_modelo=1002)])
+        validar_mes(cache, 202601)
+        assert [row['modelo'] for row in cache.get_quarentena_valores(202601)] == ['Uno 1.0']
+        
+        palio = cache.get_veiculo_ids([(21, 1002, 1, 2020, 1), (21, 9999, 1, 2020, 1)])
+        assert palio == [cache.get_veiculo_id(21, 1002, 1, 2020, 1)]
+        stats = validar_mes(cache, 202601, veiculo_ids=palio)
+        assert (stats['verificados'], stats['retidos']) == (1, 0)
+        assert [row['modelo'] for row in cache.get_quarentena_valores(202601)] == ['Uno 1.0']
+    finally:
+        cache.close()
+
+
+def test_migracao_da_tabela_valores_fipe_antiga(tmp_path):
+    """Banco no layout original (textos): valores e meses convertidos em lote na abertura"""
+    db_path = str(tmp_path / 'fipe_local.db')
+    conn = sqlite3.connect(db_path)
+    conn.execute('''
+        CREATE TABLE valores_fipe (
+            codigo_marca INTEGER NOT NULL, codigo_modelo INTEGER NOT NULL, tipo_veiculo INTEGER DEFAULT 1,
+            ano_modelo INTEGER NOT NULL, codigo_combustivel INTEGER NOT NULL, valor VARCHAR(50) NOT NULL,
+            valor_numerico REAL, codigo_fipe VARCHAR(20), mes_referencia VARCHAR(50), codigo_referencia INTEGER,
+            data_consulta TIMESTAMP DEFAULT CURRENT_TIMESTAMP, marca VARCHAR(100), modelo TEXT,
+            combustivel VARCHAR(100), created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    conn.executemany('''
+        INSERT INTO valores_fipe (codigo_marca, codigo_modelo, tipo_veiculo, ano_modelo, codigo_combustivel,
+                                  valor, codigo_fipe, mes_referencia, codigo_referencia, marca, modelo, combustivel)
+        VALUES (21, 1001, 1, 2020, 1, ?, '001001-1', ?, 330, 'Fiat', 'Uno 1.0', 'Gasolina')
+    ''', [('R$ 50.000,00', 'janeiro/2026'), ('R$ 49.500,50', 'dezembro de 2025'), ('R$ 1,00', 'mês ruim')])
+    conn.commit()
+    conn.close()
+    
+    cache = FipeLocalCache(db_path)
+    try:
+        assert [tuple(row) for row in cache.conn.execute('SELECT mes, valor_centavos FROM valores ORDER BY mes')] == [
+            (202512, 4950050), (202601, 5000000)
+        ]
+        assert cache.conn.execute("SELECT type FROM sqlite_master WHERE name = 'valores_fipe'").fetchone()[0] == 'view'
+    finally:
+        cache.close()
+
+
+def test_mescla_de_shards_fica_com_a_consulta_mais_recente(tmp_path):
+    """Mesmo valor em vários shards (e no principal): prevalece o data_consulta mais novo"""
+    cache = FipeLocalCache(str(tmp_path / 'fipe_local.db'))
+    shards = []
+    try:
+        cache.save_valores_fipe([valor('Uno 1.0', centavos=5000000)._replace(data_consulta='2026-01-10 08:00:00')])
+        for nome, centavos, consulta in (
+            ('w1', 5100000, '2026-01-12 08:00:00'),
+            ('w2', 5200000, '2026-01-11 08:00:00'),
+        ):
+            shard = FipeLocalCache.abrir_shard(nome, db_path=cache.db_path)
+            shard.save_valores_fipe([valor('Uno 1.0', centavos=centavos)._replace(data_consulta=consulta)])
+            shards.append(shard.db_path)
+            shard.close()
+        # Valor só no shard mais antigo também entra
+        shard = FipeLocalCache.abrir_shard('w3', db_path=cache.db_path)
+        shard.save_valores_fipe([valor('Uno 1.0', mes=202602, centavos=5300000)._replace(data_consulta='2026-02-01 08:00:00')])
+        shards.append(shard.db_path)
+        shard.close()
+        
+        cache.mesclar_shards(shards)
+        
+        assert [tuple(row) for row in cache.conn.execute(
+            'SELECT mes, valor_centavos, data_consulta FROM valores ORDER BY mes'
+        )] == [
+            (202601, 5100000, '2026-01-12 08:00:00'),
+            (202602, 5300000, '2026-02-01 08:00:00'),
+        ]
+        
+        # Shard com consulta mais antiga que a do principal não sobrescreve
+        shard = FipeLocalCache.abrir_shard('w4', db_path=cache.db_path)
+        shard.save_valores_fipe([valor('Uno 1.0', centavos=4000000)._replace(data_consulta='2025-12-31 08:00:00')])
+        shard.close()
+        cache.mesclar_shards([shard.db_path])
+        assert cache.conn.execute('SELECT valor_centavos FROM valores WHERE mes = 202601').fetchone()[0] == 5100000
+    finally:
+        cache.close()
+
+
+def test_valores_publicaveis_do_mes_por_veiculo(tmp_path):
+    """Publicação de faixa: só o mês e os veículos pedidos, sem os retidos em quarentena"""
+    cache = FipeLocalCache(str(tmp_path / 'fipe_local.db'))
+    try:
+        cache.save_valores_fipe([
+            valor('Uno', codigo_modelo=1001),
+            valor('Palio', codigo_modelo=1002),
+            valor('Siena', codigo_modelo=1003),
+            valor('Uno', codigo_modelo=1001, mes=202512),
+        ])
+        ids = dict(zip(('Uno', 'Palio', 'Siena'), cache.get_veiculo_ids(
+            (21, modelo, 1, 2020, 1) for modelo in (1001, 1002, 1003)
+        )))
+        cache.conn.execute(
+            "INSERT INTO quarentena_valores (veiculo_id, mes, motivo) VALUES (?, 202601, 'variacao')", (ids['Palio'],)
+        )
+        
+        def modelos(veiculo_ids=None, mes=202601):
+            return sorted(row['modelo'] for row in cache.get_valores_publicaveis_mes(mes, veiculo_ids))
+        
+        assert modelos() == ['Siena', 'Uno']
+        assert modelos([ids['Uno'], ids['Palio']]) == ['Uno']
+        assert modelos([]) == []
+        assert modelos(mes=202512) == ['Uno']
+    finally:
+        cache.close()
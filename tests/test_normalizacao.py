@@ -0,0 +1,36 @@
+"""
+Conversões de src/normalizacao.py.
+"""
+import sys
+from pathlib import Path
+
+import numpy as np
+
+ROOT_DIR = Path(__file__).parent.parent
+sys.path.insert(0, str(ROOT_DIR))
+
+from src.normalizacao import (
+    SEM_VALOR, meses_para_inteiros, valor_para_centavos, valor_para_reais, valores_para_centavos
+)
+
+
+def test_valor_zero_nao_vira_vazio():
+    """Zero é um valor (quarentena 'valor_invalido'), não ausência de valor"""
+    assert valor_para_centavos(0) == 0
+    assert valor_para_centavos(0.0) == 0
+    assert valor_para_reais(0) == 0.0
+    assert valor_para_centavos("R$ 0,00") == 0
+    assert valor_para_centavos(None) is None
+    assert valor_para_centavos('') is None
+    assert valor_para_centavos("R$ 69.252,00") == 6925200
+
+
+def test_conversao_de_colunas_inteiras():
+    centavos = valores_para_centavos(["R$ 69.252,00", "", None, "R$ 69.252,00", 0, "x"])
+    assert centavos.dtype == np.int64
+    assert centavos.tolist() == [6925200, SEM_VALOR, SEM_VALOR, 6925200, 0, SEM_VALOR]
+    assert valores_para_centavos(np.array([692.52, np.nan, 0.0])).tolist() == [69252, SEM_VALOR, 0]
+    
+    meses = meses_para_inteiros(["janeiro/2026", "dezembro de 2025", 202511, "202510", "??"])
+    assert meses.tolist() == [202601, 202512, 202511, 202510, SEM_VALOR]
+    assert meses_para_inteiros(np.array([202601])).tolist() == [202601]
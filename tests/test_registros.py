@@ -0,0 +1,34 @@
+"""
+Registros tipados (src/registros.py) lidos de volta do cache local.
+"""
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT_DIR = Path(__file__).parent.parent
+sys.path.insert(0, str(ROOT_DIR))
+
+from src.cache.fipe_local_cache import FipeLocalCache
+from src.registros import AnoCombustivel, Marca, Modelo, ValorFipe
+
+
+def test_linhas_do_cache_viram_registros(tmp_path):
+    cache = FipeLocalCache(str(tmp_path / 'fipe_local.db'))
+    try:
+        cache.save_marcas([{'Value': '21', 'Label': 'Fiat'}], 1)
+        cache.save_modelos([{'Value': 1001, 'Label': 'Uno 1.0'}], '21', 1)
+        cache.save_anos_modelo([{'Value': '2020-1', 'Label': '2020 Gasolina'}], '21', 1001, 1)
+        
+        assert cache.get_all_marcas(1) == [Marca('21', 1, 'Fiat')]
+        assert cache.get_all_modelos() == [Modelo(1001, '21', 1, 'Uno 1.0')]
+        assert cache.get_all_anos_combustivel() == [AnoCombustivel('2020-1', '2020 Gasolina', '2020', 1, 'Gasolina')]
+    finally:
+        cache.close()
+
+
+def test_linha_com_largura_errada_e_rejeitada():
+    with pytest.raises(TypeError):
+        Marca.da_linha(('21', 'Fiat'))
+    with pytest.raises(TypeError):
+        ValorFipe.da_linha((21, 1001, 1, 2020, 1, 202601, 5000000))